@@ -3,6 +3,8 @@ from typing import AsyncGenerator, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from app.core.tracing import instrument_engine
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
@@ -18,6 +20,13 @@ class Settings(BaseSettings):
     POSTGRES_PORT: Optional[str] = None
     POSTGRES_DB: Optional[str] = None
 
+    # Tracing (see app/core/tracing.py): "none", "file" (JSONL) or "otlp" (collector)
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE: str = "traces.jsonl"
+    OTEL_EXPORTER_OTLP_ENDPOINT: str = "http://localhost:4318"
+    OTEL_SERVICE_NAME: str = "veridata-admin"
+    TRACING_SAMPLE_RATE: float = 1.0
+
     @property
     def database_url_resolved(self) -> str:
         if self.DATABASE_URL:
@@ -37,6 +46,7 @@ class Settings(BaseSettings):
 settings = Settings()
 
 engine = create_async_engine(settings.database_url_resolved, echo=False, future=True)
+instrument_engine(engine)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
 
@@ -1,7 +1,7 @@
 import logging
 from typing import Any, Dict, List
 
-import httpx
+from app.core.tracing import traced_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +22,7 @@ class ChatwootClient:
         params = {"status": status, "sort_by": "last_activity_at", "sort_order": "desc"}
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with traced_http_client() as client:
                 resp = await client.get(url, headers=self.headers, params=params)
                 resp.raise_for_status()
                 data = resp.json()
@@ -38,7 +38,7 @@ class ChatwootClient:
         payload = {"status": status}
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with traced_http_client() as client:
                 resp = await client.post(url, headers=self.headers, json=payload)
                 resp.raise_for_status()
                 logger.info(f"Successfully changed status of conversation {conversation_id} to {status}")
@@ -20,7 +20,8 @@ from app.admin import (
     authentication_backend,
 )
 from app.core.logging import log_error, log_job, setup_logging
-from app.database import engine, get_session
+from app.core.tracing import TracingMiddleware, configure_tracing, start_span
+from app.database import engine, get_session, settings
 from app.models import Client, SyncConfig
 
 
@@ -28,6 +29,13 @@ from app.models import Client, SyncConfig
 # Configure logging
 setup_logging()
 logger = logging.getLogger(__name__)
+configure_tracing(
+    settings.OTEL_SERVICE_NAME,
+    exporter=settings.TRACING_EXPORTER,
+    file_path=settings.TRACING_FILE,
+    otlp_endpoint=settings.OTEL_EXPORTER_OTLP_ENDPOINT,
+    sample_rate=settings.TRACING_SAMPLE_RATE,
+)
 
 from app.jobs.auto_resolve import run_auto_resolve_job
 
@@ -77,7 +85,9 @@ async def sync_worker_loop():
 
                     if should_run:
                         if config.platform == "chatwoot" or config.platform == "chatwoot-auto-resolve":
-                            await run_auto_resolve_job(session, config)
+                            # Each run is its own trace (nothing upstream to continue)
+                            with start_span("job.auto_resolve", attributes={"client.name": client_name}):
+                                await run_auto_resolve_job(session, config)
                         else:
                             log_job(
                                 logger,
@@ -151,6 +161,7 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(title="Veridata Worker", lifespan=lifespan)
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
+app.add_middleware(TracingMiddleware)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 
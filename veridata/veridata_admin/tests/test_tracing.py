@@ -0,0 +1,61 @@
+import httpx
+import pytest
+
+from app.core import tracing
+from app.core.tracing import current_span, start_span, traced_http_client
+
+
+class RecordingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def submit(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    exporter = RecordingExporter()
+    monkeypatch.setattr(tracing, "_exporter", exporter)
+    monkeypatch.setattr(tracing, "_sample_rate", 1.0)
+    return exporter.spans
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    requests = []
+
+    async def handle_async_request(self, request):
+        requests.append(request)
+        status = 502 if request.url.path == "/down" else 200
+        return httpx.Response(status, json={"ok": True}, request=request)
+
+    # TracedAsyncTransport delegates here once it has added the header
+    monkeypatch.setattr(httpx.AsyncHTTPTransport, "handle_async_request", handle_async_request)
+    return requests
+
+
+async def test_traced_client_sends_the_client_span_as_traceparent(exported, upstream):
+    with start_span("sync.job") as job:
+        async with traced_http_client() as client:
+            await client.get("http://chatwoot:3000/api/v1/accounts?token=secret")
+
+    client_span = next(span for span in exported if span.kind == "client")
+    assert upstream[0].headers["traceparent"] == client_span.context.traceparent
+    assert (client_span.trace_id, client_span.parent_id) == (job.trace_id, job.context.span_id)
+    assert client_span.name == "GET chatwoot"
+    assert client_span.attributes["http.url"] == "http://chatwoot:3000/api/v1/accounts"
+    assert client_span.attributes["http.status_code"] == 200
+    assert not client_span.error
+
+
+async def test_traced_client_marks_server_errors(exported, upstream):
+    async with traced_http_client() as client:
+        response = await client.post("http://chatwoot:3000/down", json={})
+
+    (client_span,) = exported
+    assert response.status_code == 502
+    assert client_span.parent_id is None
+    assert upstream[0].headers["traceparent"] == client_span.context.traceparent
+    assert client_span.error
+    assert current_span() is None
@@ -1,7 +1,6 @@
 from langgraph.prebuilt import create_react_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
+from app.agent.llm import get_chat_model
 from app.agent.tools import lookup_pricing, search_knowledge_base, transfer_to_human
-from app.core.config import settings
 
 # Simple cache to avoid rebuilding graph if model is same
 _agent_cache = {}
@@ -11,11 +10,7 @@ def get_agent_app(model_name: str):
     if model_name in _agent_cache:
         return _agent_cache[model_name]
 
-    llm = ChatGoogleGenerativeAI(
-        model=model_name,
-        temperature=0,
-        google_api_key=settings.google_api_key,
-    )
+    llm = get_chat_model(model_name, temperature=0)
 
     tools = [search_knowledge_base, lookup_pricing, transfer_to_human]
 
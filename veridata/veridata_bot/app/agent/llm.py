@@ -0,0 +1,116 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Same fields as SUMMARY_PROMPT_TEMPLATE asks for
+FAKE_SUMMARY = {
+    "purchase_intent": "Medium",
+    "urgency_level": "Normal",
+    "sentiment_score": "Neutral",
+    "detected_budget": None,
+    "detected_language": "en-US",
+    "ai_summary": "Test conversation summary.",
+    "contact_info": {"name": None, "phone": None, "email": None, "address": None, "industry": None},
+    "client_description": "Test client.",
+}
+
+
+def fake_reply(messages: List[BaseMessage]) -> str:
+    system = " ".join(m.content for m in messages if isinstance(m, SystemMessage) and isinstance(m.content, str))
+    if "CRM analyst" in system:
+        return json.dumps(FAKE_SUMMARY)
+    last_question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+    return f"Thanks for your message! This is a test reply to: {str(last_question)[:200]}"
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic offline chat model for load tests. Never calls tools: the agent
+    answers directly. Latency = latency_ms + reply length at tokens_per_second.
+    """
+
+    latency_ms: float = 0.0
+    tokens_per_second: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "veridata-fake"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeChatModel":
+        return self
+
+    def _delay(self, text: str) -> float:
+        delay = self.latency_ms / 1000
+        if self.tokens_per_second > 0:
+            delay += max(1, len(text) // 4) / self.tokens_per_second
+        return delay
+
+    def _generate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        text = fake_reply(messages)
+        time.sleep(self._delay(text))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        text = fake_reply(messages)
+        await asyncio.sleep(self._delay(text))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+# ==================================================================================
+# CHAT MODEL PROVIDERS
+# gemini (default), fake (offline load tests) and openai_compatible (a local model
+# server speaking the OpenAI API; needs the langchain-openai package).
+# LLM_PROVIDER_OVERRIDE selects one for every model call in the bot, matching the
+# variable of the same name in veridata_rag.
+# ==================================================================================
+def _gemini(model_name: str, temperature: float) -> BaseChatModel:
+    return ChatGoogleGenerativeAI(model=model_name, temperature=temperature, google_api_key=settings.google_api_key)
+
+
+def _fake(model_name: str, temperature: float) -> BaseChatModel:
+    return FakeChatModel(latency_ms=settings.fake_llm_latency_ms, tokens_per_second=settings.fake_llm_tokens_per_second)
+
+
+def _openai_compatible(model_name: str, temperature: float) -> BaseChatModel:
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=settings.openai_compatible_model or model_name,
+        base_url=settings.openai_compatible_base_url,
+        api_key=settings.openai_compatible_api_key or "not-needed",
+        temperature=temperature,
+    )
+
+
+CHAT_MODEL_PROVIDERS: Dict[str, Callable[[str, float], BaseChatModel]] = {
+    "gemini": _gemini,
+    "fake": _fake,
+    "openai_compatible": _openai_compatible,
+}
+
+
+def get_provider() -> str:
+    provider = (settings.llm_provider_override or "gemini").strip().lower()
+    if provider not in CHAT_MODEL_PROVIDERS:
+        # A typo must not turn a load test into paid Gemini traffic
+        raise ValueError(f"Unknown LLM provider '{provider}'. Available: {', '.join(sorted(CHAT_MODEL_PROVIDERS))}")
+    return provider
+
+
+def get_chat_model(model_name: str, temperature: float = 0) -> BaseChatModel:
+    return CHAT_MODEL_PROVIDERS[get_provider()](model_name, temperature)
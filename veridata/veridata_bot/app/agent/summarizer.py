@@ -2,9 +2,9 @@ import logging
 import json
 import uuid
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from app.core.config import settings
+from app.agent.llm import get_chat_model
 from app.agent.prompts import SUMMARY_PROMPT_TEMPLATE
+from app.agent.tracing import TracingCallbackHandler
 from app.integrations.rag import RagClient
 
 logger = logging.getLogger(__name__)
@@ -48,18 +48,14 @@ async def summarize_start_conversation(
         )
 
         # 3. Call LLM
-        model = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0,
-            google_api_key=settings.google_api_key,
-        )
+        model = get_chat_model("gemini-2.0-flash", temperature=0)
 
         messages = [
             SystemMessage(content=prompt),
             HumanMessage(content="Analyze the conversation now.")
         ]
 
-        response = await model.ainvoke(messages)
+        response = await model.ainvoke(messages, config={"callbacks": [TracingCallbackHandler()]})
         content = response.content.replace("```json", "").replace("```", "").strip()
 
         # 4. Parse JSON
@@ -0,0 +1,76 @@
+import logging
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.core.tracing import Span, new_span
+
+logger = logging.getLogger(__name__)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    One span per LLM call and tool call of a LangGraph run, children of the span that
+    is current when the run starts (agent.invoke). Langfuse keeps the prompt-level
+    view; these spans put the same calls on the turn's trace next to DB and HTTP spans.
+    """
+
+    # Called in the caller's context, so new spans find their parent
+    run_inline = True
+
+    def __init__(self):
+        self._spans: Dict[UUID, Span] = {}
+
+    def _start(self, run_id: UUID, name: str, kind: str, attributes: Dict[str, Any]):
+        self._spans[run_id] = new_span(name, kind=kind, attributes=attributes)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None) -> Optional[Span]:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            if error is not None:
+                span.record_exception(error)
+            span.end()
+        return span
+
+    @staticmethod
+    def _model_name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> str:
+        params = kwargs.get("invocation_params") or {}
+        return str(params.get("model") or params.get("model_name") or (serialized or {}).get("name") or "unknown")
+
+    def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any
+    ) -> Any:
+        model = self._model_name(serialized, kwargs)
+        attributes = {"llm.model": model, "llm.messages": sum(len(m) for m in messages)}
+        self._start(run_id, f"llm {model}", "client", attributes)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> Any:
+        model = self._model_name(serialized, kwargs)
+        self._start(run_id, f"llm {model}", "client", {"llm.model": model})
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> Any:
+        span = self._spans.get(run_id)
+        if span is not None:
+            try:
+                usage = getattr(response.generations[0][0].message, "usage_metadata", None) or {}
+                if usage:
+                    span.set_attribute("llm.prompt_tokens", usage.get("input_tokens", 0))
+                    span.set_attribute("llm.completion_tokens", usage.get("output_tokens", 0))
+            except (IndexError, AttributeError):
+                pass
+        self._end(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> Any:
+        name = (serialized or {}).get("name") or "unknown"
+        self._start(run_id, f"tool {name}", "internal", {"tool.name": name, "tool.input": str(input_str)[:300]})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._end(run_id, error)
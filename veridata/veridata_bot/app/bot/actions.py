@@ -1,12 +1,12 @@
 import logging
 
-import httpx
 from fastapi import HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.agent.summarizer import summarize_start_conversation
 from app.core.logging import log_db, log_error, log_external_call, log_skip, log_start, log_success
+from app.core.tracing import traced_http_client
 from app.integrations.chatwoot import ChatwootClient
 from app.integrations.crm.espocrm import EspoClient
 from app.integrations.crm.hubspot import HubSpotClient
@@ -56,7 +56,9 @@ def get_crm_integrations(configs):
     if hub_conf:
         token = hub_conf.get("access_token") or hub_conf.get("api_key")
         if token:
-            integrations.append(HubSpotClient(access_token=token))
+            # base_url is only set to point at a stand-in (see loadtest/)
+            base_url = hub_conf.get("base_url") or "https://api.hubapi.com"
+            integrations.append(HubSpotClient(access_token=token, base_url=base_url))
 
     return integrations
 
@@ -118,7 +120,7 @@ async def handle_audio_message(attachments, rag_config) -> str:
             logger.info(f"Found audio attachment. Downloading from: {att.data_url}")
 
             try:
-                async with httpx.AsyncClient(follow_redirects=True) as http_client:
+                async with traced_http_client(follow_redirects=True) as http_client:
                     log_external_call(logger, "Internal/Web", f"Downloading audio from {att.data_url}")
                     resp = await http_client.get(att.data_url)
                     resp.raise_for_status()
@@ -15,6 +15,19 @@ class Settings(BaseSettings):
     rag_service_url: str = "http://veridata.rag:8000"
     rag_api_key: str = ""
     google_api_key: str = ""
+    # "fake" (offline load tests) or "openai_compatible" instead of Gemini, see app/agent/llm.py
+    llm_provider_override: str = ""
+    fake_llm_latency_ms: float = 0.0
+    fake_llm_tokens_per_second: float = 0.0
+    openai_compatible_base_url: str = "http://localhost:8080/v1"
+    openai_compatible_api_key: str = ""
+    openai_compatible_model: str = ""
+    # Spans are exported to a JSONL file ("file") or an OTLP/HTTP collector ("otlp"), see app/core/tracing.py
+    tracing_exporter: str = "none"
+    tracing_file: str = "traces.jsonl"
+    otel_exporter_otlp_endpoint: str = "http://localhost:4318"
+    otel_service_name: str = "veridata-bot"
+    tracing_sample_rate: float = 1.0
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -1,8 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.core.tracing import instrument_engine
 
 engine = create_async_engine(settings.database_url, echo=False, future=True)
+instrument_engine(engine)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
 
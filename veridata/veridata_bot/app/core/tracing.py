@@ -0,0 +1,373 @@
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+# ==================================================================================
+# TRACING
+# W3C trace context (traceparent header) and spans, without the OpenTelemetry SDK:
+# - A trace starts at webhook ingestion (TracingMiddleware) or continues the one in
+#   the incoming traceparent header. The current span lives in a contextvar, so
+#   background tasks and asyncio tasks started from a request stay in its trace.
+# - Outgoing HTTP calls made with traced_http_client() get a client span and carry
+#   the traceparent header, which veridata_rag continues.
+# - instrument_engine() adds a span per SQL statement.
+# - Finished spans are exported in batches from a background thread, either as
+#   JSON lines to a file or as OTLP/HTTP JSON to a collector (Jaeger, Tempo, the
+#   OpenTelemetry Collector) at <endpoint>/v1/traces. Nothing is exported by default.
+# The same module lives in veridata_rag and veridata_admin (each image is built from its own
+# directory), so keep the copies in step; each copy is tested in its own tests/test_tracing.py.
+# ==================================================================================
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_SKIPPED_PATHS = ("/health", "/metrics", "/static", "/favicon.ico")
+_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    match = _TRACEPARENT_RE.match((value or "").strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return SpanContext(match.group(1), match.group(2), bool(int(match.group(3), 16) & 1))
+
+
+class Span:
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str], kind: str, attributes: Dict):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error = False
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.context.trace_id
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, error: BaseException):
+        self.error = True
+        self.attributes["exception.type"] = type(error).__name__
+        self.attributes["exception.message"] = str(error)[:500]
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.context.sampled and _exporter is not None:
+            _exporter.submit(self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "service": _service_name,
+            "start_time": datetime.fromtimestamp(self.start_ns / 1e9, timezone.utc).isoformat(),
+            "start_unix_nano": self.start_ns,
+            "end_unix_nano": self.end_ns,
+            "duration_ms": round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 3),
+            "status": "error" if self.error else "ok",
+            "attributes": self.attributes,
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_service_name = "veridata-bot"
+_sample_rate = 1.0
+_exporter: Optional["_Exporter"] = None
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+def new_span(
+    name: str, kind: str = "internal", attributes: Optional[Dict] = None, parent: Optional[SpanContext] = None
+) -> Span:
+    """Starts a span without making it current (end it with span.end())."""
+    if parent is None and _current_span.get() is not None:
+        parent = _current_span.get().context
+    if parent is None:
+        context = SpanContext(secrets.token_hex(16), secrets.token_hex(8), random.random() < _sample_rate)
+    else:
+        context = SpanContext(parent.trace_id, secrets.token_hex(8), parent.sampled)
+    return Span(name, context, parent.span_id if parent else None, kind, attributes)
+
+
+@contextmanager
+def start_span(
+    name: str, kind: str = "internal", attributes: Optional[Dict] = None, parent: Optional[SpanContext] = None
+) -> Iterator[Span]:
+    span = new_span(name, kind, attributes, parent)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def inject_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    headers = dict(headers or {})
+    span = _current_span.get()
+    if span is not None:
+        headers["traceparent"] = span.context.traceparent
+    return headers
+
+
+# --- Export ---
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": _service_name}}]},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "veridata"},
+                        "spans": [
+                            {
+                                "traceId": span.context.trace_id,
+                                "spanId": span.context.span_id,
+                                "parentSpanId": span.parent_id or "",
+                                "name": span.name,
+                                "kind": _KINDS.get(span.kind, 1),
+                                "startTimeUnixNano": str(span.start_ns),
+                                "endTimeUnixNano": str(span.end_ns),
+                                "attributes": [
+                                    {"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()
+                                ],
+                                "status": {"code": 2 if span.error else 1},
+                            }
+                            for span in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class _Exporter(threading.Thread):
+    BATCH_SIZE = 512
+    INTERVAL_SECONDS = 2.0
+    MAX_QUEUE = 20_000
+
+    def __init__(self, exporter: str, file_path: str, otlp_endpoint: str):
+        super().__init__(name="span-exporter", daemon=True)
+        self.exporter = exporter
+        self.file_path = file_path
+        self.otlp_url = f"{otlp_endpoint.rstrip('/')}/v1/traces"
+        self.queue: "queue.Queue[Span]" = queue.Queue(maxsize=self.MAX_QUEUE)
+        self.dropped = 0
+
+    def submit(self, span: Span):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            batch = self._take(block=True)
+            if batch:
+                self._export(batch)
+
+    def _take(self, block: bool) -> List[Span]:
+        batch: List[Span] = []
+        deadline = time.monotonic() + self.INTERVAL_SECONDS
+        while len(batch) < self.BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(block=block and timeout > 0, timeout=max(timeout, 0) if block else None))
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        while batch := self._take(block=False):
+            self._export(batch)
+
+    def _export(self, spans: List[Span]):
+        try:
+            if self.exporter == "file":
+                with open(self.file_path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(span.as_dict(), default=str) + "\n" for span in spans)
+            elif self.exporter == "otlp":
+                request = urllib.request.Request(
+                    self.otlp_url,
+                    data=json.dumps(_otlp_payload(spans), default=str).encode("utf-8"),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                with urllib.request.urlopen(request, timeout=5):
+                    pass
+        except Exception as e:
+            logger.warning(f"Span export failed ({len(spans)} spans dropped): {e}")
+
+
+def configure_tracing(
+    service_name: str,
+    exporter: str = "none",
+    file_path: str = "traces.jsonl",
+    otlp_endpoint: str = "http://localhost:4318",
+    sample_rate: float = 1.0,
+):
+    """Sets the service name and exporter; call once at startup."""
+    global _service_name, _sample_rate, _exporter
+    _service_name = service_name
+    _sample_rate = sample_rate
+    exporter = (exporter or "none").strip().lower()
+    if exporter not in ("file", "otlp"):
+        return
+    if _exporter is None:
+        _exporter = _Exporter(exporter, file_path, otlp_endpoint)
+        _exporter.start()
+        atexit.register(_exporter.flush)
+        target = file_path if exporter == "file" else otlp_endpoint
+        logger.info(f"Tracing enabled for {service_name}: {exporter} ({target})")
+
+
+# --- Instrumentation ---
+
+
+class TracingMiddleware:
+    """ASGI middleware: one server span per HTTP request, continuing an incoming traceparent.
+
+    The span ends when the response is sent; background tasks of the request run
+    after that, still inside its trace.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(_SKIPPED_PATHS):
+            return await self.app(scope, receive, send)
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        span = new_span(
+            f"{scope['method']} {scope['path']}",
+            kind="server",
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+            parent=parse_traceparent(headers.get("traceparent")),
+        )
+        token = _current_span.set(span)
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                span.error = message["status"] >= 500
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-trace-id", span.trace_id.encode())]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                span.end()
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            span.end()
+            _current_span.reset(token)
+
+
+class TracedAsyncTransport(httpx.AsyncHTTPTransport):
+    """Client span + traceparent header on every request."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attributes = {"http.method": request.method, "http.url": str(request.url.copy_with(query=None))}
+        with start_span(f"{request.method} {request.url.host}", kind="client", attributes=attributes) as span:
+            request.headers["traceparent"] = span.context.traceparent
+            response = await super().handle_async_request(request)
+            span.set_attribute("http.status_code", response.status_code)
+            span.error = response.status_code >= 500
+            return response
+
+
+def traced_http_client(**kwargs) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=TracedAsyncTransport(), **kwargs)
+
+
+def instrument_engine(engine):
+    """One client span per SQL statement executed through this (async) engine."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(" ", 1)[0].upper()
+        context._trace_span = new_span(
+            f"db {operation}",
+            kind="client",
+            attributes={"db.system": "postgresql", "db.operation": operation, "db.statement": statement[:500]},
+        )
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            span.set_attribute("db.rows", cursor.rowcount)
+            span.end()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        span = getattr(exception_context.execution_context, "_trace_span", None)
+        if span is not None:
+            span.record_exception(exception_context.original_exception)
+            span.end()
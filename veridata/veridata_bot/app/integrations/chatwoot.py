@@ -1,6 +1,6 @@
 import logging
 
-import httpx
+from app.core.tracing import traced_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +22,7 @@ class ChatwootClient:
     # message_type='outgoing' means the bot (agent) is speaking.
     # ==================================================================================
     async def send_message(self, conversation_id: str, message: str, message_type: str = "outgoing"):
-        async with httpx.AsyncClient() as client:
+        async with traced_http_client() as client:
             url = f"{self.base_url}/api/v1/accounts/{self.account_id}/conversations/{conversation_id}/messages"
             logger.info(f"Sending message to Chatwoot conversation {conversation_id} (Account {self.account_id})")
             payload = {"content": message, "message_type": message_type, "private": False}
@@ -39,7 +39,7 @@ class ChatwootClient:
     # 'resolved'-> Done
     # ==================================================================================
     async def toggle_status(self, conversation_id: str, status: str):
-        async with httpx.AsyncClient() as client:
+        async with traced_http_client() as client:
             url = f"{self.base_url}/api/v1/accounts/{self.account_id}/conversations/{conversation_id}/toggle_status"
             payload = {"status": status}
             resp = await client.post(url, json=payload, headers=self.headers)
@@ -51,7 +51,7 @@ class ChatwootClient:
     # Updates Lead's email/phone in Chatwoot if discovered by AI.
     # ==================================================================================
     async def update_contact(self, contact_id: int, email: str = None, phone_number: str = None):
-        async with httpx.AsyncClient() as client:
+        async with traced_http_client() as client:
             url = f"{self.base_url}/api/v1/accounts/{self.account_id}/contacts/{contact_id}"
             payload = {}
             if email: payload["email"] = email
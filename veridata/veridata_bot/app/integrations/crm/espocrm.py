@@ -2,6 +2,8 @@ import logging
 
 import httpx
 
+from app.core.tracing import traced_http_client
+
 import re
 from app.integrations.crm.formatting import ConversationFormatter
 from app.bot.utils import extract_contact_info, parse_name
@@ -52,7 +54,7 @@ class EspoClient:
             logger.warning(f"EspoCRM sync matched no email or phone for name: {name}")
             return None
 
-        async with httpx.AsyncClient() as client:
+        async with traced_http_client() as client:
             contact = await self._search_impl(client, "Contact", email, phone)
             entity_type = "Contact"
             entity_id = contact["id"] if contact else None
@@ -117,7 +119,7 @@ class EspoClient:
         if not email and not phone:
             return
 
-        async with httpx.AsyncClient() as client:
+        async with traced_http_client() as client:
             parent_type = "Lead"
             parent_id = None
 
@@ -1,7 +1,7 @@
 import logging
 from typing import Any, Dict, Optional
 
-import httpx
+from app.core.tracing import traced_http_client
 
 import time
 from app.integrations.crm.formatting import ConversationFormatter
@@ -11,9 +11,9 @@ logger = logging.getLogger(__name__)
 
 
 class HubSpotClient:
-    def __init__(self, access_token: str):
+    def __init__(self, access_token: str, base_url: str = "https://api.hubapi.com"):
         self.access_token = access_token
-        self.base_url = "https://api.hubapi.com"
+        self.base_url = base_url.rstrip("/")
         self.headers = {"Authorization": f"Bearer {self.access_token}", "Content-Type": "application/json"}
 
     async def _search_contact(self, email: Optional[str] = None, phone: Optional[str] = None) -> Optional[str]:
@@ -36,7 +36,7 @@ class HubSpotClient:
 
         payload = {"filterGroups": filter_groups, "properties": ["id", "email", "firstname", "lastname"], "limit": 1}
 
-        async with httpx.AsyncClient() as client:
+        async with traced_http_client() as client:
             resp = await client.post(url, headers=self.headers, json=payload)
             if resp.status_code == 200:
                 data = resp.json()
@@ -69,7 +69,7 @@ class HubSpotClient:
         properties["firstname"] = first
         properties["lastname"] = last if last else "Unknown"
 
-        async with httpx.AsyncClient() as client:
+        async with traced_http_client() as client:
             if existing_id:
                 url = f"{self.base_url}/crm/v3/objects/contacts/{existing_id}"
                 await client.patch(url, headers=self.headers, json={"properties": properties})
@@ -134,7 +134,7 @@ class HubSpotClient:
             ],
         }
 
-        async with httpx.AsyncClient() as client:
+        async with traced_http_client() as client:
             resp = await client.post(url, headers=self.headers, json=payload)
             if resp.status_code == 201:
                 logger.info(f"HubSpot: Added summary note to contact {contact_id}")
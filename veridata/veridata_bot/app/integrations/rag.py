@@ -2,7 +2,7 @@ import base64
 import logging
 import uuid
 
-import httpx
+from app.core.tracing import traced_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +19,7 @@ class RagClient:
 
     async def create_session(self) -> str | None:
         """Explicitly create a new details session."""
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with traced_http_client(timeout=10.0) as client:
             url = f"{self.base_url}/api/session"
             headers = self._get_headers()
             payload = {"tenant_id": self.tenant_id}
@@ -35,7 +35,7 @@ class RagClient:
 
     async def append_message(self, session_id: uuid.UUID, role: str, content: str):
         """Manually append a message to the RAG history."""
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with traced_http_client(timeout=10.0) as client:
             url = f"{self.base_url}/api/session/{session_id}/messages"
             headers = self._get_headers()
             payload = {"role": role, "content": content}
@@ -72,7 +72,7 @@ class RagClient:
         external_context: str | None = None,
         **kwargs,
     ) -> dict:
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with traced_http_client(timeout=60.0) as client:
             url = f"{self.base_url}/api/query"
 
             payload = {
@@ -104,7 +104,7 @@ class RagClient:
     # Asks RAG to summarize a session (unused? logic moved to Bot/Summarizer?)
     # ==================================================================================
     async def summarize(self, session_id: uuid.UUID, provider: str = "gemini") -> dict:
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with traced_http_client(timeout=60.0) as client:
             url = f"{self.base_url}/api/summarize"
 
             payload = {"tenant_id": self.tenant_id, "session_id": str(session_id), "provider": provider}
@@ -121,7 +121,7 @@ class RagClient:
     # Cleans up memory references in RAG service.
     # ==================================================================================
     async def delete_session(self, session_id: uuid.UUID) -> dict:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with traced_http_client(timeout=10.0) as client:
             url = f"{self.base_url}/api/session/{session_id}"
 
             headers = self._get_headers()
@@ -138,7 +138,7 @@ class RagClient:
     # Retrieves chat transcript for LangGraph context or Summarization.
     # ==================================================================================
     async def get_history(self, session_id: uuid.UUID) -> list[dict]:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with traced_http_client(timeout=10.0) as client:
             url = f"{self.base_url}/api/session/{session_id}/history"
             headers = self._get_headers()
 
@@ -2,7 +2,7 @@ import csv
 import logging
 from io import StringIO
 
-import httpx
+from app.core.tracing import traced_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +15,7 @@ async def fetch_google_sheet_data(url: str, query: str = None) -> str:
             url = url.split("/view")[0] + "/export?format=csv"
 
         logger.info(f"🌐 Fetching live data from: {url}")
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        async with traced_http_client(timeout=30.0, follow_redirects=True) as client:
             response = await client.get(url)
             response.raise_for_status()
 
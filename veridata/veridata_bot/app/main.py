@@ -3,11 +3,20 @@ from fastapi import BackgroundTasks, FastAPI, Request
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from app.api.endpoints import router as api_router
 from app.bot.engine import process_bot_event, process_integration_event
+from app.core.config import settings
 from app.core.db import async_session_maker
 from app.core.logging import setup_logging
+from app.core.tracing import TracingMiddleware, configure_tracing, start_span
 
 setup_logging()
 logger = logging.getLogger(__name__)
+configure_tracing(
+    settings.otel_service_name,
+    exporter=settings.tracing_exporter,
+    file_path=settings.tracing_file,
+    otlp_endpoint=settings.otel_exporter_otlp_endpoint,
+    sample_rate=settings.tracing_sample_rate,
+)
 
 app = FastAPI(title="Veridata Bot")
 
@@ -18,16 +27,29 @@ async def root():
 
 
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=["*"])
+# Added last so it wraps everything: the webhook span is the root of the turn's trace
+app.add_middleware(TracingMiddleware)
+
+
+def _event_attributes(client_slug: str, payload: dict) -> dict:
+    conversation = payload.get("conversation") or {}
+    return {
+        "client.slug": client_slug,
+        "chatwoot.event": payload.get("event") or "",
+        "chatwoot.conversation_id": conversation.get("id") or payload.get("id") or "",
+    }
 
 
 async def run_bot_bg(client_slug: str, payload: dict):
-    async with async_session_maker() as db:
-        await process_bot_event(client_slug, payload, db)
+    with start_span("bot.process_event", attributes=_event_attributes(client_slug, payload)):
+        async with async_session_maker() as db:
+            await process_bot_event(client_slug, payload, db)
 
 
 async def run_integration_bg(client_slug: str, payload: dict):
-    async with async_session_maker() as db:
-        await process_integration_event(client_slug, payload, db)
+    with start_span("bot.process_integration_event", attributes=_event_attributes(client_slug, payload)):
+        async with async_session_maker() as db:
+            await process_integration_event(client_slug, payload, db)
 
 
 app.include_router(api_router, prefix="/api/v1")
@@ -9,7 +9,9 @@ from langfuse.langchain import CallbackHandler
 
 from app.agent.graph import get_agent_app
 from app.agent.prompts import AGENT_SYSTEM_PROMPT
+from app.agent.tracing import TracingCallbackHandler
 from app.core.llm_config import get_llm_config
+from app.core.tracing import start_span
 from app.integrations.rag import RagClient
 from app.models.session import BotSession
 
@@ -90,17 +92,18 @@ async def run_agent_pipeline(
 
         logger.info(f"🤖 Executing Agent with model: {model_name}")
 
-        result = await agent_app.ainvoke(
-            initial_state,
-            config={
-                "callbacks": [langfuse_handler],
-                "metadata": {
-                    "langfuse_user_id": lf_user_id,
-                    "langfuse_session_id": lf_session_id,
+        with start_span("agent.invoke", attributes={"llm.model": model_name}):
+            result = await agent_app.ainvoke(
+                initial_state,
+                config={
+                    "callbacks": [langfuse_handler, TracingCallbackHandler()],
+                    "metadata": {
+                        "langfuse_user_id": lf_user_id,
+                        "langfuse_session_id": lf_session_id,
+                    },
+                    "configurable": run_config
                 },
-                "configurable": run_config
-            },
-        )
+            )
         raw_content = result["messages"][-1].content
 
         # Handle Structured Content (e.g. Gemini/Anthropic returning list of blocks)
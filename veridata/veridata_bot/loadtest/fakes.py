@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import random
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+# ==================================================================================
+# FAKE UPSTREAMS
+# In-process ASGI stand-ins for everything the bot calls over HTTP, so a load test
+# only exercises the bot itself (web server, background tasks, DB, agent):
+# - Chatwoot: records every outgoing reply and status toggle per conversation
+# - RAG: sessions, history and /api/query kept in memory
+# - CRM: EspoCRM (/api/v1/...) and HubSpot (/crm/v3/...) on one app. Contacts are
+#   "found" for any email, with the email as the record id, so summary notes can be
+#   traced back to their conversation.
+# Each app gets its own Faults: a fixed latency plus uniform jitter on every request,
+# and a probability of answering 500 instead of doing the work.
+# ==================================================================================
+@dataclass
+class Faults:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+
+@dataclass
+class FakeStats:
+    requests: Counter = field(default_factory=Counter)
+    injected_errors: Counter = field(default_factory=Counter)
+
+    def as_dict(self) -> dict:
+        return {"requests": dict(self.requests), "injected_errors": dict(self.injected_errors)}
+
+
+def _with_faults(app: FastAPI, name: str, faults: Faults, stats: FakeStats, rng: random.Random) -> FastAPI:
+    @app.middleware("http")
+    async def inject(request: Request, call_next):
+        stats.requests[name] += 1
+        delay = faults.latency_ms + rng.uniform(0, faults.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if rng.random() < faults.error_rate:
+            stats.injected_errors[name] += 1
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+        return await call_next(request)
+
+    return app
+
+
+# Called with (conversation_id, payload, monotonic receive time)
+ReplyHook = Callable[[str, Dict[str, Any], float], None]
+
+
+def chatwoot_app(
+    faults: Faults, stats: FakeStats, rng: random.Random, on_message: ReplyHook, on_status: ReplyHook
+) -> FastAPI:
+    app = FastAPI(title="Fake Chatwoot")
+
+    @app.post("/api/v1/accounts/{account_id}/conversations/{conversation_id}/messages")
+    async def create_message(account_id: int, conversation_id: str, request: Request):
+        payload = await request.json()
+        on_message(conversation_id, payload, time.monotonic())
+        return {"id": rng.randint(1, 10**9), "content": payload.get("content"), "message_type": 1}
+
+    @app.post("/api/v1/accounts/{account_id}/conversations/{conversation_id}/toggle_status")
+    async def toggle_status(account_id: int, conversation_id: str, request: Request):
+        payload = await request.json()
+        on_status(conversation_id, payload, time.monotonic())
+        return {"payload": {"success": True, "current_status": payload.get("status")}}
+
+    @app.put("/api/v1/accounts/{account_id}/contacts/{contact_id}")
+    async def update_contact(account_id: int, contact_id: int, request: Request):
+        return {"id": contact_id, **(await request.json())}
+
+    return _with_faults(app, "chatwoot", faults, stats, rng)
+
+
+def rag_app(faults: Faults, stats: FakeStats, rng: random.Random, answer_words: int = 60) -> FastAPI:
+    app = FastAPI(title="Fake RAG")
+    sessions: Dict[str, List[dict]] = {}
+
+    @app.post("/api/session")
+    async def create_session():
+        session_id = str(uuid.uuid4())
+        sessions[session_id] = []
+        return {"session_id": session_id}
+
+    @app.post("/api/session/{session_id}/messages")
+    async def append_message(session_id: str, request: Request):
+        payload = await request.json()
+        sessions.setdefault(session_id, []).append(
+            {
+                "role": payload.get("role"),
+                "content": payload.get("content"),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }
+        )
+        return {"status": "ok"}
+
+    @app.get("/api/session/{session_id}/history")
+    async def history(session_id: str):
+        if session_id not in sessions:
+            return JSONResponse({"detail": "Session not found"}, status_code=404)
+        return {"messages": sessions[session_id]}
+
+    @app.delete("/api/session/{session_id}")
+    async def delete_session(session_id: str):
+        if sessions.pop(session_id, None) is None:
+            return JSONResponse({"detail": "Session not found"}, status_code=404)
+        return {"status": "deleted"}
+
+    @app.post("/api/query")
+    async def query(request: Request):
+        payload = await request.json()
+        filler = " ".join(["lorem"] * answer_words)
+        return {"answer": f"According to our documentation, {payload.get('query', '')} {filler}", "sources": []}
+
+    return _with_faults(app, "rag", faults, stats, rng)
+
+
+def crm_app(faults: Faults, stats: FakeStats, rng: random.Random, on_note: ReplyHook) -> FastAPI:
+    app = FastAPI(title="Fake CRM")
+
+    # --- EspoCRM ---
+
+    @app.get("/api/v1/{entity_type}")
+    async def espo_search(entity_type: str, request: Request):
+        value = request.query_params.get("where[0][value]")
+        return {"total": 1 if value else 0, "list": [{"id": value}] if value else []}
+
+    @app.post("/api/v1/Note")
+    async def espo_note(request: Request):
+        payload = await request.json()
+        on_note(str(payload.get("parentId")), payload, time.monotonic())
+        return {"id": str(uuid.uuid4())}
+
+    @app.post("/api/v1/{entity_type}")
+    async def espo_create(entity_type: str, request: Request):
+        return {"id": str(uuid.uuid4()), **(await request.json())}
+
+    @app.put("/api/v1/{entity_type}/{entity_id}")
+    async def espo_update(entity_type: str, entity_id: str, request: Request):
+        return {"id": entity_id, **(await request.json())}
+
+    # --- HubSpot ---
+
+    @app.post("/crm/v3/objects/contacts/search")
+    async def hubspot_search(request: Request):
+        payload = await request.json()
+        values = [f["value"] for group in payload.get("filterGroups", []) for f in group.get("filters", [])]
+        return {"total": len(values[:1]), "results": [{"id": value} for value in values[:1]]}
+
+    @app.post("/crm/v3/objects/notes", status_code=201)
+    async def hubspot_note(request: Request):
+        payload = await request.json()
+        contact_id = next((a["to"]["id"] for a in payload.get("associations", [])), None)
+        on_note(str(contact_id), payload, time.monotonic())
+        return {"id": str(uuid.uuid4())}
+
+    @app.post("/crm/v3/objects/contacts", status_code=201)
+    async def hubspot_create(request: Request):
+        return {"id": str(uuid.uuid4()), **(await request.json())}
+
+    @app.patch("/crm/v3/objects/contacts/{contact_id}")
+    async def hubspot_update(contact_id: str, request: Request):
+        return {"id": contact_id, **(await request.json())}
+
+    return _with_faults(app, "crm", faults, stats, rng)
+
+
+async def serve(app: FastAPI, host: str, port: int) -> uvicorn.Server:
+    """Starts a uvicorn server for app on the running loop; returns it for shutdown."""
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", access_log=False))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            raise RuntimeError(f"{app.title} failed to start on {host}:{port}")
+        await asyncio.sleep(0.01)
+    return server
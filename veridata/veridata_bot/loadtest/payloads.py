@@ -0,0 +1,99 @@
+import random
+import time
+from typing import List
+
+# ==================================================================================
+# CHATWOOT WEBHOOK PAYLOADS
+# Shapes follow what Chatwoot (v3) posts for an API/website inbox: message_created
+# goes to the bot webhook, conversation_status_changed to the integration webhook.
+# Every conversation gets its own contact whose email encodes the conversation id
+# (visitor-<id>@loadtest.example), which is how CRM notes are matched back to it.
+# ==================================================================================
+QUESTIONS = [
+    "Hi, what are your opening hours on Saturday?",
+    "How much does the premium plan cost per month?",
+    "Do you deliver to Porto? How long does it take?",
+    "I bought a blender last week and it stopped working, what is the warranty?",
+    "Can I get a refund if I cancel within 30 days?",
+    "Olá, vocês têm horário disponível amanhã de manhã?",
+    "Hola, ¿cuánto cuesta el corte de pelo?",
+    "Can you send me the full price list please",
+    "Is there parking near the store?",
+    "I want to talk to a person",
+    "What payment methods do you accept?",
+    "Do you have the shampoo for curly hair in stock?",
+]
+
+FOLLOW_UPS = [
+    "Thanks! And on Sunday?",
+    "ok, and is VAT included?",
+    "Can I book for 3pm?",
+    "My email is in my profile, please send me the details",
+    "Perfect, thank you",
+    "What about the basic plan?",
+]
+
+ACCOUNT_ID = 1
+INBOX_ID = 1
+
+
+def contact_email(conversation_id: int) -> str:
+    return f"visitor-{conversation_id}@loadtest.example"
+
+
+def _sender(conversation_id: int) -> dict:
+    return {
+        "id": conversation_id,
+        "name": f"Load Test Visitor {conversation_id}",
+        "email": contact_email(conversation_id),
+        "phone_number": f"+3519{conversation_id % 10**8:08d}",
+        "thumbnail": "",
+        "type": "contact",
+        "additional_attributes": {"city": "Lisbon", "country": "Portugal"},
+    }
+
+
+def _conversation(conversation_id: int, status: str, created_at: int) -> dict:
+    return {
+        "id": conversation_id,
+        "inbox_id": INBOX_ID,
+        "status": status,
+        "channel": "Channel::Api",
+        "created_at": created_at,
+        "additional_attributes": {},
+        "contact_inbox": {"source_id": f"loadtest-{conversation_id}"},
+    }
+
+
+def message_created(conversation_id: int, content: str, created_at: int, message_id: int) -> dict:
+    return {
+        "event": "message_created",
+        "id": message_id,
+        "content": content,
+        "content_type": "text",
+        "content_attributes": {},
+        "message_type": "incoming",
+        "private": False,
+        "created_at": int(time.time()),
+        "source_id": None,
+        "attachments": [],
+        "sender": _sender(conversation_id),
+        "conversation": _conversation(conversation_id, "pending", created_at),
+        "inbox": {"id": INBOX_ID, "name": "Website"},
+        "account": {"id": ACCOUNT_ID, "name": "Load Test"},
+    }
+
+
+def conversation_resolved(conversation_id: int, created_at: int) -> dict:
+    return {
+        "event": "conversation_status_changed",
+        **_conversation(conversation_id, "resolved", created_at),
+        "meta": {"sender": _sender(conversation_id), "assignee": None},
+        "changed_attributes": [{"status": {"previous_value": "pending", "current_value": "resolved"}}],
+        "account": {"id": ACCOUNT_ID, "name": "Load Test"},
+    }
+
+
+def conversation_script(rng: random.Random, turns: int) -> List[str]:
+    """The visitor's messages: one opening question, then follow-ups."""
+    return [rng.choice(QUESTIONS)] + [rng.choice(FOLLOW_UPS) for _ in range(turns - 1)]
@@ -0,0 +1,393 @@
+"""Load test for the bot webhook path with fake Chatwoot, RAG and CRM upstreams.
+
+Replays visitor conversations against a running bot: every visitor sends
+--turns message_created events to /bot/chatwoot/{client_slug}, waiting for the
+bot's reply (and a think time) between turns, and a --resolve-rate share of them
+ends with a conversation_status_changed "resolved" event on
+/integrations/chatwoot/{client_slug}, the webhook that triggers summarization and
+the CRM note. Chatwoot, RAG and the CRM are local fakes (loadtest/fakes.py) with
+injectable latency and error rates, so only the bot, its database and its model
+are under test. Start the bot with LLM_PROVIDER_OVERRIDE=fake (and
+FAKE_LLM_LATENCY_MS / FAKE_LLM_TOKENS_PER_SECOND to model the LLM) to keep the run
+offline, and point the fakes at an address the bot can reach (--advertise-host).
+
+Conversations arrive as a Poisson process. --rates 0.5,1,2,4 runs one stage per
+rate (new conversations per second), --stage-seconds each, so one run shows where
+reply latency starts to climb. Reported per stage:
+- reply latency: webhook sent -> reply received by the fake Chatwoot
+- ack latency: webhook HTTP round trip
+- resolution latency: status change sent -> summary note received by the fake CRM
+- throughput: messages sent and replies received per second
+- queue lag, sampled every --sample-interval: messages acknowledged but not yet
+  answered, and the age of the oldest one
+- errors by kind: webhook HTTP status / exception, reply or resolution timeouts,
+  the bot's fallback reply ("temporary system error") and agent errors
+The JSON report also has the fakes' request and injected-error counts and the git
+commit.
+
+--seed creates (or repoints) the client, an unlimited subscription and a service
+config using the fakes, in the database from the bot's settings (POSTGRES_*).
+
+Usage:
+    python -m loadtest.run --seed --client-slug loadtest --bot-url http://localhost:8000 \\
+        --rates 1,2,4,8 --stage-seconds 60 --rag-latency-ms 150 --chatwoot-error-rate 0.01 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import subprocess
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+
+from loadtest.fakes import FakeStats, Faults, chatwoot_app, crm_app, rag_app, serve
+from loadtest.payloads import contact_email, conversation_resolved, conversation_script, message_created
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_MARKER = "temporary system error"
+AGENT_ERROR_MARKER = "encountered an internal error"
+
+
+def percentiles(samples_ms: List[float]) -> dict:
+    if not samples_ms:
+        return {"count": 0}
+    ordered = sorted(samples_ms)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 1),
+        "p50_ms": round(pick(0.50), 1),
+        "p95_ms": round(pick(0.95), 1),
+        "p99_ms": round(pick(0.99), 1),
+        "max_ms": round(ordered[-1], 1),
+    }
+
+
+class Recorder:
+    """Matches what the fakes receive to what the load generator sent."""
+
+    def __init__(self):
+        self.replies: Dict[str, asyncio.Future] = {}
+        self.notes: Dict[str, asyncio.Future] = {}
+        self.pending: Dict[str, float] = {}  # conversation -> webhook acknowledged at
+        self.handovers = 0
+        self.late_replies = 0
+
+    def expect_reply(self, conversation_id: str) -> asyncio.Future:
+        self.replies[conversation_id] = asyncio.get_running_loop().create_future()
+        return self.replies[conversation_id]
+
+    def expect_note(self, conversation_id: str) -> asyncio.Future:
+        self.notes[contact_email(int(conversation_id))] = asyncio.get_running_loop().create_future()
+        return self.notes[contact_email(int(conversation_id))]
+
+    def on_message(self, conversation_id: str, payload: dict, received_at: float):
+        future = self.replies.pop(conversation_id, None)
+        self.pending.pop(conversation_id, None)
+        if future is None or future.done():
+            self.late_replies += 1
+            return
+        future.set_result((received_at, payload.get("content") or ""))
+
+    def on_status(self, conversation_id: str, payload: dict, received_at: float):
+        if payload.get("status") == "open":
+            self.handovers += 1
+
+    def on_note(self, contact_id: str, payload: dict, received_at: float):
+        future = self.notes.pop(contact_id, None)
+        if future is not None and not future.done():
+            future.set_result(received_at)
+
+
+class Stage:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.conversations = 0
+        self.messages = 0
+        self.replies = 0
+        self.reply_ms: List[float] = []
+        self.ack_ms: List[float] = []
+        self.resolution_ms: List[float] = []
+        self.in_flight: List[float] = []
+        self.oldest_pending_ms: List[float] = []
+        self.errors: Counter = Counter()
+
+    def report(self) -> dict:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "rate": self.rate,
+            "seconds": round(elapsed, 1),
+            "conversations": self.conversations,
+            "messages": self.messages,
+            "replies": self.replies,
+            "messages_per_second": round(self.messages / elapsed, 2) if elapsed else None,
+            "replies_per_second": round(self.replies / elapsed, 2) if elapsed else None,
+            "reply_latency": percentiles(self.reply_ms),
+            "ack_latency": percentiles(self.ack_ms),
+            "resolution_latency": percentiles(self.resolution_ms),
+            "queue": {
+                "max_in_flight": max(self.in_flight, default=0),
+                "mean_in_flight": round(sum(self.in_flight) / len(self.in_flight), 1) if self.in_flight else 0,
+                "oldest_pending": percentiles(self.oldest_pending_ms),
+            },
+            "errors": dict(self.errors),
+            "error_rate": round(sum(self.errors.values()) / max(1, self.messages), 4),
+        }
+
+
+async def post_webhook(http: httpx.AsyncClient, url: str, payload: dict, stage: Stage) -> bool:
+    sent_at = time.monotonic()
+    try:
+        response = await http.post(url, json=payload)
+    except httpx.HTTPError as e:
+        stage.errors[f"webhook_{type(e).__name__}"] += 1
+        return False
+    stage.ack_ms.append((time.monotonic() - sent_at) * 1000)
+    if response.status_code != 200:
+        stage.errors[f"webhook_http_{response.status_code}"] += 1
+        return False
+    return True
+
+
+async def run_conversation(
+    http: httpx.AsyncClient, args: argparse.Namespace, recorder: Recorder, stage: Stage, conversation_id: int
+):
+    rng = random.Random(conversation_id)
+    key = str(conversation_id)
+    created_at = int(time.time())
+    stage.conversations += 1
+    bot_url = f"{args.bot_url.rstrip('/')}/bot/chatwoot/{args.client_slug}"
+    integration_url = f"{args.bot_url.rstrip('/')}/integrations/chatwoot/{args.client_slug}"
+
+    for turn, content in enumerate(conversation_script(rng, args.turns)):
+        reply = recorder.expect_reply(key)
+        sent_at = time.monotonic()
+        stage.messages += 1
+        payload = message_created(conversation_id, content, created_at, message_id=conversation_id * 100 + turn)
+        if not await post_webhook(http, bot_url, payload, stage):
+            recorder.replies.pop(key, None)
+            return
+        if not reply.done():
+            recorder.pending[key] = time.monotonic()
+        try:
+            received_at, answer = await asyncio.wait_for(reply, args.reply_timeout)
+        except asyncio.TimeoutError:
+            recorder.pending.pop(key, None)
+            stage.errors["reply_timeout"] += 1
+            return
+        stage.replies += 1
+        stage.reply_ms.append((received_at - sent_at) * 1000)
+        if FALLBACK_MARKER in answer:
+            stage.errors["bot_fallback"] += 1
+        elif AGENT_ERROR_MARKER in answer:
+            stage.errors["agent_error"] += 1
+        await asyncio.sleep(rng.expovariate(1 / args.think_time) if args.think_time > 0 else 0)
+
+    if rng.random() >= args.resolve_rate:
+        return
+    note = recorder.expect_note(key) if args.crm != "none" else None
+    sent_at = time.monotonic()
+    if not await post_webhook(http, integration_url, conversation_resolved(conversation_id, created_at), stage):
+        return
+    if note is None:
+        return
+    try:
+        received_at = await asyncio.wait_for(note, args.reply_timeout)
+        stage.resolution_ms.append((received_at - sent_at) * 1000)
+    except asyncio.TimeoutError:
+        stage.errors["resolution_timeout"] += 1
+
+
+async def sample_queue(recorder: Recorder, stages: List[Stage], interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        if not stages:
+            continue
+        now = time.monotonic()
+        stage = stages[-1]
+        stage.in_flight.append(len(recorder.pending))
+        if recorder.pending:
+            stage.oldest_pending_ms.append((now - min(recorder.pending.values())) * 1000)
+
+
+async def seed_client(args: argparse.Namespace, base_urls: Dict[str, str]):
+    """Creates or repoints the load-test client at the fakes."""
+    from sqlalchemy import select
+
+    from app.core.db import async_session_maker, engine
+    from app.models import Client, ServiceConfig, Subscription
+
+    config = {
+        "rag": {"base_url": base_urls["rag"], "tenant_id": "loadtest", "api_key": "loadtest"},
+        "chatwoot": {"base_url": base_urls["chatwoot"], "api_key": "loadtest", "account_id": 1},
+        "client_config": {},
+    }
+    if args.crm == "espocrm":
+        config["espocrm"] = {"base_url": base_urls["crm"], "api_key": "loadtest"}
+    elif args.crm == "hubspot":
+        config["hubspot"] = {"base_url": base_urls["crm"], "access_token": "loadtest"}
+
+    async with async_session_maker() as db:
+        client = (await db.execute(select(Client).where(Client.slug == args.client_slug))).scalars().first()
+        if not client:
+            client = Client(name=f"Load test ({args.client_slug})", slug=args.client_slug, is_active=True)
+            db.add(client)
+            await db.flush()
+        client.is_active = True
+
+        service_config = (
+            (await db.execute(select(ServiceConfig).where(ServiceConfig.client_id == client.id))).scalars().first()
+        )
+        if service_config:
+            service_config.config = config
+        else:
+            db.add(ServiceConfig(client_id=client.id, config=config))
+
+        subscription = (
+            (await db.execute(select(Subscription).where(Subscription.client_id == client.id))).scalars().first()
+        )
+        if not subscription:
+            subscription = Subscription(client_id=client.id)
+            db.add(subscription)
+        subscription.quota_limit = 10**9
+        subscription.usage_count = 0
+        await db.commit()
+    await engine.dispose()
+    logger.info(f"Seeded client '{args.client_slug}' against the fakes: {base_urls}")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.random_seed)
+    recorder = Recorder()
+    stats = FakeStats()
+    ports = {"chatwoot": args.chatwoot_port, "rag": args.rag_port, "crm": args.crm_port}
+    apps = {
+        "chatwoot": chatwoot_app(
+            Faults(args.chatwoot_latency_ms, args.jitter_ms, args.chatwoot_error_rate),
+            stats,
+            random.Random(rng.random()),
+            recorder.on_message,
+            recorder.on_status,
+        ),
+        "rag": rag_app(
+            Faults(args.rag_latency_ms, args.jitter_ms, args.rag_error_rate), stats, random.Random(rng.random())
+        ),
+        "crm": crm_app(
+            Faults(args.crm_latency_ms, args.jitter_ms, args.crm_error_rate),
+            stats,
+            random.Random(rng.random()),
+            recorder.on_note,
+        ),
+    }
+    servers = [await serve(app, args.fake_host, ports[name]) for name, app in apps.items()]
+    base_urls = {name: f"http://{args.advertise_host}:{port}" for name, port in ports.items()}
+    if args.seed:
+        await seed_client(args, base_urls)
+
+    stages: List[Stage] = []
+    tasks: List[asyncio.Task] = []
+    # Conversation ids must not collide with bot sessions left by earlier runs
+    next_id = args.conversation_id_start or int(time.time()) * 1000
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(timeout=args.webhook_timeout, limits=limits) as http:
+        sampler = asyncio.create_task(sample_queue(recorder, stages, args.sample_interval))
+        for rate in [float(r) for r in args.rates.split(",")]:
+            stage = Stage(rate)
+            stages.append(stage)
+            deadline = stage.started_at + args.stage_seconds
+            while time.monotonic() < deadline:
+                tasks.append(asyncio.create_task(run_conversation(http, args, recorder, stage, next_id)))
+                next_id += 1
+                await asyncio.sleep(rng.expovariate(rate))
+            stage.finished_at = time.monotonic()
+            reply = percentiles(stage.reply_ms)
+            logger.info(
+                f"rate {rate}/s: {stage.conversations} conversations, reply p50={reply.get('p50_ms')}ms "
+                f"p95={reply.get('p95_ms')}ms, {len(recorder.pending)} in flight"
+            )
+        # Drain: conversations started in the last stages finish their turns
+        if tasks:
+            await asyncio.wait(tasks, timeout=args.drain_timeout)
+        sampler.cancel()
+        for task in tasks:
+            task.cancel()
+
+    for server in servers:
+        server.should_exit = True
+    await asyncio.sleep(0.2)
+
+    return {
+        "benchmark": "bot_webhook_load",
+        "git_commit": _git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "stages": [stage.report() for stage in stages],
+        "handovers": recorder.handovers,
+        "late_replies": recorder.late_replies,
+        "fakes": stats.as_dict(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bot-url", default="http://localhost:8000")
+    parser.add_argument("--client-slug", default="loadtest")
+    parser.add_argument("--seed", action="store_true", help="Create/repoint the client and configs at the fakes")
+    parser.add_argument("--rates", default="1", help="Comma-separated new conversations per second, one stage each")
+    parser.add_argument("--stage-seconds", type=float, default=60)
+    parser.add_argument("--turns", type=int, default=3, help="Visitor messages per conversation")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds between a reply and the next turn")
+    parser.add_argument("--resolve-rate", type=float, default=0.5, help="Share of conversations resolved at the end")
+    parser.add_argument("--crm", choices=("espocrm", "hubspot", "none"), default="espocrm")
+    parser.add_argument("--reply-timeout", type=float, default=60)
+    parser.add_argument("--webhook-timeout", type=float, default=10)
+    parser.add_argument("--drain-timeout", type=float, default=120)
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--fake-host", default="127.0.0.1", help="Address the fakes listen on")
+    parser.add_argument("--advertise-host", default="127.0.0.1", help="Address the bot uses to reach the fakes")
+    parser.add_argument("--chatwoot-port", type=int, default=18081)
+    parser.add_argument("--rag-port", type=int, default=18082)
+    parser.add_argument("--crm-port", type=int, default=18083)
+    parser.add_argument("--chatwoot-latency-ms", type=float, default=30)
+    parser.add_argument("--rag-latency-ms", type=float, default=100)
+    parser.add_argument("--crm-latency-ms", type=float, default=150)
+    parser.add_argument("--jitter-ms", type=float, default=20, help="Uniform extra latency on every fake request")
+    parser.add_argument("--chatwoot-error-rate", type=float, default=0.0)
+    parser.add_argument("--rag-error-rate", type=float, default=0.0)
+    parser.add_argument("--crm-error-rate", type=float, default=0.0)
+    parser.add_argument("--conversation-id-start", type=int, help="Default: derived from the clock")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(run(args))
+    payload = json.dumps(report, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+
+
+if __name__ == "__main__":
+    main()
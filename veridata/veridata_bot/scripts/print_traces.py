@@ -0,0 +1,60 @@
+"""Prints span trees from the file exporter (TRACING_EXPORTER=file), slowest traces first.
+
+Usage:
+    python scripts/print_traces.py traces.jsonl ../veridata_rag/traces.jsonl --slowest 3
+    python scripts/print_traces.py traces.jsonl ../veridata_rag/traces.jsonl --trace <x-trace-id>
+"""
+
+import argparse
+import json
+from typing import Any, Dict, List, Optional
+
+
+def print_traces(paths: List[str], trace_id: Optional[str] = None, slowest: int = 5):
+    """Prints span trees (all services' files can be passed together), slowest traces first."""
+    spans: Dict[str, List[Dict[str, Any]]] = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    span = json.loads(line)
+                    spans.setdefault(span["trace_id"], []).append(span)
+
+    def roots(trace: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ids = {span["span_id"] for span in trace}
+        return sorted((s for s in trace if s["parent_span_id"] not in ids), key=lambda s: s["start_unix_nano"])
+
+    def duration(trace: List[Dict[str, Any]]) -> float:
+        return (max(s["end_unix_nano"] for s in trace) - min(s["start_unix_nano"] for s in trace)) / 1e6
+
+    selected = [trace_id] if trace_id else sorted(spans, key=lambda t: duration(spans[t]), reverse=True)[:slowest]
+    for tid in selected:
+        trace = spans.get(tid, [])
+        if not trace:
+            print(f"Trace {tid} not found")
+            continue
+        children: Dict[str, List[Dict[str, Any]]] = {}
+        for span in trace:
+            children.setdefault(span["parent_span_id"], []).append(span)
+        start = min(s["start_unix_nano"] for s in trace)
+        print(f"\nTrace {tid}: {duration(trace):.1f} ms, {len(trace)} spans")
+
+        def show(span: Dict[str, Any], depth: int):
+            offset = (span["start_unix_nano"] - start) / 1e6
+            flag = " !" if span["status"] == "error" else ""
+            label = f"{'  ' * depth}[{span['service']}] {span['name']}{flag}"
+            print(f"  {offset:9.1f} {span['duration_ms']:9.1f} ms  {label}")
+            for child in sorted(children.get(span["span_id"], []), key=lambda s: s["start_unix_nano"]):
+                show(child, depth + 1)
+
+        for root in roots(trace):
+            show(root, 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show traces written by TRACING_EXPORTER=file")
+    parser.add_argument("files", nargs="+", help="traces.jsonl of one or more services")
+    parser.add_argument("--trace", help="Trace id (x-trace-id response header); default: the slowest traces")
+    parser.add_argument("--slowest", type=int, default=5)
+    args = parser.parse_args()
+    print_traces(args.files, args.trace, args.slowest)
@@ -75,7 +75,7 @@ def mock_llm_router(mocker):
     Mock the LLM used in the router node to avoid external API calls.
     Returns a JSON that forces 'rag' intent.
     """
-    mock_llm_class = mocker.patch("app.agent.nodes.ChatGoogleGenerativeAI")
+    mock_llm_class = mocker.patch("app.agent.llm.ChatGoogleGenerativeAI")
     mock_llm_instance = mock_llm_class.return_value
 
     # Mock ainvoke to return a valid JSON string for the router
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app.agent import llm
+from app.agent.llm import FAKE_SUMMARY, FakeChatModel
+
+
+def test_fake_chat_model_echoes_the_last_question():
+    model = FakeChatModel()
+    messages = [SystemMessage(content="You are a helpful assistant."), HumanMessage(content="Do you ship to Spain?")]
+
+    reply = model.invoke(messages)
+
+    assert reply.content == "Thanks for your message! This is a test reply to: Do you ship to Spain?"
+    assert FakeChatModel().invoke(messages).content == reply.content
+
+
+async def test_fake_chat_model_answers_summary_prompts_with_json():
+    model = FakeChatModel()
+    messages = [SystemMessage(content="You are an expert CRM analyst."), HumanMessage(content="USER: hi")]
+
+    reply = await model.ainvoke(messages)
+
+    assert json.loads(reply.content) == FAKE_SUMMARY
+
+
+def test_fake_chat_model_ignores_tools():
+    model = FakeChatModel()
+
+    assert model.bind_tools([]) is model
+    assert not model.invoke([HumanMessage(content="Book a meeting")]).tool_calls
+
+
+def test_fake_chat_model_delay_adds_streaming_time():
+    assert FakeChatModel()._delay("x" * 400) == 0
+    assert FakeChatModel(latency_ms=500, tokens_per_second=100)._delay("x" * 400) == pytest.approx(1.5)
+
+
+@pytest.mark.parametrize(
+    "override, expected", [("", "gemini"), (" Fake ", "fake"), ("openai_compatible", "openai_compatible")]
+)
+def test_provider_override_selects_the_provider(monkeypatch, override, expected):
+    monkeypatch.setattr(llm.settings, "llm_provider_override", override)
+
+    assert llm.get_provider() == expected
+
+
+def test_fake_override_builds_the_fake_model(monkeypatch):
+    monkeypatch.setattr(llm.settings, "llm_provider_override", "fake")
+    monkeypatch.setattr(llm.settings, "fake_llm_latency_ms", 250.0)
+
+    model = llm.get_chat_model("gemini-2.0-flash")
+
+    assert isinstance(model, FakeChatModel)
+    assert model.latency_ms == 250.0
+
+
+def test_unknown_provider_raises(monkeypatch):
+    monkeypatch.setattr(llm.settings, "llm_provider_override", "fkae")
+
+    with pytest.raises(ValueError, match="Unknown LLM provider 'fkae'. Available: fake, gemini, openai_compatible"):
+        llm.get_chat_model("gemini-2.0-flash")
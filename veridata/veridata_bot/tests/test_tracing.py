@@ -0,0 +1,115 @@
+import uuid
+
+import httpx
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from app.agent.llm import FakeChatModel
+from app.agent.tracing import TracingCallbackHandler
+from app.core import tracing
+from app.core.tracing import current_span, start_span, traced_http_client
+
+
+class RecordingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def submit(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    exporter = RecordingExporter()
+    monkeypatch.setattr(tracing, "_exporter", exporter)
+    monkeypatch.setattr(tracing, "_sample_rate", 1.0)
+    return exporter.spans
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    requests = []
+
+    async def handle_async_request(self, request):
+        requests.append(request)
+        status = 503 if request.url.path == "/down" else 200
+        return httpx.Response(status, json={"ok": True}, request=request)
+
+    # TracedAsyncTransport delegates here once it has added the header
+    monkeypatch.setattr(httpx.AsyncHTTPTransport, "handle_async_request", handle_async_request)
+    return requests
+
+
+# --- HTTP client ---
+
+
+async def test_traced_client_sends_the_client_span_as_traceparent(exported, upstream):
+    with start_span("turn") as turn:
+        async with traced_http_client() as client:
+            response = await client.get("http://rag:8000/query?q=secret", headers={"Accept": "application/json"})
+
+    assert response.status_code == 200
+    client_span = next(span for span in exported if span.kind == "client")
+    assert upstream[0].headers["traceparent"] == client_span.context.traceparent
+    assert upstream[0].headers["accept"] == "application/json"
+    assert (client_span.trace_id, client_span.parent_id) == (turn.trace_id, turn.context.span_id)
+    assert client_span.name == "GET rag"
+    # Query strings can carry user text; they stay out of the span
+    assert client_span.attributes == {
+        "http.method": "GET", "http.url": "http://rag:8000/query", "http.status_code": 200
+    }
+    assert not client_span.error
+
+
+async def test_traced_client_starts_a_trace_outside_a_request(exported, upstream):
+    async with traced_http_client() as client:
+        await client.post("http://chatwoot/down")
+
+    (client_span,) = exported
+    assert client_span.parent_id is None
+    assert upstream[0].headers["traceparent"] == client_span.context.traceparent
+    assert client_span.error
+    assert current_span() is None
+
+
+# --- LangChain callbacks ---
+
+
+async def test_chat_model_calls_are_children_of_the_current_span(exported):
+    with start_span("agent.invoke") as parent:
+        await FakeChatModel().ainvoke(
+            [HumanMessage(content="Do you ship to Spain?")], config={"callbacks": [TracingCallbackHandler()]}
+        )
+
+    llm_span = next(span for span in exported if span.name.startswith("llm "))
+    assert (llm_span.trace_id, llm_span.parent_id, llm_span.kind) == (parent.trace_id, parent.context.span_id, "client")
+    assert llm_span.attributes["llm.messages"] == 1
+    assert llm_span.end_ns is not None
+
+
+def test_llm_end_records_token_usage(exported):
+    handler = TracingCallbackHandler()
+    run_id = uuid.uuid4()
+    message = AIMessage(content="hi", usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15})
+
+    handler.on_llm_start({"name": "ChatGoogleGenerativeAI"}, ["hi"], run_id=run_id)
+    handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id)
+
+    (span,) = exported
+    assert span.name == "llm ChatGoogleGenerativeAI"
+    assert (span.attributes["llm.prompt_tokens"], span.attributes["llm.completion_tokens"]) == (12, 3)
+
+
+def test_tool_errors_are_recorded_on_the_tool_span(exported):
+    handler = TracingCallbackHandler()
+    run_id = uuid.uuid4()
+
+    handler.on_tool_start({"name": "lookup_pricing"}, "Standard plan", run_id=run_id)
+    handler.on_tool_error(TimeoutError("pricing sheet timed out"), run_id=run_id)
+    handler.on_tool_end("late output", run_id=run_id)
+
+    (span,) = exported
+    assert span.name == "tool lookup_pricing"
+    assert span.attributes["tool.input"] == "Standard plan"
+    assert span.error and span.attributes["exception.type"] == "TimeoutError"
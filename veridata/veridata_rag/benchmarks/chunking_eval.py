@@ -0,0 +1,184 @@
+"""Retrieval hit rate and prompt size per chunking strategy.
+
+Chunks the fixture corpus (benchmarks/fixtures/chunking) with every combination of
+strategy and chunk size, retrieves the top-k chunks for each question in
+questions.json and reports:
+- hit_rate: share of questions whose expected answer appears in a top-k chunk
+- mrr: mean reciprocal rank of the first chunk containing the answer
+- prompt_tokens: average tokens of the top-k chunks (the context sent to the generator)
+- chunks / avg_chunk_tokens: size of the resulting index
+
+Retrieval is BM25 by default (offline and deterministic, isolates the effect of the
+chunk boundaries); --retriever gemini ranks by embedding similarity instead and needs
+GOOGLE_API_KEY.
+
+Usage:
+    python -m benchmarks.chunking_eval
+    python -m benchmarks.chunking_eval --strategies sentence,markdown,faq,auto --chunk-sizes 256,512,1024 --k 3
+    python -m benchmarks.chunking_eval --corpus ./my_docs --questions ./my_questions.json --output chunking.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import uuid
+from collections import Counter
+from typing import Dict, List
+
+from src.services.chunking import chunk_text
+from src.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "chunking")
+# chunk_text only uses it as splitter metadata
+EVAL_TENANT_ID = uuid.UUID(int=0)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _terms(text: str) -> List[str]:
+    return [word.lower() for word in _WORD_RE.findall(text)]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class BM25:
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.term_counts = [Counter(_terms(doc)) for doc in documents]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.avg_length = sum(self.lengths) / max(1, len(self.lengths))
+        document_frequency = Counter(term for counts in self.term_counts for term in counts)
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+    def rank(self, query: str) -> List[int]:
+        scores = self.scores(query)
+        return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+
+    def scores(self, query: str) -> List[float]:
+        terms = _terms(query)
+        scores = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            score = 0.0
+            for term in terms:
+                tf = counts.get(term, 0)
+                if tf:
+                    norm = self.k1 * (1 - self.b + self.b * length / self.avg_length)
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+
+class EmbeddingRetriever:
+    def __init__(self, documents: List[str]):
+        from src.services.embedding_cache import get_embed_model
+
+        self.model = get_embed_model()
+        self.vectors = self.model.get_text_embedding_batch(documents)
+
+    def rank(self, query: str) -> List[int]:
+        query_vector = self.model.get_query_embedding(query)
+
+        def cosine(vector):
+            dot = sum(a * b for a, b in zip(query_vector, vector))
+            norm = math.sqrt(sum(a * a for a in query_vector)) * math.sqrt(sum(b * b for b in vector))
+            return dot / norm if norm else 0.0
+
+        scores = [cosine(vector) for vector in self.vectors]
+        return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+
+
+def load_corpus(corpus_dir: str) -> Dict[str, str]:
+    corpus = {}
+    for filename in sorted(os.listdir(corpus_dir)):
+        if filename.lower().endswith((".md", ".txt")):
+            with open(os.path.join(corpus_dir, filename), encoding="utf-8") as f:
+                corpus[filename] = f.read()
+    return corpus
+
+
+def chunk_corpus(corpus: Dict[str, str], settings: dict) -> List[str]:
+    chunks = []
+    for filename, content in corpus.items():
+        chunks.extend(chunk_text(EVAL_TENANT_ID, filename, content, settings=settings).values())
+    return chunks
+
+
+def evaluate(chunks: List[str], questions: List[dict], k: int, retriever: str) -> dict:
+    index = EmbeddingRetriever(chunks) if retriever == "gemini" else BM25(chunks)
+    normalized = [_normalize(chunk) for chunk in chunks]
+    chunk_tokens = [count_tokens(chunk) for chunk in chunks]
+
+    hits, reciprocal_ranks, prompt_tokens, misses = 0, [], [], []
+    for item in questions:
+        top = index.rank(item["question"])[:k]
+        answer = _normalize(item["answer"])
+        rank = next((position for position, i in enumerate(top, 1) if answer in normalized[i]), None)
+        if rank:
+            hits += 1
+            reciprocal_ranks.append(1.0 / rank)
+        else:
+            reciprocal_ranks.append(0.0)
+            misses.append(item["question"])
+        prompt_tokens.append(sum(chunk_tokens[i] for i in top))
+
+    return {
+        "chunks": len(chunks),
+        "avg_chunk_tokens": round(sum(chunk_tokens) / max(1, len(chunks)), 1),
+        "hit_rate": round(hits / len(questions), 3),
+        "mrr": round(sum(reciprocal_ranks) / len(questions), 3),
+        "prompt_tokens": round(sum(prompt_tokens) / len(questions), 1),
+        "misses": misses,
+    }
+
+
+def run(args) -> dict:
+    corpus = load_corpus(args.corpus)
+    with open(args.questions, encoding="utf-8") as f:
+        questions = json.load(f)
+    logger.info(f"{len(corpus)} files, {len(questions)} questions, retriever={args.retriever}, k={args.k}")
+
+    runs = []
+    for strategy in args.strategies.split(","):
+        for chunk_size in [int(size) for size in args.chunk_sizes.split(",")]:
+            settings = {"strategy": strategy, "chunk_size": chunk_size, "chunk_overlap": args.chunk_overlap}
+            result = evaluate(chunk_corpus(corpus, settings), questions, args.k, args.retriever)
+            logger.info(
+                f"{strategy:>8} @ {chunk_size:>4}: hit_rate={result['hit_rate']:.3f} mrr={result['mrr']:.3f} "
+                f"prompt_tokens={result['prompt_tokens']:.0f} chunks={result['chunks']}"
+            )
+            runs.append({"strategy": strategy, "chunk_size": chunk_size, **result})
+
+    return {"retriever": args.retriever, "k": args.k, "questions": len(questions), "runs": runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=FIXTURES_DIR, help="Directory of .md/.txt files")
+    parser.add_argument("--questions", default=os.path.join(FIXTURES_DIR, "questions.json"))
+    parser.add_argument("--strategies", default="sentence,markdown,faq,auto")
+    parser.add_argument("--chunk-sizes", default="256,512,1024")
+    parser.add_argument("--chunk-overlap", type=int, default=20)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--retriever", choices=("bm25", "gemini"), default="bm25")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = run(args)
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    print(payload)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+
+
+if __name__ == "__main__":
+    main()
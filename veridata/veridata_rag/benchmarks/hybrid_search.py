@@ -0,0 +1,148 @@
+"""Hybrid search benchmark.
+
+Loads a synthetic tenant (1M chunks by default), prints EXPLAIN ANALYZE for the hybrid
+retrieval query and reports latency percentiles as JSON.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m benchmarks.hybrid_search --chunks 1000000 --queries 200
+    DATABASE_URL=postgresql://... python -m benchmarks.hybrid_search --tenant-id <uuid> --compare-legacy
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+from sqlalchemy import text
+
+from benchmarks.synthetic import (
+    create_synthetic_tenant,
+    drop_tenant,
+    percentiles,
+    sample_query_embeddings,
+    sample_query_texts,
+)
+from src.storage.engine import dispose_engine, engine
+from src.storage.repository import HYBRID_SEARCH_SQL, RRF_K
+
+logger = logging.getLogger(__name__)
+
+# The pre-rewrite query, kept for side-by-side comparison.
+LEGACY_HYBRID_SEARCH_SQL = """
+    WITH vector_search AS (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY embedding <=> :embedding) as rank
+        FROM documents
+        WHERE tenant_id = :tenant_id
+        ORDER BY embedding <=> :embedding
+        LIMIT :limit
+    ),
+    keyword_search AS (
+        SELECT id, ROW_NUMBER() OVER (
+            ORDER BY ts_rank_cd(fts_vector, websearch_to_tsquery('english', :query_text)) DESC
+        ) as rank
+        FROM documents
+        WHERE tenant_id = :tenant_id AND fts_vector @@ websearch_to_tsquery('english', :query_text)
+        LIMIT :limit
+    )
+    SELECT
+        d.id, d.filename, d.content,
+        COALESCE(1.0 / (vs.rank + :rrf_k), 0.0) + COALESCE(1.0 / (ks.rank + :rrf_k), 0.0) as score
+    FROM documents d
+    LEFT JOIN vector_search vs ON d.id = vs.id
+    LEFT JOIN keyword_search ks ON d.id = ks.id
+    WHERE vs.id IS NOT NULL OR ks.id IS NOT NULL
+    ORDER BY score DESC
+    LIMIT :limit;
+"""
+
+
+async def explain(sql: str, params: dict) -> str:
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(params["tenant_id"])}
+        )
+        result = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT) {sql}"), params)
+        return "\n".join(row[0] for row in result.fetchall())
+
+
+async def measure(sql: str, tenant_id: uuid.UUID, embeddings: list, texts: list, limit: int) -> dict:
+    samples = []
+    async with engine.connect() as conn:
+        await conn.execute(
+            text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(tenant_id)}
+        )
+        for embedding, query_text in zip(embeddings, texts):
+            params = {
+                "embedding": str(embedding),
+                "tenant_id": tenant_id,
+                "limit": limit,
+                "query_text": query_text,
+                "rrf_k": RRF_K,
+                "fts_config": "english",
+            }
+            started = time.perf_counter()
+            await conn.execute(text(sql), params)
+            samples.append((time.perf_counter() - started) * 1000)
+        await conn.rollback()
+    return percentiles(samples)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    created = args.tenant_id is None
+    tenant_id = uuid.UUID(args.tenant_id) if args.tenant_id else await create_synthetic_tenant(engine, args.chunks)
+
+    try:
+        embeddings = await sample_query_embeddings(engine, tenant_id, args.queries)
+        texts = sample_query_texts(args.queries)
+        params = {
+            "embedding": str(embeddings[0]),
+            "tenant_id": tenant_id,
+            "limit": args.limit,
+            "query_text": texts[0],
+            "rrf_k": RRF_K,
+            "fts_config": "english",
+        }
+
+        variants = {"hybrid": HYBRID_SEARCH_SQL}
+        if args.compare_legacy:
+            variants["legacy"] = LEGACY_HYBRID_SEARCH_SQL
+
+        report = {"tenant_id": str(tenant_id), "chunks": args.chunks, "limit": args.limit, "variants": {}}
+        for name, sql in variants.items():
+            plan = await explain(sql, params)
+            print(f"\n=== EXPLAIN ANALYZE ({name}) ===\n{plan}\n")
+            # Warm-up pass so the measured run reflects a hot buffer cache.
+            await measure(sql, tenant_id, embeddings[: args.warmup], texts[: args.warmup], args.limit)
+            report["variants"][name] = await measure(sql, tenant_id, embeddings, texts, args.limit)
+        return report
+    finally:
+        if created and not args.keep:
+            await drop_tenant(engine, tenant_id)
+        await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1_000_000, help="Synthetic tenant size")
+    parser.add_argument("--tenant-id", help="Reuse an existing (e.g. previously kept) tenant instead of loading one")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20, help="Candidate limit (20 = rerank path)")
+    parser.add_argument("--compare-legacy", action="store_true", help="Also run the pre-rewrite query")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic tenant for later runs")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(run(args))
+    payload = json.dumps(report, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+
+
+if __name__ == "__main__":
+    main()
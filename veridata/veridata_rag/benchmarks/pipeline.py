@@ -0,0 +1,436 @@
+"""End-to-end retrieval benchmark: quality and per-stage latency.
+
+Loads a synthetic tenant with known answers into a local Postgres + pgvector and
+replays a query set through the real search_documents path (hybrid SQL, RRF, HyDE
+branch, adaptive depth with --adaptive, rerank), with the "fake" provider (src/services/fake_models.py)
+in place of Gemini. Every run is offline and reproducible for a given --seed.
+
+Corpus: --entities fictional products x 5 facts each (price, opening hours, warranty,
+delivery time, refund period), one chunk per fact padded with filler words, plus
+--noise-chunks random chunks. Each query asks for one fact; half of them (by default)
+are paraphrased so they share little more than the product name with the answer.
+
+Reported per mode (--modes base,hyde,rerank,hyde+rerank):
+- recall@1 / recall@k / mrr, overall and per query kind (exact / paraphrase)
+- latency percentiles per stage: embed, db_hybrid, hyde_llm, db_hyde_vector, rerank,
+  and total. db = db_hybrid + db_hyde_vector. The HyDE branch overlaps the direct
+  search, so stages do not add up to total.
+The JSON report carries the git commit and the full configuration. With --baseline
+(a previous report) it lists regressions and exits non-zero if there are any.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m benchmarks.pipeline --entities 200 --noise-chunks 100000
+    DATABASE_URL=postgresql://... python -m benchmarks.pipeline --modes base,rerank --rerank-backend llm \\
+        --llm-latency-ms 300 --output pipeline.json --baseline previous.json
+"""
+
+import argparse
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from benchmarks.synthetic import VOCABULARY, create_synthetic_tenant, drop_tenant, percentiles
+from src.config.config import get_config
+from src.services import embedding_cache, hyde, rag_flow, rerank
+from src.services.config_service import get_tenant_retrieval_settings
+from src.services.fake_models import hashing_embedding
+from src.storage.engine import dispose_engine, engine
+from src.storage.repository import compute_content_hash, tenant_partition_name
+
+logger = logging.getLogger(__name__)
+
+# attribute -> (fact, exact question, paraphrased question, value generator)
+ATTRIBUTES = {
+    "price": (
+        "The {entity} plan costs {value} euros per month.",
+        "What does the {entity} plan cost per month?",
+        "How much is the {entity} plan monthly?",
+        lambda rng: rng.randint(5, 500),
+    ),
+    "hours": (
+        "The opening hours of the {entity} store are {value}.",
+        "What are the opening hours of the {entity} store?",
+        "When is the {entity} store open?",
+        lambda rng: f"{rng.randint(7, 10)}:00 to {rng.randint(17, 22)}:00",
+    ),
+    "warranty": (
+        "The {entity} warranty covers {value} years.",
+        "What does the {entity} warranty cover?",
+        "How many years of guarantee come with the {entity}?",
+        lambda rng: rng.randint(1, 5),
+    ),
+    "delivery": (
+        "The delivery time for the {entity} is {value} business days.",
+        "What is the delivery time for the {entity}?",
+        "How long until the {entity} arrives?",
+        lambda rng: rng.randint(1, 15),
+    ),
+    "refund": (
+        "The refund period for the {entity} is {value} days.",
+        "What is the refund period for the {entity}?",
+        "Until when can I return the {entity} and get my money back?",
+        lambda rng: rng.choice([14, 30, 60, 90]),
+    ),
+}
+_SYLLABLES = ["va", "lor", "dri", "ne", "kas", "tu", "mo", "ren", "zi", "pha", "gol", "be", "xan", "du", "sel", "ri"]
+MODES = {
+    "base": (False, False),
+    "hyde": (True, False),
+    "rerank": (False, True),
+    "hyde+rerank": (True, True),
+}
+
+
+def generate_facts(entities: int, filler_words: int, seed: int) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < entities:
+        names.add("".join(rng.choice(_SYLLABLES) for _ in range(3)).capitalize())
+
+    facts = []
+    for entity in sorted(names):
+        for attribute, (fact, question, paraphrase, value) in ATTRIBUTES.items():
+            filler = " ".join(rng.choice(VOCABULARY) for _ in range(filler_words))
+            facts.append(
+                {
+                    "entity": entity,
+                    "attribute": attribute,
+                    "filename": f"facts_{entity.lower()}.md",
+                    "content": f"{fact.format(entity=entity, value=value(rng))} {filler.capitalize()}.",
+                    "question": question.format(entity=entity),
+                    "paraphrase": paraphrase.format(entity=entity),
+                }
+            )
+    return facts
+
+
+def sample_queries(facts: List[Dict[str, str]], count: int, paraphrase_rate: float, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(count):
+        fact = rng.choice(facts)
+        paraphrased = rng.random() < paraphrase_rate
+        queries.append(
+            {
+                "query": fact["paraphrase"] if paraphrased else fact["question"],
+                "kind": "paraphrase" if paraphrased else "exact",
+                "content_hash": compute_content_hash(fact["content"]),
+            }
+        )
+    return queries
+
+
+async def load_facts(tenant_id: uuid.UUID, facts: List[Dict[str, str]], batch_size: int = 500):
+    files: Dict[str, int] = {}
+    for fact in facts:
+        files[fact["filename"]] = files.get(fact["filename"], 0) + 1
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(tenant_id)}
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO source_documents (tenant_id, filename, status, chunk_count) "
+                "VALUES (:tenant_id, :filename, 'ready', :chunk_count) ON CONFLICT (tenant_id, filename) DO NOTHING"
+            ),
+            [{"tenant_id": tenant_id, "filename": name, "chunk_count": count} for name, count in files.items()],
+        )
+        for start in range(0, len(facts), batch_size):
+            batch = facts[start : start + batch_size]
+            await conn.execute(
+                text("""
+                    INSERT INTO documents (tenant_id, source_document_id, filename, content, content_hash, embedding)
+                    SELECT s.tenant_id, s.id, s.filename, :content, :content_hash, CAST(:embedding AS vector)
+                    FROM source_documents s
+                    WHERE s.tenant_id = :tenant_id AND s.filename = :filename
+                """),
+                [
+                    {
+                        "tenant_id": tenant_id,
+                        "filename": fact["filename"],
+                        "content": fact["content"],
+                        "content_hash": compute_content_hash(fact["content"]),
+                        # What the fake embedding model returns for this text
+                        "embedding": str(hashing_embedding(fact["content"])),
+                    }
+                    for fact in batch
+                ],
+            )
+        await conn.execute(text(f"ANALYZE {tenant_partition_name(tenant_id)}"))
+    logger.info(f"Loaded {len(facts)} fact chunks in {len(files)} files")
+
+
+async def resolve_relevant_ids(tenant_id: uuid.UUID, queries: List[Dict[str, Any]]):
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(tenant_id)}
+        )
+        result = await conn.execute(
+            text("SELECT id, content_hash FROM documents WHERE tenant_id = :tenant_id AND filename LIKE 'facts\\_%'"),
+            {"tenant_id": tenant_id},
+        )
+        ids = {row[1]: str(row[0]) for row in result.fetchall()}
+    missing = sum(1 for item in queries if item["content_hash"] not in ids)
+    if missing:
+        raise RuntimeError(f"{missing} queries have no matching chunk (different --seed/--entities than the tenant?)")
+    for item in queries:
+        item["relevant_id"] = ids[item["content_hash"]]
+
+
+# ==================================================================================
+# STAGE TIMING
+# The stages search_documents calls are wrapped where rag_flow looks them up, so the
+# real code path runs unchanged. Timings go to the current query's dict (a context
+# variable, so the HyDE task and the rerank thread report to the right query).
+# ==================================================================================
+_stage_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "stage_timings", default=None
+)
+_STAGES = {
+    "embed_query": "embed",
+    "search_documents_hybrid": "db_hybrid",
+    "search_documents_vector": "db_hyde_vector",
+    "get_hypothetical_answer": "hyde_llm",
+    "rerank_documents": "rerank",
+}
+
+
+def _record(stage: str, started: float):
+    timings = _stage_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def _timed(stage: str, fn):
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                _record(stage, started)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _record(stage, started)
+
+    return wrapper
+
+
+def install_fakes(embed_latency_ms: float, llm_latency_ms: float):
+    # Before any model is built: every step, and the embeddings, use the fake provider
+    os.environ["LLM_PROVIDER_OVERRIDE"] = "fake"
+    get_config().setdefault("providers", {})["fake"] = {
+        "latency_ms": llm_latency_ms,
+        "tokens_per_second": 0,
+        "embedding_latency_ms": embed_latency_ms,
+    }
+    for name, stage in _STAGES.items():
+        setattr(rag_flow, name, _timed(stage, getattr(rag_flow, name)))
+
+
+def reset_caches():
+    # Every mode starts cold: no query embeddings or HyDE passages from the previous one
+    embedding_cache._query_cache = None
+    hyde._cache = None
+
+
+async def replay(tenant_id: uuid.UUID, queries: List[Dict[str, Any]], mode: str, k: int, settings: dict) -> dict:
+    use_hyde, use_rerank = MODES[mode]
+    reset_caches()
+    stage_samples: Dict[str, List[float]] = {}
+    by_kind: Dict[str, Dict[str, List[float]]] = {}
+    returned = []
+
+    for item in queries:
+        timings: Dict[str, float] = {}
+        token = _stage_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            results = await rag_flow.search_documents(
+                tenant_id,
+                item["query"],
+                limit=k,
+                use_hyde=use_hyde,
+                use_rerank=use_rerank,
+                provider="fake",
+                retrieval_settings=settings,
+            )
+        finally:
+            _stage_timings.reset(token)
+        timings["total"] = (time.perf_counter() - started) * 1000
+        timings["db"] = timings.get("db_hybrid", 0.0) + timings.get("db_hyde_vector", 0.0)
+        for stage, value in timings.items():
+            stage_samples.setdefault(stage, []).append(value)
+
+        rank = next((i for i, doc in enumerate(results, 1) if doc["id"] == item["relevant_id"]), None)
+        kind = by_kind.setdefault(item["kind"], {"hit@1": [], "hit@k": [], "rr": []})
+        kind["hit@1"].append(1.0 if rank == 1 else 0.0)
+        kind["hit@k"].append(1.0 if rank else 0.0)
+        kind["rr"].append(1.0 / rank if rank else 0.0)
+        returned.append(len(results))
+
+    def quality(samples: Dict[str, List[float]]) -> dict:
+        n = len(samples["rr"])
+        return {
+            "queries": n,
+            "recall@1": round(sum(samples["hit@1"]) / n, 4),
+            f"recall@{k}": round(sum(samples["hit@k"]) / n, 4),
+            "mrr": round(sum(samples["rr"]) / n, 4),
+        }
+
+    overall = {key: [value for kind in by_kind.values() for value in kind[key]] for key in ("hit@1", "hit@k", "rr")}
+    return {
+        **quality(overall),
+        "by_kind": {name: quality(samples) for name, samples in sorted(by_kind.items())},
+        "avg_results": round(sum(returned) / len(returned), 2),
+        "latency": {stage: percentiles(samples) for stage, samples in sorted(stage_samples.items())},
+    }
+
+
+def compare(report: dict, baseline: dict, max_recall_drop: float, max_latency_increase: float) -> List[str]:
+    regressions = []
+    k = report["config"]["k"]
+    for mode, result in report["modes"].items():
+        previous = baseline.get("modes", {}).get(mode)
+        if not previous:
+            continue
+        for metric in (f"recall@{k}", "mrr"):
+            if metric in previous and result[metric] < previous[metric] - max_recall_drop:
+                regressions.append(f"{mode}: {metric} {previous[metric]} -> {result[metric]}")
+        before = previous.get("latency", {}).get("total", {}).get("p95_ms")
+        after = result["latency"]["total"]["p95_ms"]
+        if before and after > before * (1 + max_latency_increase):
+            regressions.append(f"{mode}: total p95 {before}ms -> {after}ms")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    install_fakes(args.embed_latency_ms, args.llm_latency_ms)
+    facts = generate_facts(args.entities, args.filler_words, args.seed)
+    queries = sample_queries(facts, args.queries, args.paraphrase_rate, args.seed)
+
+    created = args.tenant_id is None
+    if created:
+        tenant_id = await create_synthetic_tenant(engine, args.noise_chunks, name=f"pipeline-{args.entities}")
+        await load_facts(tenant_id, facts)
+    else:
+        tenant_id = uuid.UUID(args.tenant_id)
+
+    try:
+        await resolve_relevant_ids(tenant_id, queries)
+        settings = await get_tenant_retrieval_settings(tenant_id)
+        if args.rerank_backend:
+            settings["rerank_backend"] = args.rerank_backend
+        if args.adaptive:
+            settings["adaptive_retrieval"] = {**(settings.get("adaptive_retrieval") or {}), "enabled": True}
+
+        # Warm-up: connection pool, buffer cache, plan cache
+        for item in queries[: args.warmup]:
+            await rag_flow.search_documents(tenant_id, item["query"], limit=args.k, retrieval_settings=settings)
+
+        report = {
+            "benchmark": "pipeline",
+            "git_commit": _git_commit(),
+            "tenant_id": str(tenant_id),
+            "config": {
+                "entities": args.entities,
+                "fact_chunks": len(facts),
+                "noise_chunks": args.noise_chunks if created else None,
+                "queries": len(queries),
+                "paraphrase_rate": args.paraphrase_rate,
+                "k": args.k,
+                "seed": args.seed,
+                "embed_latency_ms": args.embed_latency_ms,
+                "llm_latency_ms": args.llm_latency_ms,
+                "retrieval_settings": settings,
+            },
+            "modes": {},
+        }
+        for mode in args.modes.split(","):
+            result = await replay(tenant_id, queries, mode, args.k, settings)
+            logger.info(
+                f"{mode:>12}: recall@{args.k}={result[f'recall@{args.k}']:.3f} mrr={result['mrr']:.3f} "
+                f"p50={result['latency']['total']['p50_ms']:.1f}ms p95={result['latency']['total']['p95_ms']:.1f}ms "
+                f"db p50={result['latency']['db']['p50_ms']:.1f}ms"
+            )
+            report["modes"][mode] = result
+        return report
+    finally:
+        if created and not args.keep:
+            await drop_tenant(engine, tenant_id)
+        await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", type=int, default=200, help="Products in the fact corpus (5 chunks each)")
+    parser.add_argument("--noise-chunks", type=int, default=10_000, help="Random chunks loaded next to the facts")
+    parser.add_argument("--filler-words", type=int, default=40)
+    parser.add_argument("--tenant-id", help="Reuse a tenant kept by a previous run (same --entities/--seed)")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--paraphrase-rate", type=float, default=0.5)
+    parser.add_argument("--modes", default="base,hyde,rerank,hyde+rerank")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rerank-backend", choices=tuple(rerank.RERANK_BACKENDS), help="Default: rerank_config")
+    parser.add_argument("--adaptive", action="store_true", help="Enable adaptive retrieval depth (off by default)")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="Simulated embedding API latency")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated LLM latency per call")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic tenant for later runs")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--max-recall-drop", type=float, default=0.01)
+    parser.add_argument("--max-latency-increase", type=float, default=0.2, help="Allowed p95 increase (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(run(args))
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.max_recall_drop, args.max_latency_increase)
+        report["regressions"] = regressions
+    payload = json.dumps(report, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    for regression in regressions:
+        logger.error(f"Regression: {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
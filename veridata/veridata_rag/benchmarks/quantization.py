@@ -0,0 +1,101 @@
+"""Vector storage mode benchmark: full vs. halfvec vs. binary quantization.
+
+For one synthetic tenant, reports per mode:
+- index_bytes: size of the tenant partition's HNSW index for that mode
+- build_seconds: time to build that index (CONCURRENTLY) in place of the partition's current one
+- recall@k against an exact scan, and query latency percentiles (with rescoring)
+
+Usage:
+    DATABASE_URL=postgresql://... python -m benchmarks.quantization --chunks 200000 --rescore-factor 4
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from sqlalchemy import text
+
+from benchmarks.recall import approximate_run, exact_neighbours
+from benchmarks.synthetic import create_synthetic_tenant, drop_tenant, sample_query_embeddings
+from src.storage.engine import dispose_engine, engine
+from src.storage.repository import (
+    VECTOR_STORAGE_MODES,
+    create_vector_index,
+    drop_vector_indexes,
+    tenant_partition_name,
+    vector_index_name,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def index_size(partition: str, mode: str) -> int:
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT COALESCE(pg_relation_size(to_regclass(:name)), 0)"),
+            {"name": vector_index_name(partition, mode)},
+        )
+        return int(result.scalar())
+
+
+async def build_time(partition: str, mode: str) -> float:
+    """Replaces the partition's HNSW index with the mode's, the way a tenant switch does."""
+    await drop_vector_indexes(partition, keep=None)
+    started = time.perf_counter()
+    await create_vector_index(partition, mode)
+    return time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> dict:
+    tenant_id = await create_synthetic_tenant(engine, args.chunks, name="benchmark-quantization")
+    partition = tenant_partition_name(tenant_id)
+
+    try:
+        embeddings = await sample_query_embeddings(engine, tenant_id, args.queries)
+        truth = await exact_neighbours(tenant_id, embeddings, args.k)
+
+        report = {"chunks": args.chunks, "k": args.k, "modes": {}}
+        for mode in args.modes.split(","):
+            if mode not in VECTOR_STORAGE_MODES:
+                raise ValueError(f"Unknown mode '{mode}'")
+            build_seconds = await build_time(partition, mode)
+            settings = {
+                "ef_search": args.ef_search,
+                "vector_storage": mode,
+                "rescore_factor": args.rescore_factor,
+            }
+            mode_report = await approximate_run(tenant_id, embeddings, truth, args.k, settings)
+            mode_report["index_bytes"] = await index_size(partition, mode)
+            mode_report["build_seconds"] = round(build_seconds, 2)
+            logger.info(mode_report)
+            report["modes"][mode] = mode_report
+        return report
+    finally:
+        await drop_tenant(engine, tenant_id)
+        await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--ef-search", type=int, default=100)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--modes", default=",".join(VECTOR_STORAGE_MODES))
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(run(args))
+    payload = json.dumps(report, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Recall-vs-latency benchmark for per-tenant HNSW settings.
+
+Reproduces the "small tenant next to a large one" case: a noise tenant is loaded first,
+then a smaller target tenant is queried under each combination of ef_search and
+iterative scan mode. Recall@k is measured against an exact (sequential) scan.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m benchmarks.recall --chunks 20000 --noise-chunks 1000000 \\
+        --ef-search 40,100,200 --iterative-scan off,relaxed_order
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+
+from sqlalchemy import text
+
+from benchmarks.synthetic import create_synthetic_tenant, drop_tenant, percentiles, sample_query_embeddings
+from src.storage.engine import dispose_engine, engine
+from src.storage.repository import apply_search_settings, build_vector_search_sql, vector_search_params
+
+logger = logging.getLogger(__name__)
+
+
+async def exact_neighbours(tenant_id: uuid.UUID, embeddings: list, k: int) -> list:
+    truth = []
+    async with engine.connect() as conn:
+        for embedding in embeddings:
+            await conn.execute(text("SET LOCAL enable_indexscan = off"))
+            result = await conn.execute(
+                text(build_vector_search_sql()), {"embedding": str(embedding), "tenant_id": tenant_id, "limit": k}
+            )
+            truth.append({row[0] for row in result.fetchall()})
+            await conn.rollback()
+    return truth
+
+
+async def approximate_run(tenant_id: uuid.UUID, embeddings: list, truth: list, k: int, settings: dict) -> dict:
+    vector_params = vector_search_params(settings, k)
+    sql = text(build_vector_search_sql(vector_params["storage"]))
+    samples, recalls, returned = [], [], []
+    async with engine.connect() as conn:
+        for embedding, expected in zip(embeddings, truth):
+            await apply_search_settings(conn, settings)
+            started = time.perf_counter()
+            result = await conn.execute(
+                sql,
+                {
+                    "embedding": str(embedding),
+                    "tenant_id": tenant_id,
+                    "limit": k,
+                    "candidates": vector_params["candidates"],
+                },
+            )
+            ids = {row[0] for row in result.fetchall()}
+            samples.append((time.perf_counter() - started) * 1000)
+            await conn.rollback()
+
+            returned.append(len(ids))
+            recalls.append(len(ids & expected) / max(1, len(expected)))
+
+    return {
+        "settings": settings,
+        f"recall@{k}": round(sum(recalls) / len(recalls), 4),
+        "avg_results": round(sum(returned) / len(returned), 2),
+        "underfilled_queries": sum(1 for n in returned if n < k),
+        "latency": percentiles(samples),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    noise_tenant = None
+    if args.noise_chunks:
+        noise_tenant = await create_synthetic_tenant(engine, args.noise_chunks, name="benchmark-noise")
+    tenant_id = await create_synthetic_tenant(engine, args.chunks, name="benchmark-target")
+
+    try:
+        embeddings = await sample_query_embeddings(engine, tenant_id, args.queries)
+        truth = await exact_neighbours(tenant_id, embeddings, args.k)
+
+        report = {"chunks": args.chunks, "noise_chunks": args.noise_chunks, "k": args.k, "runs": []}
+        grid = itertools.product([int(v) for v in args.ef_search.split(",")], args.iterative_scan.split(","))
+        for ef_search, iterative_scan in grid:
+            settings = {
+                "ef_search": ef_search,
+                "iterative_scan": iterative_scan,
+                "max_scan_tuples": args.max_scan_tuples,
+            }
+            run_report = await approximate_run(tenant_id, embeddings, truth, args.k, settings)
+            logger.info(run_report)
+            report["runs"].append(run_report)
+        return report
+    finally:
+        await drop_tenant(engine, tenant_id)
+        if noise_tenant:
+            await drop_tenant(engine, noise_tenant)
+        await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20_000, help="Size of the tenant under test")
+    parser.add_argument("--noise-chunks", type=int, default=1_000_000, help="Chunks owned by another tenant")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--ef-search", default="40,100,200")
+    parser.add_argument("--iterative-scan", default="off,relaxed_order")
+    parser.add_argument("--max-scan-tuples", type=int, default=20_000)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(run(args))
+    payload = json.dumps(report, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+
+
+if __name__ == "__main__":
+    main()
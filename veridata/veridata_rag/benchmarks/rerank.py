@@ -0,0 +1,128 @@
+"""Rerank quality and latency per backend.
+
+Chunks the fixture corpus (benchmarks/fixtures/chunking), takes the first-stage top
+--candidates chunks for each question in questions.json, reranks them with every
+backend and reports:
+- hit_rate / mrr: the expected answer within the reranked top-k (same definitions as
+  benchmarks.chunking_eval); "none" is the first-stage order, the baseline
+- latency: rerank time per question (p50/p95/mean ms)
+
+The first stage is BM25 by default (offline); --first-stage gemini ranks by embedding
+similarity, closer to what the reranker sees in production, and needs GOOGLE_API_KEY.
+The llm backend also needs the LLM credentials; cross_encoder needs the cross-encoder
+extra (pip install ".[cross-encoder]"; the first run downloads the model).
+
+Usage:
+    python -m benchmarks.rerank
+    python -m benchmarks.rerank --backends none,lexical,cross_encoder,llm --candidates 20 --k 3
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+from benchmarks.chunking_eval import BM25, FIXTURES_DIR, EmbeddingRetriever, _normalize, chunk_corpus, load_corpus
+from benchmarks.synthetic import percentiles
+from src.services.rerank import RERANK_BACKENDS, get_reranker
+
+logger = logging.getLogger(__name__)
+
+
+def first_stage(chunks, questions, candidates: int, retriever: str) -> list:
+    """Per question, the top candidates as result dicts (best first), as search_documents returns them."""
+    index = EmbeddingRetriever(chunks) if retriever == "gemini" else BM25(chunks)
+    pools = []
+    for item in questions:
+        top = index.rank(item["question"])[:candidates]
+        pools.append([{"id": i, "filename": "fixture", "content": chunks[i]} for i in top])
+    return pools
+
+
+def evaluate(backend: str, questions, pools, normalized, k: int) -> dict:
+    if backend != "none" and backend not in RERANK_BACKENDS:
+        # get_reranker would substitute lexical and the row would be mislabelled
+        raise SystemExit(f"Rerank backend '{backend}' is not available (cross_encoder needs the cross-encoder extra)")
+    reranker = None if backend == "none" else get_reranker(backend)
+    hits, reciprocal_ranks, latencies, misses = 0, [], [], []
+    for item, pool in zip(questions, pools):
+        started = time.perf_counter()
+        ranked = pool[:k] if reranker is None else reranker.rerank(item["question"], [dict(doc) for doc in pool], k)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        answer = _normalize(item["answer"])
+        rank = next((position for position, doc in enumerate(ranked, 1) if answer in normalized[doc["id"]]), None)
+        if rank:
+            hits += 1
+            reciprocal_ranks.append(1.0 / rank)
+        else:
+            reciprocal_ranks.append(0.0)
+            misses.append(item["question"])
+
+    return {
+        "backend": backend if reranker is None else reranker.name,
+        "hit_rate": round(hits / len(questions), 3),
+        "mrr": round(sum(reciprocal_ranks) / len(questions), 3),
+        "latency": percentiles(latencies),
+        "misses": misses,
+    }
+
+
+def run(args) -> dict:
+    corpus = load_corpus(args.corpus)
+    with open(args.questions, encoding="utf-8") as f:
+        questions = json.load(f)
+    settings = {"strategy": args.strategy, "chunk_size": args.chunk_size, "chunk_overlap": 20}
+    chunks = chunk_corpus(corpus, settings)
+    normalized = [_normalize(chunk) for chunk in chunks]
+    pools = first_stage(chunks, questions, args.candidates, args.first_stage)
+    logger.info(
+        f"{len(chunks)} chunks, {len(questions)} questions, first stage {args.first_stage} "
+        f"top-{args.candidates}, k={args.k}"
+    )
+
+    runs = []
+    for backend in args.backends.split(","):
+        result = evaluate(backend, questions, pools, normalized, args.k)
+        logger.info(
+            f"{backend:>13}: hit_rate={result['hit_rate']:.3f} mrr={result['mrr']:.3f} "
+            f"p50={result['latency']['p50_ms']:.2f}ms p95={result['latency']['p95_ms']:.2f}ms"
+        )
+        runs.append(result)
+
+    return {
+        "first_stage": args.first_stage,
+        "candidates": args.candidates,
+        "k": args.k,
+        "chunking": settings,
+        "questions": len(questions),
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=FIXTURES_DIR, help="Directory of .md/.txt files")
+    parser.add_argument("--questions", default=os.path.join(FIXTURES_DIR, "questions.json"))
+    local_backends = [backend for backend in RERANK_BACKENDS if backend != "llm"]
+    parser.add_argument("--backends", default=",".join(["none"] + local_backends))
+    parser.add_argument("--first-stage", choices=("bm25", "gemini"), default="bm25")
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--strategy", default="auto")
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = run(args)
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    print(payload)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import logging
+import random
+import statistics
+import time
+import uuid
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.storage.repository import delete_tenant_and_partition, ensure_tenant_partition, tenant_partition_name
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 768
+
+# Small mixed-language vocabulary so FTS matches are neither empty nor universal.
+VOCABULARY = [
+    "price", "shipping", "refund", "warranty", "delivery", "invoice", "discount", "subscription",
+    "haircut", "manicure", "shampoo", "conditioner", "appointment", "schedule", "payment", "card",
+    "portugal", "spain", "brazil", "lisbon", "madrid", "store", "opening", "hours", "support",
+    "preço", "envio", "reembolso", "garantia", "entrega", "desconto", "agendamento", "pagamento",
+    "precio", "envío", "devolución", "cita", "horario", "tienda", "factura", "descuento",
+    "product", "service", "plan", "standard", "premium", "enterprise", "contract", "policy",
+]
+
+# Bulk generation happens server-side: shipping 1M x 768 floats through the driver is
+# far slower than letting Postgres produce them. The `g * 0` terms correlate the
+# sub-selects with the outer row so they are re-evaluated per row.
+_INSERT_SOURCES_SQL = """
+    INSERT INTO source_documents (tenant_id, filename, status)
+    SELECT CAST(:tenant_id AS uuid), 'synthetic_' || f || '.md', 'ready'
+    FROM generate_series(:start / :chunks_per_file, (:stop - 1) / :chunks_per_file) AS f
+    ON CONFLICT (tenant_id, filename) DO NOTHING
+"""
+
+_INSERT_BATCH_SQL = """
+    INSERT INTO documents (tenant_id, source_document_id, filename, content, content_hash, embedding)
+    SELECT
+        CAST(:tenant_id AS uuid),
+        s.id,
+        s.filename,
+        c.content,
+        encode(sha256(convert_to(c.content, 'UTF8')), 'hex'),
+        e.embedding
+    FROM generate_series(:start, :stop - 1) AS g
+    JOIN source_documents s
+      ON s.tenant_id = CAST(:tenant_id AS uuid)
+     AND s.filename = 'synthetic_' || (g / :chunks_per_file) || '.md'
+    CROSS JOIN LATERAL (
+        SELECT string_agg(
+            (CAST(:vocabulary AS text[]))[1 + floor(random() * :vocab_size)::int + g * 0], ' '
+        ) AS content
+        FROM generate_series(1, :words_per_chunk)
+    ) c
+    CROSS JOIN LATERAL (
+        SELECT CAST(array_agg(random() - 0.5 + g * 0) AS vector(768)) AS embedding
+        FROM generate_series(1, 768)
+    ) e
+"""
+
+
+async def create_synthetic_tenant(
+    engine: AsyncEngine,
+    num_chunks: int,
+    name: Optional[str] = None,
+    batch_size: int = 50_000,
+    words_per_chunk: int = 60,
+    chunks_per_file: int = 100,
+) -> uuid.UUID:
+    """Creates a tenant and fills it with `num_chunks` random chunks, committing per batch."""
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            text("INSERT INTO tenants (name) VALUES (:name) RETURNING id"),
+            {"name": name or f"benchmark-{num_chunks}"},
+        )
+        tenant_id = result.scalar_one()
+    await ensure_tenant_partition(tenant_id)
+
+    logger.info(f"Loading {num_chunks} synthetic chunks into tenant {tenant_id}")
+    started = time.perf_counter()
+    for start in range(0, num_chunks, batch_size):
+        stop = min(start + batch_size, num_chunks)
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(tenant_id)}
+            )
+            await conn.execute(
+                text(_INSERT_SOURCES_SQL),
+                {"tenant_id": str(tenant_id), "start": start, "stop": stop, "chunks_per_file": chunks_per_file},
+            )
+            await conn.execute(
+                text(_INSERT_BATCH_SQL),
+                {
+                    "tenant_id": str(tenant_id),
+                    "start": start,
+                    "stop": stop,
+                    "chunks_per_file": chunks_per_file,
+                    "vocabulary": VOCABULARY,
+                    "vocab_size": len(VOCABULARY),
+                    "words_per_chunk": words_per_chunk,
+                },
+            )
+        logger.info(f"  {stop}/{num_chunks} chunks ({time.perf_counter() - started:.0f}s)")
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(tenant_id)}
+        )
+        await conn.execute(
+            text("""
+                UPDATE source_documents s
+                SET chunk_count = c.chunk_count
+                FROM (
+                    SELECT source_document_id, count(*) AS chunk_count
+                    FROM documents
+                    WHERE tenant_id = :tenant_id
+                    GROUP BY source_document_id
+                ) c
+                WHERE s.id = c.source_document_id
+            """),
+            {"tenant_id": tenant_id},
+        )
+        await conn.execute(text(f"ANALYZE {tenant_partition_name(tenant_id)}"))
+
+    return tenant_id
+
+
+async def drop_tenant(engine: AsyncEngine, tenant_id: uuid.UUID):
+    await delete_tenant_and_partition(tenant_id)
+
+
+async def sample_query_embeddings(
+    engine: AsyncEngine, tenant_id: uuid.UUID, count: int, noise: float = 0.05, seed: int = 42
+) -> List[List[float]]:
+    """Returns perturbed copies of stored embeddings, so every query has true near neighbours."""
+    rng = random.Random(seed)
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(tenant_id)}
+        )
+        result = await conn.execute(
+            text(
+                "SELECT embedding::text FROM documents TABLESAMPLE SYSTEM (1) "
+                "WHERE tenant_id = :tenant_id LIMIT :count"
+            ),
+            {"tenant_id": tenant_id, "count": count},
+        )
+        rows = [row[0] for row in result.fetchall()]
+
+    if not rows:
+        # Tiny tenants: TABLESAMPLE can come back empty.
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                text("SELECT embedding::text FROM documents WHERE tenant_id = :tenant_id LIMIT :count"),
+                {"tenant_id": tenant_id, "count": count},
+            )
+            rows = [row[0] for row in result.fetchall()]
+
+    embeddings = []
+    for i in range(count):
+        base = [float(x) for x in rows[i % len(rows)].strip("[]").split(",")]
+        embeddings.append([x + rng.uniform(-noise, noise) for x in base])
+    return embeddings
+
+
+def sample_query_texts(count: int, words: int = 3, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(VOCABULARY, words)) for _ in range(count)]
+
+
+def percentiles(samples_ms: List[float]) -> dict:
+    ordered = sorted(samples_ms)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(pick(0.50), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
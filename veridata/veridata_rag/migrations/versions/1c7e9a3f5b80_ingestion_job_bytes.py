@@ -0,0 +1,29 @@
+"""ingestion_job_bytes
+
+Revision ID: 1c7e9a3f5b80
+Revises: 8b3d5f7e1a26
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c7e9a3f5b80'
+down_revision: Union[str, Sequence[str], None] = '8b3d5f7e1a26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Streaming ingestion doesn't know the chunk count up front; progress is by bytes read
+    op.execute("ALTER TABLE ingestion_jobs ADD COLUMN total_bytes bigint NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE ingestion_jobs ADD COLUMN processed_bytes bigint NOT NULL DEFAULT 0")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE ingestion_jobs DROP COLUMN processed_bytes")
+    op.execute("ALTER TABLE ingestion_jobs DROP COLUMN total_bytes")
@@ -0,0 +1,33 @@
+"""ingestion_job_batches
+
+Revision ID: 4d9a2c6e8f13
+Revises: 1c7e9a3f5b80
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d9a2c6e8f13'
+down_revision: Union[str, Sequence[str], None] = '1c7e9a3f5b80'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE ingestion_jobs ADD COLUMN file_hash varchar(64)")
+    op.execute("ALTER TABLE ingestion_jobs ADD COLUMN batch_id uuid")
+    op.execute("CREATE INDEX ix_ingestion_jobs_batch_id ON ingestion_jobs (batch_id)")
+    # Latest upload per filename (bulk dedupe)
+    op.execute("CREATE INDEX ix_ingestion_jobs_tenant_file ON ingestion_jobs (tenant_id, filename, created_at)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_ingestion_jobs_tenant_file")
+    op.execute("DROP INDEX IF EXISTS ix_ingestion_jobs_batch_id")
+    op.execute("ALTER TABLE ingestion_jobs DROP COLUMN batch_id")
+    op.execute("ALTER TABLE ingestion_jobs DROP COLUMN file_hash")
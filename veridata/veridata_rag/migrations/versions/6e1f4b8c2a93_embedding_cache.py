@@ -0,0 +1,38 @@
+"""embedding_cache
+
+Revision ID: 6e1f4b8c2a93
+Revises: d2b8f0a61c47
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e1f4b8c2a93'
+down_revision: Union[str, Sequence[str], None] = 'd2b8f0a61c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE embedding_cache (
+            model_name varchar(100) NOT NULL,
+            task_type varchar(50) NOT NULL,
+            text_hash varchar(64) NOT NULL,
+            embedding vector(768) NOT NULL,
+            created_at timestamptz DEFAULT now(),
+            last_used_at timestamptz DEFAULT now(),
+            PRIMARY KEY (model_name, task_type, text_hash)
+        )
+    """)
+    # Eviction walks the least recently used entries
+    op.execute("CREATE INDEX ix_embedding_cache_last_used_at ON embedding_cache (last_used_at)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS embedding_cache")
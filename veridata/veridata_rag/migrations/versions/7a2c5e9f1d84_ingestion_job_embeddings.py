@@ -0,0 +1,35 @@
+"""ingestion_job_embeddings
+
+Revision ID: 7a2c5e9f1d84
+Revises: f3a8c1d6b247
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a2c5e9f1d84'
+down_revision: Union[str, Sequence[str], None] = 'f3a8c1d6b247'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Embeddings of a job's checkpointed batches, read back by its insert pass.
+    # Unlike embedding_cache this is never evicted while the job runs.
+    op.execute("""
+        CREATE TABLE ingestion_job_embeddings (
+            job_id uuid NOT NULL REFERENCES ingestion_jobs(id) ON DELETE CASCADE,
+            content_hash varchar(64) NOT NULL,
+            embedding vector(768) NOT NULL,
+            PRIMARY KEY (job_id, content_hash)
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS ingestion_job_embeddings")
@@ -0,0 +1,52 @@
+"""ingestion_jobs
+
+Revision ID: 8b3d5f7e1a26
+Revises: 6e1f4b8c2a93
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3d5f7e1a26'
+down_revision: Union[str, Sequence[str], None] = '6e1f4b8c2a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE ingestion_jobs (
+            id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+            tenant_id uuid NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+            filename varchar(255) NOT NULL,
+            spool_path text NOT NULL,
+            status varchar(20) NOT NULL DEFAULT 'queued',
+            stage varchar(20),
+            total_chunks integer NOT NULL DEFAULT 0,
+            total_batches integer NOT NULL DEFAULT 0,
+            completed_batches integer NOT NULL DEFAULT 0,
+            attempts integer NOT NULL DEFAULT 0,
+            error text,
+            result jsonb,
+            worker_id varchar(100),
+            heartbeat_at timestamptz,
+            created_at timestamptz DEFAULT now(),
+            started_at timestamptz,
+            finished_at timestamptz
+        )
+    """)
+    op.execute("CREATE INDEX ix_ingestion_jobs_tenant_id ON ingestion_jobs (tenant_id)")
+    # Claim path: oldest queued job, or a running one whose worker stopped heartbeating
+    op.execute("""
+        CREATE INDEX ix_ingestion_jobs_claim ON ingestion_jobs (status, created_at)
+        WHERE status IN ('queued', 'running')
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS ingestion_jobs")
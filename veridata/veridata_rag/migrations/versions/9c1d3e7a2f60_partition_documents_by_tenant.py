@@ -0,0 +1,152 @@
+"""partition_documents_by_tenant
+
+Revision ID: 9c1d3e7a2f60
+Revises: 5b7e2c9d41a3
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1d3e7a2f60'
+down_revision: Union[str, Sequence[str], None] = '5b7e2c9d41a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# LIST partitioning (one partition per tenant) rather than HASH: a hash partition mixes
+# tenants, so deleting a tenant could not be a partition drop and the ANN scan would
+# still walk other tenants' graph neighbourhoods.
+# Partition naming must match src.storage.repository.tenant_partition_name().
+
+def upgrade() -> None:
+    # 1. Move the old table aside and free its index/policy names
+    op.execute("ALTER TABLE documents RENAME TO documents_unpartitioned")
+    op.execute("DROP POLICY IF EXISTS tenant_isolation_policy ON documents_unpartitioned")
+    op.execute("DROP INDEX IF EXISTS documents_fts_vector_idx")
+    op.execute("DROP INDEX IF EXISTS documents_embedding_idx")
+    op.execute("DROP INDEX IF EXISTS documents_tenant_id_idx")
+    # Per-tenant partial HNSW indexes (vector_index=partial) are superseded by partitions
+    op.execute("""
+        DO $$
+        DECLARE idx record;
+        BEGIN
+            FOR idx IN
+                SELECT indexname FROM pg_indexes
+                WHERE tablename = 'documents_unpartitioned' AND indexname LIKE 'documents_embedding_t_%_idx'
+            LOOP
+                EXECUTE format('DROP INDEX IF EXISTS %I', idx.indexname);
+            END LOOP;
+        END $$;
+    """)
+    op.execute("ALTER TABLE documents_unpartitioned RENAME CONSTRAINT documents_pkey TO documents_unpartitioned_pkey")
+
+    # 2. Partitioned parent. The partition key must be part of the primary key.
+    op.execute("""
+        CREATE TABLE documents (
+            id UUID NOT NULL DEFAULT gen_random_uuid(),
+            tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+            filename VARCHAR(255) NOT NULL,
+            content TEXT NOT NULL,
+            embedding vector(768),
+            fts_vector tsvector,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (tenant_id, id)
+        ) PARTITION BY LIST (tenant_id)
+    """)
+    # Safety net for tenants created without a partition; ensure_tenant_partition() moves
+    # their rows out of it.
+    op.execute("CREATE TABLE documents_default PARTITION OF documents DEFAULT")
+
+    # 3. One partition per existing tenant
+    op.execute("""
+        DO $$
+        DECLARE t record;
+        BEGIN
+            FOR t IN SELECT id FROM tenants LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF documents FOR VALUES IN (%L)',
+                    'documents_t_' || replace(t.id::text, '-', ''), t.id
+                );
+            END LOOP;
+        END $$;
+    """)
+
+    # 4. Copy rows (orphans with NULL tenant_id were unreachable through RLS and are dropped)
+    op.execute("""
+        INSERT INTO documents (id, tenant_id, filename, content, embedding, fts_vector, created_at)
+        SELECT id, tenant_id, filename, content, embedding, fts_vector, created_at
+        FROM documents_unpartitioned
+        WHERE tenant_id IS NOT NULL
+    """)
+
+    # 5. Indexes after the load (bulk build is much faster than incremental inserts).
+    # GIN is declared on the parent, so each partition (including future ones) gets its
+    # own. HNSW is built per partition instead: a partition index inherited from the
+    # parent cannot be dropped on its own, and a tenant that switches to compact vector
+    # storage replaces its full-precision index (src.services.vector_indexes).
+    # Index naming must match src.storage.repository.vector_index_name().
+    op.execute("CREATE INDEX documents_fts_vector_idx ON documents USING GIN (fts_vector)")
+    op.execute("""
+        DO $$
+        DECLARE p record;
+        BEGIN
+            FOR p IN SELECT inhrelid::regclass::text AS name FROM pg_inherits WHERE inhparent = 'documents'::regclass
+            LOOP
+                EXECUTE format(
+                    'CREATE INDEX %I ON %I USING hnsw (embedding vector_cosine_ops)', p.name || '_full_hnsw', p.name
+                );
+            END LOOP;
+        END $$;
+    """)
+
+    # 6. RLS on the parent applies to every partition accessed through it
+    op.execute("ALTER TABLE documents ENABLE ROW LEVEL SECURITY")
+    op.execute("""
+        CREATE POLICY tenant_isolation_policy ON documents
+        USING (tenant_id = current_setting('app.current_tenant', true)::uuid)
+    """)
+
+    op.execute("DROP TABLE documents_unpartitioned")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE documents RENAME TO documents_partitioned")
+    op.execute("DROP POLICY IF EXISTS tenant_isolation_policy ON documents_partitioned")
+    op.execute("DROP INDEX IF EXISTS documents_fts_vector_idx")
+    op.execute("DROP INDEX IF EXISTS documents_embedding_idx")
+    op.execute("ALTER TABLE documents_partitioned RENAME CONSTRAINT documents_pkey TO documents_partitioned_pkey")
+
+    op.execute("""
+        CREATE TABLE documents (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            tenant_id UUID REFERENCES tenants(id) ON DELETE CASCADE,
+            filename VARCHAR(255) NOT NULL,
+            content TEXT NOT NULL,
+            embedding vector(768),
+            fts_vector tsvector,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    op.execute("""
+        INSERT INTO documents (id, tenant_id, filename, content, embedding, fts_vector, created_at)
+        SELECT id, tenant_id, filename, content, embedding, fts_vector, created_at
+        FROM documents_partitioned
+    """)
+
+    op.execute("CREATE INDEX documents_fts_vector_idx ON documents USING GIN (fts_vector)")
+    op.execute("CREATE INDEX documents_embedding_idx ON documents USING hnsw (embedding vector_cosine_ops)")
+    op.execute("CREATE INDEX documents_tenant_id_idx ON documents (tenant_id)")
+
+    op.execute("ALTER TABLE documents ENABLE ROW LEVEL SECURITY")
+    op.execute("""
+        CREATE POLICY tenant_isolation_policy ON documents
+        USING (tenant_id = current_setting('app.current_tenant', true)::uuid)
+    """)
+
+    # Drops every tenant partition and the default partition with it
+    op.execute("DROP TABLE documents_partitioned")
@@ -0,0 +1,62 @@
+"""generated_fts_vector
+
+Revision ID: a4e9f1c7b352
+Revises: 9c1d3e7a2f60
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e9f1c7b352'
+down_revision: Union[str, Sequence[str], None] = '9c1d3e7a2f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 1. Per-chunk text search configuration. A non-volatile default is stored in the
+    #    catalog, so this does not rewrite the table.
+    op.execute("ALTER TABLE documents ADD COLUMN fts_config regconfig NOT NULL DEFAULT 'english'")
+
+    # 2. fts_vector becomes derived from (fts_config, content) by the database instead of
+    #    the INSERT statement. Adding a STORED generated column would rewrite every
+    #    partition under ACCESS EXCLUSIVE, so the existing column and its GIN index are
+    #    kept and a BEFORE trigger computes the value. Existing rows already hold
+    #    to_tsvector('english', content), which is what their default fts_config says.
+    #    Only writes that touch content or fts_config recompute it.
+    op.execute("""
+        CREATE FUNCTION documents_fts_vector_update() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.fts_vector := to_tsvector(NEW.fts_config, NEW.content);
+            RETURN NEW;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER documents_fts_vector_trigger
+        BEFORE INSERT OR UPDATE OF content, fts_config ON documents
+        FOR EACH ROW EXECUTE FUNCTION documents_fts_vector_update()
+    """)
+
+    # 3. Switching a tenant to its language is done afterwards by the batched backfill
+    #    (src.scripts.backfill_fts), which only takes row locks. Until it has finished
+    #    for a tenant, queries keep the config the chunks are indexed with ("from");
+    #    see get_tenant_retrieval_settings.
+    op.execute("""
+        UPDATE tenants
+        SET settings = settings || '{"fts_backfill": {"from": "english"}}'::jsonb
+    """)
+
+
+def downgrade() -> None:
+    op.execute("UPDATE tenants SET settings = settings - 'fts_backfill'")
+    # The previous code queried with 'english' only; the trigger re-stems these rows
+    op.execute("UPDATE documents SET fts_config = 'english' WHERE fts_config <> 'english'")
+    op.execute("DROP TRIGGER IF EXISTS documents_fts_vector_trigger ON documents")
+    op.execute("DROP FUNCTION IF EXISTS documents_fts_vector_update()")
+    op.execute("ALTER TABLE documents DROP COLUMN fts_config")
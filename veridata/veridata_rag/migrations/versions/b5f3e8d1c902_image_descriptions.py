@@ -0,0 +1,35 @@
+"""image_descriptions
+
+Revision ID: b5f3e8d1c902
+Revises: 4d9a2c6e8f13
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f3e8d1c902'
+down_revision: Union[str, Sequence[str], None] = '4d9a2c6e8f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE image_descriptions (
+            image_hash varchar(64) NOT NULL,
+            model_name varchar(100) NOT NULL,
+            prompt_hash varchar(16) NOT NULL,
+            description text NOT NULL,
+            created_at timestamptz DEFAULT now(),
+            PRIMARY KEY (image_hash, model_name, prompt_hash)
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS image_descriptions")
@@ -0,0 +1,40 @@
+"""document_content_hash
+
+Revision ID: d2b8f0a61c47
+Revises: a4e9f1c7b352
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b8f0a61c47'
+down_revision: Union[str, Sequence[str], None] = 'a4e9f1c7b352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE documents ADD COLUMN content_hash varchar(64)")
+    op.execute("ALTER TABLE documents ADD COLUMN file_version integer NOT NULL DEFAULT 1")
+
+    # Existing chunks all become version 1 of their file. Duplicates left by earlier
+    # re-uploads share a hash and are collapsed on the file's next re-ingestion.
+    op.execute("UPDATE documents SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')")
+    op.execute("ALTER TABLE documents ALTER COLUMN content_hash SET NOT NULL")
+
+    # Lookup path for the re-ingestion diff and version swap (propagates to partitions)
+    op.execute("""
+        CREATE INDEX documents_file_hash_idx
+        ON documents (tenant_id, filename, content_hash, file_version)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS documents_file_hash_idx")
+    op.execute("ALTER TABLE documents DROP COLUMN file_version")
+    op.execute("ALTER TABLE documents DROP COLUMN content_hash")
@@ -0,0 +1,67 @@
+"""source_documents
+
+Revision ID: e7c2a9b4d615
+Revises: b5f3e8d1c902
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c2a9b4d615'
+down_revision: Union[str, Sequence[str], None] = 'b5f3e8d1c902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 1. One row per (tenant, filename): what the admin page lists and deletes
+    op.execute("""
+        CREATE TABLE source_documents (
+            id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+            tenant_id uuid NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+            filename varchar(255) NOT NULL,
+            content_hash varchar(64),
+            chunk_count integer NOT NULL DEFAULT 0,
+            size_bytes bigint NOT NULL DEFAULT 0,
+            status varchar(20) NOT NULL DEFAULT 'pending',
+            created_at timestamptz DEFAULT now(),
+            updated_at timestamptz DEFAULT now(),
+            CONSTRAINT uq_source_documents_tenant_filename UNIQUE (tenant_id, filename)
+        )
+    """)
+    op.execute("CREATE INDEX ix_source_documents_tenant_updated ON source_documents (tenant_id, updated_at DESC)")
+
+    # 2. Catalog existing files (one-time GROUP BY; the admin page no longer does this)
+    op.execute("""
+        INSERT INTO source_documents (tenant_id, filename, chunk_count, size_bytes, status, created_at, updated_at)
+        SELECT tenant_id, filename, count(*), sum(octet_length(content)), 'ready', min(created_at), max(created_at)
+        FROM documents
+        GROUP BY tenant_id, filename
+    """)
+
+    # 3. Chunks reference their source document
+    op.execute("ALTER TABLE documents ADD COLUMN source_document_id uuid")
+    op.execute("""
+        UPDATE documents d SET source_document_id = s.id
+        FROM source_documents s
+        WHERE s.tenant_id = d.tenant_id AND s.filename = d.filename
+    """)
+    op.execute("ALTER TABLE documents ALTER COLUMN source_document_id SET NOT NULL")
+    op.execute("""
+        ALTER TABLE documents ADD CONSTRAINT documents_source_document_id_fkey
+        FOREIGN KEY (source_document_id) REFERENCES source_documents(id) ON DELETE CASCADE
+    """)
+    # Backs the FK cascade (probed per partition); app-side deletes also pass tenant_id
+    op.execute("CREATE INDEX documents_source_document_id_idx ON documents (source_document_id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS documents_source_document_id_idx")
+    op.execute("ALTER TABLE documents DROP CONSTRAINT IF EXISTS documents_source_document_id_fkey")
+    op.execute("ALTER TABLE documents DROP COLUMN source_document_id")
+    op.execute("DROP TABLE IF EXISTS source_documents")
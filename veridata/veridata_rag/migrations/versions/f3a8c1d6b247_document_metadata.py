@@ -0,0 +1,75 @@
+"""document_metadata
+
+Revision ID: f3a8c1d6b247
+Revises: e7c2a9b4d615
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+import uuid
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c1d6b247'
+down_revision: Union[str, Sequence[str], None] = 'e7c2a9b4d615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    # Constant default: stored in the catalog, so adding the column rewrites nothing
+    op.execute("ALTER TABLE documents ADD COLUMN metadata jsonb NOT NULL DEFAULT '{}'::jsonb")
+
+    # Existing chunks get what can be derived from the filename. Filled in pages of the
+    # primary key (tenant_id, id), each committed on its own, so no transaction locks a
+    # whole partition and dead tuples can be vacuumed while the backfill runs.
+    backfill = sa.text(r"""
+        WITH page AS (
+            SELECT tenant_id, id FROM documents
+            WHERE (tenant_id, id) > (CAST(:tenant_id AS uuid), CAST(:id AS uuid))
+            ORDER BY tenant_id, id
+            LIMIT :batch_size
+        ),
+        updated AS (
+            UPDATE documents d
+            SET metadata = jsonb_build_object(
+                'filename', d.filename,
+                'extension', COALESCE(lower(substring(d.filename from '\.([^.]+)$')), ''),
+                'original_type', CASE WHEN d.filename ~* '\.(jpe?g|png|webp)$' THEN 'image' ELSE 'text' END
+            )
+            FROM page
+            WHERE d.tenant_id = page.tenant_id AND d.id = page.id
+            RETURNING d.tenant_id, d.id
+        )
+        SELECT tenant_id, id FROM updated ORDER BY tenant_id DESC, id DESC LIMIT 1
+    """)
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        last = (str(uuid.UUID(int=0)), str(uuid.UUID(int=0)))
+        while True:
+            row = bind.execute(
+                backfill, {"tenant_id": last[0], "id": last[1], "batch_size": BACKFILL_BATCH_SIZE}
+            ).first()
+            if row is None:
+                break
+            last = (str(row.tenant_id), str(row.id))
+
+    # jsonb_path_ops: smaller than the default opclass and only supports @>, which is
+    # the only operator the search filter uses. Created on the parent, so every tenant
+    # partition (including future ones) gets its own index.
+    op.execute("CREATE INDEX documents_metadata_idx ON documents USING gin (metadata jsonb_path_ops)")
+
+    # Metadata supplied at upload time travels with the queued job
+    op.execute("ALTER TABLE ingestion_jobs ADD COLUMN metadata jsonb NOT NULL DEFAULT '{}'::jsonb")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE ingestion_jobs DROP COLUMN IF EXISTS metadata")
+    op.execute("DROP INDEX IF EXISTS documents_metadata_idx")
+    op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS metadata")
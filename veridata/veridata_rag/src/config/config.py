@@ -85,3 +85,13 @@ def get_global_setting(key: str, default: Any = None) -> Any:
     config = get_config()
     llm_config = config.get("llm_config", {})
     return llm_config.get(key, default)
+
+
+def get_retrieval_config() -> Dict[str, Any]:
+    config = get_config()
+    return dict(config.get("retrieval_config", {}))
+
+
+def get_chunking_config() -> Dict[str, Any]:
+    config = get_config()
+    return dict(config.get("chunking_config", {}))
@@ -1,4 +1,7 @@
-from fastapi import APIRouter
+import json
+from collections import Counter
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import ValidationError
 from uuid import UUID
 from src.services.rag import generate_answer
 from src.models.schemas import (
@@ -8,8 +11,17 @@ from src.models.schemas import (
     AppendMessageRequest,
     CreateSessionRequest,
     CreateSessionResponse,
+    IngestionJobResponse,
+    BulkIngestRequest,
+    BulkIngestResponse,
+    IngestionBatchResponse,
 )
 from src.services.memory import get_full_chat_history, create_session, delete_session, add_message
+from src.services.embedding_cache import get_embedding_cache_stats
+from src.services.contextualization import get_contextualization_stats
+from src.services.metrics import track_operation
+from src.services.ingestion_jobs import BULK_MAX_FILES, enqueue_bulk
+from src.storage.repository import get_ingestion_job, get_ingestion_batch
 
 router = APIRouter()
 
@@ -53,7 +65,7 @@ async def api_append_message(session_id: UUID, request: AppendMessageRequest):
 # API: QUERY RAG
 # The primary endpoint.
 # Receives user text + metadata (Pricing/Complexity).
-# Returns: Answer + Handoff Flag + Session ID.
+# Returns: Answer + Handoff Flag + Session ID (+ stage timings when debug is set).
 # ==================================================================================
 @router.post("/query", response_model=QueryResponse)
 async def api_query_rag(request: QueryRequest):
@@ -62,20 +74,103 @@ async def api_query_rag(request: QueryRequest):
         session_id_str = await create_session(request.tenant_id)
         session_id = UUID(session_id_str)
 
-    answer, context = await generate_answer(
-        request.tenant_id,
-        request.query,
-        use_hyde=request.use_hyde,
-        use_rerank=request.use_rerank,
-        provider=request.provider,
-        session_id=session_id,
-        complexity_score=request.complexity_score,
-        pricing_intent=request.pricing_intent,
-        external_context=request.external_context,
-    )
+    with track_operation("query") as trace:
+        answer, context = await generate_answer(
+            request.tenant_id,
+            request.query,
+            use_hyde=request.use_hyde,
+            use_rerank=request.use_rerank,
+            provider=request.provider,
+            session_id=session_id,
+            complexity_score=request.complexity_score,
+            pricing_intent=request.pricing_intent,
+            external_context=request.external_context,
+            metadata_filter=request.metadata_filter,
+        )
     return QueryResponse(
         answer=answer,
         # requires_human field removed from schema
         session_id=session_id,
-        context=context
+        context=context,
+        timings=trace.as_dict() if request.debug else None,
     )
+
+
+# ==================================================================================
+# API: EMBEDDING CACHE
+# Hit rates of the query LRU and the persistent document cache (this process).
+# ==================================================================================
+@router.get("/embedding-cache/stats")
+async def api_embedding_cache_stats():
+    return get_embedding_cache_stats()
+
+
+# ==================================================================================
+# API: CONTEXTUALIZATION
+# Skip rate of the query-rewrite classifier, rewrite cache hits and the latency
+# saved by not calling the LLM (this process).
+# ==================================================================================
+@router.get("/contextualization/stats")
+async def api_contextualization_stats():
+    return get_contextualization_stats()
+
+
+# ==================================================================================
+# API: INGESTION JOBS
+# PROGRESS
+# State, stage and batch checkpoint of a queued/running/finished ingestion job.
+# ==================================================================================
+@router.get("/ingestion-jobs/{job_id}", response_model=IngestionJobResponse)
+async def api_get_ingestion_job(job_id: UUID):
+    job = await get_ingestion_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job
+
+
+# ==================================================================================
+# API: BULK DOCUMENTS
+# SYNC
+# Queues many documents in one request, either as JSON
+#   {"tenant_id": ..., "documents": [{"filename": ..., "content": ...}]}
+# or as multipart (tenant_id + repeated "files", each a document or a zip/tar archive).
+# Optional "metadata" (a JSON object; per document in the JSON form) is stored on every
+# chunk and can be filtered on at query time (QueryRequest.metadata_filter).
+# Unchanged files (same filename + hash as the latest upload) are skipped.
+# ==================================================================================
+@router.post("/documents/bulk", response_model=BulkIngestResponse)
+async def api_bulk_ingest(request: Request):
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            # Starlette caps a form at 1000 files by default; enqueue_bulk enforces our own limit
+            form = await request.form(max_files=BULK_MAX_FILES)
+            tenant_id = UUID(str(form.get("tenant_id")))
+            uploads = [f for f in form.getlist("files") if hasattr(f, "filename")]
+            metadata = json.loads(form.get("metadata") or "{}")
+            if not isinstance(metadata, dict):
+                raise ValueError("metadata must be a JSON object")
+            result = await enqueue_bulk(tenant_id, uploads=uploads, metadata=metadata)
+        else:
+            payload = BulkIngestRequest.model_validate(await request.json())
+            result = await enqueue_bulk(
+                payload.tenant_id,
+                documents=[(d.filename, d.content, d.metadata) for d in payload.documents],
+                metadata=payload.metadata,
+            )
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result
+
+
+@router.get("/ingestion-batches/{batch_id}", response_model=IngestionBatchResponse)
+async def api_get_ingestion_batch(batch_id: UUID):
+    jobs = await get_ingestion_batch(batch_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Ingestion batch not found")
+    return {
+        "batch_id": batch_id,
+        "total": len(jobs),
+        "status_counts": dict(Counter(job["status"] for job in jobs)),
+        "jobs": jobs,
+    }
@@ -15,16 +15,52 @@ from fastapi import (
 )
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, delete, update, func
+from sqlalchemy import select, update
 from src.storage.engine import get_session
-from src.models import Tenant, Document
+from src.models import Tenant, SourceDocument
 from src.utils.auth import require_auth
-from src.services.rag import ingest_document, generate_answer
+from src.services.rag import generate_answer, TEXT_EXTENSIONS, IMAGE_EXTENSIONS
+from src.services.ingestion_jobs import enqueue_ingestion, TERMINAL_STATUSES
+from src.services.config_service import get_tenant_retrieval_settings, resolve_fts_config
+from src.services.fts import SUPPORTED_FTS_CONFIGS, backfill_fts_config, pending_fts_backfill
+from src.services.vector_indexes import sync_vector_index
+from src.services.chunking import CHUNKING_STRATEGIES
+from src.services.rerank import RERANK_BACKENDS
+from src.storage.repository import (
+    ITERATIVE_SCAN_MODES,
+    VECTOR_STORAGE_MODES,
+    ensure_tenant_partition,
+    delete_tenant_and_partition,
+    get_ingestion_job,
+    delete_source_document,
+)
 
 logger = logging.getLogger(__name__)
 templates = Jinja2Templates(directory="src/templates")
 router = APIRouter()
 
+# Tenant settings keys edited on the tenant page
+RETRIEVAL_FORM_KEYS = (
+    "ef_search", "iterative_scan", "vector_storage", "fts_config", "context_token_budget", "rerank_backend",
+)
+CHUNKING_FORM_KEYS = ("strategy", "chunk_size", "chunk_overlap")
+
+
+def merge_tenant_settings(settings: Optional[dict], retrieval: dict, chunking: dict) -> dict:
+    """Applies the tenant form to stored settings.
+
+    Keys the form does not expose (max_scan_tuples, rescore_factor, adaptive_retrieval, ...)
+    are kept; form keys left empty are removed so they fall back to the global config.
+    """
+    settings = dict(settings or {})
+    for section, values, form_keys in (
+        ("retrieval", retrieval, RETRIEVAL_FORM_KEYS),
+        ("chunking", chunking, CHUNKING_FORM_KEYS),
+    ):
+        kept = {key: value for key, value in (settings.get(section) or {}).items() if key not in form_keys}
+        settings[section] = {**kept, **values}
+    return settings
+
 
 async def get_tenants():
     async for session in get_session():
@@ -38,13 +74,14 @@ async def get_tenant_documents(tenant_id: UUID):
     async for session in get_session():
         stmt = (
             select(
-                Document.filename,
-                func.max(Document.created_at).label("created_at"),
-                func.count().label("chunk_count"),
+                SourceDocument.id,
+                SourceDocument.filename,
+                SourceDocument.updated_at,
+                SourceDocument.chunk_count,
+                SourceDocument.status,
             )
-            .where(Document.tenant_id == tenant_id)
-            .group_by(Document.filename)
-            .order_by(func.max(Document.created_at).desc())
+            .where(SourceDocument.tenant_id == tenant_id)
+            .order_by(SourceDocument.updated_at.desc())
         )
         result = await session.execute(stmt)
         return result.all()
@@ -108,6 +145,8 @@ async def create_tenant(
         tenant = Tenant(name=name)
         session.add(tenant)
         await session.commit()
+    # Each tenant gets its own documents partition (own HNSW + GIN indexes)
+    await ensure_tenant_partition(tenant.id)
     return RedirectResponse(url="/", status_code=303)
 
 
@@ -118,7 +157,9 @@ async def view_tenant(
     tenants = await get_tenants()
     documents = await get_tenant_documents(tenant_id)
 
-    tenant_data = {"id": str(tenant_id), "name": "Unknown", "preferred_languages": ""}
+    tenant_data = {
+        "id": str(tenant_id), "name": "Unknown", "preferred_languages": "", "retrieval": {}, "chunking": {}
+    }
 
     async for session in get_session():
         result = await session.execute(select(Tenant).where(Tenant.id == tenant_id))
@@ -126,6 +167,8 @@ async def view_tenant(
         if tenant:
             tenant_data["name"] = tenant.name
             tenant_data["preferred_languages"] = tenant.preferred_languages or ""
+            tenant_data["retrieval"] = (tenant.settings or {}).get("retrieval", {})
+            tenant_data["chunking"] = (tenant.settings or {}).get("chunking", {})
 
     return templates.TemplateResponse(
         "index.html",
@@ -134,6 +177,7 @@ async def view_tenant(
             "tenants": tenants,
             "selected_tenant": tenant_data,
             "documents": documents,
+            "rerank_backends": RERANK_BACKENDS,
             "username": username,
         },
     )
@@ -143,60 +187,117 @@ async def view_tenant(
 async def update_tenant_settings(
     request: Request,
     tenant_id: UUID,
+    background_tasks: BackgroundTasks,
     preferred_languages: Annotated[str, Form()],
+    ef_search: Annotated[Optional[str], Form()] = None,
+    iterative_scan: Annotated[Optional[str], Form()] = None,
+    vector_storage: Annotated[Optional[str], Form()] = None,
+    fts_config: Annotated[Optional[str], Form()] = None,
+    context_token_budget: Annotated[Optional[str], Form()] = None,
+    rerank_backend: Annotated[Optional[str], Form()] = None,
+    chunk_strategy: Annotated[Optional[str], Form()] = None,
+    chunk_size: Annotated[Optional[str], Form()] = None,
+    chunk_overlap: Annotated[Optional[str], Form()] = None,
     username: str = Depends(require_auth),
 ):
+    # Empty fields fall back to the global retrieval_config / chunking_config
+    retrieval = {}
+    if ef_search and ef_search.strip().isdigit():
+        retrieval["ef_search"] = max(1, min(int(ef_search), 1000))
+    if iterative_scan in ITERATIVE_SCAN_MODES:
+        retrieval["iterative_scan"] = iterative_scan
+    if vector_storage in VECTOR_STORAGE_MODES:
+        retrieval["vector_storage"] = vector_storage
+    if fts_config in SUPPORTED_FTS_CONFIGS:
+        retrieval["fts_config"] = fts_config
+    if context_token_budget and context_token_budget.strip().isdigit():
+        retrieval["context_token_budget"] = max(256, min(int(context_token_budget), 100_000))
+    if rerank_backend in RERANK_BACKENDS:
+        retrieval["rerank_backend"] = rerank_backend
+
+    # Applies to files ingested from now on (re-upload to re-chunk existing ones)
+    chunking = {}
+    if chunk_strategy in CHUNKING_STRATEGIES:
+        chunking["strategy"] = chunk_strategy
+    if chunk_size and chunk_size.strip().isdigit():
+        chunking["chunk_size"] = max(64, min(int(chunk_size), 8192))
+    if chunk_overlap and chunk_overlap.strip().isdigit():
+        chunking["chunk_overlap"] = int(chunk_overlap)
+
+    previous = await get_tenant_retrieval_settings(tenant_id)
+
     async for session in get_session():
+        # Row lock: a finishing FTS backfill clears its marker from these settings
+        result = await session.execute(select(Tenant.settings).where(Tenant.id == tenant_id).with_for_update())
+        settings = merge_tenant_settings(result.scalars().first(), retrieval, chunking)
+
+        # Language changes (explicit or via preferred_languages) re-stem existing chunks.
+        # Queries keep the config the chunks are indexed with until that has finished.
+        fts_config = resolve_fts_config(settings, preferred_languages)
+        if fts_config != previous["fts_config"]:
+            pending = pending_fts_backfill(settings) or {}
+            settings["fts_backfill"] = {"from": pending.get("from", previous["fts_config"]), "to": fts_config}
+
         stmt = (
             update(Tenant)
             .where(Tenant.id == tenant_id)
-            .values(preferred_languages=preferred_languages)
+            .values(preferred_languages=preferred_languages, settings=settings)
         )
         await session.execute(stmt)
         await session.commit()
 
+    if fts_config != previous["fts_config"]:
+        logger.info(f"Tenant {tenant_id} FTS config {previous['fts_config']} -> {fts_config}")
+        background_tasks.add_task(backfill_fts_config, tenant_id, fts_config)
+
+    # Compact vector storage: build the tenant's new HNSW index, then drop the old one
+    current = await get_tenant_retrieval_settings(tenant_id)
+    if current["vector_storage"] != current["query_vector_storage"]:
+        background_tasks.add_task(sync_vector_index, tenant_id)
+
     return RedirectResponse(url=f"/tenants/{tenant_id}", status_code=303)
 
 
 @router.post("/ingest", response_class=HTMLResponse)
 async def ingest_file(
     request: Request,
-    background_tasks: BackgroundTasks,
     tenant_id: Annotated[UUID, Form()],
     file: Annotated[UploadFile, File()],
+    tags: Annotated[Optional[str], Form()] = None,
+    language: Annotated[Optional[str], Form()] = None,
     username: str = Depends(require_auth),
 ):
-    if not file.filename.lower().endswith(
-        (".txt", ".md", ".jpg", ".jpeg", ".png", ".webp")
-    ):
+    if not file.filename.lower().endswith(TEXT_EXTENSIONS + IMAGE_EXTENSIONS):
         return HTMLResponse(
             '<div class="text-red-500">Supported formats: .txt, .md, .jpg, .png, .webp</div>'
         )
 
-    content = await file.read()
     try:
-        text_content = None
-        file_bytes = None
-
-        if file.filename.lower().endswith((".txt", ".md")):
-            text_content = content.decode("utf-8")
-        else:
-            file_bytes = content
-
-        background_tasks.add_task(
-            ingest_document,
-            tenant_id,
-            file.filename,
-            content=text_content,
-            file_bytes=file_bytes,
-        )
-        return HTMLResponse(
-            f'<div class="text-green-500 mb-2">Started processing {file.filename}... check back soon.</div>'
-        )
+        metadata = {}
+        if tags and tags.strip():
+            metadata["tags"] = tags
+        if language and language.strip():
+            metadata["language"] = language.strip().lower()
+        job_id = await enqueue_ingestion(tenant_id, file, metadata=metadata)
     except Exception as e:
-        logger.error(f"Error reading file: {e}")
+        logger.error(f"Error queuing file: {e}")
         return HTMLResponse('<div class="text-red-500">Error reading file</div>')
 
+    return await ingestion_job_status(request, job_id, username)
+
+
+@router.get("/ingestion-jobs/{job_id}", response_class=HTMLResponse)
+async def ingestion_job_status(
+    request: Request, job_id: UUID, username: str = Depends(require_auth)
+):
+    job = await get_ingestion_job(job_id)
+    if not job:
+        return HTMLResponse('<div class="text-red-500">Ingestion job not found</div>')
+    return templates.TemplateResponse(
+        "partials/ingestion_job.html",
+        {"request": request, "job": job, "finished": job["status"] in TERMINAL_STATUSES},
+    )
+
 
 from src.services.memory import create_session
 
@@ -234,19 +335,14 @@ async def query_rag(
     )
 
 
-@router.delete("/tenants/{tenant_id}/documents", response_class=HTMLResponse)
+@router.delete("/tenants/{tenant_id}/documents/{document_id}", response_class=HTMLResponse)
 async def delete_document(
     request: Request,
     tenant_id: UUID,
-    filename: str,
+    document_id: UUID,
     username: str = Depends(require_auth),
 ):
-    async for session in get_session():
-        stmt = delete(Document).where(
-            Document.tenant_id == tenant_id, Document.filename == filename
-        )
-        await session.execute(stmt)
-        await session.commit()
+    await delete_source_document(tenant_id, document_id)
     return HTMLResponse("")
 
 
@@ -254,9 +350,7 @@ async def delete_document(
 async def delete_tenant(
     request: Request, tenant_id: UUID, username: str = Depends(require_auth)
 ):
-    async for session in get_session():
-        stmt = delete(Tenant).where(Tenant.id == tenant_id)
-        await session.execute(stmt)
-        await session.commit()
+    # Dropping the partition is O(1) compared to cascading a delete over every chunk
+    await delete_tenant_and_partition(tenant_id)
     # HX-Redirect tells HTMX to navigate the client to the new URL
     return HTMLResponse("", headers={"HX-Redirect": "/"})
@@ -1,14 +1,27 @@
 import logging
+import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from src.controllers import web, api
 from src.storage.engine import dispose_engine, ensure_database_exists, run_migrations
 from src.config.config import load_config_from_db
 from src.config.logging import setup_logging
+from src.services.ingestion_jobs import start_ingestion_workers, stop_ingestion_workers
+from src.services.metrics import render_metrics
+from src.services.tracing import TracingMiddleware, configure_tracing
 
 setup_logging()
 logger = logging.getLogger(__name__)
+# Spans go to a JSONL file or an OTLP/HTTP collector; off unless TRACING_EXPORTER is set
+configure_tracing(
+    os.getenv("OTEL_SERVICE_NAME", "veridata-rag"),
+    exporter=os.getenv("TRACING_EXPORTER", "none"),
+    file_path=os.getenv("TRACING_FILE", "traces.jsonl"),
+    otlp_endpoint=os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"),
+    sample_rate=float(os.getenv("TRACING_SAMPLE_RATE", "1.0")),
+)
 
 
 @asynccontextmanager
@@ -16,13 +29,23 @@ async def lifespan(app: FastAPI):
     await ensure_database_exists()
     await run_migrations()
     await load_config_from_db()
+    start_ingestion_workers()
     yield
+    await stop_ingestion_workers()
     await dispose_engine()
 
 
 app = FastAPI(title="VeriRag Core", lifespan=lifespan)
+# Continues the trace of the bot request that called us (traceparent header)
+app.add_middleware(TracingMiddleware)
 
 app.include_router(web.router)
 app.include_router(api.router, prefix="/api")
 
 app.mount("/static", StaticFiles(directory="src/static"), name="static")
+
+
+# Prometheus scrape endpoint (text exposition format, this process only)
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1 +1,27 @@
-from .db import Base, Tenant, GlobalConfig, Document, ChatSession, ChatMessage
+from .db import (
+    Base,
+    Tenant,
+    GlobalConfig,
+    SourceDocument,
+    Document,
+    ChatSession,
+    ChatMessage,
+    EmbeddingCache,
+    IngestionJob,
+    IngestionJobEmbedding,
+    ImageDescription,
+)
+
+__all__ = [
+    "Base",
+    "Tenant",
+    "GlobalConfig",
+    "SourceDocument",
+    "Document",
+    "ChatSession",
+    "ChatMessage",
+    "EmbeddingCache",
+    "IngestionJob",
+    "IngestionJobEmbedding",
+    "ImageDescription",
+]
@@ -1,10 +1,12 @@
 from datetime import datetime
 from typing import Optional, List
 import uuid
-from sqlalchemy import String, Text, TIMESTAMP, ForeignKey, JSON
+from sqlalchemy import (
+    String, Text, Integer, BigInteger, TIMESTAMP, ForeignKey, JSON, UniqueConstraint, text
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR, JSONB, REGCONFIG
 from pgvector.sqlalchemy import Vector
 
 
@@ -20,6 +22,8 @@ class Tenant(Base):
     )
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     preferred_languages: Mapped[Optional[str]] = mapped_column(Text)
+    # Per-tenant overrides, e.g. {"retrieval": {"ef_search": 100, "iterative_scan": "relaxed_order"}}
+    settings: Mapped[dict] = mapped_column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
     created_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True), server_default=func.now()
     )
@@ -42,19 +46,63 @@ class GlobalConfig(Base):
     )
 
 
+class SourceDocument(Base):
+    # Catalog of ingested files: one row per (tenant, filename), chunk_count kept on ingest
+    __tablename__ = "source_documents"
+    __table_args__ = (UniqueConstraint("tenant_id", "filename", name="uq_source_documents_tenant_filename"),)
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid()
+    )
+    tenant_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False
+    )
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    # sha256 of the ingested file
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64))
+    chunk_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
+    # pending (first ingest running) -> ready | failed
+    status: Mapped[str] = mapped_column(String(20), nullable=False, server_default=text("'pending'"))
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
 class Document(Base):
+    # LIST-partitioned by tenant_id (see migration 9c1d3e7a2f60), hence the composite key
     __tablename__ = "documents"
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid()
     )
     tenant_id: Mapped[uuid.UUID] = mapped_column(
-        ForeignKey("tenants.id", ondelete="CASCADE")
+        ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True
+    )
+    source_document_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("source_documents.id", ondelete="CASCADE"), nullable=False, index=True
     )
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
+    # sha256(content) hex and file version, used to diff re-uploads of the same filename
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    file_version: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("1"))
+    # Always stored at full precision. Compact halfvec/bit HNSW indexes are expression
+    # indexes over this column (see repository VECTOR_STORAGE_MODES).
     embedding: Mapped[Optional[List[float]]] = mapped_column(Vector(768))
+    # Text search configuration (e.g. 'portuguese') the chunk is stemmed with
+    fts_config: Mapped[str] = mapped_column(REGCONFIG, nullable=False, server_default=text("'english'"))
+    # to_tsvector(fts_config, content), kept up to date by documents_fts_vector_trigger
     fts_vector: Mapped[Optional[str]] = mapped_column(TSVECTOR)
+    # original_type, extension, filename plus upload metadata (tags, language, ...).
+    # GIN (jsonb_path_ops) indexed for the `@>` search filter. "metadata" is reserved
+    # on declarative classes, hence the attribute name.
+    meta: Mapped[dict] = mapped_column(
+        "metadata", JSONB, nullable=False, server_default=text("'{}'::jsonb")
+    )
     created_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True), server_default=func.now()
     )
@@ -97,3 +145,87 @@ class ChatMessage(Base):
     )
 
     session: Mapped["ChatSession"] = relationship(back_populates="messages")
+
+
+class EmbeddingCache(Base):
+    # Shared across tenants: keyed by the text hash only, never by who embedded it
+    __tablename__ = "embedding_cache"
+
+    model_name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    task_type: Mapped[str] = mapped_column(String(50), primary_key=True)
+    text_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    embedding: Mapped[List[float]] = mapped_column(Vector(768), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
+    last_used_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), index=True
+    )
+
+
+class IngestionJob(Base):
+    # Durable queue for the ingestion pipeline (see services/ingestion_jobs.py)
+    __tablename__ = "ingestion_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid()
+    )
+    tenant_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("tenants.id", ondelete="CASCADE"), index=True
+    )
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Upload spooled to disk; removed once the job completes
+    spool_path: Mapped[str] = mapped_column(Text, nullable=False)
+    # sha256 of the uploaded file, used to skip unchanged files in bulk syncs
+    file_hash: Mapped[Optional[str]] = mapped_column(String(64))
+    # Set for jobs queued together through /api/documents/bulk
+    batch_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), index=True)
+    # Upload metadata copied onto every chunk of the file
+    meta: Mapped[dict] = mapped_column(
+        "metadata", JSONB, nullable=False, server_default=text("'{}'::jsonb")
+    )
+    # queued -> running -> completed | failed
+    status: Mapped[str] = mapped_column(String(20), nullable=False, server_default=text("'queued'"))
+    # parse -> embed -> insert -> done
+    stage: Mapped[Optional[str]] = mapped_column(String(20))
+    # Spooled size and how far the streaming chunker has read (progress)
+    total_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
+    processed_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
+    total_chunks: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    total_batches: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    # Checkpoint: embedding batches already persisted (resumed from here)
+    completed_batches: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    result: Mapped[Optional[dict]] = mapped_column(JSONB)
+    worker_id: Mapped[Optional[str]] = mapped_column(String(100))
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+
+
+class IngestionJobEmbedding(Base):
+    # Staged embeddings of a job's checkpointed batches; removed when the job finishes
+    __tablename__ = "ingestion_job_embeddings"
+
+    job_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("ingestion_jobs.id", ondelete="CASCADE"), primary_key=True
+    )
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    embedding: Mapped[List[float]] = mapped_column(Vector(768), nullable=False)
+
+
+class ImageDescription(Base):
+    # VLM output cache keyed by image content; prompt_hash invalidates on prompt changes
+    __tablename__ = "image_descriptions"
+
+    image_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model_name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    prompt_hash: Mapped[str] = mapped_column(String(16), primary_key=True)
+    description: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from uuid import UUID
-from typing import Optional, Union
+from datetime import datetime
+from typing import Any, Optional, Union
 
 
 class QueryRequest(BaseModel):
@@ -13,12 +14,17 @@ class QueryRequest(BaseModel):
     complexity_score: Optional[int] = 5
     pricing_intent: Optional[bool] = False
     external_context: Optional[str] = None
+    # JSONB containment on chunk metadata, e.g. {"tags": ["pricing"], "original_type": "text"}
+    metadata_filter: Optional[dict[str, Any]] = None
+    # Adds the per-stage timing and token breakdown of this request to the response
+    debug: bool = False
 
 
 class QueryResponse(BaseModel):
     answer: str
     session_id: Optional[UUID] = None
     context: Optional[str] = None
+    timings: Optional[dict[str, Any]] = None
 
 
 class SummarizeRequest(BaseModel):
@@ -58,3 +64,52 @@ class CreateSessionRequest(BaseModel):
 
 class CreateSessionResponse(BaseModel):
     session_id: UUID
+
+
+class IngestionJobResponse(BaseModel):
+    id: UUID
+    tenant_id: UUID
+    batch_id: Optional[UUID] = None
+    filename: str
+    metadata: dict[str, Any] = {}
+    status: str
+    stage: Optional[str] = None
+    total_bytes: int = 0
+    processed_bytes: int = 0
+    total_chunks: int = 0
+    total_batches: int = 0
+    completed_batches: int = 0
+    attempts: int = 0
+    error: Optional[str] = None
+    result: Optional[dict] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class BulkDocument(BaseModel):
+    filename: str
+    content: str
+    metadata: Optional[dict[str, Any]] = None
+
+
+class BulkIngestRequest(BaseModel):
+    tenant_id: UUID
+    documents: list[BulkDocument]
+    # Applied to every document; per-document keys win
+    metadata: Optional[dict[str, Any]] = None
+
+
+class BulkIngestResponse(BaseModel):
+    batch_id: Optional[UUID] = None
+    queued: list[str] = []
+    unchanged: list[str] = []
+    duplicates: list[str] = []
+    rejected: list[str] = []
+
+
+class IngestionBatchResponse(BaseModel):
+    batch_id: UUID
+    total: int
+    status_counts: dict[str, int]
+    jobs: list[IngestionJobResponse]
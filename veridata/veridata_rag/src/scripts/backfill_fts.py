@@ -0,0 +1,50 @@
+"""Re-stems existing chunks with each tenant's text search configuration.
+
+Usage:
+    python -m src.scripts.backfill_fts                      # all tenants, resolved config
+    python -m src.scripts.backfill_fts --tenant-id <uuid> --batch-size 500
+"""
+
+import argparse
+import asyncio
+import logging
+from uuid import UUID
+
+from sqlalchemy import select
+
+from src.models import Tenant
+from src.services.config_service import get_tenant_retrieval_settings
+from src.services.fts import backfill_fts_config
+from src.storage.engine import dispose_engine, get_session
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def run(tenant_id: str = None, batch_size: int = 1000) -> None:
+    if tenant_id:
+        tenant_ids = [UUID(tenant_id)]
+    else:
+        async for session in get_session():
+            result = await session.execute(select(Tenant.id))
+            tenant_ids = list(result.scalars().all())
+
+    try:
+        for tid in tenant_ids:
+            settings = await get_tenant_retrieval_settings(tid)
+            await backfill_fts_config(tid, settings["fts_config"], batch_size=batch_size)
+    finally:
+        await dispose_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenant-id", help="Only backfill this tenant")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.tenant_id, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Builds each tenant's HNSW index for its vector_storage mode and drops the others.
+
+Run after changing the global retrieval_config.vector_storage (per-tenant changes made
+in the admin UI are applied automatically).
+
+Usage:
+    python -m src.scripts.sync_vector_indexes                      # all tenants
+    python -m src.scripts.sync_vector_indexes --tenant-id <uuid>
+"""
+
+import argparse
+import asyncio
+import logging
+from uuid import UUID
+
+from sqlalchemy import select
+
+from src.models import Tenant
+from src.services.vector_indexes import sync_vector_index
+from src.storage.engine import dispose_engine, get_session
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def run(tenant_id: str = None) -> None:
+    if tenant_id:
+        tenant_ids = [UUID(tenant_id)]
+    else:
+        async for session in get_session():
+            result = await session.execute(select(Tenant.id))
+            tenant_ids = list(result.scalars().all())
+
+    try:
+        for tid in tenant_ids:
+            await sync_vector_index(tid)
+    finally:
+        await dispose_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenant-id", help="Only sync this tenant")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.tenant_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from src.config.config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+# ==================================================================================
+# ADAPTIVE RETRIEVAL DEPTH
+# Decides how deep to retrieve from the shape of the fused (RRF) score curve instead
+# of always fetching `limit` (or 4x `limit` for rerank):
+# 1. Cut: the first drop inside the top `limit` where score[i] / score[i+1] >=
+#    gap_ratio. Everything above it clearly dominates (typically chunks both the vector
+#    and the keyword branch ranked first); the rest is not sent, but never fewer than
+#    min_results.
+# 2. Decisive: a cut was found, or the boundary at `limit` is itself sharp
+#    (score[limit-1] / score[limit] >= dominance_ratio). The fused order is trusted and
+#    the rerank stage is skipped.
+# 3. Flat: (top - last) / top < flat_spread over a full candidate pool, i.e. the
+#    branches disagree and nothing stands out. Only then (and only when reranking) is
+#    the pool widened to max_candidates_factor x `limit`.
+# RRF scores are rank based, so ratios (not absolute values) are compared. Every
+# decision is logged as one JSON line ("Adaptive retrieval {...}") for offline tuning.
+# Off by default; tenants opt in with retrieval settings {"adaptive_retrieval": {"enabled": true}}.
+# ==================================================================================
+DEFAULT_ADAPTIVE_RETRIEVAL = {
+    "enabled": False,
+    "initial_candidates_factor": 2,
+    "max_candidates_factor": 6,
+    "gap_ratio": 1.6,
+    "dominance_ratio": 1.5,
+    "flat_spread": 0.15,
+    "min_results": 2,
+}
+
+
+def get_adaptive_retrieval_settings(retrieval_settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Priority: retrieval settings "adaptive_retrieval" (per tenant) > config.json
+    "adaptive_retrieval_config" > DEFAULT_ADAPTIVE_RETRIEVAL.
+    """
+    settings = dict(DEFAULT_ADAPTIVE_RETRIEVAL)
+    settings.update(get_config().get("adaptive_retrieval_config", {}))
+    overrides = (retrieval_settings or {}).get("adaptive_retrieval") or {}
+    settings.update({k: v for k, v in overrides.items() if v not in (None, "")})
+    return settings
+
+
+def candidate_limits(limit: int, use_rerank: bool, settings: Dict[str, Any]) -> tuple[int, int]:
+    """(initial, widened) candidate pool sizes."""
+    if not settings.get("enabled"):
+        fixed = limit * 4 if use_rerank else limit
+        return fixed, fixed
+    initial = max(limit + 1, limit * int(settings["initial_candidates_factor"]))
+    return initial, max(initial, limit * int(settings["max_candidates_factor"]))
+
+
+def assess_scores(scores: List[float], limit: int, candidate_limit: int, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Reads a best-first score list. Returns keep (results worth sending), decisive, flat and why."""
+    assessment = {"keep": min(limit, len(scores)), "decisive": False, "flat": False, "reason": "default"}
+    if not scores:
+        assessment["reason"] = "empty"
+        return assessment
+
+    top, window = scores[0], scores[:limit]
+    min_results = max(1, int(settings["min_results"]))
+    for i in range(len(window) - 1):
+        current, following = window[i], window[i + 1]
+        if following <= 0 or current / following >= float(settings["gap_ratio"]):
+            keep = min(len(window), max(i + 1, min_results))
+            assessment.update(keep=keep, decisive=True, reason=f"gap_after_{i + 1}")
+            return assessment
+
+    dominance_ratio = float(settings["dominance_ratio"])
+    if len(scores) > limit and scores[limit] > 0 and scores[limit - 1] / scores[limit] >= dominance_ratio:
+        assessment.update(decisive=True, reason="dominant_top_k")
+        return assessment
+
+    spread = (top - scores[-1]) / top if top > 0 else 0.0
+    if len(scores) >= candidate_limit and spread < float(settings["flat_spread"]):
+        assessment.update(flat=True, reason="flat")
+    return assessment
+
+
+def log_decision(
+    tenant_id, query: str, scores: List[float], assessment: Dict[str, Any], settings: Dict[str, Any], **extra
+):
+    record = {
+        "tenant_id": str(tenant_id),
+        "query_chars": len(query),
+        "scores": [round(score, 5) for score in scores],
+        **assessment,
+        **extra,
+        "thresholds": {k: v for k, v in settings.items() if k != "enabled"},
+    }
+    logger.info(f"Adaptive retrieval {json.dumps(record, sort_keys=True)}")
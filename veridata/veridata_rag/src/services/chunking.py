@@ -0,0 +1,288 @@
+import codecs
+import logging
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from llama_index.core import Document
+from llama_index.core.node_parser import SentenceSplitter
+
+from src.storage.repository import compute_content_hash
+from src.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 1024 * 1024
+# Text handed to the splitter at a time. Large enough that segment edges are rare
+# (a file under this size chunks exactly as it did when split in one piece).
+SEGMENT_CHARS = 256 * 1024
+
+
+# ==================================================================================
+# STREAMING READ
+# Decodes a spooled upload incrementally and yields segments cut at paragraph (or
+# line / sentence) boundaries. Memory is bounded by READ_SIZE + SEGMENT_CHARS,
+# whatever the file size.
+# ==================================================================================
+def _find_cut(buffer: str, limit: int) -> int:
+    for separator in ("\n\n", "\n", ". "):
+        position = buffer.rfind(separator, 0, limit)
+        if position > limit // 2:
+            return position + len(separator)
+    return limit
+
+
+def iter_text_file(path: str, segment_chars: int = SEGMENT_CHARS) -> Iterator[Tuple[str, int]]:
+    """Yields (segment, bytes read so far). Raises UnicodeDecodeError on non UTF-8 input."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    bytes_read = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_SIZE)
+            bytes_read += len(block)
+            buffer += decoder.decode(block, final=not block)
+            while len(buffer) >= segment_chars:
+                cut = _find_cut(buffer, segment_chars)
+                yield buffer[:cut], bytes_read
+                buffer = buffer[cut:]
+            if not block:
+                break
+    if buffer.strip():
+        yield buffer, bytes_read
+
+
+# ==================================================================================
+# CHUNKING STRATEGIES (per tenant: Tenant.settings["chunking"] > "chunking_config")
+# - sentence: LlamaIndex SentenceSplitter over each segment. With the defaults
+#   (1024 / 20) it reproduces the original chunks, so stored hashes stay valid.
+# - markdown: one chunk per heading section, prefixed with its heading path
+#   ("Knowledge Base > 4. Product > Key Features"). Oversized sections are split by
+#   sentence inside the section; sections under min_chunk_tokens merge forward.
+# - faq: like markdown, but every question ("Q: ...", "**How do I ...?**",
+#   "### Pricing?") starts its own chunk, so a question and its answer stay together.
+# - auto: picks faq / markdown / sentence from the first segment of the file.
+# Sizes are in tokens (same tokenizer as the splitter, see utils/tokens.py).
+# ==================================================================================
+CHUNKING_STRATEGIES = ("sentence", "markdown", "faq", "auto")
+DEFAULT_CHUNKING = {"strategy": "sentence", "chunk_size": 1024, "chunk_overlap": 20, "min_chunk_tokens": 32}
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_QUESTION_RE = re.compile(
+    r"^\s*(?:[-*]\s+)?(?:\*\*|__)?\s*(?:Q|Question|P|Pergunta|Pregunta)\s*\d*\s*[:.)-]"
+    r"|^\s*(?:[-*]\s+)?(?:\*\*|__).+\?\s*(?:\*\*|__)\s*$",
+    re.IGNORECASE,
+)
+_FAQ_MIN_QUESTIONS = 3
+
+
+def normalize_chunking_settings(settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    resolved = dict(DEFAULT_CHUNKING)
+    resolved.update({k: v for k, v in (settings or {}).items() if v not in (None, "")})
+    if resolved["strategy"] not in CHUNKING_STRATEGIES:
+        logger.warning(f"Unknown chunking strategy '{resolved['strategy']}', using sentence")
+        resolved["strategy"] = "sentence"
+    resolved["chunk_size"] = max(64, min(int(resolved["chunk_size"]), 8192))
+    resolved["chunk_overlap"] = max(0, min(int(resolved["chunk_overlap"]), resolved["chunk_size"] // 2))
+    resolved["min_chunk_tokens"] = max(0, int(resolved["min_chunk_tokens"]))
+    return resolved
+
+
+def _is_question(line: str) -> bool:
+    heading = _HEADING_RE.match(line)
+    if heading:
+        return heading.group(2).rstrip("*_ ").endswith("?")
+    return bool(_QUESTION_RE.match(line))
+
+
+class SentenceChunker:
+    def __init__(self, settings: Dict[str, Any], metadata: Dict[str, str]):
+        self.splitter = SentenceSplitter(chunk_size=settings["chunk_size"], chunk_overlap=settings["chunk_overlap"])
+        # Metadata counts against the chunk budget, as it always has
+        self.metadata = metadata
+
+    def split(self, text: str) -> Iterator[str]:
+        doc = Document(text=text, metadata=self.metadata)
+        for node in self.splitter.get_nodes_from_documents([doc]):
+            yield node.get_content()
+
+
+class MarkdownChunker:
+    # Whether adjacent sections under min_chunk_tokens are merged
+    merge_small = True
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.chunk_size = settings["chunk_size"]
+        self.chunk_overlap = settings["chunk_overlap"]
+        self.min_chunk_tokens = settings["min_chunk_tokens"]
+        self._splitters: Dict[int, SentenceSplitter] = {}
+        # Heading stack and fence state carry over between segments of one file
+        self.headings: List[Tuple[int, str]] = []
+        self.in_fence = False
+
+    def _splitter(self, chunk_size: int) -> SentenceSplitter:
+        if chunk_size not in self._splitters:
+            self._splitters[chunk_size] = SentenceSplitter(
+                chunk_size=chunk_size, chunk_overlap=min(self.chunk_overlap, chunk_size // 2)
+            )
+        return self._splitters[chunk_size]
+
+    def _heading_path(self) -> str:
+        return " > ".join(title for _, title in self.headings)
+
+    def _starts_block(self, line: str) -> bool:
+        return False
+
+    def _sections(self, text: str) -> Iterator[Tuple[str, str]]:
+        """Yields (heading path, body) per section; heading-only sections only extend the path."""
+        body: List[str] = []
+        for line in text.splitlines():
+            if line.lstrip().startswith(("```", "~~~")):
+                self.in_fence = not self.in_fence
+            if not self.in_fence and self._starts_block(line):
+                if any(part.strip() for part in body):
+                    yield self._heading_path(), "\n".join(body).strip()
+                body = [line.lstrip("#").strip() if _HEADING_RE.match(line) else line]
+                continue
+            heading = None if self.in_fence else _HEADING_RE.match(line)
+            if heading:
+                if any(part.strip() for part in body):
+                    yield self._heading_path(), "\n".join(body).strip()
+                body = []
+                level = len(heading.group(1))
+                self.headings = [h for h in self.headings if h[0] < level] + [(level, heading.group(2).strip())]
+            else:
+                body.append(line)
+        if any(part.strip() for part in body):
+            yield self._heading_path(), "\n".join(body).strip()
+
+    def _section_chunks(self, path: str, body: str) -> Iterator[str]:
+        chunk = f"{path}\n{body}" if path else body
+        if count_tokens(chunk) <= self.chunk_size:
+            yield chunk
+            return
+        # Keep the heading path on every piece of an oversized section
+        budget = max(64, self.chunk_size - count_tokens(path) - 1) if path else self.chunk_size
+        for piece in self._splitter(budget).split_text(body):
+            yield f"{path}\n{piece}" if path else piece
+
+    def split(self, text: str) -> Iterator[str]:
+        pending = ""
+        for path, body in self._sections(text):
+            pieces = list(self._section_chunks(path, body))
+            for chunk in pieces:
+                if pending:
+                    merged = f"{pending}\n\n{chunk}"
+                    if count_tokens(merged) <= self.chunk_size:
+                        chunk = merged
+                    else:
+                        yield pending
+                    pending = ""
+                # Only whole sections are held back (not the tail of a split one)
+                if self.merge_small and len(pieces) == 1 and count_tokens(chunk) < self.min_chunk_tokens:
+                    pending = chunk
+                else:
+                    yield chunk
+        if pending:
+            yield pending
+
+
+class FAQChunker(MarkdownChunker):
+    merge_small = False
+
+    def _starts_block(self, line: str) -> bool:
+        return _is_question(line)
+
+
+class AutoChunker:
+    def __init__(self, settings: Dict[str, Any], metadata: Dict[str, str]):
+        self.settings = settings
+        self.metadata = metadata
+        self.chunker = None
+
+    def _pick(self, text: str):
+        lines = text.splitlines()
+        if sum(1 for line in lines if _is_question(line)) >= _FAQ_MIN_QUESTIONS:
+            strategy = "faq"
+        elif sum(1 for line in lines if _HEADING_RE.match(line)) >= 2:
+            strategy = "markdown"
+        else:
+            strategy = "sentence"
+        logger.info(f"Chunking {self.metadata.get('filename')} with the {strategy} strategy")
+        return get_chunker({**self.settings, "strategy": strategy}, self.metadata)
+
+    def split(self, text: str) -> Iterator[str]:
+        if self.chunker is None:
+            self.chunker = self._pick(text)
+        return self.chunker.split(text)
+
+
+def get_chunker(settings: Optional[Dict[str, Any]], metadata: Dict[str, str]):
+    settings = normalize_chunking_settings(settings)
+    strategy = settings["strategy"]
+    if strategy == "markdown":
+        return MarkdownChunker(settings)
+    if strategy == "faq":
+        return FAQChunker(settings)
+    if strategy == "auto":
+        return AutoChunker(settings, metadata)
+    return SentenceChunker(settings, metadata)
+
+
+# ==================================================================================
+# CHUNKING
+# Each segment is split with the tenant's strategy. One chunker instance handles the
+# whole file, so section context carries across segment boundaries.
+# ==================================================================================
+def iter_document_chunks(
+    tenant_id: UUID,
+    filename: str,
+    segments: Iterable[Tuple[str, int]],
+    original_type: str = "text",
+    settings: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[str, int]]:
+    metadata = {"filename": filename, "tenant_id": str(tenant_id), "original_type": original_type}
+    chunker = get_chunker(settings, metadata)
+    for segment, position in segments:
+        for chunk in chunker.split(segment):
+            if chunk.strip():
+                yield chunk, position
+
+
+def iter_chunk_batches(
+    chunks: Iterable[Tuple[str, int]], batch_size: int
+) -> Iterator[Tuple[List[Tuple[str, str]], int]]:
+    """Groups chunks into batches of (hash, text), dropping repeats within the file.
+
+    Yields (batch, bytes read so far). Only hashes are remembered across batches.
+    """
+    seen = set()
+    batch: List[Tuple[str, str]] = []
+    position = 0
+    for chunk_text, position in chunks:
+        content_hash = compute_content_hash(chunk_text)
+        if content_hash in seen:
+            continue
+        seen.add(content_hash)
+        batch.append((content_hash, chunk_text))
+        if len(batch) >= batch_size:
+            yield batch, position
+            batch = []
+    if batch:
+        yield batch, position
+
+
+def chunk_text(
+    tenant_id: UUID,
+    filename: str,
+    content: str,
+    original_type: str = "text",
+    settings: Optional[Dict[str, Any]] = None,
+) -> Dict[str, str]:
+    """In-memory variant for small inputs: {hash: text} for the whole content."""
+    chunks = iter_document_chunks(tenant_id, filename, [(content, len(content))], original_type, settings)
+    result = {}
+    for batch, _ in iter_chunk_batches(chunks, batch_size=1024):
+        result.update(batch)
+    logger.info(f"Split into {len(result)} chunks")
+    return result
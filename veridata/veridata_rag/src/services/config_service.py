@@ -1,7 +1,17 @@
 import logging
+from typing import Optional
 from sqlalchemy import select
 from src.storage.engine import get_session
 from src.models.db import GlobalConfig
+from src.config.config import get_chunking_config, get_retrieval_config
+from src.services.chunking import normalize_chunking_settings
+from src.storage.repository import VECTOR_STORAGE_MODES, get_tenant_settings, get_tenant_languages
+from src.services.fts import (
+    DEFAULT_FTS_CONFIG,
+    fts_config_for_languages,
+    normalize_fts_config,
+    pending_fts_backfill,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -47,3 +57,61 @@ async def get_rag_global_config() -> dict:
         logger.error(f"Failed to fetch GlobalConfig from DB: {e}")
 
     return defaults
+
+
+def resolve_fts_config(tenant_settings: dict, preferred_languages: Optional[str] = None) -> str:
+    """
+    Text search configuration the tenant's chunks should be stemmed with.
+    Priority: Tenant.settings["retrieval"]["fts_config"] > Tenant.preferred_languages >
+    "retrieval_config" > english.
+    """
+    return (
+        normalize_fts_config((tenant_settings.get("retrieval") or {}).get("fts_config"))
+        or fts_config_for_languages(preferred_languages)
+        or normalize_fts_config(get_retrieval_config().get("fts_config"))
+        or DEFAULT_FTS_CONFIG
+    )
+
+
+async def get_tenant_retrieval_settings(tenant_id) -> dict:
+    """
+    Resolves retrieval settings for a tenant.
+    Priority: Tenant.settings["retrieval"] > GlobalConfig/config.json "retrieval_config".
+    Keys: ef_search, iterative_scan, max_scan_tuples, vector_storage, query_vector_storage,
+    rescore_factor, fts_config, query_fts_config, context_token_budget, external_context_share,
+    adaptive_retrieval (dict of threshold overrides), rerank_backend (llm | lexical | cross_encoder).
+    fts_config (used for new chunks) without an explicit tenant override follows
+    Tenant.preferred_languages. query_fts_config is the config the existing chunks are
+    indexed with: the previous one until a language change has been backfilled.
+    query_vector_storage is the mode the tenant's HNSW index is built for, which lags
+    vector_storage until the new index exists.
+    """
+    settings = get_retrieval_config()
+    tenant_settings = await get_tenant_settings(tenant_id)
+    overrides = {k: v for k, v in tenant_settings.get("retrieval", {}).items() if v not in (None, "")}
+    settings.update(overrides)
+
+    preferred_languages = None
+    if not normalize_fts_config(overrides.get("fts_config")):
+        preferred_languages = await get_tenant_languages(tenant_id)
+    settings["fts_config"] = resolve_fts_config(tenant_settings, preferred_languages)
+
+    pending = pending_fts_backfill(tenant_settings)
+    settings["query_fts_config"] = normalize_fts_config((pending or {}).get("from")) or settings["fts_config"]
+
+    # Partitions start with a full-precision index; see src.services.vector_indexes
+    indexed = tenant_settings.get("vector_index")
+    settings["query_vector_storage"] = indexed if indexed in VECTOR_STORAGE_MODES else "full"
+    return settings
+
+
+async def get_tenant_chunking_settings(tenant_id) -> dict:
+    """
+    Resolves chunking settings for a tenant.
+    Priority: Tenant.settings["chunking"] > GlobalConfig/config.json "chunking_config".
+    Keys: strategy (sentence | markdown | faq | auto), chunk_size, chunk_overlap, min_chunk_tokens.
+    """
+    settings = get_chunking_config()
+    tenant_settings = await get_tenant_settings(tenant_id)
+    settings.update({k: v for k, v in tenant_settings.get("chunking", {}).items() if v not in (None, "")})
+    return normalize_chunking_settings(settings)
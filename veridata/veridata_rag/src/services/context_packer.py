@@ -0,0 +1,212 @@
+import logging
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.storage.repository import compute_content_hash
+from src.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+# ==================================================================================
+# CONTEXT PACKING
+# Builds the generation context under a token budget instead of concatenating the
+# live data dump and every retrieved chunk:
+# 1. External (live) data gets up to `external_context_share` of the budget. If the
+#    dump is larger, its header line plus the rows that mention query terms are kept
+#    (in their original order).
+# 2. Chunks are deduplicated: identical text, near-identical text (neighbouring
+#    chunks sharing their overlap) and sentences already packed from a better chunk.
+# 3. Each chunk is trimmed to the sentences that mention query terms, plus one
+#    sentence either side for coherence. A chunk with no lexical match was retrieved
+#    semantically and keeps its leading sentences (up to UNMATCHED_CHUNK_TOKENS).
+# 4. Chunks are packed in retrieval order (best first) until the budget runs out;
+#    the last one is cut at a sentence boundary if enough room is left.
+# Stats report what was dropped, so truncation is visible in the logs.
+# ==================================================================================
+DEFAULT_CONTEXT_TOKEN_BUDGET = 3000
+DEFAULT_EXTERNAL_CONTEXT_SHARE = 0.5
+# Below this, the remaining budget is not worth a truncated chunk
+MIN_CHUNK_TOKENS = 48
+NEAR_DUPLICATE_SIMILARITY = 0.8
+UNMATCHED_CHUNK_TOKENS = 128
+
+# Sentence ends after a word (not "1." in a numbered heading or list)
+_SENTENCE_RE = re.compile(r"(?<=[^\W\d_][.!?])\s+|(?<=[.!?][\"')*])\s+")
+_WORD_RE = re.compile(r"\w+")
+# Too common to say anything about relevance (en / pt / es)
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i", "in", "is",
+    "it", "me", "my", "of", "on", "or", "the", "to", "what", "when", "where", "which", "who", "why", "with",
+    "you", "your", "o", "os", "um", "uma", "de", "da", "das", "dos", "e", "em", "no", "na", "que",
+    "qual", "quais", "como", "para", "por", "com", "el", "la", "los", "las", "y", "en", "cual", "cuanto",
+}
+
+
+def _terms(text: str) -> Set[str]:
+    return {word for word in _WORD_RE.findall(text.lower()) if word not in _STOPWORDS and len(word) > 1}
+
+
+def _split_sentences(text: str) -> List[Tuple[int, str]]:
+    """(line number, sentence) pairs, so kept sentences can be re-joined on their original lines."""
+    return [
+        (line_number, sentence.strip())
+        for line_number, line in enumerate(text.splitlines())
+        for sentence in _SENTENCE_RE.split(line)
+        if sentence.strip()
+    ]
+
+
+def _join_sentences(sentences: List[Tuple[int, str]]) -> str:
+    text, previous_line = "", None
+    for line_number, sentence in sentences:
+        if previous_line is not None:
+            text += " " if line_number == previous_line else "\n"
+        text += sentence
+        previous_line = line_number
+    return text
+
+
+def _shingles(text: str, size: int = 5) -> Set[Tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    return {tuple(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _truncate_to_budget(sentences: List[Tuple[int, str]], budget: int) -> List[Tuple[int, str]]:
+    kept, used = [], 0
+    for line_number, sentence in sentences:
+        tokens = count_tokens(sentence)
+        if used + tokens > budget:
+            break
+        kept.append((line_number, sentence))
+        used += tokens
+    return kept
+
+
+def trim_external_context(external_context: str, query_terms: Set[str], budget: int) -> Tuple[str, bool]:
+    """Returns (text, trimmed). Line oriented: live data is a sheet / API dump, one row per line."""
+    if count_tokens(external_context) <= budget:
+        return external_context, False
+
+    lines = [line for line in external_context.splitlines() if line.strip()]
+    if not lines:
+        return "", True
+    # Header row first, then the rows that mention the query, then the rest
+    order = [0] + sorted(
+        range(1, len(lines)), key=lambda i: len(query_terms & _terms(lines[i])), reverse=True
+    )
+    selected, used = set(), 0
+    for i in order:
+        # + 1 for the newline joining it to the next row
+        tokens = count_tokens(lines[i]) + 1
+        if used + tokens > budget:
+            continue
+        selected.add(i)
+        used += tokens
+    return "\n".join(lines[i] for i in sorted(selected)), True
+
+
+def trim_chunk(
+    content: str, query_terms: Set[str], max_tokens: int, seen_sentences: Set[str]
+) -> List[Tuple[int, str]]:
+    """(line number, sentence) pairs of `content` worth sending, in order, skipping ones already packed."""
+    sentences = [
+        (line_number, sentence)
+        for line_number, sentence in _split_sentences(content)
+        if compute_content_hash(sentence.lower()) not in seen_sentences
+    ]
+    if not sentences:
+        return []
+
+    matching = [i for i, (_, sentence) in enumerate(sentences) if query_terms & _terms(sentence)]
+    if not matching:
+        return _truncate_to_budget(sentences, min(max_tokens, UNMATCHED_CHUNK_TOKENS))
+
+    keep = set()
+    for i in matching:
+        keep.update((i - 1, i, i + 1))
+    # Markdown/FAQ chunks open with their heading path: keep it as a label
+    keep.add(0)
+    return _truncate_to_budget([pair for i, pair in enumerate(sentences) if i in keep], max_tokens)
+
+
+def pack_context(
+    query: str,
+    results: List[Dict[str, Any]],
+    external_context: Optional[str] = None,
+    budget_tokens: int = DEFAULT_CONTEXT_TOKEN_BUDGET,
+    external_share: float = DEFAULT_EXTERNAL_CONTEXT_SHARE,
+) -> Tuple[str, str, Dict[str, Any]]:
+    """Returns (live data, document context, stats). `results` must be ordered best first."""
+    query_terms = _terms(query)
+    stats = {
+        "budget_tokens": budget_tokens,
+        "input_tokens": 0,
+        "used_tokens": 0,
+        "external_tokens": 0,
+        "external_trimmed": False,
+        "chunks_in": len(results),
+        "chunks_packed": 0,
+        "chunks_duplicate": 0,
+        "chunks_dropped": 0,
+        "dropped_tokens": 0,
+    }
+
+    live_data = ""
+    if external_context:
+        stats["input_tokens"] += count_tokens(external_context)
+        external_budget = int(budget_tokens * min(max(external_share, 0.0), 1.0))
+        live_data, stats["external_trimmed"] = trim_external_context(external_context, query_terms, external_budget)
+        stats["external_tokens"] = count_tokens(live_data)
+
+    remaining = budget_tokens - stats["external_tokens"]
+    packed: List[str] = []
+    seen_hashes: Set[str] = set()
+    seen_sentences: Set[str] = set()
+    packed_shingles: List[Set[Tuple[str, ...]]] = []
+
+    for result in results:
+        content = result.get("content") or ""
+        stats["input_tokens"] += count_tokens(content)
+
+        content_hash = compute_content_hash(content)
+        shingles = _shingles(content)
+        near_duplicate = any(
+            len(shingles & other) / max(1, min(len(shingles), len(other))) >= NEAR_DUPLICATE_SIMILARITY
+            for other in packed_shingles
+        )
+        if content_hash in seen_hashes or near_duplicate:
+            stats["chunks_duplicate"] += 1
+            continue
+
+        label = f"Source: {result.get('filename', 'unknown')}"
+        budget = remaining - count_tokens(label) - 1
+        if budget < MIN_CHUNK_TOKENS:
+            stats["chunks_dropped"] += 1
+            continue
+
+        sentences = trim_chunk(content, query_terms, budget, seen_sentences)
+        if not sentences:
+            # Nothing new, or its first sentence alone would not fit
+            stats["chunks_dropped"] += 1
+            continue
+
+        block = f"{label}\n{_join_sentences(sentences)}"
+        packed.append(block)
+        # + 1 for the blank line separating it from the next block
+        remaining -= count_tokens(block) + 1
+        seen_hashes.add(content_hash)
+        packed_shingles.append(shingles)
+        seen_sentences.update(compute_content_hash(sentence.lower()) for _, sentence in sentences)
+        stats["chunks_packed"] += 1
+
+    doc_context = "\n\n".join(packed)
+    stats["used_tokens"] = stats["external_tokens"] + count_tokens(doc_context)
+    stats["dropped_tokens"] = max(0, stats["input_tokens"] - stats["used_tokens"])
+    logger.info(
+        f"Context packed: {stats['used_tokens']}/{budget_tokens} tokens "
+        f"({stats['dropped_tokens']} dropped), {stats['chunks_packed']}/{stats['chunks_in']} chunks "
+        f"({stats['chunks_duplicate']} duplicate, {stats['chunks_dropped']} over budget)"
+        + (", live data trimmed" if stats["external_trimmed"] else "")
+    )
+    return live_data, doc_context, stats
@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from src.config.config import get_config
+from src.services.llm_factory import get_llm
+from src.services.metrics import record_llm_usage
+from src.utils.cache import TTLCache
+from src.utils.prompts import CONTEXTUALIZE_PROMPT_TEMPLATE
+
+logger = logging.getLogger(__name__)
+
+
+# ==================================================================================
+# FLOW HELPER: CONTEXTUALIZE
+# Rewrites the user query to include context from previous messages.
+# Example: "How much is it?" -> "How much is the Standard Plan?"
+# ==================================================================================
+def contextualize_query(
+    query: str, history: List[Dict[str, str]], provider: str = None, model_name: str = None
+) -> str:
+    if not history:
+        return query
+
+    history_str = "\n".join(
+        [f"{msg['role'].upper()}: {msg['content']}" for msg in history]
+    )
+
+    try:
+        llm = get_llm(step="contextualization", provider=provider, model_name=model_name)
+        prompt = CONTEXTUALIZE_PROMPT_TEMPLATE.format(
+            history_str=history_str, query=query
+        )
+        response = llm.complete(prompt)
+        record_llm_usage("contextualization", prompt, response)
+        rewritten = response.text.strip()
+        logger.info(f"Contextualized query: '{query}' -> '{rewritten}'")
+        return rewritten
+    except Exception as e:
+        logger.error(f"Contextualization failed: {e}")
+        return query
+
+
+# ==================================================================================
+# SKIP HEURISTICS
+# Most follow-ups are self-contained ("do you ship to Portugal?") and gain nothing from
+# an LLM rewrite. A local classifier decides, in order:
+# 1. Ellipsis openers ("and for 3?", "what about...", "e o plano anual?") -> rewrite
+# 2. Pronouns / demonstratives ("it", "that one", "isso", "eso") -> rewrite, unless
+#    the query already repeats the topic of the last turn (>= 2 shared content words)
+# 3. Very short queries (< MIN_CONTENT_WORDS content words) -> rewrite
+# 4. Anything else is treated as self-contained -> skip
+# Word lists cover English, Portuguese and Spanish (the tenants' languages).
+# ==================================================================================
+MIN_CONTENT_WORDS = 2
+MIN_TOPIC_OVERLAP = 2
+
+_WORD_RE = re.compile(r"\w+")
+_REFERENCE_WORDS = {
+    # en
+    "it", "its", "that", "this", "these", "those", "they", "them", "their", "one", "ones", "he", "she", "him",
+    "her", "there", "same", "former", "latter",
+    # pt
+    "ele", "ela", "eles", "elas", "dele", "dela", "deles", "delas", "nele", "nela", "isso", "isto", "esse",
+    "essa", "esses", "essas", "este", "esta", "disso", "nisso", "desse", "dessa", "mesmo", "mesma", "lá",
+    # es
+    "lo", "eso", "esto", "ese", "esa", "esos", "esas", "ello", "ellos", "ellas", "mismo", "misma", "allí", "ahí",
+}
+_ELLIPSIS_OPENERS = (
+    "and ", "what about", "how about", "also", "what else", "anything else", "same for", "and?",
+    "e ", "e o ", "e a ", "e os ", "e as ", "e para", "e se", "também", "tambem", "e quanto",
+    "y ", "y el ", "y la ", "y para", "y si", "también", "qué tal", "que tal",
+)
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "do", "does", "you", "your", "i", "we", "to", "of", "in", "on", "for", "with",
+    "can", "how", "what", "which", "when", "where", "who", "why", "much", "many", "me", "my", "have", "has",
+    "o", "os", "as", "um", "uma", "de", "da", "do", "das", "dos", "em", "no", "na", "que", "qual", "como", "para",
+    "por", "com", "voce", "você", "vocês", "tem", "é", "el", "la", "los", "las", "un", "una", "del", "en", "es",
+    "cual", "cuál", "cuanto", "cuánto", "usted", "tiene", "se", "y", "e",
+}
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def _content_words(words: List[str]) -> Set[str]:
+    return {word for word in words if word not in _STOPWORDS and word not in _REFERENCE_WORDS and len(word) > 1}
+
+
+def needs_contextualization(query: str, history: List[Dict[str, str]]) -> Tuple[bool, str]:
+    """(rewrite?, reason). Cheap and local: runs on every turn."""
+    if not history:
+        return False, "no_history"
+
+    normalized = " ".join(query.lower().split())
+    if normalized.startswith(_ELLIPSIS_OPENERS):
+        return True, "ellipsis"
+
+    words = _words(normalized)
+    content = _content_words(words)
+    if _REFERENCE_WORDS.intersection(words):
+        last_turn = _content_words(_words(history[-1]["content"]))
+        if len(content & last_turn) >= MIN_TOPIC_OVERLAP:
+            return False, "explicit_reference"
+        return True, "reference"
+
+    if len(content) < MIN_CONTENT_WORDS:
+        return True, "short"
+
+    return False, "self_contained"
+
+
+# ==================================================================================
+# REWRITE CACHE + STATS
+# Rewrites are cached per (session, turn): the turn is identified by the history the
+# rewrite was based on, so a retried or resent message reuses its rewrite and a new
+# message in the same session never sees a stale one.
+# Stats (process-local) include the skip rate and an estimate of the latency saved:
+# skipped turns x average measured rewrite latency.
+# ==================================================================================
+_cache: Optional[TTLCache] = None
+_stats_lock = threading.Lock()
+_stats = {"turns": 0, "skipped": 0, "rewritten": 0, "cache_hits": 0, "rewrite_ms_total": 0.0}
+_reasons: Counter = Counter()
+
+
+def _contextualization_config() -> Dict[str, Any]:
+    return get_config().get("contextualization_config", {})
+
+
+def get_rewrite_cache() -> TTLCache:
+    global _cache
+    if _cache is None:
+        config = _contextualization_config()
+        _cache = TTLCache(int(config.get("cache_max_entries", 4096)), float(config.get("cache_ttl_seconds", 1800)))
+    return _cache
+
+
+def _turn_key(
+    session_id: Optional[UUID], query: str, history: List[Dict[str, str]], model_name: Optional[str]
+) -> tuple:
+    turn = hashlib.sha256(
+        "\x1f".join(f"{msg['role']}:{msg['content']}" for msg in history).encode("utf-8")
+    ).hexdigest()
+    return (str(session_id), turn, " ".join(query.lower().split()), model_name)
+
+
+def _record(outcome: str, reason: str, rewrite_ms: float = 0.0):
+    with _stats_lock:
+        _stats["turns"] += 1
+        _stats[outcome] += 1
+        _stats["rewrite_ms_total"] += rewrite_ms
+        _reasons[reason] += 1
+
+
+async def contextualize(
+    session_id: Optional[UUID],
+    query: str,
+    history: List[Dict[str, str]],
+    provider: Optional[str] = None,
+    model_name: Optional[str] = None,
+) -> str:
+    """Rewrites `query` against `history` only when the classifier says it depends on it."""
+    if not _contextualization_config().get("skip_heuristics", True):
+        rewrite, reason = bool(history), "heuristics_disabled"
+    else:
+        rewrite, reason = needs_contextualization(query, history)
+    if not rewrite:
+        logger.info(f"Contextualization skipped ({reason})")
+        _record("skipped", reason)
+        return query
+
+    key = _turn_key(session_id, query, history, model_name)
+    cache = get_rewrite_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        _record("cache_hits", reason)
+        return cached
+
+    started = time.perf_counter()
+    rewritten = await asyncio.to_thread(contextualize_query, query, history, provider, model_name)
+    _record("rewritten", reason, (time.perf_counter() - started) * 1000)
+    if rewritten != query:
+        cache.put(key, rewritten)
+    return rewritten
+
+
+def get_contextualization_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+        reasons = dict(_reasons)
+    avg_rewrite_ms = stats["rewrite_ms_total"] / stats["rewritten"] if stats["rewritten"] else 0.0
+    return {
+        "turns": stats["turns"],
+        "skipped": stats["skipped"],
+        "rewritten": stats["rewritten"],
+        "cache_hits": stats["cache_hits"],
+        "skip_rate": round(stats["skipped"] / stats["turns"], 4) if stats["turns"] else 0.0,
+        "avg_rewrite_ms": round(avg_rewrite_ms, 1),
+        "estimated_saved_ms": round((stats["skipped"] + stats["cache_hits"]) * avg_rewrite_ms, 1),
+        "reasons": reasons,
+        "cache": get_rewrite_cache().stats(),
+    }
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.config.config import get_config
+from src.services.providers import build_embed_model
+from src.storage.repository import (
+    compute_content_hash,
+    evict_embedding_cache,
+    get_cached_embeddings,
+    store_cached_embeddings,
+)
+
+logger = logging.getLogger(__name__)
+
+# Single instance of embedding model
+_embed_model = None
+
+
+def get_embed_model():
+    global _embed_model
+    if _embed_model is None:
+        _embed_model = build_embed_model()
+    return _embed_model
+
+
+def _cache_config() -> Dict[str, Any]:
+    return get_config().get("embedding_cache", {})
+
+
+# ==================================================================================
+# QUERY CACHE (in-memory LRU)
+# Repeat questions ("what are your opening hours?") skip the embedding API entirely.
+# Process-local and bounded; keyed like the persistent cache.
+# ==================================================================================
+class EmbeddingLRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key: tuple, embedding: List[float]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_query_cache: Optional[EmbeddingLRU] = None
+
+
+def get_query_cache() -> EmbeddingLRU:
+    global _query_cache
+    if _query_cache is None:
+        _query_cache = EmbeddingLRU(int(_cache_config().get("query_lru_size", 4096)))
+    return _query_cache
+
+
+async def embed_query(query: str) -> List[float]:
+    embed_model = get_embed_model()
+    key = (embed_model.embedding_model_name, embed_model.QUERY_TASK_TYPE, compute_content_hash(query))
+    cache = get_query_cache()
+
+    embedding = cache.get(key)
+    if embedding is None:
+        embedding = await asyncio.to_thread(embed_model.get_query_embedding, query)
+        cache.put(key, embedding)
+    return embedding
+
+
+# ==================================================================================
+# DOCUMENT CACHE (Postgres)
+# Chunks are looked up by hash in one round trip; only misses go to the embedding
+# API. Shared boilerplate across files and tenants is embedded once per model.
+# ==================================================================================
+_document_stats = {"hits": 0, "misses": 0, "evicted": 0}
+_writes_since_eviction = 0
+
+
+async def embed_documents(texts: List[str]) -> List[List[float]]:
+    global _writes_since_eviction
+    if not texts:
+        return []
+
+    embed_model = get_embed_model()
+    model_name, task_type = embed_model.embedding_model_name, embed_model.DOCUMENT_TASK_TYPE
+    hashes = [compute_content_hash(t) for t in texts]
+
+    found = await get_cached_embeddings(model_name, task_type, hashes)
+
+    missing = {}
+    for text_hash, text_content in zip(hashes, texts):
+        if text_hash not in found:
+            missing.setdefault(text_hash, text_content)
+    _document_stats["hits"] += len(texts) - sum(1 for h in hashes if h in missing)
+    _document_stats["misses"] += len(missing)
+
+    if missing:
+        logger.info(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} to embed")
+        computed = await asyncio.to_thread(embed_model.get_text_embedding_batch, list(missing.values()))
+        new_entries = dict(zip(missing.keys(), computed))
+        await store_cached_embeddings(model_name, task_type, new_entries)
+        found.update(new_entries)
+
+        _writes_since_eviction += len(new_entries)
+        config = _cache_config()
+        if _writes_since_eviction >= int(config.get("evict_every_writes", 5000)):
+            _writes_since_eviction = 0
+            evicted = await evict_embedding_cache(int(config.get("document_cache_max_rows", 1_000_000)))
+            _document_stats["evicted"] += evicted
+            if evicted:
+                logger.info(f"Embedding cache: evicted {evicted} least recently used entries")
+
+    return [found[h] for h in hashes]
+
+
+def get_embedding_cache_stats() -> Dict[str, Any]:
+    lookups = _document_stats["hits"] + _document_stats["misses"]
+    return {
+        "query": get_query_cache().stats(),
+        "document": {
+            **_document_stats,
+            "hit_rate": round(_document_stats["hits"] / lookups, 4) if lookups else 0.0,
+        },
+    }
@@ -1,10 +1,14 @@
-from typing import Any, List, Optional
+from typing import Any, ClassVar, List, Optional
 import google.generativeai as genai
 from llama_index.core.embeddings import BaseEmbedding
 from llama_index.core.bridge.pydantic import PrivateAttr
 
 
 class CustomGeminiEmbedding(BaseEmbedding):
+    # Gemini embeds queries and documents asymmetrically
+    QUERY_TASK_TYPE: ClassVar[str] = "retrieval_query"
+    DOCUMENT_TASK_TYPE: ClassVar[str] = "retrieval_document"
+
     _model_name: str = PrivateAttr()
     _api_key: str = PrivateAttr()
 
@@ -20,8 +24,12 @@ class CustomGeminiEmbedding(BaseEmbedding):
         if api_key:
             genai.configure(api_key=api_key)
 
+    @property
+    def embedding_model_name(self) -> str:
+        return self._model_name
+
     def _get_query_embedding(self, query: str) -> List[float]:
-        return self._get_embedding(query)
+        return self._get_embedding(query, task_type=self.QUERY_TASK_TYPE)
 
     def _get_text_embedding(self, text: str) -> List[float]:
         return self._get_embedding(text)
@@ -35,10 +43,10 @@ class CustomGeminiEmbedding(BaseEmbedding):
     async def _aget_text_embedding(self, text: str) -> List[float]:
         return self._get_text_embedding(text)
 
-    def _get_embedding(self, text: str) -> List[float]:
+    def _get_embedding(self, text: str, task_type: str = DOCUMENT_TASK_TYPE) -> List[float]:
         result = genai.embed_content(
             model=self._model_name,
             content=text,
-            task_type="retrieval_document",
+            task_type=task_type,
         )
         return result["embedding"]
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import math
+import re
+import time
+from typing import Any, ClassVar, List
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.llms import CompletionResponse, CompletionResponseGen, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+# ==================================================================================
+# FAKE PROVIDER
+# Deterministic, offline stand-ins for the LLM, the embedding model and the VLM, used
+# by load tests and benchmarks (provider "fake", see providers.py):
+# - FakeLLM recognizes the service's prompts (rerank, HyDE, contextualization, RAG
+#   answer, small talk) and returns well-formed output for each: rerank JSON with a
+#   term-overlap score, the question itself as the standalone rewrite, an answer
+#   quoting the first retrieved line. The same prompt always gets the same text.
+# - HashingEmbedding is a feature-hashed bag of words (+ bigrams), L2-normalized, with
+#   the dimension of the documents.embedding column. Texts sharing words are close,
+#   so vector search behaves like a weak semantic retriever.
+# Latency is modelled as a fixed round trip (latency_ms) plus generation time at
+# tokens_per_second (0 = instant).
+# ==================================================================================
+EMBEDDING_DIM = 768
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _between(text: str, start: str, end: str) -> str:
+    if start not in text:
+        return ""
+    return text.split(start, 1)[1].split(end, 1)[0].strip()
+
+
+def fake_completion(prompt: str) -> str:
+    if "relevance ranking system" in prompt:
+        terms = set(_WORD_RE.findall(_between(prompt, "Query:", "\n").lower()))
+        document = set(_WORD_RE.findall(_between(prompt, "Document:", "\n\nTask:").lower()))
+        return json.dumps({"score": round(10 * len(terms & document) / max(1, len(terms)))})
+    if "formulate a standalone question" in prompt:
+        return _between(prompt, "Latest Question:", "\n\nStandalone Question:")
+    if "answers the following question" in prompt:
+        question = _between(prompt, "Question:", "\n\nPassage:")
+        return f"{question} The answer to this question is described in our policy."
+    if "<retrieved_context>" in prompt:
+        context = _between(prompt, "<retrieved_context>", "</retrieved_context>")
+        lines = [line for line in context.splitlines() if line.strip() and not line.startswith("Source:")]
+        if not lines:
+            return "I could not find that information."
+        return f"According to our information: {lines[0][:300]}"
+    if "does not require database retrieval" in prompt:
+        return "Hello! I am Veribot, the virtual assistant here to help you."
+    return "This is a deterministic test answer."
+
+
+def fake_image_description(image_bytes: bytes, filename: str) -> str:
+    return f"Image {filename} ({len(image_bytes)} bytes, sha256 {hashlib.sha256(image_bytes).hexdigest()[:12]})."
+
+
+def simulate_latency(latency_ms: float, tokens_per_second: float, text: str):
+    delay = latency_ms / 1000
+    if tokens_per_second > 0:
+        # ~4 characters per token, no tokenizer needed
+        delay += max(1, len(text) // 4) / tokens_per_second
+    if delay > 0:
+        time.sleep(delay)
+
+
+class FakeLLM(CustomLLM):
+    model_name: str = "fake"
+    latency_ms: float = 0.0
+    tokens_per_second: float = 0.0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name=self.model_name)
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        text = fake_completion(prompt)
+        simulate_latency(self.latency_ms, self.tokens_per_second, text)
+        return CompletionResponse(text=text)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        text = fake_completion(prompt)
+        simulate_latency(self.latency_ms, 0.0, "")
+        streamed = ""
+        for word in text.split(" "):
+            delta = word if not streamed else f" {word}"
+            simulate_latency(0.0, self.tokens_per_second, delta)
+            streamed += delta
+            yield CompletionResponse(text=streamed, delta=delta)
+
+
+def hashing_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    words = [word.lower() for word in _WORD_RE.findall(text)]
+    vector = [0.0] * dim
+    for feature in words + [f"{a}_{b}" for a, b in zip(words, words[1:])]:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        sign = 1.0 if digest[4] & 1 else -1.0
+        # Bigrams count half: word overlap dominates, word order breaks ties
+        vector[int.from_bytes(digest[:4], "little") % dim] += sign * (0.5 if "_" in feature else 1.0)
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class HashingEmbedding(BaseEmbedding):
+    QUERY_TASK_TYPE: ClassVar[str] = "retrieval_query"
+    DOCUMENT_TASK_TYPE: ClassVar[str] = "retrieval_document"
+
+    _latency_ms: float = PrivateAttr()
+
+    def __init__(self, latency_ms: float = 0.0, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._latency_ms = latency_ms
+
+    @property
+    def embedding_model_name(self) -> str:
+        return f"fake/hashing-{EMBEDDING_DIM}"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        simulate_latency(self._latency_ms, 0.0, "")
+        return hashing_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_query_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        # One round trip per batch, like the real API
+        simulate_latency(self._latency_ms, 0.0, "")
+        return [hashing_embedding(text) for text in texts]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embedding(text)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import re
+from typing import Optional
+from uuid import UUID
+
+from src.storage.repository import finish_fts_backfill, get_tenant_settings, update_fts_config_batch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FTS_CONFIG = "english"
+
+# Built-in Postgres text search configurations we allow tenants to use.
+SUPPORTED_FTS_CONFIGS = (
+    "simple",
+    "english",
+    "portuguese",
+    "spanish",
+    "french",
+    "german",
+    "italian",
+    "dutch",
+)
+
+# Free-text Tenant.preferred_languages tokens ("Portuguese, Spanish", "pt-BR", "es")
+# -> regconfig name.
+_LANGUAGE_ALIASES = {
+    "en": "english",
+    "english": "english",
+    "inglês": "english",
+    "ingles": "english",
+    "pt": "portuguese",
+    "pt-br": "portuguese",
+    "pt-pt": "portuguese",
+    "portuguese": "portuguese",
+    "português": "portuguese",
+    "portugues": "portuguese",
+    "es": "spanish",
+    "spanish": "spanish",
+    "español": "spanish",
+    "espanol": "spanish",
+    "espanhol": "spanish",
+    "fr": "french",
+    "french": "french",
+    "français": "french",
+    "de": "german",
+    "german": "german",
+    "deutsch": "german",
+    "it": "italian",
+    "italian": "italian",
+    "italiano": "italian",
+    "nl": "dutch",
+    "dutch": "dutch",
+}
+
+
+def fts_config_for_languages(preferred_languages: Optional[str]) -> Optional[str]:
+    """
+    Maps the tenant's preferred languages to a text search configuration.
+    A single tsvector can only be stemmed one way, so the first recognised language wins.
+    Returns None when nothing is recognised (caller falls back to the global default).
+    """
+    if not preferred_languages:
+        return None
+    for token in re.split(r"[,;/|]+|\s+", preferred_languages.lower()):
+        config = _LANGUAGE_ALIASES.get(token.strip(" .()"))
+        if config:
+            return config
+    return None
+
+
+def normalize_fts_config(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip().lower()
+    return value if value in SUPPORTED_FTS_CONFIGS else None
+
+
+# ==================================================================================
+# FTS BACKFILL
+# fts_vector is derived from fts_config by a trigger, so switching a tenant's language
+# only needs fts_config rewritten. Done in small committed batches, paged by primary
+# key, so ingestion and search keep running while it progresses. Chunks inserted
+# behind the cursor are already stemmed with the tenant's new config.
+# While Tenant.settings["fts_backfill"] is set, queries keep using its "from" config,
+# which most chunks are still indexed with; the marker is cleared once every chunk
+# has been re-stemmed, and queries switch over.
+# ==================================================================================
+def pending_fts_backfill(tenant_settings: dict) -> Optional[dict]:
+    pending = tenant_settings.get("fts_backfill")
+    return pending if isinstance(pending, dict) else None
+
+
+async def backfill_fts_config(
+    tenant_id: UUID, fts_config: str, batch_size: int = 1000, pause_seconds: float = 0.05
+) -> int:
+    if fts_config not in SUPPORTED_FTS_CONFIGS:
+        raise ValueError(f"Unsupported text search configuration '{fts_config}'")
+
+    logger.info(f"Backfilling fts_config='{fts_config}' for tenant {tenant_id}")
+    total, last_id = 0, None
+    while True:
+        pending = pending_fts_backfill(await get_tenant_settings(tenant_id)) or {}
+        if pending.get("to", fts_config) != fts_config:
+            # A newer language change started its own backfill; stop fighting over rows
+            logger.info(f"FTS backfill to '{fts_config}' for tenant {tenant_id} superseded by '{pending['to']}'")
+            return total
+
+        updated, last_id = await update_fts_config_batch(tenant_id, fts_config, batch_size, after_id=last_id)
+        total += updated
+        if last_id is None:
+            break
+        if updated:
+            logger.info(f"  {total} chunks re-indexed for tenant {tenant_id}")
+        # Give autovacuum and concurrent writers some room between batches
+        await asyncio.sleep(pause_seconds)
+
+    await finish_fts_backfill(tenant_id, fts_config)
+    logger.info(f"FTS backfill finished for tenant {tenant_id}: {total} chunks")
+    return total
@@ -1,5 +1,13 @@
+import asyncio
 import logging
+import re
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from src.config.config import get_config
 from src.services.llm_factory import get_llm
+from src.services.metrics import record_llm_usage
+from src.utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -9,10 +17,61 @@ from src.utils.prompts import HYDE_PROMPT_TEMPLATE
 def generate_hypothetical_answer(query: str, provider: str = None, model_name: str = None) -> str:
     try:
         llm = get_llm(step="rag_search", provider=provider, model_name=model_name)
-        response = llm.complete(HYDE_PROMPT_TEMPLATE.format(query=query))
+        prompt = HYDE_PROMPT_TEMPLATE.format(query=query)
+        response = llm.complete(prompt)
+        record_llm_usage("hyde", prompt, response)
         hypothetical = response.text.strip()
         logger.info(f"HyDE generated (rag_search): {hypothetical[:100]}...")
         return hypothetical
     except Exception as e:
         logger.error(f"HyDE generation failed: {e}")
         return query
+
+
+def _hyde_config() -> Dict[str, Any]:
+    return get_config().get("hyde_config", {})
+
+
+# ==================================================================================
+# HYDE CACHE
+# Passages keyed by (tenant, normalized query, provider, model). The same question asked
+# again ("what are your opening hours?") reuses the passage instead of paying for another
+# LLM call. Entries expire after `cache_ttl_seconds` so edited documents and prompt
+# changes are picked up.
+# ==================================================================================
+_cache: Optional[TTLCache] = None
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def get_hyde_cache() -> TTLCache:
+    global _cache
+    if _cache is None:
+        config = _hyde_config()
+        _cache = TTLCache(int(config.get("cache_max_entries", 2048)), float(config.get("cache_ttl_seconds", 3600)))
+    return _cache
+
+
+def normalize_query(query: str) -> str:
+    return _WHITESPACE_RE.sub(" ", query).strip().lower().rstrip("?!. ")
+
+
+async def get_hypothetical_answer(
+    tenant_id: UUID, query: str, provider: str = None, model_name: str = None
+) -> Optional[str]:
+    """Cached, non-blocking HyDE passage. None when generation failed (nothing is cached)."""
+    key = (str(tenant_id), normalize_query(query), provider, model_name)
+    cache = get_hyde_cache()
+    passage = cache.get(key)
+    if passage is not None:
+        logger.info("HyDE cache hit")
+        return passage
+
+    passage = await asyncio.to_thread(generate_hypothetical_answer, query, provider, model_name)
+    if not passage or passage == query:
+        return None
+    cache.put(key, passage)
+    return passage
+
+
+def get_hyde_deadline_seconds() -> float:
+    return float(_hyde_config().get("deadline_ms", 1500)) / 1000
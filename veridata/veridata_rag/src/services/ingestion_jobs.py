@@ -0,0 +1,524 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import socket
+import tarfile
+import uuid
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import UploadFile
+from PIL import UnidentifiedImageError
+
+from src.services.chunking import iter_chunk_batches, iter_document_chunks, iter_text_file
+from src.services.config_service import get_tenant_chunking_settings, get_tenant_retrieval_settings
+from src.services.embedding_cache import embed_documents
+from src.services.metrics import timed_stage
+from src.services.rag import (
+    IMAGE_EXTENSIONS,
+    TEXT_EXTENSIONS,
+    build_document_metadata,
+    is_image_file,
+    parse_document,
+)
+from src.services.tracing import start_span
+from src.storage.repository import (
+    claim_ingestion_job,
+    create_ingestion_job,
+    create_ingestion_jobs,
+    delete_job_embeddings,
+    ensure_tenant_partition,
+    get_document_chunk_hashes,
+    get_job_embeddings,
+    get_latest_file_uploads,
+    mark_source_document_failed,
+    mark_source_document_pending,
+    replace_document_chunks,
+    store_job_embeddings,
+    update_ingestion_job,
+)
+
+logger = logging.getLogger(__name__)
+
+# Uploads are spooled here until their job completes. Must be shared by every worker
+# process (a volume in docker-compose) for jobs to survive restarts.
+SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", "/app/data/ingest_spool")
+WORKER_COUNT = int(os.getenv("INGEST_WORKERS", "4"))
+# Leaves workers free for other tenants while one tenant runs a bulk sync
+MAX_RUNNING_PER_TENANT = int(os.getenv("INGEST_MAX_JOBS_PER_TENANT", "3"))
+
+EMBED_BATCH_SIZE = 64
+BATCH_RETRIES = 3
+MAX_ATTEMPTS = 3
+HEARTBEAT_SECONDS = 15
+STALE_AFTER_SECONDS = 120
+POLL_SECONDS = 2.0
+UPLOAD_READ_SIZE = 1024 * 1024
+# Bulk limits (archives are expanded member by member straight into the spool)
+BULK_MAX_FILES = int(os.getenv("INGEST_BULK_MAX_FILES", "5000"))
+BULK_MAX_BYTES = int(os.getenv("INGEST_BULK_MAX_BYTES", str(2 * 1024 ** 3)))
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+
+TERMINAL_STATUSES = ("completed", "failed")
+# Bad input: retrying cannot help. ValueError covers UnicodeDecodeError and validation
+# errors. Other OSErrors (ConnectionError, TimeoutError) are transient and retried.
+PERMANENT_ERRORS = (ValueError, FileNotFoundError, IsADirectoryError, NotADirectoryError, UnidentifiedImageError)
+
+
+# ==================================================================================
+# ENQUEUE
+# Uploads are copied to the spool in fixed-size reads (hashing as they go), then a
+# job row is created. From here on the request is done; workers pick the job up.
+# ==================================================================================
+@dataclass
+class SpooledFile:
+    filename: str
+    spool_path: str
+    file_hash: str
+    size: int
+    metadata: Optional[Dict[str, Any]] = None
+
+
+def _new_spool_path(filename: str) -> str:
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    return os.path.join(SPOOL_DIR, f"{uuid.uuid4().hex}{os.path.splitext(filename)[1].lower()}")
+
+
+def is_supported_file(filename: str) -> bool:
+    return filename.lower().endswith(TEXT_EXTENSIONS + IMAGE_EXTENSIONS)
+
+
+def spool_stream(filename: str, stream: BinaryIO) -> SpooledFile:
+    spool_path = _new_spool_path(filename)
+    digest = hashlib.sha256()
+    size = 0
+    with open(spool_path, "wb") as f:
+        while block := stream.read(UPLOAD_READ_SIZE):
+            digest.update(block)
+            size += len(block)
+            f.write(block)
+    return SpooledFile(filename, spool_path, digest.hexdigest(), size)
+
+
+async def spool_upload(upload: UploadFile) -> SpooledFile:
+    spool_path = _new_spool_path(upload.filename)
+    digest = hashlib.sha256()
+    size = 0
+    with open(spool_path, "wb") as f:
+        while block := await upload.read(UPLOAD_READ_SIZE):
+            digest.update(block)
+            size += len(block)
+            f.write(block)
+    return SpooledFile(upload.filename, spool_path, digest.hexdigest(), size)
+
+
+def spool_text(filename: str, content: str) -> SpooledFile:
+    return spool_stream(filename, io.BytesIO(content.encode("utf-8")))
+
+
+async def enqueue_ingestion(tenant_id: UUID, upload: UploadFile, metadata: Optional[Dict[str, Any]] = None) -> UUID:
+    spooled = await spool_upload(upload)
+    job_id = await create_ingestion_job(
+        tenant_id, spooled.filename, spooled.spool_path, spooled.file_hash, metadata=metadata
+    )
+    logger.info(f"Queued ingestion job {job_id} for {upload.filename} (tenant {tenant_id})")
+    return job_id
+
+
+# ==================================================================================
+# BULK ENQUEUE
+# Many documents (or tar/zip archives of them) in one request:
+# 1. Spool every supported file; archives are expanded member by member. Plain files,
+#    text documents and archive members all count against one files / bytes budget.
+# 2. Dedupe: the same filename twice in the request -> last one wins; a file whose
+#    hash and metadata equal the latest upload of that filename -> skipped as unchanged.
+# 3. Queue the rest as one batch. The worker pool (and its per-tenant cap) bounds
+#    how many of them are processed at once.
+# ==================================================================================
+def _archive_member_name(name: str) -> str:
+    return os.path.normpath(name).lstrip("./\\")[:255]
+
+
+def _charge(budget: List[int], size: int):
+    """Counts one file of `size` bytes against `budget` ([files left, bytes left]), shared across the request."""
+    if budget[0] <= 0 or size > budget[1]:
+        raise ValueError(f"Bulk upload exceeds {BULK_MAX_FILES} files / {BULK_MAX_BYTES} bytes")
+    budget[0] -= 1
+    budget[1] -= size
+
+
+def expand_archive(filename: str, stream: BinaryIO, budget: List[int]) -> Tuple[List[SpooledFile], List[str]]:
+    """Spools supported archive members, charging each against `budget` (see _charge)."""
+    spooled, rejected = [], []
+
+    def accept(name: str, size: int) -> bool:
+        basename = os.path.basename(name)
+        if not basename or basename.startswith(".") or not is_supported_file(name):
+            rejected.append(f"{filename}:{name}")
+            return False
+        _charge(budget, size)
+        return True
+
+    try:
+        if filename.lower().endswith(".zip"):
+            with zipfile.ZipFile(stream) as archive:
+                for member in archive.infolist():
+                    if member.is_dir() or not accept(member.filename, member.file_size):
+                        continue
+                    with archive.open(member) as member_stream:
+                        spooled.append(spool_stream(_archive_member_name(member.filename), member_stream))
+        else:
+            with tarfile.open(fileobj=stream, mode="r:*") as archive:
+                for member in archive:
+                    if not member.isfile() or not accept(member.name, member.size):
+                        continue
+                    member_stream = archive.extractfile(member)
+                    spooled.append(spool_stream(_archive_member_name(member.name), member_stream))
+    except Exception:
+        # The caller never sees these files, so it cannot clean them up
+        for file in spooled:
+            _remove_spool(file.spool_path)
+        raise
+    return spooled, rejected
+
+
+async def enqueue_bulk(
+    tenant_id: UUID,
+    documents: List[Tuple[str, str, Optional[Dict[str, Any]]]] = (),
+    uploads: List[UploadFile] = (),
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Spools, dedupes and queues a batch. `documents` are (filename, text, metadata) triples;
+    `metadata` applies to every file (per-document keys win).
+    """
+    spooled: List[SpooledFile] = []
+    rejected: List[str] = []
+    budget = [BULK_MAX_FILES, BULK_MAX_BYTES]
+
+    if len(documents) + len(uploads) > BULK_MAX_FILES:
+        raise ValueError(f"Bulk upload exceeds {BULK_MAX_FILES} files")
+
+    try:
+        for filename, content, document_metadata in documents:
+            if not is_supported_file(filename):
+                rejected.append(filename)
+                continue
+            _charge(budget, len(content.encode("utf-8")))
+            file = await asyncio.to_thread(spool_text, filename, content)
+            file.metadata = document_metadata
+            spooled.append(file)
+
+        for upload in uploads:
+            if upload.filename.lower().endswith(ARCHIVE_EXTENSIONS):
+                members, member_rejects = await asyncio.to_thread(expand_archive, upload.filename, upload.file, budget)
+                spooled.extend(members)
+                rejected.extend(member_rejects)
+            elif is_supported_file(upload.filename):
+                # Size is only known once spooled; appended first so a rejection cleans it up
+                file = await spool_upload(upload)
+                spooled.append(file)
+                _charge(budget, file.size)
+            else:
+                rejected.append(upload.filename)
+    except Exception:
+        for file in spooled:
+            _remove_spool(file.spool_path)
+        raise
+
+    # Same filename twice in one request: the last occurrence wins
+    latest: Dict[str, SpooledFile] = {}
+    duplicates = []
+    for file in spooled:
+        if file.filename in latest:
+            duplicates.append(file.filename)
+            _remove_spool(latest[file.filename].spool_path)
+        latest[file.filename] = file
+
+    for file in latest.values():
+        file.metadata = {**(metadata or {}), **(file.metadata or {})}
+
+    previous = await get_latest_file_uploads(tenant_id, list(latest))
+    to_queue, unchanged = [], []
+    for file in latest.values():
+        upload = previous.get(file.filename)
+        if upload and upload["file_hash"] == file.file_hash and upload["metadata"] == file.metadata:
+            unchanged.append(file.filename)
+            _remove_spool(file.spool_path)
+        else:
+            to_queue.append(file)
+
+    batch_id = None
+    if to_queue:
+        batch_id = uuid.uuid4()
+        await create_ingestion_jobs(
+            tenant_id,
+            [
+                {"filename": f.filename, "spool_path": f.spool_path, "file_hash": f.file_hash, "metadata": f.metadata}
+                for f in to_queue
+            ],
+            batch_id,
+        )
+    logger.info(
+        f"Bulk ingest for tenant {tenant_id}: {len(to_queue)} queued (batch {batch_id}), "
+        f"{len(unchanged)} unchanged, {len(duplicates)} duplicates, {len(rejected)} rejected"
+    )
+    return {
+        "batch_id": batch_id,
+        "queued": [f.filename for f in to_queue],
+        "unchanged": unchanged,
+        "duplicates": duplicates,
+        "rejected": rejected,
+    }
+
+
+# ==================================================================================
+# PIPELINE
+# parse -> chunk -> embed -> insert, streamed in batches so memory does not grow with
+# the file size:
+# - embed pass: the spooled file is decoded and chunked incrementally (in a thread,
+#   prefetching at most PREFETCH_BATCHES ahead); new chunks are embedded per batch.
+#   Each finished batch is staged in ingestion_job_embeddings before it advances
+#   `completed_batches`, so a retried or reclaimed job skips work already done.
+# - insert pass: the file is chunked again (deterministic) and fed batch by batch into
+#   the atomic version swap; embeddings are read back from the staging table, so the
+#   transaction never waits on the embedding API.
+# ==================================================================================
+PREFETCH_BATCHES = 2
+_DONE = object()
+
+
+async def _prefetch(batches: Iterator, maxsize: int = PREFETCH_BATCHES) -> AsyncIterator:
+    """Runs a blocking batch generator in a thread, keeping at most `maxsize` batches ahead."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def produce():
+        try:
+            while True:
+                item = await asyncio.to_thread(next, batches, _DONE)
+                await queue.put(item)
+                if item is _DONE:
+                    return
+        except Exception as e:
+            await queue.put(e)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        producer.cancel()
+
+
+def _chunk_batches(job: Dict[str, Any], content: Optional[str], settings: Dict[str, Any]) -> Iterator:
+    if content is not None:
+        # Image descriptions: small, already in memory
+        segments = [(content, job["total_bytes"])]
+        original_type = "image"
+    else:
+        segments = iter_text_file(job["spool_path"])
+        original_type = "text"
+    chunks = iter_document_chunks(job["tenant_id"], job["filename"], segments, original_type, settings)
+    return iter_chunk_batches(chunks, EMBED_BATCH_SIZE)
+
+
+async def _embed_batch(texts: List[str]) -> List[List[float]]:
+    for attempt in range(1, BATCH_RETRIES + 1):
+        try:
+            return await embed_documents(texts)
+        except Exception as e:
+            if attempt == BATCH_RETRIES:
+                raise
+            delay = 2 ** attempt
+            logger.warning(f"Embedding batch failed (attempt {attempt}/{BATCH_RETRIES}), retrying in {delay}s: {e}")
+            await asyncio.sleep(delay)
+
+
+async def _heartbeat(job_id: UUID):
+    # Keeps the claim alive during long single steps (VLM call, big chunking)
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        try:
+            await update_ingestion_job(job_id)
+        except Exception as e:
+            logger.warning(f"Heartbeat failed for job {job_id}: {e}")
+
+
+async def run_ingestion_job(job: Dict[str, Any]):
+    job_id, tenant_id, filename = job["id"], job["tenant_id"], job["filename"]
+    logger.info(f"Running ingestion job {job_id} ({filename}), attempt {job['attempts']}")
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+
+    try:
+        await ensure_tenant_partition(tenant_id)
+        await mark_source_document_pending(tenant_id, filename)
+        job["total_bytes"] = os.path.getsize(job["spool_path"])
+
+        # 1. Parse (text is decoded lazily by the chunk stream)
+        await update_ingestion_job(job_id, stage="parse", total_bytes=job["total_bytes"])
+        content = None
+        if is_image_file(filename):
+            with timed_stage("parse", pipeline="ingest_job"):
+                file_bytes = await asyncio.to_thread(_read_bytes, job["spool_path"])
+                content = await parse_document(filename, file_bytes=file_bytes)
+            if not content:
+                raise ValueError("No content to ingest")
+
+        stored_hashes = await get_document_chunk_hashes(tenant_id, filename)
+        # Resolved once: both passes must produce the same chunks
+        chunking_settings = await get_tenant_chunking_settings(tenant_id)
+
+        # 2-3. Chunk + embed, checkpointing per batch
+        await update_ingestion_job(job_id, stage="embed")
+        resume_from = job["completed_batches"]
+        if resume_from:
+            logger.info(f"Job {job_id}: resuming after batch {resume_from}")
+        total_chunks = new_chunks = batch_count = 0
+        with timed_stage("embed", pipeline="ingest_job"):
+            async for batch, bytes_read in _prefetch(_chunk_batches(job, content, chunking_settings)):
+                batch_count += 1
+                total_chunks += len(batch)
+                new = [(h, chunk) for h, chunk in batch if h not in stored_hashes]
+                new_chunks += len(new)
+                if batch_count > resume_from:
+                    if new:
+                        embeddings = await _embed_batch([chunk for _, chunk in new])
+                        await store_job_embeddings(job_id, dict(zip([h for h, _ in new], embeddings)))
+                    await update_ingestion_job(
+                        job_id, completed_batches=batch_count, total_chunks=total_chunks, processed_bytes=bytes_read
+                    )
+        if not total_chunks:
+            raise ValueError("No content to ingest")
+        logger.info(f"{filename}: {total_chunks - new_chunks} unchanged chunks, {new_chunks} embedded")
+
+        # 4. Insert (single transaction, streamed; embeddings come back from staging)
+        await update_ingestion_job(
+            job_id, stage="insert", total_chunks=total_chunks, total_batches=batch_count,
+            processed_bytes=job["total_bytes"],
+        )
+
+        async def insert_batches():
+            async for batch, _ in _prefetch(_chunk_batches(job, content, chunking_settings)):
+                new = {h for h, _ in batch if h not in stored_hashes}
+                embeddings = await get_job_embeddings(job_id, new)
+                if len(embeddings) < len(new):
+                    # Staging lost (e.g. checkpointed before the table existed): re-embed on retry
+                    await update_ingestion_job(job_id, completed_batches=0)
+                    raise RuntimeError(f"{len(new) - len(embeddings)} staged embeddings missing")
+                yield [
+                    {"content_hash": h, "content": chunk, "embedding": embeddings.get(h)}
+                    for h, chunk in batch
+                ]
+
+        retrieval_settings = await get_tenant_retrieval_settings(tenant_id)
+        with timed_stage("insert", pipeline="ingest_job"):
+            result = await replace_document_chunks(
+                tenant_id,
+                filename,
+                insert_batches(),
+                fts_config=retrieval_settings["fts_config"],
+                file_hash=job.get("file_hash"),
+                size_bytes=job["total_bytes"],
+                metadata=build_document_metadata(filename, job.get("metadata")),
+            )
+        if result is None:
+            raise RuntimeError("Failed to store chunks")
+
+        await update_ingestion_job(
+            job_id, status="completed", stage="done", result=result, error=None,
+            finished_at=datetime.now(timezone.utc),
+        )
+        _remove_spool(job["spool_path"])
+        await _clear_staged_embeddings(job_id)
+        logger.info(f"Ingestion job {job_id} completed: {result}")
+
+    except Exception as e:
+        retry = job["attempts"] < MAX_ATTEMPTS and not isinstance(e, PERMANENT_ERRORS)
+        logger.error(f"Ingestion job {job_id} failed ({'will retry' if retry else 'giving up'}): {e}")
+        if retry:
+            await update_ingestion_job(job_id, status="queued", error=str(e))
+        else:
+            await update_ingestion_job(
+                job_id, status="failed", error=str(e), finished_at=datetime.now(timezone.utc)
+            )
+            await mark_source_document_failed(tenant_id, filename)
+            _remove_spool(job["spool_path"])
+            await _clear_staged_embeddings(job_id)
+    finally:
+        heartbeat.cancel()
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def _clear_staged_embeddings(job_id: UUID):
+    try:
+        await delete_job_embeddings(job_id)
+    except Exception as e:
+        # Removed with the job row at the latest (ON DELETE CASCADE)
+        logger.warning(f"Could not remove staged embeddings of job {job_id}: {e}")
+
+
+def _remove_spool(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove spooled upload {path}: {e}")
+
+
+# ==================================================================================
+# WORKER POOL
+# Started from the app lifespan. Each worker polls for a job, runs it, repeats.
+# ==================================================================================
+_workers: List[asyncio.Task] = []
+
+
+async def _worker_loop(worker_id: str):
+    logger.info(f"Ingestion worker {worker_id} started")
+    while True:
+        try:
+            job = await claim_ingestion_job(worker_id, STALE_AFTER_SECONDS, MAX_ATTEMPTS, MAX_RUNNING_PER_TENANT)
+        except Exception as e:
+            logger.error(f"Ingestion worker {worker_id} could not claim a job: {e}")
+            job = None
+
+        if job is None:
+            await asyncio.sleep(POLL_SECONDS)
+            continue
+        # Jobs outlive the upload request: each run is its own trace
+        attributes = {"ingest.job_id": str(job["id"]), "ingest.filename": job["filename"]}
+        try:
+            with start_span("ingest.job", attributes=attributes):
+                await run_ingestion_job(job)
+        except Exception as e:
+            # e.g. the DB went away while recording the failure: the job is picked up
+            # again once its heartbeat is stale, this worker keeps going
+            logger.error(f"Ingestion worker {worker_id} failed on job {job['id']}: {e}")
+
+
+def start_ingestion_workers(count: Optional[int] = None):
+    count = WORKER_COUNT if count is None else count
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    for index in range(count):
+        _workers.append(asyncio.create_task(_worker_loop(f"{prefix}-{index}")))
+
+
+async def stop_ingestion_workers():
+    # Cancelled jobs stay 'running' and are reclaimed from their checkpoint once stale
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
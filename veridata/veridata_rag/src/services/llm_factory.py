@@ -1,18 +1,31 @@
-import os
 import logging
-from typing import Any
-from llama_index.llms.gemini import Gemini
+from typing import Any, Optional
 
 from src.config.config import get_llm_settings
+from src.services.llm_gateway import GatewayLLM
+from src.services.providers import LLM_PROVIDERS, get_provider_override, require_provider
 
 logger = logging.getLogger(__name__)
 
 _llm_instances = {}
+_gateways = {}
+
+
+def _get_client(provider: str, model_name: Optional[str]) -> Any:
+    instance_key = f"{provider}:{model_name}"
+    if instance_key not in _llm_instances:
+        logger.info(f"Initializing LLM (Provider: {provider}, Model: {model_name})")
+        _llm_instances[instance_key] = LLM_PROVIDERS[provider](model_name)
+    return _llm_instances[instance_key]
 
 
 def get_llm(step: str = "generation", provider: str = None, model_name: str = None) -> Any:
     settings = {}
-    if provider:
+    override = get_provider_override()
+    if override:
+        # Model names belong to the configured provider
+        settings, model_name = {"provider": override, "model": None}, None
+    elif provider:
         settings = {"provider": provider.lower(), "model": None}
     else:
         settings = get_llm_settings(step)
@@ -23,31 +36,15 @@ def get_llm(step: str = "generation", provider: str = None, model_name: str = No
     configured_model = settings.get("model")
     final_model_name = model_name or configured_model
 
-    instance_key = f"{provider}:{final_model_name}"
-
-    if instance_key in _llm_instances:
-        return _llm_instances[instance_key]
-
-    logger.info(
-        f"Initializing LLM for step '{step}' (Provider: {provider}, Model: {final_model_name})"
-    )
-
-    llm = None
-
-    if provider == "gemini" or True:
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not set.")
-        final_model_name = final_model_name or os.getenv("GEMINI_MODEL", "models/gemini-2.0-flash")
-        llm = Gemini(model=final_model_name, api_key=api_key)
-
-    else:
-        # Should be unreachable due to 'or True' above, but good for safety
-        logger.warning(f"Unknown provider '{provider}'. Defaulting to Gemini.")
-        return get_llm(step=step, provider="gemini")
+    require_provider(LLM_PROVIDERS, provider, "LLM")
 
-    _llm_instances[instance_key] = llm
-    return llm
+    # Rate limits, retries and fallback models (see llm_gateway.py); clients are shared
+    gateway_key = (step, provider, final_model_name)
+    if gateway_key not in _gateways:
+        _gateways[gateway_key] = GatewayLLM(
+            step, provider, final_model_name, lambda name, provider=provider: _get_client(provider, name)
+        )
+    return _gateways[gateway_key]
 
 
 def get_hyde_llm() -> Any:
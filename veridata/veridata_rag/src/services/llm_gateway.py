@@ -0,0 +1,329 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+import urllib.error
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from src.config.config import get_config
+from src.services.metrics import (
+    LLM_CIRCUIT_OPENED,
+    LLM_FALLBACKS,
+    LLM_QUEUE_SECONDS,
+    LLM_REJECTED,
+    LLM_RETRIES,
+)
+from src.services.tracing import start_span
+from src.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+# ==================================================================================
+# LLM GATEWAY
+# get_llm() hands out a GatewayLLM instead of the raw client. Every complete() call:
+# 1. Waits for capacity in token buckets: requests/min for the calling tenant (shared
+#    by all its models) and requests/min + prompt tokens/min per model. The wait is
+#    the queue time (rag_llm_queue_seconds). The tenant budget is charged once per
+#    call, before any model is tried. A call that would wait longer than its step's
+#    max_queue_seconds does not queue at all: on a model's limits it moves to the
+#    fallback model, on the tenant's own budget it fails.
+# 2. Calls the model, retrying 429 / 5xx / timeouts with exponential backoff and full
+#    jitter. Other errors (bad request, auth) are raised immediately.
+# 3. Feeds a circuit breaker per model. After failure_threshold calls in a row have
+#    failed, calls skip the model for open_seconds and go to the fallback. After
+#    that, a single probe call decides whether the model is back.
+# fallback_models maps a model to a cheaper one from the same provider; chains are
+# followed. When no candidate is left, LLMUnavailableError is raised. The callers
+# already degrade on errors: HyDE falls back to the raw query, rerank keeps the
+# first-stage order, generation answers with an apology.
+# Limits live in config.json "llm_gateway" and are read when a bucket is first used.
+# ==================================================================================
+class LLMUnavailableError(RuntimeError):
+    pass
+
+
+def _gateway_config() -> Dict[str, Any]:
+    return get_config().get("llm_gateway", {})
+
+
+class TokenBucket:
+    """Thread-safe token bucket. Callers reserve capacity and sleep for the returned wait."""
+
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: float, max_wait: float) -> Optional[float]:
+        """Takes cost tokens; returns the seconds to wait first, or None if that exceeds max_wait."""
+        cost = min(cost, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0.0, (cost - self.tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            # May go negative: the deficit is the queue of callers already waiting
+            self.tokens -= cost
+            return wait
+
+    def refund(self, cost: float):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + min(cost, self.capacity))
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, open_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.open_seconds else "half_open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release_probe(self):
+        """A probe that never reached the model: let the next call probe instead."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Returns True when this failure opens the circuit."""
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                was_open = self.opened_at is not None
+                self.opened_at = time.monotonic()
+                self._probing = False
+                return not was_open
+            return False
+
+
+# --- Shared state (per process) ---
+
+_state_lock = threading.Lock()
+_model_buckets: Dict[str, Tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+_tenant_buckets: Dict[str, Optional[TokenBucket]] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+
+_current_tenant: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_tenant", default=None)
+
+
+def set_llm_tenant(tenant_id: Optional[UUID]):
+    """LLM calls made by the current request (and threads it starts) count against this tenant."""
+    _current_tenant.set(str(tenant_id) if tenant_id else None)
+
+
+def _limits(section: str, key: str) -> Dict[str, Any]:
+    limits = _gateway_config().get(section, {})
+    return {**limits.get("default", {}), **limits.get(key, {})}
+
+
+def _bucket(per_minute: Any) -> Optional[TokenBucket]:
+    per_minute = float(per_minute or 0)
+    if per_minute <= 0:
+        return None
+    return TokenBucket(per_minute, float(_gateway_config().get("burst_seconds", 10)))
+
+
+def _model_limits(model_key: str, model_name: Optional[str]) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+    with _state_lock:
+        if model_key not in _model_buckets:
+            limits = _limits("model_limits", model_name or "")
+            _model_buckets[model_key] = (
+                _bucket(limits.get("requests_per_minute")),
+                _bucket(limits.get("tokens_per_minute")),
+            )
+        return _model_buckets[model_key]
+
+
+def _tenant_limit(tenant_id: str) -> Optional[TokenBucket]:
+    with _state_lock:
+        if tenant_id not in _tenant_buckets:
+            _tenant_buckets[tenant_id] = _bucket(_limits("tenant_limits", tenant_id).get("requests_per_minute"))
+        return _tenant_buckets[tenant_id]
+
+
+def _breaker(model_key: str) -> CircuitBreaker:
+    with _state_lock:
+        if model_key not in _breakers:
+            config = _gateway_config().get("circuit_breaker", {})
+            _breakers[model_key] = CircuitBreaker(
+                int(config.get("failure_threshold", 5)), float(config.get("open_seconds", 30))
+            )
+        return _breakers[model_key]
+
+
+_RETRYABLE_MARKERS = (
+    "429",
+    "resource exhausted",
+    "resource_exhausted",
+    "rate limit",
+    "quota",
+    "503",
+    "unavailable",
+    "deadline exceeded",
+    "timed out",
+)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """429, 5xx, timeouts and dropped connections; not bad requests or auth errors."""
+    code = getattr(error, "code", None)
+    if not isinstance(code, int):
+        code = getattr(error, "status_code", None)
+    if isinstance(code, int) and 100 <= code < 600:
+        return code in (408, 429) or code >= 500
+    if isinstance(error, (TimeoutError, ConnectionError, urllib.error.URLError)):
+        return True
+    # SDK errors without a status code (Gemini wraps some in generic exceptions)
+    message = str(error).lower()
+    return any(marker in message for marker in _RETRYABLE_MARKERS)
+
+
+class GatewayLLM:
+    """Drop-in for a LlamaIndex LLM (complete(); other attributes go to the primary client)."""
+
+    def __init__(self, step: str, provider: str, model_name: Optional[str], client_for: Callable[[Optional[str]], Any]):
+        self.step = step
+        self.provider = provider
+        self.model_name = model_name
+        self._client_for = client_for
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client_for(self.model_name), name)
+
+    def _candidates(self) -> List[Optional[str]]:
+        fallbacks = _gateway_config().get("fallback_models", {})
+        models, model = [self.model_name], self.model_name
+        while model in fallbacks and fallbacks[model] not in models:
+            model = fallbacks[model]
+            models.append(model)
+        return models
+
+    def _max_queue_seconds(self) -> float:
+        limits = _gateway_config().get("max_queue_seconds", {})
+        return float(limits.get(self.step, limits.get("default", 15)))
+
+    def _reserve_tenant(self) -> Tuple[Optional[TokenBucket], float]:
+        """One request from the tenant's budget per complete() call, however many models it tries."""
+        tenant_id = _current_tenant.get()
+        bucket = _tenant_limit(tenant_id) if tenant_id else None
+        if bucket is None:
+            return None, 0.0
+        wait = bucket.reserve(1, self._max_queue_seconds())
+        if wait is None:
+            LLM_REJECTED.inc(model=f"{self.provider}:{self.model_name}", reason="tenant_rate_limited")
+            raise LLMUnavailableError(f"Tenant LLM budget exhausted for step '{self.step}'")
+        return bucket, wait
+
+    def _acquire(self, model_key: str, model_name: Optional[str], prompt_tokens: int) -> Optional[float]:
+        """Reserves model capacity; returns the wait, or None if it would exceed the step's budget."""
+        max_wait = self._max_queue_seconds()
+        taken, wait = [], 0.0
+        for bucket, cost in zip(_model_limits(model_key, model_name), (1, prompt_tokens)):
+            if bucket is None:
+                continue
+            bucket_wait = bucket.reserve(cost, max_wait)
+            if bucket_wait is None:
+                for taken_bucket, taken_cost in taken:
+                    taken_bucket.refund(taken_cost)
+                return None
+            taken.append((bucket, cost))
+            wait = max(wait, bucket_wait)
+        return wait
+
+    def _call_with_retries(self, client: Any, model_key: str, prompt: str, **kwargs: Any) -> Any:
+        retry = _gateway_config().get("retry", {})
+        attempts = max(1, int(retry.get("max_attempts", 3)))
+        base_delay = float(retry.get("base_delay_seconds", 0.5))
+        max_delay = float(retry.get("max_delay_seconds", 8))
+        for attempt in range(attempts):
+            try:
+                return client.complete(prompt, **kwargs)
+            except Exception as e:
+                if not is_retryable(e) or attempt == attempts - 1:
+                    raise
+                delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+                LLM_RETRIES.inc(model=model_key)
+                logger.warning(f"LLM {model_key} failed ({e}); retry {attempt + 1}/{attempts - 1} in {delay:.2f}s")
+                time.sleep(delay)
+
+    def complete(self, prompt: str, **kwargs: Any) -> Any:
+        prompt_tokens = count_tokens(prompt)
+        tenant_bucket, tenant_wait = self._reserve_tenant()
+        called = False
+        last_error: Optional[BaseException] = None
+        for i, model_name in enumerate(self._candidates()):
+            model_key = f"{self.provider}:{model_name}"
+            if i > 0:
+                LLM_FALLBACKS.inc(model=f"{self.provider}:{self.model_name}")
+                logger.warning(f"LLM step '{self.step}' falling back to {model_key}")
+
+            breaker = _breaker(model_key)
+            if not breaker.allow():
+                LLM_REJECTED.inc(model=model_key, reason="circuit_open")
+                continue
+            model_wait = self._acquire(model_key, model_name, prompt_tokens)
+            if model_wait is None:
+                LLM_REJECTED.inc(model=model_key, reason="rate_limited")
+                breaker.release_probe()
+                continue
+
+            # The tenant's wait overlaps the first model's; later candidates only wait for their own limits
+            wait, tenant_wait = max(model_wait, tenant_wait), 0.0
+            LLM_QUEUE_SECONDS.observe(wait, model=model_key)
+            if wait > 0:
+                time.sleep(wait)
+
+            called = True
+            with start_span(f"llm {model_key}", kind="client", attributes={"llm.step": self.step}):
+                try:
+                    response = self._call_with_retries(self._client_for(model_name), model_key, prompt, **kwargs)
+                except Exception as e:
+                    if not is_retryable(e):
+                        breaker.release_probe()
+                        raise
+                    last_error = e
+                    LLM_REJECTED.inc(model=model_key, reason="failed")
+                    if breaker.record_failure():
+                        LLM_CIRCUIT_OPENED.inc(model=model_key)
+                        logger.error(f"Circuit opened for {model_key} after repeated failures: {e}")
+                    continue
+            breaker.record_success()
+            return response
+
+        if tenant_bucket is not None and not called:
+            # No model was reached: the call did not use the tenant's quota
+            tenant_bucket.refund(1)
+        raise LLMUnavailableError(
+            f"No LLM available for step '{self.step}' ({self.provider}:{self.model_name})"
+            + (f": {last_error}" if last_error else "")
+        )
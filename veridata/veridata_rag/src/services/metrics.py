@@ -0,0 +1,268 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.services.tracing import current_span, start_span
+from src.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+# ==================================================================================
+# METRICS
+# In-process counters and histograms, rendered in the Prometheus text format on
+# GET /metrics (no client library: a handful of metrics, one process per container).
+# - timed_stage(): wraps one stage of the query or ingestion pipeline and records its
+#   duration in rag_stage_duration_seconds{pipeline, stage} (errors are counted too)
+# - track_operation(): wraps a whole request (query); while it is active the
+#   stages and LLM token usage of that request are also collected in a RequestTrace,
+#   returned to API callers that ask for it (QueryRequest.debug)
+# - record_llm_usage(): tokens per LLM step, as reported by the provider when the
+#   response carries usage, otherwise counted with the local tokenizer
+# Updates take a lock: stages also finish in worker threads (rerank, HyDE).
+# Operations and stages are also spans (rag.<operation>, <pipeline>.<stage>) on the
+# request's trace, see tracing.py.
+# ==================================================================================
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_label_text(self.labels, key)} {_number(value)}" for key, value in sorted(values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            series = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = {key: list(series) for key, series in self._values.items()}
+        lines = []
+        for key, series in sorted(values.items()):
+            bounds = [f'le="{bound}"' for bound in self.buckets] + ['le="+Inf"']
+            for bound, count in zip(bounds, series):
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, bound)} {_number(count)}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {_number(series[-2])}")
+        return lines
+
+
+_REGISTRY: Dict[str, Any] = {}
+
+
+def _register(metric):
+    _REGISTRY[metric.name] = metric
+    return metric
+
+
+OPERATION_SECONDS = _register(
+    Histogram("rag_operation_duration_seconds", "End-to-end duration of a query.", ("operation",))
+)
+OPERATIONS = _register(Counter("rag_operations_total", "Queries by outcome.", ("operation", "outcome")))
+STAGE_SECONDS = _register(
+    Histogram("rag_stage_duration_seconds", "Duration of one pipeline stage.", ("pipeline", "stage"))
+)
+STAGE_ERRORS = _register(Counter("rag_stage_errors_total", "Pipeline stages that raised.", ("pipeline", "stage")))
+LLM_CALLS = _register(Counter("rag_llm_calls_total", "LLM completions per step.", ("step",)))
+LLM_TOKENS = _register(
+    Counter("rag_llm_tokens_total", "LLM tokens per step; kind is prompt or completion.", ("step", "kind"))
+)
+LLM_QUEUE_SECONDS = _register(
+    Histogram("rag_llm_queue_seconds", "Time LLM calls waited for rate-limit capacity.", ("model",))
+)
+LLM_RETRIES = _register(Counter("rag_llm_retries_total", "LLM calls retried after a 429, 5xx or timeout.", ("model",)))
+LLM_REJECTED = _register(
+    Counter(
+        "rag_llm_rejected_total",
+        "LLM calls not served by a model: rate_limited, tenant_rate_limited, circuit_open or failed.",
+        ("model", "reason"),
+    )
+)
+LLM_FALLBACKS = _register(
+    Counter("rag_llm_fallbacks_total", "Calls moved to a fallback model, by primary.", ("model",))
+)
+LLM_CIRCUIT_OPENED = _register(Counter("rag_llm_circuit_opened_total", "Times a model's circuit opened.", ("model",)))
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _REGISTRY.values():
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+class RequestTrace:
+    """Stage timings and token usage of one request, in the order the stages finished."""
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.started = time.perf_counter()
+        self.total_ms: Optional[float] = None
+        self.stages: List[Dict[str, Any]] = []
+        self.tokens: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage: str, started: float, elapsed: float, error: bool):
+        entry = {
+            "stage": stage,
+            "start_ms": round((started - self.started) * 1000, 2),
+            "ms": round(elapsed * 1000, 2),
+        }
+        if error:
+            entry["error"] = True
+        with self._lock:
+            self.stages.append(entry)
+
+    def add_tokens(self, step: str, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            usage = self.tokens.setdefault(step, {"calls": 0, "prompt": 0, "completion": 0})
+            usage["calls"] += 1
+            usage["prompt"] += prompt_tokens
+            usage["completion"] += completion_tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_ms": self.total_ms,
+                # Stages overlap (the HyDE branch runs next to the direct search) and
+                # nest (retrieve contains embed / hybrid_sql / rerank): they do not add up
+                "stages": list(self.stages),
+                "tokens": {step: dict(usage) for step, usage in self.tokens.items()},
+            }
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar(
+    "rag_request_trace", default=None
+)
+
+
+@contextmanager
+def track_operation(operation: str) -> Iterator[RequestTrace]:
+    trace = RequestTrace(operation)
+    token = _current_trace.set(trace)
+    outcome = "ok"
+    try:
+        with start_span(f"rag.{operation}"):
+            yield trace
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - trace.started
+        trace.total_ms = round(elapsed * 1000, 2)
+        _current_trace.reset(token)
+        OPERATION_SECONDS.observe(elapsed, operation=operation)
+        OPERATIONS.inc(operation=operation, outcome=outcome)
+
+
+@contextmanager
+def timed_stage(stage: str, pipeline: str = "query") -> Iterator[None]:
+    started = time.perf_counter()
+    error = False
+    try:
+        with start_span(f"{pipeline}.{stage}"):
+            yield
+    except Exception:
+        error = True
+        STAGE_ERRORS.inc(pipeline=pipeline, stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, pipeline=pipeline, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_stage(stage, started, elapsed, error)
+
+
+def _reported_usage(raw: Any) -> Optional[Tuple[int, int]]:
+    if not isinstance(raw, dict):
+        return None
+    usage = raw.get("usage")  # OpenAI-compatible servers
+    if isinstance(usage, dict) and "prompt_tokens" in usage:
+        return int(usage["prompt_tokens"]), int(usage.get("completion_tokens") or 0)
+    usage = raw.get("usage_metadata")  # Gemini
+    if isinstance(usage, dict) and "prompt_token_count" in usage:
+        return int(usage["prompt_token_count"]), int(usage.get("candidates_token_count") or 0)
+    return None
+
+
+def record_llm_usage(step: str, prompt: str, response: Any):
+    try:
+        usage = _reported_usage(getattr(response, "raw", None))
+        if usage is None:
+            usage = count_tokens(prompt), count_tokens(getattr(response, "text", "") or "")
+    except Exception as e:
+        logger.debug(f"Token usage unavailable for {step}: {e}")
+        return
+    prompt_tokens, completion_tokens = usage
+    LLM_CALLS.inc(step=step)
+    LLM_TOKENS.inc(prompt_tokens, step=step, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, step=step, kind="completion")
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_tokens(step, prompt_tokens, completion_tokens)
+    span = current_span()
+    if span is not None:
+        span.set_attribute("llm.step", step)
+        span.set_attribute("llm.prompt_tokens", prompt_tokens)
+        span.set_attribute("llm.completion_tokens", completion_tokens)
@@ -0,0 +1,111 @@
+import json
+import logging
+import urllib.request
+from typing import Any, ClassVar, Dict, List, Optional
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.llms import CompletionResponse, CompletionResponseGen, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+from src.services.tracing import inject_headers, start_span
+
+logger = logging.getLogger(__name__)
+
+
+# ==================================================================================
+# OPENAI-COMPATIBLE ENDPOINTS
+# Local model servers (vLLM, llama.cpp server, Ollama, LM Studio, TGI) expose the
+# OpenAI REST API. Plain HTTP via urllib: no SDK dependency for two endpoints.
+# - /chat/completions: each prompt is sent as a single user message
+# - /embeddings: the model must produce vectors with the dimension of the
+#   documents.embedding column
+# ==================================================================================
+def _post(base_url: str, path: str, payload: Dict[str, Any], api_key: Optional[str], timeout: float) -> Dict[str, Any]:
+    url = f"{base_url.rstrip('/')}{path}"
+    with start_span(f"POST {path}", kind="client", attributes={"http.method": "POST", "http.url": url}):
+        headers = inject_headers({"Content-Type": "application/json"})
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), headers=headers, method="POST")
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+
+
+class OpenAICompatibleLLM(CustomLLM):
+    model_name: str
+    base_url: str
+    api_key: Optional[str] = None
+    timeout_seconds: float = 60.0
+    temperature: float = 0.0
+    max_tokens: Optional[int] = None
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name=self.model_name)
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        payload = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+        }
+        if self.max_tokens:
+            payload["max_tokens"] = self.max_tokens
+        data = _post(self.base_url, "/chat/completions", payload, self.api_key, self.timeout_seconds)
+        return CompletionResponse(text=data["choices"][0]["message"]["content"] or "", raw=data)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        # Nothing in the service streams yet: one chunk with the full completion
+        response = self.complete(prompt, formatted=formatted, **kwargs)
+        yield CompletionResponse(text=response.text, delta=response.text, raw=response.raw)
+
+
+class OpenAICompatibleEmbedding(BaseEmbedding):
+    QUERY_TASK_TYPE: ClassVar[str] = "query"
+    DOCUMENT_TASK_TYPE: ClassVar[str] = "document"
+
+    _model: str = PrivateAttr()
+    _base_url: str = PrivateAttr()
+    _api_key: Optional[str] = PrivateAttr()
+    _timeout: float = PrivateAttr()
+
+    def __init__(
+        self,
+        model_name: str,
+        base_url: str,
+        api_key: Optional[str] = None,
+        timeout_seconds: float = 60.0,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self._model = model_name
+        self._base_url = base_url
+        self._api_key = api_key
+        self._timeout = timeout_seconds
+
+    @property
+    def embedding_model_name(self) -> str:
+        return f"openai_compatible/{self._model}"
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        payload = {"model": self._model, "input": texts}
+        data = _post(self._base_url, "/embeddings", payload, self._api_key, self._timeout)
+        return [item["embedding"] for item in sorted(data["data"], key=lambda item: item["index"])]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([query])[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embedding(text)
@@ -0,0 +1,136 @@
+import logging
+import os
+from typing import Any, Callable, Dict, Optional
+
+from llama_index.llms.gemini import Gemini
+
+from src.config.config import get_config
+from src.services.embeddings import CustomGeminiEmbedding
+from src.services.fake_models import FakeLLM, HashingEmbedding
+from src.services.openai_compatible import OpenAICompatibleEmbedding, OpenAICompatibleLLM
+
+logger = logging.getLogger(__name__)
+
+
+# ==================================================================================
+# PROVIDER REGISTRY
+# A provider is a name plus builders for an LLM and/or an embedding model:
+# - gemini: Google Gemini (GOOGLE_API_KEY)
+# - fake: deterministic offline models for load tests (see fake_models.py)
+# - openai_compatible: any server speaking the OpenAI REST API, e.g. a local model
+# Per-provider options live in config.json "providers". Which provider a step uses
+# comes from llm_config.steps / embedding_config; LLM_PROVIDER_OVERRIDE (env) forces
+# one provider for every step, embeddings and image captions, e.g. "fake" to
+# load-test the whole stack offline.
+# ==================================================================================
+LLM_PROVIDERS: Dict[str, Callable[[Optional[str]], Any]] = {}
+EMBEDDING_PROVIDERS: Dict[str, Callable[[Optional[str]], Any]] = {}
+
+
+def register_llm_provider(name: str):
+    def decorator(builder: Callable[[Optional[str]], Any]):
+        LLM_PROVIDERS[name] = builder
+        return builder
+
+    return decorator
+
+
+def register_embedding_provider(name: str):
+    def decorator(builder: Callable[[Optional[str]], Any]):
+        EMBEDDING_PROVIDERS[name] = builder
+        return builder
+
+    return decorator
+
+
+def get_provider_config(name: str) -> Dict[str, Any]:
+    return dict(get_config().get("providers", {}).get(name, {}))
+
+
+def get_provider_override() -> Optional[str]:
+    override = os.getenv("LLM_PROVIDER_OVERRIDE", "").strip().lower()
+    return override or None
+
+
+def require_provider(registry: Dict[str, Callable[[Optional[str]], Any]], name: str, kind: str) -> str:
+    """Returns `name` if `registry` has it; a typo in config or LLM_PROVIDER_OVERRIDE fails loudly."""
+    if name not in registry:
+        raise ValueError(f"Unknown {kind} provider '{name}'. Available: {', '.join(sorted(registry))}")
+    return name
+
+
+def _api_key(config: Dict[str, Any]) -> Optional[str]:
+    return os.getenv(config.get("api_key_env") or "") or None
+
+
+# --- gemini ---
+
+
+@register_llm_provider("gemini")
+def _gemini_llm(model_name: Optional[str]) -> Any:
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not set.")
+    model_name = model_name or os.getenv("GEMINI_MODEL", "models/gemini-2.0-flash")
+    return Gemini(model=model_name, api_key=api_key)
+
+
+@register_embedding_provider("gemini")
+def _gemini_embedding(model_name: Optional[str]) -> Any:
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        logger.warning("GOOGLE_API_KEY not set.")
+    return CustomGeminiEmbedding(model_name=model_name or "models/text-embedding-004", api_key=api_key)
+
+
+# --- fake ---
+
+
+@register_llm_provider("fake")
+def _fake_llm(model_name: Optional[str]) -> Any:
+    config = get_provider_config("fake")
+    return FakeLLM(
+        latency_ms=float(config.get("latency_ms", 0)),
+        tokens_per_second=float(config.get("tokens_per_second", 0)),
+    )
+
+
+@register_embedding_provider("fake")
+def _fake_embedding(model_name: Optional[str]) -> Any:
+    return HashingEmbedding(latency_ms=float(get_provider_config("fake").get("embedding_latency_ms", 0)))
+
+
+# --- openai_compatible ---
+
+
+@register_llm_provider("openai_compatible")
+def _openai_compatible_llm(model_name: Optional[str]) -> Any:
+    config = get_provider_config("openai_compatible")
+    return OpenAICompatibleLLM(
+        model_name=model_name or config["model"],
+        base_url=config["base_url"],
+        api_key=_api_key(config),
+        timeout_seconds=float(config.get("timeout_seconds", 60)),
+    )
+
+
+@register_embedding_provider("openai_compatible")
+def _openai_compatible_embedding(model_name: Optional[str]) -> Any:
+    config = get_provider_config("openai_compatible")
+    return OpenAICompatibleEmbedding(
+        model_name=model_name or config["embedding_model"],
+        base_url=config["base_url"],
+        api_key=_api_key(config),
+        timeout_seconds=float(config.get("timeout_seconds", 60)),
+    )
+
+
+def build_embed_model() -> Any:
+    settings = get_config().get("embedding_config", {})
+    override = get_provider_override()
+    provider = override or settings.get("provider", "gemini")
+    # Model names belong to the configured provider
+    model_name = None if override else settings.get("model")
+    require_provider(EMBEDDING_PROVIDERS, provider, "embedding")
+    logger.info(f"Using {provider} embeddings ({model_name or 'default model'})")
+    return EMBEDDING_PROVIDERS[provider](model_name)
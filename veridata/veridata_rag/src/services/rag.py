@@ -1,47 +1,66 @@
+import asyncio
 import logging
-from typing import Optional
+import os
+from typing import Any, Dict, Optional
 from uuid import UUID
-from llama_index.core import Document
-from llama_index.core.node_parser import SentenceSplitter
-from src.config.logging import log_start, log_skip
-from src.storage.repository import insert_document_chunk
-from src.services.vlm import describe_image
-from src.utils.prompts import RAG_ANSWER_PROMPT_TEMPLATE, SMALL_TALK_PROMPT_TEMPLATE
+
+from src.config.logging import log_skip, log_start
+from src.services.config_service import get_rag_global_config
+from src.services.llm_gateway import set_llm_tenant
+from src.services.metrics import timed_stage
 from src.services.rag_flow import (
-    get_embed_model,
-    resolve_config,
+    determine_intent,
+    generate_llm_response,
     get_language_instruction,
     prepare_query_context,
-    determine_intent,
+    resolve_config,
     retrieve_context,
-    generate_llm_response,
-    generate_llm_response,
     save_interaction,
 )
-from src.services.config_service import get_rag_global_config
+from src.services.vlm import describe_image
+from src.utils.prompts import RAG_ANSWER_PROMPT_TEMPLATE, SMALL_TALK_PROMPT_TEMPLATE
 
 logger = logging.getLogger(__name__)
 
 
 # ==================================================================================
-# INGESTION FLOW
-# 1. Parse Input: Handle text or image (file_bytes -> VLM description).
-# 2. Document Creation: Wrap content in LlamaIndex Document.
-# 3. Chunking: Split large text into manageable nodes (1024 tokens).
-# 4. Embedding: Convert chunks to vectors using Gemini.
-# 5. Storage: Insert text + vectors into Postgres (via Repository).
+# INGESTION HELPERS
+# Used by the durable job pipeline (services/ingestion_jobs.py), which chunks, embeds
+# and stores files in batches:
+# - parse_document: text as is; images (file_bytes) become a VLM description.
+# - build_document_metadata: chunk metadata (type, tags, language) stored alongside
+#   for filtered retrieval.
 # ==================================================================================
-async def ingest_document(
-    tenant_id: UUID, filename: str, content: str = None, file_bytes: bytes = None
-):
-    logger.info(f"Ingesting document {filename} for tenant {tenant_id}")
+TEXT_EXTENSIONS = (".txt", ".md")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
 
-    is_image = filename.lower().endswith((".jpg", ".jpeg", ".png", ".webp"))
+def is_image_file(filename: str) -> bool:
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
 
-    if is_image:
+
+def build_document_metadata(filename: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Metadata stored on every chunk: upload metadata (tags, language, ...) plus what the file says about itself."""
+    metadata = dict(metadata or {})
+    tags = metadata.get("tags")
+    if isinstance(tags, str):
+        # "pricing, 2024" from a form field -> ["pricing", "2024"] (arrays match per element)
+        metadata["tags"] = [tag.strip() for tag in tags.split(",") if tag.strip()]
+    metadata.update(
+        {
+            "filename": filename,
+            "extension": os.path.splitext(filename)[1].lstrip(".").lower(),
+            "original_type": "image" if is_image_file(filename) else "text",
+        }
+    )
+    return metadata
+
+
+async def parse_document(filename: str, content: str = None, file_bytes: bytes = None) -> Optional[str]:
+    if is_image_file(filename):
         if not file_bytes:
             logger.error("Image ingestion requires file_bytes")
-            return
+            return None
         logger.info("Processing image with VLM...")
 
         # Fetch dynamic config to get model_name
@@ -49,49 +68,11 @@ async def ingest_document(
         db_model_name = config.get("model_name")
 
         # Overwrite content with the image description
-        content = describe_image(file_bytes, filename, model_name=db_model_name)
+        content = await describe_image(file_bytes, filename, model_name=db_model_name)
         # We can prepend a tag so we know it's an image description
         content = f"[IMAGE DESCRIPTION for {filename}]\n{content}"
 
-    if not content:
-        logger.warning(f"No content to ingest for {filename}")
-        return
-
-    # 1. Create LlamaIndex Document
-    doc = Document(
-        text=content,
-        metadata={
-            "filename": filename,
-            "tenant_id": str(tenant_id),
-            "original_type": "image" if is_image else "text",
-        },
-    )
-
-    # 2. Chunking
-    splitter = SentenceSplitter(chunk_size=1024, chunk_overlap=20)
-    nodes = splitter.get_nodes_from_documents([doc])
-
-    logger.info(f"Split into {len(nodes)} chunks")
-
-    # 3. Embedding
-    embed_model = get_embed_model()
-    texts = [node.get_content() for node in nodes]
-
-    try:
-        embeddings = embed_model.get_text_embedding_batch(texts)
-    except Exception as e:
-        logger.error(f"Embedding failed: {e}")
-        return
-
-    # 4. Insert into DB (Delegated to Repository)
-    for node, embedding in zip(nodes, embeddings):
-        success = await insert_document_chunk(
-            tenant_id, filename, node.get_content(), embedding
-        )
-        if not success:
-            logger.error(f"Failed to insert chunk for {filename}")
-
-    logger.info(f"Successfully ingested {filename}")
+    return content
 
 
 # ==================================================================================
@@ -103,6 +84,8 @@ async def ingest_document(
 # 4. Retrieve: Search Vectors + Hybrid Search + Rerank.
 # 5. Generate: Feed Context + Query to LLM.
 # 6. Save: Persist the conversation.
+# Every step is a timed stage (services/metrics.py); callers wrap the call in
+# track_operation("query") to get the breakdown of one request.
 # ==================================================================================
 async def generate_answer(
     tenant_id: UUID,
@@ -114,11 +97,15 @@ async def generate_answer(
     complexity_score: int = 5,
     pricing_intent: bool = False,
     external_context: Optional[str] = None,
+    metadata_filter: Optional[Dict[str, Any]] = None,
 ) -> tuple[str, str]:
     log_start(logger, f"Generating answer for query: '{query}'")
+    set_llm_tenant(tenant_id)
 
     # 0. Load Dynamic Config (DB Override)
-    config = await get_rag_global_config()
+    with timed_stage("setup"):
+        config = await get_rag_global_config()
+        lang_instruction = await get_language_instruction(tenant_id)
     db_model_name = config.get("model_name")
 
     # Resolving flags: DB > Request > Default
@@ -132,7 +119,6 @@ async def generate_answer(
 
     # 1. Config Resolving (Fallback to env/default)
     use_hyde, use_rerank = resolve_config(use_hyde, use_rerank)
-    lang_instruction = await get_language_instruction(tenant_id)
 
     # 2. Contextualization
     search_query, history = await prepare_query_context(session_id, query, provider, model_name=db_model_name)
@@ -149,45 +135,52 @@ async def generate_answer(
     answer = ""
     if requires_rag:
         # Retrieve docs & Generate Answer
-        context_str, final_lang_instruction = await retrieve_context(
-            tenant_id,
-            search_query,
-            external_context,
-            use_hyde,
-            use_rerank,
-            provider,
-            lang_instruction,
-            model_name=db_model_name,
-        )
-        answer = generate_llm_response(
-            prompt_template=RAG_ANSWER_PROMPT_TEMPLATE,
-            template_args={
-                "lang_instruction": final_lang_instruction,
-                "history_str": history_str,
-                "context_str": context_str,
-                "search_query": search_query,
-            },
-            gen_step=gen_step,
-            provider=provider,
-            model_name=db_model_name,
-        )
+        with timed_stage("retrieve"):
+            context_str, final_lang_instruction = await retrieve_context(
+                tenant_id,
+                search_query,
+                external_context,
+                use_hyde,
+                use_rerank,
+                provider,
+                lang_instruction,
+                model_name=db_model_name,
+                metadata_filter=metadata_filter,
+            )
+        with timed_stage("generate"):
+            answer = await asyncio.to_thread(
+                generate_llm_response,
+                prompt_template=RAG_ANSWER_PROMPT_TEMPLATE,
+                template_args={
+                    "lang_instruction": final_lang_instruction,
+                    "history_str": history_str,
+                    "context_str": context_str,
+                    "search_query": search_query,
+                },
+                gen_step=gen_step,
+                provider=provider,
+                model_name=db_model_name,
+            )
     else:
         # Small Talk (No RAG)
         log_skip(logger, "Small talk detected. Bypassing RAG.")
-        answer = generate_llm_response(
-            prompt_template=SMALL_TALK_PROMPT_TEMPLATE,
-            template_args={
-                "lang_instruction": lang_instruction,
-                "history_str": history_str,
-                "search_query": search_query,
-            },
-            gen_step=gen_step,
-            provider=provider,
-            model_name=db_model_name,
-        )
+        with timed_stage("generate"):
+            answer = await asyncio.to_thread(
+                generate_llm_response,
+                prompt_template=SMALL_TALK_PROMPT_TEMPLATE,
+                template_args={
+                    "lang_instruction": lang_instruction,
+                    "history_str": history_str,
+                    "search_query": search_query,
+                },
+                gen_step=gen_step,
+                provider=provider,
+                model_name=db_model_name,
+            )
 
     # 5. Persistence
-    await save_interaction(session_id, query, answer)
+    with timed_stage("save"):
+        await save_interaction(session_id, query, answer)
 
     # Return (Answer, Context)
     # Handoff Detection removed (handled by Bot Agent Tool Call)
@@ -1,5 +1,6 @@
-import os
+import asyncio
 import logging
+import time
 from typing import List, Dict, Any, Optional
 from uuid import UUID
 
@@ -7,71 +8,89 @@ from src.config.config import get_global_setting
 from src.config.logging import (
     log_error,
 )
-from src.storage.repository import search_documents_hybrid
-from src.services.embeddings import CustomGeminiEmbedding
-from src.services.hyde import generate_hypothetical_answer
+from src.storage.repository import RRF_K, search_documents_hybrid, search_documents_vector
+from src.services.embedding_cache import embed_query
+from src.services.hyde import get_hyde_deadline_seconds, get_hypothetical_answer
 from src.services.rerank import rerank_documents
+from src.services.adaptive_retrieval import (
+    assess_scores,
+    candidate_limits,
+    get_adaptive_retrieval_settings,
+    log_decision,
+)
+from src.services.context_packer import (
+    DEFAULT_CONTEXT_TOKEN_BUDGET,
+    DEFAULT_EXTERNAL_CONTEXT_SHARE,
+    pack_context,
+)
 from src.services.llm_factory import get_llm
-from src.services.config_service import get_rag_global_config
+from src.services.metrics import record_llm_usage, timed_stage
+from src.services.contextualization import contextualize
+from src.services.config_service import get_rag_global_config, get_tenant_retrieval_settings
 from src.services.memory import add_message, get_chat_history
 from src.storage.repository import get_tenant_languages
-from src.utils.prompts import CONTEXTUALIZE_PROMPT_TEMPLATE
 
 logger = logging.getLogger(__name__)
 
-# Single instance of embedding model
-_embed_model = None
-
-
-def get_embed_model():
-    global _embed_model
-    if _embed_model is None:
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            logger.warning("GOOGLE_API_KEY not set.")
-        logger.info("Using Google Gemini Embeddings (models/text-embedding-004)")
-        _embed_model = CustomGeminiEmbedding(
-            model_name="models/text-embedding-004", api_key=api_key
-        )
-    return _embed_model
-
-
 # ==================================================================================
-# FLOW HELPER: CONTEXTUALIZE
-# Rewrites the user query to include context from previous messages.
-# Example: "How much is it?" -> "How much is the Standard Plan?"
+# RETRIEVAL ENGINE
+# 1. HyDE (Optional): Runs as a parallel branch. Its passage (cached per tenant and
+#    normalized query) is embedded and searched semantically while the direct query
+#    is already being retrieved; the two rankings are fused with RRF. If HyDE is not
+#    back within the deadline (hyde_config.deadline_ms) it is dropped for this request
+#    but keeps running in the background, so the next identical question hits the cache.
+# 2. Embedding: Vectorize the query.
+# 3. Search: Hybrid (Keyword + Semantic) search via Postgres, optionally narrowed by
+#    a chunk metadata filter (e.g. {"tags": ["pricing"]}).
+# 4. Adaptive depth: the fused score curve decides whether the top results already
+#    dominate (return fewer, skip rerank) or are flat (widen the pool before rerank).
+#    See adaptive_retrieval.py.
+# 5. Rerank (Optional): Re-score the candidates with the configured backend (local
+#    lexical / cross-encoder, or the LLM). See rerank.py.
+# Stages are timed as embed, hybrid_sql, hyde_llm / hyde_embed / hyde_sql (the branch),
+# hyde_wait (time spent waiting for it after the direct search) and rerank
+# (rag_stage_duration_seconds, services/metrics.py).
 # ==================================================================================
-def contextualize_query(
-    query: str, history: List[Dict[str, str]], provider: str = None, model_name: str = None
-) -> str:
-    if not history:
-        return query
+_background_tasks = set()
 
-    history_str = "\n".join(
-        [f"{msg['role'].upper()}: {msg['content']}" for msg in history]
-    )
 
-    try:
-        llm = get_llm(step="contextualization", provider=provider, model_name=model_name)
-        prompt = CONTEXTUALIZE_PROMPT_TEMPLATE.format(
-            history_str=history_str, query=query
+def fuse_rankings(rankings: List[List[Dict[str, Any]]], limit: int, k: int = RRF_K) -> List[Dict[str, Any]]:
+    """Reciprocal Rank Fusion of result lists (same formula as the SQL hybrid query)."""
+    documents: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            scores[doc["id"]] = scores.get(doc["id"], 0.0) + 1.0 / (rank + k)
+            documents.setdefault(doc["id"], doc)
+    ordered = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [{**documents[doc_id], "score": scores[doc_id]} for doc_id in ordered]
+
+
+async def _hyde_search(
+    tenant_id: UUID,
+    query: str,
+    limit: int,
+    provider: str,
+    model_name: str,
+    retrieval_settings: Dict[str, Any],
+    metadata_filter: Optional[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    # Shielded: a request that stops waiting does not cancel the LLM call (it fills the cache)
+    passage_task = asyncio.create_task(get_hypothetical_answer(tenant_id, query, provider, model_name))
+    _background_tasks.add(passage_task)
+    passage_task.add_done_callback(_background_tasks.discard)
+    with timed_stage("hyde_llm"):
+        passage = await asyncio.shield(passage_task)
+    if not passage:
+        return []
+    with timed_stage("hyde_embed"):
+        embedding = await embed_query(passage)
+    with timed_stage("hyde_sql"):
+        return await search_documents_vector(
+            tenant_id, embedding, limit, settings=retrieval_settings, metadata_filter=metadata_filter
         )
-        response = llm.complete(prompt)
-        rewritten = response.text.strip()
-        logger.info(f"Contextualized query: '{query}' -> '{rewritten}'")
-        return rewritten
-    except Exception as e:
-        logger.error(f"Contextualization failed: {e}")
-        return query
 
 
-# ==================================================================================
-# RETRIEVAL ENGINE
-# 1. HyDE (Optional): Hallucinate an answer to search for semantic concepts.
-# 2. Embedding: Vectorize the query.
-# 3. Search: Hybrid (Keyword + Semantic) search via Postgres.
-# 4. Rerank (Optional): Use a cross-encoder to re-score results.
-# ==================================================================================
 async def search_documents(
     tenant_id: UUID,
     query: str,
@@ -80,39 +99,110 @@ async def search_documents(
     use_rerank: bool = False,
     provider: str = "gemini",
     model_name: str = None,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    retrieval_settings: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
-    search_query = query
+    started = time.monotonic()
+    if retrieval_settings is None:
+        retrieval_settings = await get_tenant_retrieval_settings(tenant_id)
+    adaptive = get_adaptive_retrieval_settings(retrieval_settings)
+    # Adaptive: a small pool first, widened only when the scores are flat.
+    # Fixed: 4x the limit when reranking, so there is something to rerank down
+    candidate_limit, widened_limit = candidate_limits(limit, use_rerank, adaptive)
+
+    # 1. HyDE branch starts first so its LLM call overlaps the direct retrieval
+    hyde_task = None
     if use_hyde:
-        logger.info(f"🔍 Opt 1 (Accuracy): Using HyDE expansion with {provider}")
-        search_query = generate_hypothetical_answer(query, provider=provider, model_name=model_name)
+        logger.info(f"🔍 Opt 1 (Accuracy): Using HyDE expansion with {provider} (parallel branch)")
+        hyde_task = asyncio.create_task(
+            _hyde_search(tenant_id, query, candidate_limit, provider, model_name, retrieval_settings, metadata_filter)
+        )
 
-    # 2. Embed Query
-    embed_model = get_embed_model()
+    # 2-3. Direct query: embed (LRU-cached) + hybrid search (Delegated to Repository)
+    query_embedding = None
     try:
-        query_embedding = embed_model.get_query_embedding(search_query)
+        with timed_stage("embed"):
+            query_embedding = await embed_query(query)
     except Exception as e:
         logger.error(f"Query embedding failed: {e}")
-        return []
 
-    # 3. Retrieve Candidates (Delegated to Repository)
-    # If using rerank, we fetch more candidates (e.g., 4x the limit) to rerank down
-    candidate_limit = limit * 4 if use_rerank else limit
+    async def direct_search(pool: int) -> List[Dict[str, Any]]:
+        if query_embedding is None:
+            return []
+        logger.info(f"🔍 Opt 2 (Accuracy): Performing Hybrid Search (Vector + FTS) with RRF (Limit: {pool})")
+        try:
+            with timed_stage("hybrid_sql"):
+                return await search_documents_hybrid(
+                    tenant_id,
+                    query_embedding,
+                    query,
+                    pool,
+                    settings=retrieval_settings,
+                    metadata_filter=metadata_filter,
+                )
+        except Exception as e:
+            logger.error(f"Hybrid search failed: {e}")
+            return []
 
-    logger.info(
-        f"🔍 Opt 2 (Accuracy): Performing Hybrid Search (Vector + FTS) with RRF (Limit: {candidate_limit})"
-    )
+    results = await direct_search(candidate_limit)
 
-    results = await search_documents_hybrid(
-        tenant_id, query_embedding, query, candidate_limit
-    )
+    hyde_results = []
+    if hyde_task:
+        remaining = get_hyde_deadline_seconds() - (time.monotonic() - started)
+        try:
+            with timed_stage("hyde_wait"):
+                hyde_results = await asyncio.wait_for(hyde_task, timeout=max(0.0, remaining))
+        except asyncio.TimeoutError:
+            logger.warning(f"HyDE missed its {get_hyde_deadline_seconds():.1f}s deadline, using direct results only")
+        except Exception as e:
+            logger.error(f"HyDE branch failed: {e}")
+        if hyde_results:
+            results = fuse_rankings([results, hyde_results], candidate_limit)
+
+    # 4. Adaptive depth: stop early / skip rerank / widen, from the fused score curve
+    if adaptive.get("enabled"):
+        scores = [doc["score"] for doc in results]
+        assessment = assess_scores(scores, limit, candidate_limit, adaptive)
+        widened = False
+        if assessment["flat"] and use_rerank and widened_limit > candidate_limit:
+            # Only worth it when a reranker will look at the extra candidates.
+            # The HyDE branch is not re-run: its ranking is fused again as it is
+            results = await direct_search(widened_limit)
+            if hyde_results:
+                results = fuse_rankings([results, hyde_results], widened_limit)
+            widened = True
+        log_decision(
+            tenant_id,
+            query,
+            scores,
+            assessment,
+            adaptive,
+            limit=limit,
+            candidates=candidate_limit,
+            widened_to=widened_limit if widened else None,
+            rerank=use_rerank and not assessment["decisive"],
+        )
+        if assessment["decisive"]:
+            if use_rerank:
+                logger.info(f"Skipping rerank: fused scores are decisive ({assessment['reason']})")
+            return results[: assessment["keep"]]
 
-    # 4. Reranking
+    # 5. Reranking
     if use_rerank and results:
-        logger.info(f"Reranking results with {provider}")
-        # We rerank against the ORIGINAL query, not the HyDE query
-        results = rerank_documents(query, results, top_k=limit, provider=provider, model_name=model_name)
-
-    return results
+        # We rerank against the ORIGINAL query, not the HyDE query. Off the event loop:
+        # local backends are CPU bound, the LLM backend blocks on the network
+        with timed_stage("rerank"):
+            results = await asyncio.to_thread(
+                rerank_documents,
+                query,
+                results,
+                top_k=limit,
+                provider=provider,
+                model_name=model_name,
+                backend=retrieval_settings.get("rerank_backend"),
+            )
+
+    return results[:limit]
 
 
 # --- Flow Helpers ---
@@ -143,9 +233,12 @@ async def prepare_query_context(
     search_query = query
     history = []
     if session_id:
-        history = await get_chat_history(session_id, limit=5)
+        with timed_stage("history"):
+            history = await get_chat_history(session_id, limit=5)
         if history:
-            search_query = contextualize_query(query, history, provider)
+            # Local classifier first: self-contained follow-ups skip the LLM rewrite
+            with timed_stage("contextualize"):
+                search_query = await contextualize(session_id, query, history, provider, model_name=model_name)
     return search_query, history
 
 
@@ -185,6 +278,7 @@ def determine_intent(complexity_score: int, pricing_intent: bool) -> tuple[bool,
 # Aggregates data from:
 # 1. Live Data (Google Sheets/External API - passed as external_context)
 # 2. Vector Store (search_documents)
+# Both are packed under the tenant's context token budget (services/context_packer.py).
 # ==================================================================================
 async def retrieve_context(
     tenant_id: UUID,
@@ -195,17 +289,16 @@ async def retrieve_context(
     provider: Optional[str],
     lang_instruction: str,
     model_name: Optional[str] = None,
+    metadata_filter: Optional[Dict[str, Any]] = None,
 ) -> tuple[str, str]:
     # 1. External (Live) Data
-    live_data = ""
     updated_lang_instruction = lang_instruction
     if external_context:
         logger.info("📊 Opt 1 (Live Data): Injecting external context provided by Bot.")
         updated_lang_instruction += "\nIMPORTANT: Use the [LIVE PRICING & PRODUCT DATA] section for any mention of products or costs. Trust it over other data. Be flexible with names (e.g., 'consultoria' matches 'Consulting Hour')."
-        live_data = external_context
 
     # 2. Database (RAG) Data
-    doc_context = ""
+    retrieval_settings = await get_tenant_retrieval_settings(tenant_id)
     results = await search_documents(
         tenant_id,
         search_query,
@@ -213,13 +306,21 @@ async def retrieve_context(
         use_rerank=use_rerank,
         provider=provider,
         model_name=model_name,
+        metadata_filter=metadata_filter,
+        retrieval_settings=retrieval_settings,
     )
-    if results:
-        doc_context = "\n\n".join(
-            [f"Source: {r['filename']}\n{r['content']}" for r in results]
+
+    # 3. Pack both under the token budget
+    with timed_stage("pack_context"):
+        live_data, doc_context, _ = pack_context(
+            search_query,
+            results,
+            external_context=external_context,
+            budget_tokens=int(retrieval_settings.get("context_token_budget") or DEFAULT_CONTEXT_TOKEN_BUDGET),
+            external_share=float(retrieval_settings.get("external_context_share") or DEFAULT_EXTERNAL_CONTEXT_SHARE),
         )
 
-    # 3. Combine
+    # 4. Combine
     context_str = ""
     if live_data:
         context_str += live_data
@@ -243,6 +344,7 @@ def generate_llm_response(
         prompt = prompt_template.format(**template_args)
         llm = get_llm(step=gen_step, provider=provider, model_name=model_name)
         response = llm.complete(prompt)
+        record_llm_usage(gen_step, prompt, response)
         return response.text
     except Exception as e:
         log_error(logger, f"LLM generation failed: {e}")
@@ -1,11 +1,202 @@
-import logging
+import abc
+import contextvars
+import importlib.util
 import json
-from typing import List, Dict, Any
+import logging
+import math
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from src.config.config import get_config
 from src.services.llm_factory import get_llm
+from src.services.metrics import record_llm_usage
+from src.utils.prompts import RERANK_PROMPT_TEMPLATE
 
 logger = logging.getLogger(__name__)
 
-from src.utils.prompts import RERANK_PROMPT_TEMPLATE
+
+# ==================================================================================
+# RERANKERS
+# One interface, several backends (rerank_config.backend, or the tenant's retrieval
+# setting "rerank_backend"):
+# - llm: asks the LLM for a 0-10 relevance score per candidate (RERANK_PROMPT_TEMPLATE).
+#   Network bound and non-deterministic; candidates are scored concurrently.
+# - lexical: local and dependency free. BM25 over the candidate set, query term
+#   coverage and query bigram matches, blended with the first-stage (hybrid) rank,
+#   which carries the semantic signal. ~1ms for 20 candidates.
+# - cross_encoder: a small local cross-encoder (sentence-transformers, CPU), scored in
+#   batches. Only offered when the optional "cross-encoder" extra is installed.
+# Every backend sets doc["rerank_score"] (higher is better) and returns the top_k.
+# The default stays llm (what use_rerank has always meant); local backends are opt-in
+# per deployment (rerank_config.backend) or per tenant.
+# ==================================================================================
+CROSS_ENCODER_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+RERANK_BACKENDS = ("llm", "lexical") + (("cross_encoder",) if CROSS_ENCODER_AVAILABLE else ())
+DEFAULT_RERANK_CONFIG = {
+    "backend": "llm",
+    "max_chars": 1000,
+    "prior_weight": 0.3,
+    "llm_concurrency": 4,
+    "cross_encoder_model": "cross-encoder/ms-marco-MiniLM-L-6-v2",
+    "batch_size": 32,
+}
+
+
+def get_rerank_config() -> Dict[str, Any]:
+    config = dict(DEFAULT_RERANK_CONFIG)
+    config.update(get_config().get("rerank_config", {}))
+    return config
+
+
+class Reranker(abc.ABC):
+    name = "base"
+
+    def __init__(self, config: Dict[str, Any]):
+        self.max_chars = int(config["max_chars"])
+
+    @abc.abstractmethod
+    def score(self, query: str, documents: List[Dict[str, Any]]) -> List[float]:
+        pass
+
+    def rerank(self, query: str, documents: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        for doc, score in zip(documents, self.score(query, documents)):
+            doc["rerank_score"] = score
+        # Stable: ties keep their first-stage order
+        return sorted(documents, key=lambda doc: doc["rerank_score"], reverse=True)[:top_k]
+
+
+class LLMReranker(Reranker):
+    name = "llm"
+
+    def __init__(self, config: Dict[str, Any], provider: str = None, model_name: str = None):
+        super().__init__(config)
+        self.llm = get_llm(step="rag_search", provider=provider, model_name=model_name)
+        self.concurrency = max(1, int(config["llm_concurrency"]))
+
+    def _score_one(self, query: str, doc: Dict[str, Any]) -> float:
+        try:
+            prompt = RERANK_PROMPT_TEMPLATE.format(query=query, content=doc["content"][: self.max_chars])
+            response = self.llm.complete(prompt)
+            record_llm_usage("rerank", prompt, response)
+            text = response.text.replace("```json", "").replace("```", "").strip()
+            return float(json.loads(text).get("score", 0))
+        except Exception as e:
+            logger.warning(f"Reranking failed for doc {doc.get('id')}: {e}")
+            return 0.0
+
+    def score(self, query: str, documents: List[Dict[str, Any]]) -> List[float]:
+        # Pool threads do not inherit contextvars: copy them so token usage reaches the request trace
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(documents))) as pool:
+            return list(pool.map(lambda doc: context.copy().run(self._score_one, query, doc), documents))
+
+
+_WORD_RE = re.compile(r"\w+")
+# Too common to say anything about relevance (en / pt / es)
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i", "in", "is",
+    "it", "me", "my", "of", "on", "or", "the", "to", "what", "when", "where", "which", "who", "why", "with",
+    "you", "your", "o", "os", "um", "uma", "de", "da", "das", "dos", "e", "em", "no", "na", "que",
+    "qual", "quais", "como", "para", "por", "com", "el", "la", "los", "las", "y", "en", "cual", "cuanto",
+}
+_SUFFIXES = ("ing", "es", "ed", "s")
+
+
+def _stem(word: str) -> str:
+    # Just enough to match "refund"/"refunds", "ship"/"shipping" without a stemmer dependency
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+def _tokens(text: str) -> List[str]:
+    return [_stem(word) for word in _WORD_RE.findall(text.lower()) if word not in _STOPWORDS]
+
+
+class LexicalReranker(Reranker):
+    name = "lexical"
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.prior_weight = min(max(float(config["prior_weight"]), 0.0), 1.0)
+
+    def score(self, query: str, documents: List[Dict[str, Any]]) -> List[float]:
+        query_tokens = _tokens(query)
+        query_terms = set(query_tokens)
+        query_bigrams = set(zip(query_tokens, query_tokens[1:]))
+        docs = [_tokens(doc["content"][: self.max_chars]) for doc in documents]
+        n = len(docs)
+        avg_length = sum(len(tokens) for tokens in docs) / max(1, n) or 1.0
+        document_frequency = Counter(term for tokens in docs for term in set(tokens) & query_terms)
+        idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+        bm25, coverage, phrases = [], [], []
+        for tokens in docs:
+            counts = Counter(tokens)
+            norm = self.k1 * (1 - self.b + self.b * len(tokens) / avg_length)
+            bm25.append(
+                sum(
+                    idf[term] * counts[term] * (self.k1 + 1) / (counts[term] + norm)
+                    for term in query_terms
+                    if counts[term]
+                )
+            )
+            coverage.append(len(query_terms & counts.keys()) / len(query_terms) if query_terms else 0.0)
+            bigrams = set(zip(tokens, tokens[1:]))
+            phrases.append(len(query_bigrams & bigrams) / len(query_bigrams) if query_bigrams else 0.0)
+
+        top_bm25 = max(bm25, default=0.0) or 1.0
+        scores = []
+        for i in range(n):
+            lexical = 0.5 * bm25[i] / top_bm25 + 0.3 * coverage[i] + 0.2 * phrases[i]
+            # Candidates arrive best first from the hybrid search
+            prior = (n - i) / n
+            scores.append((1 - self.prior_weight) * lexical + self.prior_weight * prior)
+        return scores
+
+
+class CrossEncoderReranker(Reranker):
+    name = "cross_encoder"
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        from sentence_transformers import CrossEncoder
+
+        self.batch_size = int(config["batch_size"])
+        self.model = CrossEncoder(config["cross_encoder_model"], device="cpu", max_length=512)
+        logger.info(f"Loaded cross-encoder {config['cross_encoder_model']}")
+
+    def score(self, query: str, documents: List[Dict[str, Any]]) -> List[float]:
+        pairs = [(query, doc["content"][: self.max_chars]) for doc in documents]
+        scores = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        return [float(score) for score in scores]
+
+
+@lru_cache(maxsize=None)
+def _local_reranker(backend: str) -> Reranker:
+    # Local models are loaded once per process
+    config = get_rerank_config()
+    if backend == "cross_encoder":
+        return CrossEncoderReranker(config)
+    return LexicalReranker(config)
+
+
+def get_reranker(backend: Optional[str] = None, provider: str = None, model_name: str = None) -> Reranker:
+    backend = backend or get_rerank_config()["backend"]
+    if backend not in RERANK_BACKENDS:
+        # e.g. a tenant saved cross_encoder and the extra has since been removed
+        hint = " (install the cross-encoder extra)" if backend == "cross_encoder" else ""
+        logger.warning(f"Rerank backend '{backend}' is not available{hint}, using lexical")
+        backend = "lexical"
+    if backend == "llm":
+        return LLMReranker(get_rerank_config(), provider=provider, model_name=model_name)
+    return _local_reranker(backend)
 
 
 def rerank_documents(
@@ -14,33 +205,11 @@ def rerank_documents(
     top_k: int = 5,
     provider: str = None,
     model_name: str = None,
+    backend: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     if not documents:
         return []
 
-    logger.info(
-        f"Reranking {len(documents)} documents for query: {query} using step 'rag_search'"
-    )
-    llm = get_llm(step="rag_search", provider=provider, model_name=model_name)
-    scored_docs = []
-
-    for doc in documents:
-        try:
-            content_preview = doc["content"][:1000]
-            prompt = RERANK_PROMPT_TEMPLATE.format(query=query, content=content_preview)
-
-            response = llm.complete(prompt)
-            text = response.text.replace("```json", "").replace("```", "").strip()
-            score_data = json.loads(text)
-            score = score_data.get("score", 0)
-
-            doc["rerank_score"] = score
-            scored_docs.append(doc)
-
-        except Exception as e:
-            logger.warning(f"Reranking failed for doc {doc.get('id')}: {e}")
-            doc["rerank_score"] = 0
-            scored_docs.append(doc)
-
-    scored_docs.sort(key=lambda x: x["rerank_score"], reverse=True)
-    return scored_docs[:top_k]
+    reranker = get_reranker(backend, provider=provider, model_name=model_name)
+    logger.info(f"Reranking {len(documents)} documents for query: {query} using '{reranker.name}'")
+    return reranker.rerank(query, documents, top_k)
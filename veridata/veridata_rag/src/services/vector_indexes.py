@@ -0,0 +1,45 @@
+import logging
+from uuid import UUID
+
+from src.services.config_service import get_tenant_retrieval_settings
+from src.storage.repository import (
+    VECTOR_STORAGE_MODES,
+    create_vector_index,
+    drop_vector_indexes,
+    ensure_tenant_partition,
+    set_tenant_vector_index,
+    tenant_partition_name,
+    vector_index_lock,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ==================================================================================
+# PER-TENANT VECTOR INDEX
+# Compact vector storage is opt-in per tenant (retrieval vector_storage). Each tenant
+# partition carries a single HNSW index, for its own mode. Switching modes:
+#   1. builds the new index with CREATE INDEX CONCURRENTLY (search and ingestion keep
+#      running; only this partition is scanned),
+#   2. records it in Tenant.settings["vector_index"], which is what queries use,
+#   3. drops the previous index CONCURRENTLY, releasing e.g. the float32 graph.
+# Queries never run without an index. Runs are serialized per tenant and build the
+# mode requested when they get the lock, so a later change always wins.
+# ==================================================================================
+async def sync_vector_index(tenant_id: UUID) -> str:
+    tenant_id = UUID(str(tenant_id))
+    await ensure_tenant_partition(tenant_id)
+    partition = tenant_partition_name(tenant_id)
+
+    async with vector_index_lock(partition):
+        settings = await get_tenant_retrieval_settings(tenant_id)
+        storage = settings["vector_storage"] if settings["vector_storage"] in VECTOR_STORAGE_MODES else "full"
+
+        if await create_vector_index(partition, storage):
+            logger.info(f"Built {storage} HNSW index for tenant {tenant_id}")
+        if settings["query_vector_storage"] != storage:
+            await set_tenant_vector_index(tenant_id, storage)
+            logger.info(f"Tenant {tenant_id} vector search {settings['query_vector_storage']} -> {storage}")
+        await drop_vector_indexes(partition, keep=storage)
+
+    return storage
@@ -1,45 +1,147 @@
-import os
+import asyncio
+import hashlib
+import io
 import logging
-from llama_index.multi_modal_llms.gemini import GeminiMultiModal
-from src.utils.prompts import IMAGE_DESCRIPTION_PROMPT_TEMPLATE
+import os
+import time
+from typing import Optional, Tuple
+
 import google.generativeai as genai
 from PIL import Image
-import io
-from src.config.config import get_llm_settings
+
+from src.config.config import get_config, get_llm_settings
+from src.services.fake_models import fake_image_description
+from src.services.providers import get_provider_override
+from src.storage.repository import get_cached_image_description, store_cached_image_description
+from src.utils.prompts import IMAGE_DESCRIPTION_PROMPT_TEMPLATE
 
 logger = logging.getLogger(__name__)
 
-_vlm = None
+def _vlm_config() -> dict:
+    return get_config().get("vlm_config", {})
+
+
+# ==================================================================================
+# CLIENT
+# genai is configured once and one GenerativeModel is kept per model name.
+# ==================================================================================
+_configured = False
+_models = {}
+
+
+def get_image_model(model_name: str) -> genai.GenerativeModel:
+    global _configured
+    if not _configured:
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        _configured = True
+    if model_name not in _models:
+        _models[model_name] = genai.GenerativeModel(model_name)
+    return _models[model_name]
+
+
+def resolve_image_provider() -> str:
+    return get_provider_override() or get_llm_settings("complex_reasoning").get("provider", "gemini")
+
+
+def resolve_image_model_name(model_name: str = None) -> str:
+    settings = get_llm_settings("complex_reasoning")
+    # Priority: Passed ARG > Config > Env > Default
+    final_model_name = model_name or settings.get("model") or os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+    return final_model_name.replace("models/", "")
+
+
+# ==================================================================================
+# RATE LIMITING
+# A semaphore bounds in-flight VLM calls; the limiter spaces request starts so a
+# catalog import stays under the provider's per-minute quota.
+# ==================================================================================
+class AsyncRateLimiter:
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_semaphore: Optional[asyncio.Semaphore] = None
+_rate_limiter: Optional[AsyncRateLimiter] = None
+
+
+def _limits() -> Tuple[asyncio.Semaphore, AsyncRateLimiter]:
+    global _semaphore, _rate_limiter
+    if _semaphore is None:
+        config = _vlm_config()
+        _semaphore = asyncio.Semaphore(int(config.get("max_concurrency", 4)))
+        _rate_limiter = AsyncRateLimiter(float(config.get("requests_per_minute", 60)))
+    return _semaphore, _rate_limiter
+
+
+# ==================================================================================
+# IMAGE PREPARATION
+# Catalog photos are often 4000px+; the model doesn't need that to read a price tag.
+# Downsizing and re-encoding as JPEG cuts upload size and latency by an order of
+# magnitude. Runs in a thread (PIL is CPU bound).
+# ==================================================================================
+def prepare_image(image_bytes: bytes, max_side: int = 1536, quality: int = 85) -> bytes:
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image.thumbnail((max_side, max_side))
+        if image.mode not in ("RGB", "L"):
+            # JPEG has no alpha: flatten onto white
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+            image = background
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+        return output.getvalue()
+
+
+_PROMPT_HASH = hashlib.sha256(IMAGE_DESCRIPTION_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:16]
 
 
-def get_vlm():
-    global _vlm
-    if _vlm is None:
-        api_key = os.getenv("GOOGLE_API_KEY")
-        model_name = os.getenv("GEMINI_MODEL", "models/gemini-2.0-flash")
-        _vlm = GeminiMultiModal(model_name=model_name, api_key=api_key)
-    return _vlm
+async def describe_image(image_bytes: bytes, filename: str, model_name: str = None) -> str:
+    # Captions come from Gemini; the fake provider (load tests) describes offline, uncached
+    if resolve_image_provider() == "fake":
+        return fake_image_description(image_bytes, filename)
 
+    image_hash = hashlib.sha256(image_bytes).hexdigest()
+    final_model_name = resolve_image_model_name(model_name)
 
-def describe_image(image_bytes: bytes, filename: str, model_name: str = None) -> str:
-    try:
-        logger.info(f"Generating caption for image: {filename}")
-        api_key = os.getenv("GOOGLE_API_KEY")
-        genai.configure(api_key=api_key)
-        settings = get_llm_settings("complex_reasoning")
+    cached = await get_cached_image_description(image_hash, final_model_name, _PROMPT_HASH)
+    if cached:
+        logger.info(f"Using cached caption for image: {filename}")
+        return cached
 
-        # Priority: Passed ARG > Config > Env > Default
-        final_model_name = model_name or settings.get("model") or os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+    # Failures propagate to the ingestion job: unreadable images fail permanently,
+    # transient provider errors are retried. Nothing is cached until a caption exists.
+    config = _vlm_config()
+    prepared = await asyncio.to_thread(
+        prepare_image,
+        image_bytes,
+        int(config.get("max_image_side", 1536)),
+        int(config.get("jpeg_quality", 85)),
+    )
+    logger.info(
+        f"Generating caption for image: {filename} ({len(image_bytes) // 1024} KB -> {len(prepared) // 1024} KB)"
+    )
 
-        clean_model = final_model_name.replace("models/", "")
-        model = genai.GenerativeModel(clean_model)
-        image = Image.open(io.BytesIO(image_bytes))
-        prompt = IMAGE_DESCRIPTION_PROMPT_TEMPLATE
-        response = model.generate_content([prompt, image])
-        description = response.text
-        logger.info(f"Caption generated: {description[:100]}...")
-        return description
+    semaphore, rate_limiter = _limits()
+    async with semaphore:
+        await rate_limiter.acquire()
+        model = get_image_model(final_model_name)
+        response = await model.generate_content_async(
+            [IMAGE_DESCRIPTION_PROMPT_TEMPLATE, {"mime_type": "image/jpeg", "data": prepared}]
+        )
+    description = response.text
+    logger.info(f"Caption generated: {description[:100]}...")
 
-    except Exception as e:
-        logger.error(f"VLM generation failed: {e}")
-        return f"Image: {filename} (Description failed)"
+    await store_cached_image_description(image_hash, final_model_name, _PROMPT_HASH, description)
+    return description
@@ -1,9 +1,12 @@
+import hashlib
+import json
 import logging
-from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, AsyncIterable, Optional, Set, Tuple
 from uuid import UUID
 from sqlalchemy import select, text
-from src.storage.engine import get_session
-from src.models import Tenant, Document
+from src.storage.engine import engine, get_session
+from src.models import Tenant, EmbeddingCache, IngestionJobEmbedding
 
 logger = logging.getLogger(__name__)
 
@@ -24,63 +27,603 @@ async def get_tenant_languages(tenant_id: UUID) -> Optional[str]:
             return None
 
 
-async def insert_document_chunk(
-    tenant_id: UUID, filename: str, content: str, embedding: List[float]
-) -> bool:
+async def get_tenant_settings(tenant_id: UUID) -> Dict[str, Any]:
+    async for session in get_session():
+        try:
+            result = await session.execute(select(Tenant.settings).where(Tenant.id == tenant_id))
+            return result.scalars().first() or {}
+        except Exception as e:
+            logger.error(f"Failed to fetch tenant settings: {e}")
+            return {}
+
+
+# ==================================================================================
+# INCREMENTAL RE-INGESTION
+# Every chunk carries sha256(content) and the version of the file it belongs to.
+# A re-upload only embeds hashes the file doesn't already have, then swaps versions
+# in one transaction: unchanged chunks are promoted to the new version, new chunks
+# are inserted with it, and everything left on an older version is deleted.
+# Readers see either the old file or the new one, never a mix or a duplicate.
+# ==================================================================================
+def compute_content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+async def get_document_chunk_hashes(tenant_id: UUID, filename: str) -> Set[str]:
+    async for session in get_session():
+        await session.execute(
+            text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(tenant_id)}
+        )
+        result = await session.execute(
+            text("SELECT DISTINCT content_hash FROM documents WHERE tenant_id = :tenant_id AND filename = :filename"),
+            {"tenant_id": tenant_id, "filename": filename},
+        )
+        return {row[0] for row in result.fetchall()}
+
+
+async def replace_document_chunks(
+    tenant_id: UUID,
+    filename: str,
+    batches: AsyncIterable[List[Dict[str, Any]]],
+    fts_config: str = "english",
+    file_hash: Optional[str] = None,
+    size_bytes: int = 0,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, int]]:
+    """
+    Atomically makes the chunks in `batches` the content of `filename`.
+    Each chunk is {content_hash, content, embedding}; embedding None means the hash is
+    already stored for this file and is kept as-is (no re-embedding). Batches are
+    consumed one at a time, so memory stays bounded for very large files.
+    `metadata` is stored on every chunk of the new version (kept chunks included).
+    The file's source_documents row is updated in the same transaction.
+    Returns {version, kept, inserted, deleted}, or None on failure (old version stays live).
+    """
     async for session in get_session():
         try:
-            # Set RLS variable
             await session.execute(
                 text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(tenant_id)}
             )
-            # We use ORM for insertion, but need to handle fts_vector generation.
-            # SQLAlchemy defaults don't easily do to_tsvector on insert unless defined in model or trigger.
-            # So generic insert with specific SQL for fts might be cleaner, OR we trust a trigger (not present?),
-            # OR we construct the FTS vector in python (not possible easily),
-            # OR we use func.to_tsvector in the insert values?
-            # Actually, standard SQLAlchemy insert:
-            doc = Document(
-                tenant_id=tenant_id,
-                filename=filename,
-                content=content,
-                embedding=embedding,
-                # fts_vector is updated via SQL usually or trigger.
-                # In the old code: VALUES (..., to_tsvector('english', %s))
-            )
-            session.add(doc)
-            # We flush to get ID, but we also want to set fts_vector.
-            # Let's simple use a second update or straight SQL insert if we want efficiency.
-            # Given we want to move to strict ORM, let's use SQL for this specific specialized insert
-            # to keep the to_tsvector logic valid without triggers.
-
-            stmt = text("""
-                INSERT INTO documents (tenant_id, filename, content, embedding, fts_vector)
-                VALUES (:tenant_id, :filename, :content, :embedding, to_tsvector('english', :content))
-            """)
+            # The upsert row-locks the catalog entry, serializing concurrent re-uploads of the file
+            result = await session.execute(
+                text("""
+                    INSERT INTO source_documents (tenant_id, filename)
+                    VALUES (:tenant_id, :filename)
+                    ON CONFLICT (tenant_id, filename) DO UPDATE SET updated_at = now()
+                    RETURNING id
+                """),
+                {"tenant_id": tenant_id, "filename": filename},
+            )
+            source_document_id = result.scalar_one()
+            params = {"tenant_id": tenant_id, "filename": filename}
+            metadata_json = json.dumps(metadata or {})
+
+            result = await session.execute(
+                text("""
+                    SELECT COALESCE(MAX(file_version), 0) + 1 FROM documents
+                    WHERE tenant_id = :tenant_id AND filename = :filename
+                """),
+                params,
+            )
+            version = result.scalar_one()
+
+            kept = inserted = 0
+            async for batch in batches:
+                kept_hashes = [chunk["content_hash"] for chunk in batch if chunk.get("embedding") is None]
+                new_chunks = [chunk for chunk in batch if chunk.get("embedding") is not None]
+
+                if kept_hashes:
+                    # Promote one row per unchanged hash (older duplicates are dropped below)
+                    result = await session.execute(
+                        text("""
+                            UPDATE documents SET file_version = :version, metadata = CAST(:metadata AS jsonb)
+                            WHERE tenant_id = :tenant_id AND id IN (
+                                SELECT DISTINCT ON (content_hash) id FROM documents
+                                WHERE tenant_id = :tenant_id AND filename = :filename
+                                  AND content_hash = ANY(:hashes) AND file_version < :version
+                                ORDER BY content_hash, file_version DESC
+                            )
+                        """),
+                        {**params, "version": version, "hashes": kept_hashes, "metadata": metadata_json},
+                    )
+                    kept += result.rowcount
+
+                if new_chunks:
+                    result = await session.execute(
+                        text("""
+                            INSERT INTO documents (
+                                tenant_id, source_document_id, filename, content, content_hash, file_version,
+                                embedding, fts_config, metadata
+                            )
+                            SELECT
+                                :tenant_id, :source_document_id, :filename, :content, :content_hash, :version,
+                                CAST(:embedding AS vector), CAST(:fts_config AS regconfig), CAST(:metadata AS jsonb)
+                            WHERE NOT EXISTS (
+                                SELECT 1 FROM documents
+                                WHERE tenant_id = :tenant_id AND filename = :filename
+                                  AND content_hash = :content_hash AND file_version = :version
+                            )
+                        """),
+                        [
+                            {
+                                **params,
+                                "source_document_id": source_document_id,
+                                "content": chunk["content"],
+                                "content_hash": chunk["content_hash"],
+                                "version": version,
+                                "embedding": str(chunk["embedding"]),
+                                "fts_config": fts_config,
+                                "metadata": metadata_json,
+                            }
+                            for chunk in new_chunks
+                        ],
+                    )
+                    # NOT EXISTS skips chunks repeated within the file; count only rows written
+                    inserted += result.rowcount
+
+            result = await session.execute(
+                text("""
+                    DELETE FROM documents
+                    WHERE tenant_id = :tenant_id AND filename = :filename AND file_version < :version
+                """),
+                {**params, "version": version},
+            )
+            deleted = result.rowcount
+
             await session.execute(
-                stmt,
+                text("""
+                    UPDATE source_documents
+                    SET chunk_count = :chunk_count, content_hash = :file_hash, size_bytes = :size_bytes,
+                        status = 'ready', updated_at = now()
+                    WHERE id = :id
+                """),
                 {
-                    "tenant_id": tenant_id,
-                    "filename": filename,
-                    "content": content,
-                    "embedding": str(
-                        embedding
-                    ),  # pgvector usually takes list but let's see if sqlalchemy handles list->vector auto.
-                    # If we use raw text(), we might need to cast or format.
-                    # Actually, standard usage with SQLAlchemy 2.0 and text():
-                    # Just pass the list, but we might need explicit cast in SQL.
-                    # :embedding is passed as parameter.
+                    "id": source_document_id,
+                    "chunk_count": kept + inserted,
+                    "file_hash": file_hash,
+                    "size_bytes": size_bytes,
                 },
             )
+
             await session.commit()
-            return True
+            return {"version": version, "kept": kept, "inserted": inserted, "deleted": deleted}
         except Exception as e:
-            logger.error(f"Failed to insert document chunk for {filename}: {e}")
-            return False
+            await session.rollback()
+            logger.error(f"Failed to replace chunks for {filename}: {e}")
+            return None
+
+
+# ==================================================================================
+# SOURCE DOCUMENTS
+# The per-file catalog. Listing and deleting go through it instead of aggregating
+# or scanning chunk rows; chunk rows reference it (FK, ON DELETE CASCADE).
+# ==================================================================================
+async def list_source_documents(tenant_id: UUID) -> List[Dict[str, Any]]:
+    async for session in get_session():
+        result = await session.execute(
+            text("""
+                SELECT id, filename, chunk_count, size_bytes, status, updated_at
+                FROM source_documents
+                WHERE tenant_id = :tenant_id
+                ORDER BY updated_at DESC
+            """),
+            {"tenant_id": tenant_id},
+        )
+        return [dict(row) for row in result.mappings().all()]
+
+
+async def mark_source_document_pending(tenant_id: UUID, filename: str):
+    """Lists a file as soon as its first ingestion starts (re-ingests keep their status)."""
+    async for session in get_session():
+        await session.execute(
+            text("""
+                INSERT INTO source_documents (tenant_id, filename) VALUES (:tenant_id, :filename)
+                ON CONFLICT (tenant_id, filename) DO NOTHING
+            """),
+            {"tenant_id": tenant_id, "filename": filename},
+        )
+        await session.commit()
+
+
+async def mark_source_document_failed(tenant_id: UUID, filename: str):
+    async for session in get_session():
+        await session.execute(
+            text("""
+                UPDATE source_documents SET status = 'failed', updated_at = now()
+                WHERE tenant_id = :tenant_id AND filename = :filename AND status = 'pending'
+            """),
+            {"tenant_id": tenant_id, "filename": filename},
+        )
+        await session.commit()
+
+
+async def delete_source_document(tenant_id: UUID, document_id: UUID) -> bool:
+    async for session in get_session():
+        await session.execute(
+            text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(tenant_id)}
+        )
+        # Chunks first with tenant_id, so only this tenant's partition is touched
+        await session.execute(
+            text("DELETE FROM documents WHERE tenant_id = :tenant_id AND source_document_id = :id"),
+            {"tenant_id": tenant_id, "id": document_id},
+        )
+        result = await session.execute(
+            text("DELETE FROM source_documents WHERE tenant_id = :tenant_id AND id = :id"),
+            {"tenant_id": tenant_id, "id": document_id},
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
+# ==================================================================================
+# EMBEDDING CACHE
+# Document embeddings keyed by (model_name, task_type, sha256(text)). Not tenant
+# scoped (no RLS): an entry is only reachable by presenting the exact same text.
+# ==================================================================================
+async def get_cached_embeddings(model_name: str, task_type: str, text_hashes: List[str]) -> Dict[str, List[float]]:
+    if not text_hashes:
+        return {}
+    async for session in get_session():
+        try:
+            result = await session.execute(
+                select(EmbeddingCache.text_hash, EmbeddingCache.embedding).where(
+                    EmbeddingCache.model_name == model_name,
+                    EmbeddingCache.task_type == task_type,
+                    EmbeddingCache.text_hash.in_(set(text_hashes)),
+                )
+            )
+            found = {text_hash: [float(x) for x in embedding] for text_hash, embedding in result.all()}
+            if found:
+                # Recency for LRU eviction; skipped for entries touched within the hour
+                # so hot entries don't turn every lookup into a write.
+                await session.execute(
+                    text("""
+                        UPDATE embedding_cache SET last_used_at = now()
+                        WHERE model_name = :model_name AND task_type = :task_type
+                          AND text_hash = ANY(:hashes) AND last_used_at < now() - interval '1 hour'
+                    """),
+                    {"model_name": model_name, "task_type": task_type, "hashes": list(found)},
+                )
+                await session.commit()
+            return found
+        except Exception as e:
+            logger.error(f"Failed to read embedding cache: {e}")
+            return {}
+
+
+async def store_cached_embeddings(model_name: str, task_type: str, embeddings: Dict[str, List[float]]):
+    if not embeddings:
+        return
+    async for session in get_session():
+        try:
+            await session.execute(
+                text("""
+                    INSERT INTO embedding_cache (model_name, task_type, text_hash, embedding)
+                    VALUES (:model_name, :task_type, :text_hash, CAST(:embedding AS vector))
+                    ON CONFLICT (model_name, task_type, text_hash) DO UPDATE SET last_used_at = now()
+                """),
+                [
+                    {"model_name": model_name, "task_type": task_type, "text_hash": h, "embedding": str(e)}
+                    for h, e in embeddings.items()
+                ],
+            )
+            await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to write embedding cache: {e}")
+
+
+async def evict_embedding_cache(max_rows: int) -> int:
+    """Deletes the least recently used entries beyond `max_rows`. Returns rows deleted."""
+    async for session in get_session():
+        try:
+            result = await session.execute(
+                text("""
+                    DELETE FROM embedding_cache
+                    WHERE (model_name, task_type, text_hash) IN (
+                        SELECT model_name, task_type, text_hash FROM embedding_cache
+                        ORDER BY last_used_at DESC
+                        OFFSET :max_rows
+                    )
+                """),
+                {"max_rows": max_rows},
+            )
+            await session.commit()
+            return result.rowcount
+        except Exception as e:
+            logger.error(f"Failed to evict embedding cache: {e}")
+            return 0
+
+
+# ==================================================================================
+# IMAGE DESCRIPTION CACHE
+# VLM descriptions keyed by sha256 of the original image bytes, model and prompt.
+# ==================================================================================
+async def get_cached_image_description(image_hash: str, model_name: str, prompt_hash: str) -> Optional[str]:
+    async for session in get_session():
+        try:
+            result = await session.execute(
+                text("""
+                    SELECT description FROM image_descriptions
+                    WHERE image_hash = :image_hash AND model_name = :model_name AND prompt_hash = :prompt_hash
+                """),
+                {"image_hash": image_hash, "model_name": model_name, "prompt_hash": prompt_hash},
+            )
+            return result.scalar()
+        except Exception as e:
+            logger.error(f"Failed to read image description cache: {e}")
+            return None
+
+
+async def store_cached_image_description(image_hash: str, model_name: str, prompt_hash: str, description: str):
+    async for session in get_session():
+        try:
+            await session.execute(
+                text("""
+                    INSERT INTO image_descriptions (image_hash, model_name, prompt_hash, description)
+                    VALUES (:image_hash, :model_name, :prompt_hash, :description)
+                    ON CONFLICT (image_hash, model_name, prompt_hash) DO UPDATE SET description = EXCLUDED.description
+                """),
+                {
+                    "image_hash": image_hash,
+                    "model_name": model_name,
+                    "prompt_hash": prompt_hash,
+                    "description": description,
+                },
+            )
+            await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to write image description cache: {e}")
+
+
+async def update_fts_config_batch(
+    tenant_id: UUID, fts_config: str, batch_size: int, after_id: Optional[UUID] = None
+) -> Tuple[int, Optional[UUID]]:
+    """Re-targets the next `batch_size` chunks (by id, after `after_id`) to a new text search config.
+
+    Pages through the tenant's partition by primary key, so each batch is an index range
+    scan and rows that already have the config are stepped over instead of re-read by
+    every batch. fts_vector is recomputed by the documents trigger as part of the
+    UPDATE. Returns (rows updated, last id of the page); the id is None once the
+    partition is exhausted.
+    """
+    async for session in get_session():
+        await session.execute(
+            text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(tenant_id)}
+        )
+        result = await session.execute(
+            text("""
+                WITH page AS (
+                    SELECT id FROM documents
+                    WHERE tenant_id = :tenant_id AND (CAST(:after_id AS uuid) IS NULL OR id > :after_id)
+                    ORDER BY id
+                    LIMIT :batch_size
+                ),
+                batch AS (
+                    SELECT d.id FROM documents d JOIN page ON page.id = d.id
+                    WHERE d.tenant_id = :tenant_id AND d.fts_config <> CAST(:fts_config AS regconfig)
+                    FOR UPDATE OF d
+                ),
+                updated AS (
+                    UPDATE documents d
+                    SET fts_config = CAST(:fts_config AS regconfig)
+                    FROM batch
+                    WHERE d.tenant_id = :tenant_id AND d.id = batch.id
+                    RETURNING d.id
+                )
+                SELECT (SELECT count(*) FROM updated) AS updated,
+                       (SELECT id FROM page ORDER BY id DESC LIMIT 1) AS last_id
+            """),
+            {"tenant_id": tenant_id, "fts_config": fts_config, "batch_size": batch_size, "after_id": after_id},
+        )
+        row = result.one()
+        await session.commit()
+        return row.updated, row.last_id
+
+
+async def finish_fts_backfill(tenant_id: UUID, fts_config: str) -> bool:
+    """Clears the tenant's pending FTS backfill, so queries switch to `fts_config`.
+
+    Only clears a marker for the same target (or the migration's marker, which has none);
+    a backfill superseded by a newer language change leaves the newer marker alone.
+    """
+    async for session in get_session():
+        result = await session.execute(
+            text("""
+                UPDATE tenants SET settings = settings - 'fts_backfill'
+                WHERE id = :tenant_id
+                  AND settings->'fts_backfill' IS NOT NULL
+                  AND COALESCE(settings->'fts_backfill'->>'to', :fts_config) = :fts_config
+            """),
+            {"tenant_id": tenant_id, "fts_config": fts_config},
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
+# Hybrid search with RRF (Reciprocal Rank Fusion).
+# - Each branch orders and limits *before* ranking, so ROW_NUMBER only runs over
+#   `limit` rows and the vector branch can walk the HNSW index.
+# - The tsquery is evaluated once (FROM-clause function) and reused for match + rank.
+# - Branches are fused with a FULL OUTER JOIN; only the final `limit` ids are joined
+#   back to `documents` to fetch content.
+# Note: We use CAST(:embedding AS vector) because parameter passing might be typeless string/json.
+RRF_K = 60
+
+
+# ==================================================================================
+# VECTOR STORAGE MODES
+# Full-precision vectors always stay in the heap; the mode picks which HNSW index the
+# ANN scan walks. Each tenant partition has the index of its own mode only
+# (src.services.vector_indexes):
+# - full:    vector(768) index, float32 (~3 KB per chunk)
+# - halfvec: halfvec(768) expression index, float16 (half the size, near-identical recall)
+# - binary:  bit(768) expression index via binary_quantize (1/32 of the size, coarse ordering)
+# Compact modes over-fetch `limit * rescore_factor` candidates from the compact index
+# and rescore them against the full-precision vectors.
+# ==================================================================================
+VECTOR_STORAGE_MODES = ("full", "halfvec", "binary")
+
+_COMPACT_ORDER_BY = {
+    "halfvec": "CAST(embedding AS halfvec(768)) <=> CAST(:embedding AS halfvec(768))",
+    "binary": "CAST(binary_quantize(embedding) AS bit(768)) <~> binary_quantize(CAST(:embedding AS vector))",
+}
+
+# Index definitions per mode (the expressions must match the ORDER BY above)
+VECTOR_INDEX_DEFINITIONS = {
+    "full": "embedding vector_cosine_ops",
+    "halfvec": "(CAST(embedding AS halfvec(768))) halfvec_cosine_ops",
+    "binary": "(CAST(binary_quantize(embedding) AS bit(768))) bit_hamming_ops",
+}
+
+
+# ==================================================================================
+# METADATA FILTER
+# Optional JSONB containment filter, e.g. {"original_type": "text", "tags": ["pricing"]}
+# (arrays match chunks whose array contains every listed value). It is added to the
+# WHERE clause of both branches, so it narrows the candidates instead of trimming the
+# fused result: a selective filter can be answered from the GIN index alone, and the
+# HNSW scan keeps going past filtered-out rows when iterative_scan is enabled.
+# Unfiltered queries use SQL without the clause (no catch-all `IS NULL OR` that would
+# hide the index from the planner).
+# ==================================================================================
+def _metadata_filter_sql(filtered: bool, alias: str = "") -> str:
+    return f"AND {alias}metadata @> CAST(:metadata_filter AS jsonb)" if filtered else ""
+
+
+def build_vector_search_sql(storage: str = "full", filtered: bool = False) -> str:
+    """ANN candidates ordered by cosine distance (the vector branch of the hybrid query)."""
+    metadata_filter = _metadata_filter_sql(filtered)
+    if storage not in _COMPACT_ORDER_BY:
+        return f"""
+        SELECT id, embedding <=> CAST(:embedding AS vector) AS distance
+        FROM documents
+        WHERE tenant_id = :tenant_id {metadata_filter}
+        ORDER BY embedding <=> CAST(:embedding AS vector)
+        LIMIT :limit
+    """
+    return f"""
+        SELECT id, embedding <=> CAST(:embedding AS vector) AS distance
+        FROM (
+            SELECT id, embedding
+            FROM documents
+            WHERE tenant_id = :tenant_id {metadata_filter}
+            ORDER BY {_COMPACT_ORDER_BY[storage]}
+            LIMIT :candidates
+        ) c
+        ORDER BY distance
+        LIMIT :limit
+    """
+
+
+def build_hybrid_search_sql(storage: str = "full", filtered: bool = False) -> str:
+    metadata_filter = _metadata_filter_sql(filtered, alias="d.")
+    return f"""
+    WITH vector_search AS (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY distance) AS rank
+        FROM ({build_vector_search_sql(storage, filtered)}) v
+    ),
+    keyword_search AS (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY kw_rank DESC) AS rank
+        FROM (
+            SELECT d.id, ts_rank_cd(d.fts_vector, q.tsq) AS kw_rank
+            FROM documents d, websearch_to_tsquery(CAST(:fts_config AS regconfig), :query_text) AS q(tsq)
+            WHERE d.tenant_id = :tenant_id AND d.fts_vector @@ q.tsq {metadata_filter}
+            ORDER BY kw_rank DESC
+            LIMIT :limit
+        ) k
+    ),
+    fused AS (
+        SELECT
+            COALESCE(vs.id, ks.id) AS id,
+            COALESCE(1.0 / (vs.rank + :rrf_k), 0.0) + COALESCE(1.0 / (ks.rank + :rrf_k), 0.0) AS score
+        FROM vector_search vs
+        FULL OUTER JOIN keyword_search ks ON vs.id = ks.id
+        ORDER BY score DESC
+        LIMIT :limit
+    )
+    SELECT d.id, d.filename, d.content, f.score, d.metadata
+    FROM fused f
+    JOIN documents d ON d.tenant_id = :tenant_id AND d.id = f.id
+    ORDER BY f.score DESC;
+    """
+
+
+HYBRID_SEARCH_SQL = build_hybrid_search_sql()
+_HYBRID_SEARCH_SQL_BY_STORAGE = {
+    (mode, filtered): build_hybrid_search_sql(mode, filtered)
+    for mode in VECTOR_STORAGE_MODES
+    for filtered in (False, True)
+}
+
+
+def build_vector_results_sql(storage: str = "full", filtered: bool = False) -> str:
+    """Vector branch alone, joined back to content (score = cosine similarity)."""
+    return f"""
+    SELECT d.id, d.filename, d.content, 1 - v.distance AS score, d.metadata
+    FROM ({build_vector_search_sql(storage, filtered)}) v
+    JOIN documents d ON d.tenant_id = :tenant_id AND d.id = v.id
+    ORDER BY v.distance;
+    """
+
+
+_VECTOR_RESULTS_SQL_BY_STORAGE = {
+    (mode, filtered): build_vector_results_sql(mode, filtered)
+    for mode in VECTOR_STORAGE_MODES
+    for filtered in (False, True)
+}
+
+
+def vector_search_params(settings: Optional[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+    """Storage mode + over-fetch size for the vector branch."""
+    settings = settings or {}
+    # The mode the tenant's partition is indexed for; differs from vector_storage while a switch is built
+    storage = settings.get("query_vector_storage") or settings.get("vector_storage") or "full"
+    if storage not in VECTOR_STORAGE_MODES:
+        storage = "full"
+    rescore_factor = max(1, int(settings.get("rescore_factor") or 1))
+    return {"storage": storage, "candidates": limit * rescore_factor}
+
+
+# ==================================================================================
+# RETRIEVAL SETTINGS (per tenant)
+# - ef_search: HNSW candidate list size. Higher = better recall, slower scans.
+# - iterative_scan: pgvector >= 0.8. Keeps scanning the index when a filter removes
+#   candidates, so the query still returns `limit` rows.
+# All values are transaction-local (set_config(..., true)), so pooled connections
+# never leak one tenant's settings into another's query.
+# ==================================================================================
+ITERATIVE_SCAN_MODES = ("off", "relaxed_order", "strict_order")
+
+
+async def apply_search_settings(session, settings: Optional[Dict[str, Any]]):
+    if not settings:
+        return
+    ef_search = settings.get("ef_search")
+    if ef_search:
+        await session.execute(
+            text("SELECT set_config('hnsw.ef_search', :value, true)"), {"value": str(int(ef_search))}
+        )
+    iterative_scan = settings.get("iterative_scan") or "off"
+    # Only touch the iterative-scan GUCs when enabled: they do not exist before pgvector 0.8.
+    if iterative_scan != "off":
+        await session.execute(
+            text("SELECT set_config('hnsw.iterative_scan', :value, true)"), {"value": iterative_scan}
+        )
+        max_scan_tuples = settings.get("max_scan_tuples")
+        if max_scan_tuples:
+            await session.execute(
+                text("SELECT set_config('hnsw.max_scan_tuples', :value, true)"),
+                {"value": str(int(max_scan_tuples))},
+            )
 
 
 async def search_documents_hybrid(
-    tenant_id: UUID, query_embedding: List[float], query_text: str, limit: int
+    tenant_id: UUID,
+    query_embedding: List[float],
+    query_text: str,
+    limit: int,
+    settings: Optional[Dict[str, Any]] = None,
+    metadata_filter: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
     results = []
     async for session in get_session():
@@ -89,35 +632,11 @@ async def search_documents_hybrid(
             await session.execute(
                 text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(tenant_id)}
             )
-            # Hybrid search with RRF (Reciprocal Rank Fusion)
-            # Note: We use CAST(:embedding AS vector) because parameter passing might be typeless string/json.
-            stmt = text("""
-                WITH vector_search AS (
-                    SELECT id, ROW_NUMBER() OVER (ORDER BY embedding <=> :embedding) as rank
-                    FROM documents
-                    WHERE tenant_id = :tenant_id
-                    ORDER BY embedding <=> :embedding
-                    LIMIT :limit
-                ),
-                keyword_search AS (
-                    SELECT id, ROW_NUMBER() OVER (ORDER BY ts_rank_cd(fts_vector, websearch_to_tsquery('english', :query_text)) DESC) as rank
-                    FROM documents
-                    WHERE tenant_id = :tenant_id AND fts_vector @@ websearch_to_tsquery('english', :query_text)
-                    LIMIT :limit
-                )
-                SELECT
-                    d.id, d.filename, d.content,
-                    COALESCE(1.0 / (vs.rank + 60), 0.0) + COALESCE(1.0 / (ks.rank + 60), 0.0) as score
-                FROM documents d
-                LEFT JOIN vector_search vs ON d.id = vs.id
-                LEFT JOIN keyword_search ks ON d.id = ks.id
-                WHERE vs.id IS NOT NULL OR ks.id IS NOT NULL
-                ORDER BY score DESC
-                LIMIT :limit;
-            """)
-
+            await apply_search_settings(session, settings)
+            vector_params = vector_search_params(settings, limit)
+            filtered = bool(metadata_filter)
             result = await session.execute(
-                stmt,
+                text(_HYBRID_SEARCH_SQL_BY_STORAGE[(vector_params["storage"], filtered)]),
                 {
                     "embedding": str(
                         query_embedding
@@ -125,6 +644,13 @@ async def search_documents_hybrid(
                     "tenant_id": tenant_id,
                     "limit": limit,
                     "query_text": query_text,
+                    "rrf_k": RRF_K,
+                    "candidates": vector_params["candidates"],
+                    # Must match the config the chunks were indexed with
+                    "fts_config": (settings or {}).get("query_fts_config")
+                    or (settings or {}).get("fts_config")
+                    or "english",
+                    "metadata_filter": json.dumps(metadata_filter) if filtered else None,
                 },
             )
 
@@ -137,9 +663,404 @@ async def search_documents_hybrid(
                         "filename": row[1],
                         "content": row[2],
                         "score": float(row[3]),
+                        "metadata": row[4] or {},
                     }
                 )
         except Exception as e:
             logger.error(f"Hybrid search failed: {e}")
 
     return results
+
+
+async def search_documents_vector(
+    tenant_id: UUID,
+    query_embedding: List[float],
+    limit: int,
+    settings: Optional[Dict[str, Any]] = None,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Semantic-only search, for query variants (HyDE) whose keywords are not worth matching."""
+    results = []
+    async for session in get_session():
+        try:
+            await session.execute(
+                text("SELECT set_config('app.current_tenant', :tenant_id, false)"), {"tenant_id": str(tenant_id)}
+            )
+            await apply_search_settings(session, settings)
+            vector_params = vector_search_params(settings, limit)
+            filtered = bool(metadata_filter)
+            result = await session.execute(
+                text(_VECTOR_RESULTS_SQL_BY_STORAGE[(vector_params["storage"], filtered)]),
+                {
+                    "embedding": str(query_embedding),
+                    "tenant_id": tenant_id,
+                    "limit": limit,
+                    "candidates": vector_params["candidates"],
+                    "metadata_filter": json.dumps(metadata_filter) if filtered else None,
+                },
+            )
+            for row in result.fetchall():
+                results.append(
+                    {
+                        "id": str(row[0]),
+                        "filename": row[1],
+                        "content": row[2],
+                        "score": float(row[3]),
+                        "metadata": row[4] or {},
+                    }
+                )
+        except Exception as e:
+            logger.error(f"Vector search failed: {e}")
+
+    return results
+
+
+# ==================================================================================
+# TENANT PARTITIONS
+# `documents` is LIST-partitioned by tenant_id (one partition per tenant), so:
+# - vector/FTS search prunes to a single partition and walks only that tenant's
+#   HNSW + GIN indexes,
+# - deleting a tenant is a partition drop instead of a cascading row delete.
+# Rows for tenants without a partition land in `documents_default`; creating the
+# partition later moves them over.
+# ==================================================================================
+_known_partitions = set()
+
+
+def tenant_partition_name(tenant_id: UUID) -> str:
+    # Must match the naming used in the partitioning migration
+    return f"documents_t_{UUID(str(tenant_id)).hex}"
+
+
+def vector_index_name(partition: str, storage: str) -> str:
+    # Must match the naming used in the partitioning migration
+    return f"{partition}_{storage}_hnsw"
+
+
+async def ensure_tenant_partition(tenant_id: UUID):
+    tenant_id = UUID(str(tenant_id))
+    name = tenant_partition_name(tenant_id)
+    if name in _known_partitions:
+        return
+
+    async with engine.begin() as conn:
+        # Serialize concurrent creators (e.g. two uploads for a brand-new tenant)
+        await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": name})
+        exists = await conn.execute(text("SELECT to_regclass(:name)"), {"name": name})
+        if exists.scalar() is None:
+            logger.info(f"Creating document partition {name}")
+            # Build detached, move stray rows out of the default partition, then attach.
+            # Attaching validates that the default partition no longer holds this tenant.
+            await conn.execute(
+                text(f"CREATE TABLE {name} (LIKE documents INCLUDING DEFAULTS INCLUDING GENERATED)")
+            )
+            columns = await conn.execute(
+                text(
+                    "SELECT column_name FROM information_schema.columns "
+                    "WHERE table_name = 'documents' AND is_generated = 'NEVER' ORDER BY ordinal_position"
+                )
+            )
+            column_list = ", ".join(row[0] for row in columns.fetchall())
+            await conn.execute(
+                text(f"""
+                    WITH moved AS (
+                        DELETE FROM documents_default WHERE tenant_id = :tenant_id RETURNING {column_list}
+                    )
+                    INSERT INTO {name} ({column_list}) SELECT {column_list} FROM moved
+                """),
+                {"tenant_id": tenant_id},
+            )
+            # HNSW is per partition, for the mode the tenant's queries use
+            result = await conn.execute(
+                text("SELECT settings->>'vector_index' FROM tenants WHERE id = :tenant_id"), {"tenant_id": tenant_id}
+            )
+            storage = result.scalar()
+            if storage not in VECTOR_INDEX_DEFINITIONS:
+                storage = "full"
+            await conn.execute(
+                text(
+                    f"CREATE INDEX {vector_index_name(name, storage)} ON {name} "
+                    f"USING hnsw ({VECTOR_INDEX_DEFINITIONS[storage]})"
+                )
+            )
+            await conn.execute(
+                text(f"ALTER TABLE documents ATTACH PARTITION {name} FOR VALUES IN ('{tenant_id}')")
+            )
+
+    _known_partitions.add(name)
+
+
+async def delete_tenant_and_partition(tenant_id: UUID):
+    """Drops the tenant's partition and deletes the tenant (cascading to its catalog) in one transaction."""
+    name = tenant_partition_name(tenant_id)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            await conn.execute(text("DELETE FROM tenants WHERE id = :id"), {"id": tenant_id})
+        _known_partitions.discard(name)
+        logger.info(f"Deleted tenant {tenant_id} and dropped document partition {name}")
+    except Exception as e:
+        logger.error(f"Failed to delete tenant {tenant_id}: {e}")
+        raise
+
+
+# ==================================================================================
+# PER-TENANT VECTOR INDEX
+# Index builds and drops use CONCURRENTLY, which cannot run inside a transaction, so
+# they get their own AUTOCOMMIT connection. Only ever called for a single partition.
+# ==================================================================================
+@asynccontextmanager
+async def vector_index_lock(partition: str):
+    """Serializes index switches for one partition.
+
+    Session-level advisory lock on an AUTOCOMMIT connection: holding a transaction open
+    would make every concurrent index build wait for it.
+    """
+    key = {"key": f"{partition}:vector_index"}
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("SELECT pg_advisory_lock(hashtext(:key))"), key)
+        try:
+            yield
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), key)
+
+
+async def create_vector_index(partition: str, storage: str) -> bool:
+    """Builds the partition's HNSW index for `storage` without blocking reads or writes.
+
+    A build interrupted earlier leaves an INVALID index behind; it is dropped and built
+    again. Returns False when a valid index already existed.
+    """
+    name = vector_index_name(partition, storage)
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        result = await conn.execute(
+            text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+        )
+        valid = result.scalar()
+        if valid:
+            return False
+        if valid is not None:
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        await conn.execute(
+            text(f"CREATE INDEX CONCURRENTLY {name} ON {partition} USING hnsw ({VECTOR_INDEX_DEFINITIONS[storage]})")
+        )
+        return True
+
+
+async def drop_vector_indexes(partition: str, keep: Optional[str]) -> None:
+    """Drops the partition's HNSW indexes for every mode except `keep` (all of them for None)."""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for storage in VECTOR_STORAGE_MODES:
+            if storage != keep:
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {vector_index_name(partition, storage)}"))
+
+
+async def set_tenant_vector_index(tenant_id: UUID, storage: str) -> None:
+    """Records the mode the tenant's partition is indexed for; queries switch to it."""
+    async for session in get_session():
+        await session.execute(
+            text("""
+                UPDATE tenants SET settings = jsonb_set(settings, '{vector_index}', to_jsonb(CAST(:storage AS text)))
+                WHERE id = :tenant_id
+            """),
+            {"tenant_id": tenant_id, "storage": storage},
+        )
+        await session.commit()
+
+
+# ==================================================================================
+# INGESTION JOBS
+# A Postgres-backed work queue. Workers claim with FOR UPDATE SKIP LOCKED, so any
+# number of workers (in any number of processes) never pick the same job. A running
+# job whose heartbeat goes stale (worker crashed / restarted) is claimed again and
+# resumes from its checkpoint.
+# ==================================================================================
+INGESTION_JOB_COLUMNS = (
+    "status", "stage", "total_bytes", "processed_bytes", "total_chunks", "total_batches", "completed_batches",
+    "error", "result", "finished_at",
+)
+
+
+async def create_ingestion_job(
+    tenant_id: UUID,
+    filename: str,
+    spool_path: str,
+    file_hash: Optional[str] = None,
+    batch_id: Optional[UUID] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> UUID:
+    job_ids = await create_ingestion_jobs(
+        tenant_id,
+        [{"filename": filename, "spool_path": spool_path, "file_hash": file_hash, "metadata": metadata}],
+        batch_id,
+    )
+    return job_ids[0]
+
+
+async def create_ingestion_jobs(
+    tenant_id: UUID, files: List[Dict[str, Any]], batch_id: Optional[UUID] = None
+) -> List[UUID]:
+    """Queues one job per {filename, spool_path, file_hash, metadata} in a single transaction."""
+    async for session in get_session():
+        job_ids = []
+        for file in files:
+            result = await session.execute(
+                text("""
+                    INSERT INTO ingestion_jobs (tenant_id, filename, spool_path, file_hash, batch_id, metadata)
+                    VALUES (:tenant_id, :filename, :spool_path, :file_hash, :batch_id, CAST(:metadata AS jsonb))
+                    RETURNING id
+                """),
+                {
+                    "tenant_id": tenant_id,
+                    "batch_id": batch_id,
+                    "filename": file["filename"],
+                    "spool_path": file["spool_path"],
+                    "file_hash": file.get("file_hash"),
+                    "metadata": json.dumps(file.get("metadata") or {}),
+                },
+            )
+            job_ids.append(result.scalar_one())
+        await session.commit()
+        return job_ids
+
+
+async def get_latest_file_uploads(tenant_id: UUID, filenames: List[str]) -> Dict[str, Dict[str, Any]]:
+    """{file_hash, metadata} of the most recent non-failed upload of each filename (queued, running or completed)."""
+    if not filenames:
+        return {}
+    async for session in get_session():
+        result = await session.execute(
+            text("""
+                SELECT DISTINCT ON (filename) filename, file_hash, metadata
+                FROM ingestion_jobs
+                WHERE tenant_id = :tenant_id AND filename = ANY(:filenames) AND status <> 'failed'
+                ORDER BY filename, created_at DESC
+            """),
+            {"tenant_id": tenant_id, "filenames": filenames},
+        )
+        return {
+            filename: {"file_hash": file_hash, "metadata": metadata or {}}
+            for filename, file_hash, metadata in result.fetchall()
+            if file_hash
+        }
+
+
+async def claim_ingestion_job(
+    worker_id: str, stale_after_seconds: int, max_attempts: int, max_running_per_tenant: int
+) -> Optional[Dict[str, Any]]:
+    async for session in get_session():
+        # Jobs that keep killing their worker are given up on instead of reclaimed forever
+        await session.execute(
+            text("""
+                UPDATE ingestion_jobs
+                SET status = 'failed', finished_at = now(),
+                    error = COALESCE(error, 'Worker stopped responding') || ' (attempts exhausted)'
+                WHERE status = 'running' AND attempts >= :max_attempts
+                  AND heartbeat_at < now() - make_interval(secs => :stale)
+            """),
+            {"stale": stale_after_seconds, "max_attempts": max_attempts},
+        )
+        result = await session.execute(
+            text("""
+                UPDATE ingestion_jobs
+                SET status = 'running', worker_id = :worker_id, heartbeat_at = now(),
+                    started_at = COALESCE(started_at, now()), attempts = attempts + 1
+                WHERE id = (
+                    SELECT j.id FROM ingestion_jobs j
+                    WHERE (j.status = 'queued'
+                       OR (j.status = 'running' AND j.heartbeat_at < now() - make_interval(secs => :stale)))
+                      -- A large bulk sync for one tenant must not occupy every worker
+                      AND (
+                        SELECT count(*) FROM ingestion_jobs r
+                        WHERE r.tenant_id = j.tenant_id AND r.status = 'running'
+                          AND r.heartbeat_at >= now() - make_interval(secs => :stale)
+                      ) < :max_running_per_tenant
+                    ORDER BY j.created_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING *
+            """),
+            {"worker_id": worker_id, "stale": stale_after_seconds, "max_running_per_tenant": max_running_per_tenant},
+        )
+        job = result.mappings().first()
+        await session.commit()
+        return dict(job) if job else None
+
+
+async def update_ingestion_job(job_id: UUID, **fields):
+    """Updates progress/state columns and refreshes the heartbeat."""
+    unknown = set(fields) - set(INGESTION_JOB_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown ingestion job fields: {unknown}")
+
+    assignments = ["heartbeat_at = now()"]
+    params: Dict[str, Any] = {"id": job_id}
+    for column, value in fields.items():
+        if column == "result":
+            assignments.append("result = CAST(:result AS jsonb)")
+            value = json.dumps(value) if value is not None else None
+        else:
+            assignments.append(f"{column} = :{column}")
+        params[column] = value
+
+    async for session in get_session():
+        await session.execute(
+            text(f"UPDATE ingestion_jobs SET {', '.join(assignments)} WHERE id = :id"), params
+        )
+        await session.commit()
+
+
+# Staged embeddings: written by the embed pass before each checkpoint, read by the
+# insert pass. Errors propagate, so a batch is never checkpointed without them.
+async def store_job_embeddings(job_id: UUID, embeddings: Dict[str, List[float]]):
+    if not embeddings:
+        return
+    async for session in get_session():
+        await session.execute(
+            text("""
+                INSERT INTO ingestion_job_embeddings (job_id, content_hash, embedding)
+                VALUES (:job_id, :content_hash, CAST(:embedding AS vector))
+                ON CONFLICT (job_id, content_hash) DO NOTHING
+            """),
+            [{"job_id": job_id, "content_hash": h, "embedding": str(e)} for h, e in embeddings.items()],
+        )
+        await session.commit()
+
+
+async def get_job_embeddings(job_id: UUID, content_hashes: Set[str]) -> Dict[str, List[float]]:
+    if not content_hashes:
+        return {}
+    async for session in get_session():
+        result = await session.execute(
+            select(IngestionJobEmbedding.content_hash, IngestionJobEmbedding.embedding).where(
+                IngestionJobEmbedding.job_id == job_id,
+                IngestionJobEmbedding.content_hash.in_(content_hashes),
+            )
+        )
+        return {h: [float(x) for x in embedding] for h, embedding in result.all()}
+
+
+async def delete_job_embeddings(job_id: UUID):
+    async for session in get_session():
+        await session.execute(text("DELETE FROM ingestion_job_embeddings WHERE job_id = :job_id"), {"job_id": job_id})
+        await session.commit()
+
+
+async def get_ingestion_job(job_id: UUID) -> Optional[Dict[str, Any]]:
+    async for session in get_session():
+        result = await session.execute(text("SELECT * FROM ingestion_jobs WHERE id = :id"), {"id": job_id})
+        job = result.mappings().first()
+        return dict(job) if job else None
+
+
+async def get_ingestion_batch(batch_id: UUID) -> List[Dict[str, Any]]:
+    async for session in get_session():
+        result = await session.execute(
+            text("SELECT * FROM ingestion_jobs WHERE batch_id = :batch_id ORDER BY created_at, filename"),
+            {"batch_id": batch_id},
+        )
+        return [dict(row) for row in result.mappings().all()]
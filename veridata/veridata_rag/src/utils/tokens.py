@@ -0,0 +1,17 @@
+from functools import lru_cache
+from typing import Callable, List
+
+from llama_index.core.utils import get_tokenizer
+
+
+# Same tokenizer LlamaIndex's splitters count with, so chunk sizes computed here and
+# by SentenceSplitter agree.
+@lru_cache(maxsize=1)
+def _tokenizer() -> Callable[[str], List[int]]:
+    return get_tokenizer()
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return len(_tokenizer()(text))
@@ -0,0 +1,101 @@
+import json
+import logging
+
+from src.services import adaptive_retrieval
+from src.services.adaptive_retrieval import (
+    DEFAULT_ADAPTIVE_RETRIEVAL,
+    assess_scores,
+    candidate_limits,
+    get_adaptive_retrieval_settings,
+    log_decision,
+)
+
+SETTINGS = {**DEFAULT_ADAPTIVE_RETRIEVAL, "enabled": True}
+
+
+def test_disabled_by_default():
+    assert get_adaptive_retrieval_settings()["enabled"] is False
+
+
+def test_disabled_keeps_the_fixed_pool_sizes():
+    settings = {**SETTINGS, "enabled": False}
+
+    assert candidate_limits(5, use_rerank=False, settings=settings) == (5, 5)
+    assert candidate_limits(5, use_rerank=True, settings=settings) == (20, 20)
+
+
+def test_enabled_starts_small_and_can_widen():
+    assert candidate_limits(5, use_rerank=True, settings=SETTINGS) == (10, 30)
+    # Always one more than limit, so the boundary at `limit` can be read
+    assert candidate_limits(5, use_rerank=True, settings={**SETTINGS, "initial_candidates_factor": 1}) == (6, 30)
+
+
+def test_gap_cuts_the_results_and_is_decisive():
+    scores = [0.033, 0.032, 0.016, 0.015, 0.014, 0.013]
+
+    assessment = assess_scores(scores, limit=5, candidate_limit=10, settings=SETTINGS)
+
+    assert assessment == {"keep": 2, "decisive": True, "flat": False, "reason": "gap_after_2"}
+
+
+def test_gap_never_keeps_fewer_than_min_results():
+    scores = [0.033, 0.016, 0.015, 0.014, 0.013, 0.012]
+
+    assessment = assess_scores(scores, limit=5, candidate_limit=10, settings={**SETTINGS, "min_results": 3})
+
+    assert assessment["keep"] == 3
+    assert assessment["reason"] == "gap_after_1"
+
+
+def test_sharp_boundary_at_limit_is_decisive_without_cutting():
+    scores = [0.033, 0.032, 0.031, 0.030, 0.029, 0.015]
+
+    assessment = assess_scores(scores, limit=5, candidate_limit=10, settings=SETTINGS)
+
+    assert assessment == {"keep": 5, "decisive": True, "flat": False, "reason": "dominant_top_k"}
+
+
+def test_flat_full_pool_asks_for_more_candidates():
+    scores = [0.0164 - i * 0.0001 for i in range(10)]
+
+    assessment = assess_scores(scores, limit=5, candidate_limit=10, settings=SETTINGS)
+
+    assert assessment["flat"] is True
+    assert assessment["decisive"] is False
+
+
+def test_short_pool_is_never_flat():
+    scores = [0.0164 - i * 0.0001 for i in range(7)]
+
+    assessment = assess_scores(scores, limit=5, candidate_limit=10, settings=SETTINGS)
+
+    assert assessment == {"keep": 5, "decisive": False, "flat": False, "reason": "default"}
+
+
+def test_empty_scores():
+    assert assess_scores([], limit=5, candidate_limit=10, settings=SETTINGS)["reason"] == "empty"
+
+
+def test_tenant_settings_override_config(monkeypatch):
+    monkeypatch.setattr(
+        adaptive_retrieval, "get_config", lambda: {"adaptive_retrieval_config": {"gap_ratio": 2.0, "min_results": 3}}
+    )
+
+    settings = get_adaptive_retrieval_settings({"adaptive_retrieval": {"gap_ratio": 1.2, "min_results": ""}})
+
+    assert settings["gap_ratio"] == 1.2
+    assert settings["min_results"] == 3
+    assert settings["flat_spread"] == DEFAULT_ADAPTIVE_RETRIEVAL["flat_spread"]
+
+
+def test_decision_is_logged_as_one_json_line(caplog):
+    assessment = {"keep": 2, "decisive": True, "flat": False, "reason": "gap_after_2"}
+
+    with caplog.at_level(logging.INFO, logger=adaptive_retrieval.__name__):
+        log_decision("t1", "refund policy", [0.0331234, 0.01], assessment, SETTINGS, reranked=False)
+
+    record = json.loads(caplog.records[-1].getMessage().removeprefix("Adaptive retrieval "))
+    assert record["scores"] == [0.03312, 0.01]
+    assert record["reranked"] is False
+    assert "enabled" not in record["thresholds"]
+    assert record["query_chars"] == len("refund policy")
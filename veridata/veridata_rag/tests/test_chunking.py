@@ -0,0 +1,162 @@
+from uuid import uuid4
+
+from src.services import chunking
+from src.services.chunking import (
+    AutoChunker,
+    FAQChunker,
+    MarkdownChunker,
+    SentenceChunker,
+    get_chunker,
+    iter_chunk_batches,
+    iter_text_file,
+    normalize_chunking_settings,
+)
+from src.utils.tokens import count_tokens
+
+MARKDOWN = """# Knowledge Base
+
+## Shipping
+We ship to Portugal and Spain. Delivery takes three to five working days.
+
+## Returns
+### Refunds
+Refunds are accepted within 30 days with the receipt.
+"""
+
+FAQ = """# Help
+
+**How do I reset my password?**
+Use the link on the login page.
+
+**Can I change my plan?**
+Yes, from the billing page.
+
+Q: Do you ship abroad?
+Only to Portugal and Spain.
+"""
+
+
+def _settings(**overrides):
+    return normalize_chunking_settings({"min_chunk_tokens": 0, **overrides})
+
+
+def test_settings_fall_back_to_defaults_and_are_clamped():
+    settings = normalize_chunking_settings({"strategy": "unknown", "chunk_size": "10", "chunk_overlap": 500})
+
+    assert settings["strategy"] == "sentence"
+    assert settings["chunk_size"] == 64
+    assert settings["chunk_overlap"] == 32
+    assert normalize_chunking_settings({"chunk_size": ""})["chunk_size"] == chunking.DEFAULT_CHUNKING["chunk_size"]
+
+
+def test_get_chunker_picks_the_strategy():
+    metadata = {"filename": "a.md"}
+
+    assert isinstance(get_chunker(None, metadata), SentenceChunker)
+    assert type(get_chunker({"strategy": "markdown"}, metadata)) is MarkdownChunker
+    assert isinstance(get_chunker({"strategy": "faq"}, metadata), FAQChunker)
+    assert isinstance(get_chunker({"strategy": "auto"}, metadata), AutoChunker)
+
+
+def test_markdown_prefixes_each_section_with_its_heading_path():
+    chunks = list(MarkdownChunker(_settings()).split(MARKDOWN))
+
+    assert chunks == [
+        "Knowledge Base > Shipping\nWe ship to Portugal and Spain. Delivery takes three to five working days.",
+        "Knowledge Base > Returns > Refunds\nRefunds are accepted within 30 days with the receipt.",
+    ]
+
+
+def test_markdown_ignores_headings_inside_code_fences():
+    text = "# Setup\n```\n# not a heading\n```\nRun it."
+
+    chunks = list(MarkdownChunker(_settings()).split(text))
+
+    assert chunks == ["Setup\n```\n# not a heading\n```\nRun it."]
+
+
+def test_markdown_merges_small_sections_forward():
+    chunks = list(MarkdownChunker(_settings(min_chunk_tokens=100)).split(MARKDOWN))
+
+    assert len(chunks) == 1
+    assert "Knowledge Base > Shipping" in chunks[0]
+    assert "Knowledge Base > Returns > Refunds" in chunks[0]
+
+
+def test_markdown_splits_oversized_sections_and_keeps_the_path():
+    body = " ".join(f"Sentence number {i} describes the refund process in detail." for i in range(80))
+    chunker = MarkdownChunker(_settings(chunk_size=128, chunk_overlap=0))
+
+    chunks = list(chunker.split(f"# Policies\n## Refunds\n{body}"))
+
+    assert len(chunks) > 1
+    assert all(chunk.startswith("Policies > Refunds\n") for chunk in chunks)
+    assert all(count_tokens(chunk) <= 128 for chunk in chunks)
+
+
+def test_markdown_heading_path_carries_across_segments():
+    chunker = MarkdownChunker(_settings())
+
+    list(chunker.split("# Manual\n## Install\nDownload the package."))
+    chunks = list(chunker.split("Then run the installer."))
+
+    assert chunks == ["Manual > Install\nThen run the installer."]
+
+
+def test_faq_keeps_each_question_with_its_answer():
+    chunks = list(FAQChunker(_settings()).split(FAQ))
+
+    assert chunks == [
+        "Help\n**How do I reset my password?**\nUse the link on the login page.",
+        "Help\n**Can I change my plan?**\nYes, from the billing page.",
+        "Help\nQ: Do you ship abroad?\nOnly to Portugal and Spain.",
+    ]
+
+
+def test_auto_picks_the_strategy_from_the_content():
+    def picked(text):
+        chunker = AutoChunker(_settings(), {"filename": "doc"})
+        list(chunker.split(text))
+        return type(chunker.chunker)
+
+    assert picked(FAQ) is FAQChunker
+    assert picked(MARKDOWN) is MarkdownChunker
+    assert picked("Plain text without any structure. Just sentences.") is SentenceChunker
+
+
+def test_iter_text_file_cuts_segments_at_paragraphs(tmp_path):
+    paragraphs = [f"Paragraph {i} " + "word " * 30 for i in range(50)]
+    path = tmp_path / "doc.txt"
+    path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+
+    segments = list(iter_text_file(str(path), segment_chars=1000))
+
+    assert len(segments) > 1
+    assert "".join(segment for segment, _ in segments) == path.read_text(encoding="utf-8")
+    assert all(segment.endswith("\n\n") for segment, _ in segments[:-1])
+    assert segments[-1][1] == path.stat().st_size
+
+
+def test_iter_text_file_decodes_characters_split_across_reads(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunking, "READ_SIZE", 3)
+    text = "Informação útil: preço à vista."
+    path = tmp_path / "pt.txt"
+    path.write_text(text, encoding="utf-8")
+
+    assert "".join(segment for segment, _ in iter_text_file(str(path))) == text
+
+
+def test_chunk_batches_drop_repeats_within_the_file():
+    chunks = [("alpha", 10), ("beta", 20), ("alpha", 30), ("gamma", 40)]
+
+    batches = list(iter_chunk_batches(chunks, batch_size=2))
+
+    assert [[text for _, text in batch] for batch, _ in batches] == [["alpha", "beta"], ["gamma"]]
+    assert [position for _, position in batches] == [20, 40]
+
+
+def test_chunk_text_returns_chunks_by_hash():
+    result = chunking.chunk_text(uuid4(), "kb.md", MARKDOWN, settings={"strategy": "markdown", "min_chunk_tokens": 0})
+
+    assert len(result) == 2
+    assert all(len(content_hash) == 64 for content_hash in result)
@@ -0,0 +1,90 @@
+from src.services.context_packer import MIN_CHUNK_TOKENS, pack_context, trim_chunk, trim_external_context
+from src.utils.tokens import count_tokens
+
+REFUNDS = "Refunds are accepted within 30 days. Bring the receipt to any store. Gift cards are not refundable."
+SHIPPING = "We ship to Portugal and Spain. Delivery takes three to five working days."
+
+
+def _results(*contents):
+    return [{"filename": f"doc{i}.md", "content": content} for i, content in enumerate(contents)]
+
+
+def test_identical_chunks_are_packed_once():
+    _, context, stats = pack_context("refund policy", _results(REFUNDS, REFUNDS))
+
+    assert context.count("Refunds are accepted") == 1
+    assert stats["chunks_packed"] == 1
+    assert stats["chunks_duplicate"] == 1
+
+
+def test_near_duplicate_chunks_are_packed_once():
+    overlapping = REFUNDS + " Exchanges are free."
+
+    _, _, stats = pack_context("refund policy", _results(REFUNDS, overlapping))
+
+    assert stats["chunks_duplicate"] == 1
+
+
+def test_sentences_already_packed_are_not_repeated():
+    other = "Bring the receipt to any store. Store hours are nine to six."
+
+    _, context, stats = pack_context("receipt store", _results(REFUNDS, other))
+
+    assert context.count("Bring the receipt to any store.") == 1
+    assert "Store hours are nine to six." in context
+    assert stats["chunks_packed"] == 2
+
+
+def test_chunks_past_the_budget_are_dropped_in_retrieval_order():
+    sentence = "Refund requests are reviewed by the support team within two days."
+    chunks = [f"Section {i}. " + " ".join([sentence.replace("two", str(i + 2))] * 6) for i in range(10)]
+    budget = 2 * count_tokens(chunks[0])
+
+    _, context, stats = pack_context("refund requests", _results(*chunks), budget_tokens=budget)
+
+    assert stats["used_tokens"] <= budget
+    assert stats["chunks_dropped"] > 0
+    assert stats["chunks_packed"] + stats["chunks_dropped"] + stats["chunks_duplicate"] == len(chunks)
+    # Best results come first
+    assert "Source: doc0.md" in context
+    assert "Source: doc9.md" not in context
+
+
+def test_no_chunk_is_started_below_the_minimum():
+    _, context, stats = pack_context("refund", _results(REFUNDS), budget_tokens=MIN_CHUNK_TOKENS)
+
+    assert context == ""
+    assert stats["chunks_dropped"] == 1
+
+
+def test_oversized_external_data_is_trimmed_to_its_share():
+    header = "sku,name,stock"
+    rows = [f"{i},widget model {i},{i * 3}" for i in range(400)]
+    rows[250] = "250,refund voucher,7"
+    external = "\n".join([header] + rows)
+
+    live_data, _, stats = pack_context("refund voucher", [], external_context=external, budget_tokens=1000)
+
+    assert stats["external_trimmed"] is True
+    assert stats["external_tokens"] <= 500
+    assert live_data.splitlines()[0] == header
+    assert "250,refund voucher,7" in live_data
+    # Kept rows stay in their original order
+    kept = live_data.splitlines()[1:]
+    assert kept == sorted(kept, key=lambda line: int(line.split(",")[0]))
+
+
+def test_small_external_data_is_kept_as_is():
+    external = "sku,name,stock\n1,widget,3"
+
+    assert trim_external_context(external, {"widget"}, 500) == (external, False)
+
+
+def test_trim_chunk_keeps_matching_sentences_with_neighbours():
+    content = "Returns. Sentence one is filler. We accept refunds in store. Sentence three is filler. Unrelated end."
+
+    sentences = [sentence for _, sentence in trim_chunk(content, {"refunds"}, 500, set())]
+
+    assert sentences == [
+        "Returns.", "Sentence one is filler.", "We accept refunds in store.", "Sentence three is filler."
+    ]
@@ -0,0 +1,125 @@
+import uuid
+from collections import Counter
+
+import pytest
+
+from src.services import contextualization
+from src.services.contextualization import needs_contextualization
+from src.utils import cache
+from src.utils.cache import TTLCache
+
+HISTORY = [
+    {"role": "user", "content": "How much is the Standard Plan?"},
+    {"role": "assistant", "content": "The Standard Plan costs 20 euros per month."},
+]
+SESSION = uuid.uuid4()
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        # Self-contained: skip the rewrite
+        ("Do you ship to Portugal?", (False, "self_contained")),
+        ("What are your opening hours on Sunday?", (False, "self_contained")),
+        ("Vocês entregam em Lisboa amanhã?", (False, "self_contained")),
+        ("Is the Standard Plan monthly or is it yearly?", (False, "explicit_reference")),
+        # Depend on the conversation: rewrite
+        ("and for 3 people?", (True, "ellipsis")),
+        ("What about the annual one?", (True, "ellipsis")),
+        ("e o plano anual?", (True, "ellipsis")),
+        ("y para dos personas?", (True, "ellipsis")),
+        ("How much is it?", (True, "reference")),
+        ("Does that include taxes?", (True, "reference")),
+        ("Quanto custa isso?", (True, "reference")),
+        ("¿Cuánto cuesta eso?", (True, "reference")),
+        ("Prices?", (True, "short")),
+    ],
+)
+def test_needs_contextualization(query, expected):
+    assert needs_contextualization(query, HISTORY) == expected
+
+
+def test_first_turn_is_never_rewritten():
+    assert needs_contextualization("How much is it?", []) == (False, "no_history")
+
+
+@pytest.fixture
+def rewrites(monkeypatch):
+    calls = []
+
+    def contextualize_query(query, history, provider=None, model_name=None):
+        calls.append(query)
+        return f"{query} (about the Standard Plan)"
+
+    monkeypatch.setattr(contextualization, "contextualize_query", contextualize_query)
+    monkeypatch.setattr(contextualization, "_cache", TTLCache(16, 60))
+    monkeypatch.setattr(
+        contextualization,
+        "_stats",
+        {"turns": 0, "skipped": 0, "rewritten": 0, "cache_hits": 0, "rewrite_ms_total": 0.0},
+    )
+    monkeypatch.setattr(contextualization, "_reasons", Counter())
+    return calls
+
+
+async def test_self_contained_turns_skip_the_llm(rewrites):
+    query = await contextualization.contextualize(SESSION, "Do you ship to Portugal?", HISTORY)
+
+    assert query == "Do you ship to Portugal?"
+    assert rewrites == []
+    stats = contextualization.get_contextualization_stats()
+    assert stats["skipped"] == 1
+    assert stats["skip_rate"] == 1.0
+    assert stats["reasons"] == {"self_contained": 1}
+
+
+async def test_a_resent_turn_reuses_its_rewrite(rewrites):
+    first = await contextualization.contextualize(SESSION, "How much is it?", HISTORY)
+    second = await contextualization.contextualize(SESSION, "how much is  it?", HISTORY)
+
+    assert first == second == "How much is it? (about the Standard Plan)"
+    assert len(rewrites) == 1
+    stats = contextualization.get_contextualization_stats()
+    assert (stats["turns"], stats["rewritten"], stats["cache_hits"]) == (2, 1, 1)
+    assert stats["estimated_saved_ms"] == pytest.approx(stats["avg_rewrite_ms"], abs=0.1)
+    assert stats["cache"]["hits"] == 1
+
+
+async def test_a_new_turn_does_not_see_the_previous_rewrite(rewrites):
+    await contextualization.contextualize(SESSION, "How much is it?", HISTORY)
+    later = HISTORY + [{"role": "user", "content": "How much is it?"}, {"role": "assistant", "content": "20 euros."}]
+    await contextualization.contextualize(SESSION, "How much is it?", later)
+    await contextualization.contextualize(uuid.uuid4(), "How much is it?", HISTORY)
+
+    assert len(rewrites) == 3
+
+
+async def test_cached_rewrites_expire(rewrites, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(contextualization, "_cache", TTLCache(16, ttl_seconds=30))
+
+    await contextualization.contextualize(SESSION, "How much is it?", HISTORY)
+    now[0] += 29
+    await contextualization.contextualize(SESSION, "How much is it?", HISTORY)
+    assert len(rewrites) == 1
+
+    now[0] += 2
+    await contextualization.contextualize(SESSION, "How much is it?", HISTORY)
+    assert len(rewrites) == 2
+
+
+async def test_failed_rewrites_are_not_cached(rewrites, monkeypatch):
+    monkeypatch.setattr(contextualization, "contextualize_query", lambda query, *args: query)
+
+    assert await contextualization.contextualize(SESSION, "How much is it?", HISTORY) == "How much is it?"
+    assert contextualization.get_rewrite_cache().stats()["size"] == 0
+
+
+async def test_disabled_heuristics_rewrite_every_follow_up(rewrites, monkeypatch):
+    monkeypatch.setattr(contextualization, "_contextualization_config", lambda: {"skip_heuristics": False})
+
+    await contextualization.contextualize(SESSION, "Do you ship to Portugal?", HISTORY)
+
+    assert rewrites == ["Do you ship to Portugal?"]
+    assert contextualization.get_contextualization_stats()["reasons"] == {"heuristics_disabled": 1}
@@ -0,0 +1,86 @@
+import uuid
+
+import pytest
+
+from src.services import config_service, fts
+from src.services.config_service import resolve_fts_config
+
+TENANT = uuid.uuid4()
+
+
+def test_resolve_fts_config_prefers_the_tenant_override(monkeypatch):
+    monkeypatch.setattr(config_service, "get_retrieval_config", lambda: {"fts_config": "simple"})
+
+    assert resolve_fts_config({"retrieval": {"fts_config": "Spanish"}}, "Portuguese") == "spanish"
+    assert resolve_fts_config({"retrieval": {"fts_config": ""}}, "pt-BR, en") == "portuguese"
+    assert resolve_fts_config({}, "Klingon") == "simple"
+
+
+@pytest.fixture
+def tenant(monkeypatch):
+    state = {"settings": {}, "languages": "Portuguese"}
+
+    async def get_tenant_settings(tenant_id):
+        return state["settings"]
+
+    async def get_tenant_languages(tenant_id):
+        return state["languages"]
+
+    monkeypatch.setattr(config_service, "get_tenant_settings", get_tenant_settings)
+    monkeypatch.setattr(config_service, "get_tenant_languages", get_tenant_languages)
+    monkeypatch.setattr(fts, "get_tenant_settings", get_tenant_settings)
+    return state
+
+
+async def test_queries_keep_the_indexed_config_while_a_backfill_is_pending(tenant):
+    tenant["settings"] = {"fts_backfill": {"from": "english", "to": "portuguese"}}
+
+    settings = await config_service.get_tenant_retrieval_settings(TENANT)
+
+    assert (settings["fts_config"], settings["query_fts_config"]) == ("portuguese", "english")
+
+
+async def test_queries_use_the_tenant_config_without_a_pending_backfill(tenant):
+    settings = await config_service.get_tenant_retrieval_settings(TENANT)
+
+    assert (settings["fts_config"], settings["query_fts_config"]) == ("portuguese", "portuguese")
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    calls = {"pages": [], "finished": []}
+    pages = iter([(2, uuid.uuid4()), (1, uuid.uuid4()), (0, None)])
+
+    async def update_fts_config_batch(tenant_id, fts_config, batch_size, after_id=None):
+        calls["pages"].append(after_id)
+        return next(pages)
+
+    async def finish_fts_backfill(tenant_id, fts_config):
+        calls["finished"].append(fts_config)
+        return True
+
+    monkeypatch.setattr(fts, "update_fts_config_batch", update_fts_config_batch)
+    monkeypatch.setattr(fts, "finish_fts_backfill", finish_fts_backfill)
+    return calls
+
+
+async def test_backfill_switches_queries_only_after_the_last_page(tenant, batches):
+    tenant["settings"] = {"fts_backfill": {"from": "english", "to": "portuguese"}}
+
+    total = await fts.backfill_fts_config(TENANT, "portuguese", pause_seconds=0)
+
+    assert total == 3
+    assert len(batches["pages"]) == 3 and batches["pages"][0] is None
+    assert batches["finished"] == ["portuguese"]
+
+
+async def test_superseded_backfill_stops_without_switching(tenant, batches):
+    tenant["settings"] = {"fts_backfill": {"from": "english", "to": "spanish"}}
+
+    assert await fts.backfill_fts_config(TENANT, "portuguese", pause_seconds=0) == 0
+    assert batches == {"pages": [], "finished": []}
+
+
+async def test_backfill_rejects_unsupported_configs(tenant, batches):
+    with pytest.raises(ValueError, match="Unsupported text search configuration 'klingon'"):
+        await fts.backfill_fts_config(TENANT, "klingon")
@@ -0,0 +1,159 @@
+import asyncio
+import uuid
+
+import pytest
+
+from src.services import hyde, rag_flow
+from src.services.fake_models import FakeLLM
+from src.utils import cache
+from src.utils.cache import TTLCache
+
+TENANT = uuid.uuid4()
+
+
+class CountingLLM(FakeLLM):
+    calls: int = 0
+
+    def complete(self, prompt, formatted=False, **kwargs):
+        self.calls += 1
+        return super().complete(prompt, formatted=formatted, **kwargs)
+
+
+@pytest.fixture
+def hyde_llm(monkeypatch):
+    llm = CountingLLM()
+    monkeypatch.setattr(hyde, "get_llm", lambda **kwargs: llm)
+    monkeypatch.setattr(hyde, "_cache", TTLCache(16, 60))
+    return llm
+
+
+def _docs(*ids):
+    return [{"id": doc_id, "content": f"chunk {doc_id}", "score": 1.0} for doc_id in ids]
+
+
+# --- cache ---
+
+
+def test_normalize_query_ignores_case_spacing_and_trailing_punctuation():
+    assert hyde.normalize_query("  What are your   Opening hours?! ") == "what are your opening hours"
+
+
+async def test_passage_is_cached_per_tenant_and_normalized_query(hyde_llm):
+    first = await hyde.get_hypothetical_answer(TENANT, "What are your opening hours?")
+    second = await hyde.get_hypothetical_answer(TENANT, "what are your  opening hours")
+
+    assert first == second
+    assert "opening hours" in first
+    assert hyde_llm.calls == 1
+    assert hyde.get_hyde_cache().stats()["hits"] == 1
+
+    await hyde.get_hypothetical_answer(uuid.uuid4(), "What are your opening hours?")
+    assert hyde_llm.calls == 2
+
+
+async def test_failed_generation_is_not_cached(hyde_llm, monkeypatch):
+    monkeypatch.setattr(hyde, "generate_hypothetical_answer", lambda query, provider, model_name: query)
+
+    assert await hyde.get_hypothetical_answer(TENANT, "refund policy") is None
+    assert hyde.get_hyde_cache().stats()["size"] == 0
+
+
+def test_cache_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    ttl_cache = TTLCache(max_entries=2, ttl_seconds=10)
+    ttl_cache.put(("t", "q"), "passage")
+
+    now[0] += 9
+    assert ttl_cache.get(("t", "q")) == "passage"
+    now[0] += 2
+    assert ttl_cache.get(("t", "q")) is None
+    assert ttl_cache.stats() == {"size": 0, "max_entries": 2, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_cache_evicts_the_least_recently_used_entry():
+    ttl_cache = TTLCache(max_entries=2, ttl_seconds=60)
+    ttl_cache.put(("a",), 1)
+    ttl_cache.put(("b",), 2)
+    ttl_cache.get(("a",))
+    ttl_cache.put(("c",), 3)
+
+    assert ttl_cache.get(("b",)) is None
+    assert ttl_cache.get(("a",)) == 1
+
+
+# --- fusion ---
+
+
+def test_fuse_rankings_promotes_documents_found_by_both_branches():
+    fused = rag_flow.fuse_rankings([_docs("a", "b", "c"), _docs("c", "d")], limit=4, k=60)
+
+    # b and d tie (both second in one list); ties keep first-seen order
+    assert [doc["id"] for doc in fused] == ["c", "a", "b", "d"]
+    assert fused[0]["score"] == pytest.approx(1 / 63 + 1 / 61)
+    assert fused[1]["score"] == pytest.approx(1 / 61)
+
+
+def test_fuse_rankings_keeps_the_first_copy_of_each_document():
+    direct = [{"id": "a", "content": "direct", "score": 0.9}]
+    from_hyde = [{"id": "a", "content": "hyde", "score": 0.1}]
+
+    fused = rag_flow.fuse_rankings([direct, from_hyde], limit=5)
+
+    assert len(fused) == 1
+    assert fused[0]["content"] == "direct"
+
+
+# --- parallel branch ---
+
+
+@pytest.fixture
+def search_env(monkeypatch):
+    state = {"hyde_delay": 0.0, "passage_calls": 0}
+
+    async def embed_query(text):
+        return [0.0]
+
+    async def search_documents_hybrid(tenant_id, embedding, query, limit, settings=None, metadata_filter=None):
+        return _docs("a", "b", "c")[:limit]
+
+    async def search_documents_vector(tenant_id, embedding, limit, settings=None, metadata_filter=None):
+        return _docs("c", "d")[:limit]
+
+    async def get_hypothetical_answer(tenant_id, query, provider, model_name):
+        state["passage_calls"] += 1
+        await asyncio.sleep(state["hyde_delay"])
+        return "A hypothetical passage."
+
+    monkeypatch.setattr(rag_flow, "embed_query", embed_query)
+    monkeypatch.setattr(rag_flow, "search_documents_hybrid", search_documents_hybrid)
+    monkeypatch.setattr(rag_flow, "search_documents_vector", search_documents_vector)
+    monkeypatch.setattr(rag_flow, "get_hypothetical_answer", get_hypothetical_answer)
+    monkeypatch.setattr(rag_flow, "get_hyde_deadline_seconds", lambda: 0.05)
+    return state
+
+
+async def test_hyde_results_are_fused_with_the_direct_search(search_env):
+    results = await rag_flow.search_documents(TENANT, "refund policy", limit=3, use_hyde=True, retrieval_settings={})
+
+    assert [doc["id"] for doc in results] == ["c", "a", "b"]
+
+
+async def test_hyde_past_its_deadline_is_dropped_but_keeps_running(search_env):
+    search_env["hyde_delay"] = 0.2
+
+    results = await rag_flow.search_documents(TENANT, "refund policy", limit=3, use_hyde=True, retrieval_settings={})
+
+    assert [doc["id"] for doc in results] == ["a", "b", "c"]
+    assert search_env["passage_calls"] == 1
+    # The passage call is shielded: it finishes in the background and fills the cache
+    pending = list(rag_flow._background_tasks)
+    assert pending and not any(task.cancelled() for task in pending)
+    await asyncio.gather(*pending)
+
+
+async def test_without_hyde_only_the_direct_search_runs(search_env):
+    results = await rag_flow.search_documents(TENANT, "refund policy", limit=3, retrieval_settings={})
+
+    assert [doc["id"] for doc in results] == ["a", "b", "c"]
+    assert search_env["passage_calls"] == 0
@@ -0,0 +1,41 @@
+import importlib
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _modules():
+    # Most packages under src/ have no __init__.py, so walk the files instead of pkgutil
+    return sorted(
+        ".".join(path.relative_to(ROOT).with_suffix("").parts).removesuffix(".__init__")
+        for path in (ROOT / "src").rglob("*.py")
+    )
+
+
+@pytest.mark.parametrize("module", _modules())
+def test_module_imports(module):
+    importlib.import_module(module)
+
+
+def test_app_imports():
+    from src.main import app
+
+    assert any(getattr(route, "path", None) == "/metrics" for route in app.routes)
+
+
+@pytest.mark.parametrize(
+    "cls_path",
+    [
+        "src.services.embeddings.CustomGeminiEmbedding",
+        "src.services.fake_models.HashingEmbedding",
+        "src.services.openai_compatible.OpenAICompatibleEmbedding",
+    ],
+)
+def test_embedding_task_types_are_class_constants(cls_path):
+    module, name = cls_path.rsplit(".", 1)
+    cls = getattr(importlib.import_module(module), name)
+
+    assert isinstance(cls.QUERY_TASK_TYPE, str) and isinstance(cls.DOCUMENT_TASK_TYPE, str)
+    assert "QUERY_TASK_TYPE" not in cls.model_fields
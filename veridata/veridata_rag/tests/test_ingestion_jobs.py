@@ -0,0 +1,288 @@
+import asyncio
+import io
+import uuid
+import zipfile
+
+import pytest
+from PIL import UnidentifiedImageError
+
+from src.services import ingestion_jobs
+
+
+def _job(attempts=1):
+    return {
+        "id": uuid.uuid4(),
+        "tenant_id": uuid.uuid4(),
+        "filename": "doc.txt",
+        "spool_path": "/nonexistent/spool/doc.txt",
+        "attempts": attempts,
+    }
+
+
+@pytest.fixture
+def job_updates(monkeypatch):
+    updates = []
+
+    async def update_ingestion_job(job_id, **fields):
+        updates.append(fields)
+
+    async def noop(*args, **kwargs):
+        return None
+
+    async def fail_partition(tenant_id):
+        raise failure["error"]
+
+    failure = {"error": None}
+    monkeypatch.setattr(ingestion_jobs, "update_ingestion_job", update_ingestion_job)
+    monkeypatch.setattr(ingestion_jobs, "mark_source_document_failed", noop)
+    monkeypatch.setattr(ingestion_jobs, "delete_job_embeddings", noop)
+    monkeypatch.setattr(ingestion_jobs, "ensure_tenant_partition", fail_partition)
+    monkeypatch.setattr(ingestion_jobs, "_heartbeat", noop)
+    return updates, failure
+
+
+@pytest.mark.parametrize(
+    "error",
+    [ConnectionError("connection reset"), TimeoutError(), asyncio.TimeoutError(), OSError("server closed")],
+)
+async def test_transient_errors_requeue_the_job(job_updates, error):
+    updates, failure = job_updates
+    failure["error"] = error
+
+    await ingestion_jobs.run_ingestion_job(_job())
+
+    assert updates[-1]["status"] == "queued"
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        ValueError("No content"),
+        UnicodeDecodeError("utf-8", b"\xff", 0, 1, "bad"),
+        FileNotFoundError(),
+        UnidentifiedImageError(),
+    ],
+)
+async def test_input_errors_fail_the_job(job_updates, error):
+    updates, failure = job_updates
+    failure["error"] = error
+
+    await ingestion_jobs.run_ingestion_job(_job())
+
+    assert updates[-1]["status"] == "failed"
+
+
+async def test_last_attempt_fails_even_when_transient(job_updates):
+    updates, failure = job_updates
+    failure["error"] = ConnectionError()
+
+    await ingestion_jobs.run_ingestion_job(_job(attempts=ingestion_jobs.MAX_ATTEMPTS))
+
+    assert updates[-1]["status"] == "failed"
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    state = {"updates": [], "embedded": [], "staged": {}, "inserted": [], "stage": None}
+
+    async def update_ingestion_job(job_id, **fields):
+        state["stage"] = fields.get("stage", state["stage"])
+        state["updates"].append(fields)
+
+    async def noop(*args, **kwargs):
+        return None
+
+    async def no_stored_hashes(tenant_id, filename):
+        return set()
+
+    async def chunking_settings(tenant_id):
+        return {"strategy": "sentence", "chunk_size": 64, "chunk_overlap": 0, "min_chunk_tokens": 0}
+
+    async def retrieval_settings(tenant_id):
+        return {"fts_config": "english"}
+
+    async def embed_documents(texts):
+        state["embedded"].append((state["stage"], len(texts)))
+        return [[float(len(text))] for text in texts]
+
+    async def store_job_embeddings(job_id, embeddings):
+        state["staged"].update(embeddings)
+
+    async def get_job_embeddings(job_id, hashes):
+        return {h: state["staged"][h] for h in hashes if h in state["staged"]}
+
+    async def delete_job_embeddings(job_id):
+        state["staged"].clear()
+
+    async def replace_document_chunks(tenant_id, filename, batches, **kwargs):
+        async for batch in batches:
+            state["inserted"].extend(batch)
+        return {"inserted": len(state["inserted"])}
+
+    for name, fn in (
+        ("update_ingestion_job", update_ingestion_job),
+        ("ensure_tenant_partition", noop),
+        ("mark_source_document_pending", noop),
+        ("mark_source_document_failed", noop),
+        ("_heartbeat", noop),
+        ("get_document_chunk_hashes", no_stored_hashes),
+        ("get_tenant_chunking_settings", chunking_settings),
+        ("get_tenant_retrieval_settings", retrieval_settings),
+        ("embed_documents", embed_documents),
+        ("store_job_embeddings", store_job_embeddings),
+        ("get_job_embeddings", get_job_embeddings),
+        ("delete_job_embeddings", delete_job_embeddings),
+        ("replace_document_chunks", replace_document_chunks),
+    ):
+        monkeypatch.setattr(ingestion_jobs, name, fn)
+    monkeypatch.setattr(ingestion_jobs, "EMBED_BATCH_SIZE", 2)
+
+    spool = tmp_path / "doc.txt"
+    spool.write_text("\n\n".join(f"Paragraph {i} about refunds and shipping to Portugal." for i in range(5)))
+    job = {**_job(), "spool_path": str(spool), "completed_batches": 0, "metadata": {}}
+    return job, state
+
+
+async def test_insert_pass_reads_staged_embeddings_instead_of_embedding_again(pipeline):
+    job, state = pipeline
+
+    await ingestion_jobs.run_ingestion_job(job)
+
+    assert state["updates"][-1]["status"] == "completed"
+    assert state["embedded"] and all(stage == "embed" for stage, _ in state["embedded"])
+    assert len(state["inserted"]) > 2
+    assert all(chunk["embedding"] == [float(len(chunk["content"]))] for chunk in state["inserted"])
+    assert state["staged"] == {}
+
+
+async def test_missing_staged_embeddings_restart_the_embed_pass(pipeline):
+    job, state = pipeline
+    job["completed_batches"] = 1  # checkpointed, but nothing staged for it
+
+    await ingestion_jobs.run_ingestion_job(job)
+
+    assert state["inserted"] == []
+    assert {"completed_batches": 0} in state["updates"]
+    assert state["updates"][-1]["status"] == "queued"
+
+
+async def test_worker_survives_a_job_that_raises(monkeypatch):
+    claims = [_job(), _job()]
+    ran = []
+
+    async def claim(*args):
+        if not claims:
+            raise asyncio.CancelledError
+        return claims.pop(0)
+
+    async def run(job):
+        ran.append(job["id"])
+        raise RuntimeError("database is gone")
+
+    monkeypatch.setattr(ingestion_jobs, "claim_ingestion_job", claim)
+    monkeypatch.setattr(ingestion_jobs, "run_ingestion_job", run)
+
+    with pytest.raises(asyncio.CancelledError):
+        await ingestion_jobs._worker_loop("test-worker")
+
+    assert len(ran) == 2
+
+
+# --- Bulk budget ---
+
+
+def _upload(filename, data):
+    from starlette.datastructures import UploadFile
+
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+
+def _zip(names):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name in names:
+            archive.writestr(name, "some text")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def bulk_limits(monkeypatch, tmp_path):
+    async def no_previous(tenant_id, filenames):
+        return {}
+
+    async def create_jobs(*args):
+        return None
+
+    monkeypatch.setattr(ingestion_jobs, "SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(ingestion_jobs, "get_latest_file_uploads", no_previous)
+    monkeypatch.setattr(ingestion_jobs, "create_ingestion_jobs", create_jobs)
+
+    def set_limits(files, size):
+        monkeypatch.setattr(ingestion_jobs, "BULK_MAX_FILES", files)
+        monkeypatch.setattr(ingestion_jobs, "BULK_MAX_BYTES", size)
+
+    return tmp_path, set_limits
+
+
+async def test_plain_uploads_count_against_the_byte_budget(bulk_limits):
+    spool_dir, set_limits = bulk_limits
+    set_limits(files=10, size=100)
+
+    with pytest.raises(ValueError):
+        await ingestion_jobs.enqueue_bulk(
+            uuid.uuid4(), uploads=[_upload("a.txt", b"x" * 60), _upload("b.txt", b"x" * 60)]
+        )
+
+    assert list(spool_dir.iterdir()) == []
+
+
+async def test_text_documents_count_against_the_byte_budget(bulk_limits):
+    _, set_limits = bulk_limits
+    set_limits(files=10, size=100)
+
+    with pytest.raises(ValueError):
+        await ingestion_jobs.enqueue_bulk(uuid.uuid4(), documents=[("a.txt", "x" * 101, None)])
+
+
+async def test_plain_files_and_archive_members_share_the_file_budget(bulk_limits):
+    spool_dir, set_limits = bulk_limits
+    set_limits(files=3, size=10_000)
+    uploads = [_upload("a.txt", b"hello"), _upload("docs.zip", _zip(["b.txt", "c.txt", "d.txt"]))]
+
+    with pytest.raises(ValueError):
+        await ingestion_jobs.enqueue_bulk(uuid.uuid4(), uploads=uploads)
+
+    assert list(spool_dir.iterdir()) == []
+
+
+async def test_bulk_within_budget_is_queued(bulk_limits):
+    _, set_limits = bulk_limits
+    set_limits(files=3, size=10_000)
+    uploads = [_upload("a.txt", b"hello"), _upload("docs.zip", _zip(["b.txt", "c.txt"]))]
+
+    result = await ingestion_jobs.enqueue_bulk(uuid.uuid4(), uploads=uploads)
+
+    assert sorted(result["queued"]) == ["a.txt", "b.txt", "c.txt"]
+
+
+def test_bulk_multipart_accepts_more_files_than_the_starlette_default(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.controllers import api
+
+    received = {}
+
+    async def enqueue_bulk(tenant_id, uploads=(), metadata=None):
+        received["files"] = len(uploads)
+        return {"batch_id": uuid.uuid4(), "queued": [], "unchanged": [], "rejected": []}
+
+    monkeypatch.setattr(api, "enqueue_bulk", enqueue_bulk)
+    app = FastAPI()
+    app.include_router(api.router, prefix="/api")
+    files = [("files", (f"doc{i}.txt", b"x", "text/plain")) for i in range(1001)]
+
+    response = TestClient(app).post("/api/documents/bulk", data={"tenant_id": str(uuid.uuid4())}, files=files)
+
+    assert response.status_code == 200, response.text
+    assert received["files"] == 1001
@@ -0,0 +1,247 @@
+import urllib.error
+
+import pytest
+
+from src.services import llm_gateway
+from src.services.llm_gateway import CircuitBreaker, GatewayLLM, LLMUnavailableError, TokenBucket, is_retryable
+
+GATEWAY_CONFIG = {
+    "burst_seconds": 1,
+    "max_queue_seconds": {"default": 5},
+    "retry": {"max_attempts": 1},
+    "circuit_breaker": {"failure_threshold": 2, "open_seconds": 30},
+    "fallback_models": {"big": "small"},
+    "tenant_limits": {"default": {"requests_per_minute": 60}},
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+
+
+class StatusError(Exception):
+    def __init__(self, code):
+        super().__init__(f"status {code}")
+        self.code = code
+
+
+class FakeClient:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def complete(self, prompt, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return f"answer to {prompt}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_gateway.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(llm_gateway.time, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.fixture
+def gateway(monkeypatch, clock):
+    monkeypatch.setattr(llm_gateway, "_gateway_config", lambda: GATEWAY_CONFIG)
+    monkeypatch.setattr(llm_gateway, "_model_buckets", {})
+    monkeypatch.setattr(llm_gateway, "_tenant_buckets", {})
+    monkeypatch.setattr(llm_gateway, "_breakers", {})
+    token = llm_gateway._current_tenant.set("tenant-a")
+    yield
+    llm_gateway._current_tenant.reset(token)
+
+
+def _llm(clients):
+    return GatewayLLM("generation", "fake", "big", lambda model: clients[model])
+
+
+# --- TokenBucket ---
+
+
+def test_bucket_goes_into_deficit_and_queues_callers(clock):
+    bucket = TokenBucket(per_minute=60, burst_seconds=2)
+
+    assert bucket.reserve(1, max_wait=5) == 0
+    assert bucket.reserve(1, max_wait=5) == 0
+    # Empty: the next callers wait one and two seconds behind each other
+    assert bucket.reserve(1, max_wait=5) == pytest.approx(1)
+    assert bucket.reserve(1, max_wait=5) == pytest.approx(2)
+    assert bucket.tokens == pytest.approx(-2)
+
+
+def test_bucket_rejects_without_charging_when_the_wait_is_too_long(clock):
+    bucket = TokenBucket(per_minute=60, burst_seconds=1)
+    bucket.reserve(1, max_wait=5)
+
+    assert bucket.reserve(1, max_wait=0.5) is None
+    assert bucket.tokens == pytest.approx(0)
+
+
+def test_bucket_refills_over_time_up_to_capacity(clock):
+    bucket = TokenBucket(per_minute=60, burst_seconds=2)
+    bucket.reserve(2, max_wait=5)
+
+    clock.now += 60
+    assert bucket.reserve(0, max_wait=5) == 0
+    assert bucket.tokens == pytest.approx(2)
+
+
+def test_bucket_refund_is_capped_at_capacity(clock):
+    bucket = TokenBucket(per_minute=60, burst_seconds=2)
+    bucket.reserve(1, max_wait=5)
+
+    bucket.refund(1)
+    assert bucket.tokens == pytest.approx(2)
+    bucket.refund(5)
+    assert bucket.tokens == pytest.approx(2)
+
+
+# --- CircuitBreaker ---
+
+
+def test_breaker_opens_after_threshold_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, open_seconds=30)
+
+    assert breaker.record_failure() is False
+    assert breaker.record_failure() is True
+    assert breaker.state == "open"
+    assert breaker.allow() is False
+
+
+def test_breaker_half_open_allows_a_single_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=30)
+    breaker.record_failure()
+    clock.now += 31
+
+    assert breaker.state == "half_open"
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() is True
+
+
+def test_breaker_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=5, open_seconds=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 31
+    assert breaker.allow() is True
+
+    # Reopening is not reported as a new opening
+    assert breaker.record_failure() is False
+    assert breaker.state == "open"
+
+
+def test_breaker_released_probe_lets_the_next_call_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=30)
+    breaker.record_failure()
+    clock.now += 31
+    assert breaker.allow() is True
+
+    breaker.release_probe()
+    assert breaker.allow() is True
+
+
+# --- is_retryable ---
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (StatusError(429), True),
+        (StatusError(503), True),
+        (StatusError(408), True),
+        (StatusError(400), False),
+        (StatusError(401), False),
+        (TimeoutError(), True),
+        (ConnectionResetError(), True),
+        (urllib.error.URLError("refused"), True),
+        (RuntimeError("429 Resource exhausted"), True),
+        (ValueError("invalid prompt"), False),
+    ],
+)
+def test_is_retryable(error, expected):
+    assert is_retryable(error) is expected
+
+
+# --- GatewayLLM ---
+
+
+def test_falls_back_to_the_next_model_on_retryable_errors(gateway):
+    clients = {"big": FakeClient(StatusError(503)), "small": FakeClient()}
+
+    assert _llm(clients).complete("hi") == "answer to hi"
+    assert clients["big"].calls == 1
+    assert clients["small"].calls == 1
+
+
+def test_non_retryable_errors_are_raised_without_fallback(gateway):
+    clients = {"big": FakeClient(StatusError(400)), "small": FakeClient()}
+
+    with pytest.raises(StatusError):
+        _llm(clients).complete("hi")
+    assert clients["small"].calls == 0
+
+
+def test_open_circuit_skips_the_model(gateway):
+    clients = {"big": FakeClient(StatusError(503)), "small": FakeClient()}
+    llm = _llm(clients)
+    llm.complete("one")
+    llm.complete("two")
+
+    llm.complete("three")
+    assert clients["big"].calls == 2
+    assert clients["small"].calls == 3
+
+
+def test_raises_when_no_candidate_is_left(gateway):
+    clients = {"big": FakeClient(StatusError(503)), "small": FakeClient(StatusError(503))}
+
+    with pytest.raises(LLMUnavailableError, match="status 503"):
+        _llm(clients).complete("hi")
+
+
+def test_tenant_budget_is_charged_once_per_call_across_fallbacks(gateway):
+    clients = {"big": FakeClient(StatusError(503)), "small": FakeClient()}
+
+    _llm(clients).complete("hi")
+
+    assert llm_gateway._tenant_buckets["tenant-a"].tokens == pytest.approx(0)
+
+
+def test_tenant_budget_is_refunded_when_no_model_was_called(gateway):
+    clients = {"big": FakeClient(), "small": FakeClient()}
+    for model in ("big", "small"):
+        breaker = llm_gateway._breaker(f"fake:{model}")
+        breaker.record_failure()
+        breaker.record_failure()
+
+    with pytest.raises(LLMUnavailableError):
+        _llm(clients).complete("hi")
+    assert llm_gateway._tenant_buckets["tenant-a"].tokens == pytest.approx(1)
+
+
+def test_exhausted_tenant_budget_fails_without_calling_a_model(gateway, monkeypatch):
+    monkeypatch.setitem(GATEWAY_CONFIG, "max_queue_seconds", {"default": 0})
+    clients = {"big": FakeClient(), "small": FakeClient()}
+    llm = _llm(clients)
+    llm.complete("one")
+
+    with pytest.raises(LLMUnavailableError, match="Tenant LLM budget exhausted"):
+        llm.complete("two")
+    assert clients["big"].calls == 1
@@ -0,0 +1,100 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.services.metrics import Counter, Histogram, render_metrics, timed_stage, track_operation
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test.", ("stage",), buckets=(1.0, 0.1, 0.01))
+    for value in (0.003, 0.02, 0.1, 0.5, 100):
+        histogram.observe(value, stage="embed")
+
+    assert histogram.samples() == [
+        'test_seconds_bucket{stage="embed",le="0.01"} 1',
+        'test_seconds_bucket{stage="embed",le="0.1"} 3',
+        'test_seconds_bucket{stage="embed",le="1.0"} 4',
+        'test_seconds_bucket{stage="embed",le="+Inf"} 5',
+        'test_seconds_sum{stage="embed"} 100.623',
+        'test_seconds_count{stage="embed"} 5',
+    ]
+
+
+def test_histogram_keeps_one_series_per_label_set():
+    histogram = Histogram("test_seconds", "Test.", ("stage",), buckets=(1.0,))
+    histogram.observe(0.5, stage="b")
+    histogram.observe(2, stage="a")
+
+    assert histogram.samples() == [
+        'test_seconds_bucket{stage="a",le="1.0"} 0',
+        'test_seconds_bucket{stage="a",le="+Inf"} 1',
+        'test_seconds_sum{stage="a"} 2',
+        'test_seconds_count{stage="a"} 1',
+        'test_seconds_bucket{stage="b",le="1.0"} 1',
+        'test_seconds_bucket{stage="b",le="+Inf"} 1',
+        'test_seconds_sum{stage="b"} 0.5',
+        'test_seconds_count{stage="b"} 1',
+    ]
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("test_total", "Test.", ("step",))
+    counter.inc(step='say "hi"\n')
+    counter.inc(2.5, step="plain")
+
+    assert counter.samples() == ['test_total{step="plain"} 2.5', 'test_total{step="say \\"hi\\"\\n"} 1']
+
+
+def test_counter_without_labels():
+    counter = Counter("test_total", "Test.")
+    counter.inc()
+
+    assert counter.samples() == ["test_total 1"]
+
+
+def _sample(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+
+def test_timed_stage_records_durations_and_errors():
+    with pytest.raises(RuntimeError):
+        with timed_stage("failing", pipeline="test"):
+            raise RuntimeError("boom")
+
+    text = render_metrics()
+    assert _sample(text, 'rag_stage_errors_total{pipeline="test",stage="failing"}') == [
+        'rag_stage_errors_total{pipeline="test",stage="failing"} 1'
+    ]
+    assert _sample(text, 'rag_stage_duration_seconds_count{pipeline="test",stage="failing"}')[0].endswith(" 1")
+
+
+def test_track_operation_collects_the_stages_of_one_request():
+    with track_operation("query") as trace:
+        with timed_stage("embed"):
+            pass
+        with timed_stage("rerank"):
+            pass
+    with timed_stage("outside"):
+        pass
+
+    result = trace.as_dict()
+    assert [entry["stage"] for entry in result["stages"]] == ["embed", "rerank"]
+    assert result["total_ms"] is not None
+
+
+def test_metrics_endpoint_serves_the_text_format():
+    from src.main import app
+
+    with timed_stage("embed"):
+        pass
+
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert "# HELP rag_stage_duration_seconds Duration of one pipeline stage." in lines
+    assert "# TYPE rag_stage_duration_seconds histogram" in lines
+    assert "# TYPE rag_llm_calls_total counter" in lines
+    bucket = 'rag_stage_duration_seconds_bucket{pipeline="query",stage="embed",le="0.005"} '
+    assert any(line.startswith(bucket) for line in lines)
+    assert response.text.endswith("\n")
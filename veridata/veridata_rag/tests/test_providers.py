@@ -0,0 +1,135 @@
+import math
+
+import pytest
+
+from src.config.config import get_config
+from src.services import llm_factory, openai_compatible, providers, vlm
+from src.services.fake_models import EMBEDDING_DIM, FakeLLM, HashingEmbedding, fake_completion
+from src.services.openai_compatible import OpenAICompatibleEmbedding, OpenAICompatibleLLM
+from src.utils.prompts import CONTEXTUALIZE_PROMPT_TEMPLATE, HYDE_PROMPT_TEMPLATE
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    monkeypatch.setattr(llm_factory, "_llm_instances", {})
+    monkeypatch.setattr(llm_factory, "_gateways", {})
+    monkeypatch.delenv("LLM_PROVIDER_OVERRIDE", raising=False)
+
+
+# --- fake models ---
+
+
+def test_hashing_embedding_is_deterministic_and_normalized():
+    model = HashingEmbedding()
+
+    first = model.get_query_embedding("What is the refund period?")
+    second = HashingEmbedding().get_text_embedding("What is the refund period?")
+
+    assert first == second
+    assert len(first) == EMBEDDING_DIM
+    assert math.isclose(math.sqrt(sum(x * x for x in first)), 1.0)
+    batch = model.get_text_embedding_batch(["a b", "c d"])
+    assert batch == [model.get_text_embedding("a b"), model.get_text_embedding("c d")]
+
+
+def test_hashing_embedding_places_texts_sharing_words_closer():
+    model = HashingEmbedding()
+    query = model.get_query_embedding("refund period for the Lumo plan")
+
+    def similarity(text):
+        return sum(a * b for a, b in zip(query, model.get_text_embedding(text)))
+
+    assert similarity("The refund period for the Lumo plan is 30 days.") > similarity("We ship to Portugal and Spain.")
+
+
+def test_fake_llm_output_is_stable_per_prompt():
+    llm = FakeLLM()
+    hyde_prompt = HYDE_PROMPT_TEMPLATE.format(query="What is the refund period?")
+    rewrite_prompt = CONTEXTUALIZE_PROMPT_TEMPLATE.format(history_str="USER: hi", query="And for Spain?")
+
+    assert llm.complete(hyde_prompt).text == FakeLLM().complete(hyde_prompt).text
+    assert "What is the refund period?" in llm.complete(hyde_prompt).text
+    assert llm.complete(rewrite_prompt).text == "And for Spain?"
+    assert "".join(r.delta for r in llm.stream_complete(hyde_prompt)) == fake_completion(hyde_prompt)
+
+
+# --- registry ---
+
+
+def test_provider_override_routes_every_step_to_the_chosen_provider(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER_OVERRIDE", " Fake ")
+    steps = list(get_config()["llm_config"]["steps"]) + ["rag_search"]
+
+    for step in steps:
+        llm = llm_factory.get_llm(step=step, provider="gemini", model_name="gemini-2.0-flash")
+        assert (llm.provider, llm.model_name) == ("fake", None)
+        assert isinstance(llm_factory._get_client(llm.provider, llm.model_name), FakeLLM)
+
+    assert isinstance(providers.build_embed_model(), HashingEmbedding)
+    assert vlm.resolve_image_provider() == "fake"
+
+
+def test_configured_providers_are_used_without_an_override():
+    llm = llm_factory.get_llm(step="generation", provider="FAKE")
+
+    assert llm.provider == "fake"
+
+
+@pytest.mark.parametrize("override", ["", "  "])
+def test_blank_override_is_ignored(monkeypatch, override):
+    monkeypatch.setenv("LLM_PROVIDER_OVERRIDE", override)
+
+    assert providers.get_provider_override() is None
+
+
+def test_unknown_llm_provider_raises(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER_OVERRIDE", "fkae")
+
+    with pytest.raises(ValueError, match="Unknown LLM provider 'fkae'. Available: fake, gemini, openai_compatible"):
+        llm_factory.get_llm(step="generation")
+
+
+def test_unknown_embedding_provider_raises(monkeypatch):
+    monkeypatch.setitem(get_config(), "embedding_config", {"provider": "openai"})
+
+    with pytest.raises(ValueError, match="Unknown embedding provider 'openai'"):
+        providers.build_embed_model()
+
+
+# --- openai_compatible ---
+
+
+@pytest.fixture
+def posts(monkeypatch):
+    calls = []
+
+    def post(base_url, path, payload, api_key, timeout):
+        calls.append((base_url, path, payload, api_key))
+        if path == "/embeddings":
+            # Servers may answer out of order; index says which input a vector belongs to
+            return {"data": [{"index": i, "embedding": [float(i)]} for i in reversed(range(len(payload["input"])))]}
+        return {"choices": [{"message": {"content": "local answer"}}], "usage": {"prompt_tokens": 3}}
+
+    monkeypatch.setattr(openai_compatible, "_post", post)
+    return calls
+
+
+def test_openai_compatible_llm_sends_one_user_message(posts):
+    llm = OpenAICompatibleLLM(model_name="qwen", base_url="http://llm:8000/v1", api_key="key", max_tokens=64)
+
+    assert llm.complete("Hello").text == "local answer"
+    base_url, path, payload, api_key = posts[0]
+    assert (base_url, path, api_key) == ("http://llm:8000/v1", "/chat/completions", "key")
+    assert payload == {
+        "model": "qwen",
+        "messages": [{"role": "user", "content": "Hello"}],
+        "temperature": 0.0,
+        "max_tokens": 64,
+    }
+
+
+def test_openai_compatible_embeddings_keep_input_order(posts):
+    model = OpenAICompatibleEmbedding(model_name="bge", base_url="http://llm:8000/v1")
+
+    assert model.get_text_embedding_batch(["a", "b", "c"]) == [[0.0], [1.0], [2.0]]
+    assert model.embedding_model_name == "openai_compatible/bge"
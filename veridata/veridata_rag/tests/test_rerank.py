@@ -0,0 +1,53 @@
+import pytest
+
+from src.services import rerank
+from src.services.rerank import LexicalReranker, Reranker, get_reranker
+
+CONFIG = {**rerank.DEFAULT_RERANK_CONFIG, "prior_weight": 0.0}
+
+
+def _docs(*contents):
+    return [{"id": i, "content": content} for i, content in enumerate(contents)]
+
+
+def test_reranker_requires_score():
+    with pytest.raises(TypeError):
+        Reranker(CONFIG)
+
+
+def test_lexical_prefers_documents_covering_the_query():
+    docs = _docs(
+        "Our store is in Lisbon, next to the river.",
+        "Refunds are accepted within 30 days of purchase with the receipt.",
+        "We ship to Portugal and Spain.",
+    )
+
+    ranked = LexicalReranker(CONFIG).rerank("how do refunds work", docs, top_k=2)
+
+    assert [doc["id"] for doc in ranked][0] == 1
+    assert len(ranked) == 2
+    assert all("rerank_score" in doc for doc in ranked)
+
+
+def test_lexical_prior_keeps_first_stage_order_on_ties():
+    docs = _docs("nothing relevant here", "also unrelated text")
+
+    ranked = LexicalReranker({**CONFIG, "prior_weight": 0.3}).rerank("refund policy", docs, top_k=2)
+
+    assert [doc["id"] for doc in ranked] == [0, 1]
+
+
+def test_default_backend_is_llm():
+    assert rerank.DEFAULT_RERANK_CONFIG["backend"] == "llm"
+
+
+@pytest.mark.skipif(rerank.CROSS_ENCODER_AVAILABLE, reason="sentence-transformers is installed")
+def test_cross_encoder_is_not_offered_without_the_extra():
+    assert "cross_encoder" not in rerank.RERANK_BACKENDS
+
+
+def test_unavailable_backend_falls_back_to_lexical_with_a_warning(caplog):
+    reranker = get_reranker("no_such_backend")
+
+    assert isinstance(reranker, LexicalReranker)
+    assert "not available" in caplog.text
@@ -0,0 +1,141 @@
+import pytest
+
+from src.services import tracing
+from src.services.tracing import (
+    SpanContext,
+    TracingMiddleware,
+    current_span,
+    inject_headers,
+    parse_traceparent,
+    start_span,
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+SPAN_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture(autouse=True)
+def no_export(monkeypatch):
+    monkeypatch.setattr(tracing, "_exporter", None)
+    monkeypatch.setattr(tracing, "_sample_rate", 1.0)
+
+
+def test_parse_traceparent():
+    context = parse_traceparent(f"00-{TRACE_ID}-{SPAN_ID}-01")
+
+    assert context == SpanContext(TRACE_ID, SPAN_ID, sampled=True)
+    assert context.traceparent == f"00-{TRACE_ID}-{SPAN_ID}-01"
+    assert parse_traceparent(f" 00-{TRACE_ID.upper()}-{SPAN_ID}-00 ") == SpanContext(TRACE_ID, SPAN_ID, False)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        "",
+        "garbage",
+        f"01-{TRACE_ID}-{SPAN_ID}-01",  # unknown version
+        f"00-{TRACE_ID[:-1]}-{SPAN_ID}-01",  # short trace id
+        f"00-{TRACE_ID}-{SPAN_ID}z-01",
+        f"00-{'0' * 32}-{SPAN_ID}-01",  # all-zero ids are invalid
+        f"00-{TRACE_ID}-{'0' * 16}-01",
+    ],
+)
+def test_parse_traceparent_rejects_invalid_headers(value):
+    assert parse_traceparent(value) is None
+
+
+def test_inject_headers_without_a_span_leaves_headers_alone():
+    assert inject_headers({"Accept": "application/json"}) == {"Accept": "application/json"}
+
+
+def test_inject_headers_carries_the_current_span():
+    original = {"Accept": "application/json"}
+    with start_span("outer") as span:
+        headers = inject_headers(original)
+
+    assert headers["traceparent"] == span.context.traceparent
+    assert "traceparent" not in original
+
+
+def test_start_span_links_children_to_the_current_span():
+    with start_span("parent") as parent:
+        with start_span("child") as child:
+            assert current_span() is child
+        assert current_span() is parent
+
+    assert current_span() is None
+    assert parent.parent_id is None
+    assert child.trace_id == parent.trace_id
+    assert child.parent_id == parent.context.span_id
+    assert child.context.span_id != parent.context.span_id
+    assert child.end_ns is not None and parent.end_ns is not None
+
+
+def test_start_span_continues_an_explicit_parent_and_records_errors():
+    remote = SpanContext(TRACE_ID, SPAN_ID, sampled=False)
+
+    with pytest.raises(RuntimeError):
+        with start_span("work", parent=remote) as span:
+            raise RuntimeError("boom")
+
+    assert (span.trace_id, span.parent_id, span.context.sampled) == (TRACE_ID, SPAN_ID, False)
+    assert span.error
+    assert span.attributes["exception.type"] == "RuntimeError"
+
+
+async def _call(middleware, path="/query", headers=()):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": list(headers)}
+    await middleware(scope, receive, send)
+    return messages
+
+
+def _app(seen):
+    async def app(scope, receive, send):
+        seen.append(current_span())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    return app
+
+
+async def test_middleware_continues_an_incoming_traceparent():
+    seen = []
+
+    header = (b"traceparent", f"00-{TRACE_ID}-{SPAN_ID}-01".encode())
+
+    messages = await _call(TracingMiddleware(_app(seen)), headers=[header])
+
+    span = seen[0]
+    assert (span.trace_id, span.parent_id, span.kind) == (TRACE_ID, SPAN_ID, "server")
+    assert span.name == "POST /query"
+    assert span.attributes["http.status_code"] == 200
+    assert (b"x-trace-id", TRACE_ID.encode()) in messages[0]["headers"]
+    assert current_span() is None
+
+
+async def test_middleware_starts_a_new_trace_without_a_valid_header():
+    seen = []
+    header = (b"traceparent", f"00-{'0' * 32}-{SPAN_ID}-01".encode())
+
+    await _call(TracingMiddleware(_app(seen)), headers=[header])
+
+    assert seen[0].parent_id is None
+    assert seen[0].trace_id != "0" * 32
+
+
+async def test_middleware_skips_health_checks():
+    seen = []
+
+    messages = await _call(TracingMiddleware(_app(seen)), path="/health")
+
+    assert seen == [None]
+    assert messages[0]["headers"] == []
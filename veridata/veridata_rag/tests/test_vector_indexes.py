@@ -0,0 +1,100 @@
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+
+from src.services import config_service, vector_indexes
+from src.storage.repository import tenant_partition_name, vector_index_name, vector_search_params
+
+TENANT = uuid.uuid4()
+PARTITION = tenant_partition_name(TENANT)
+
+
+@pytest.fixture
+def tenant(monkeypatch):
+    state = {"settings": {}, "indexes": {"full"}, "calls": []}
+
+    async def get_tenant_settings(tenant_id):
+        return state["settings"]
+
+    async def get_tenant_languages(tenant_id):
+        return None
+
+    async def ensure_tenant_partition(tenant_id):
+        state["calls"].append("ensure_partition")
+
+    @asynccontextmanager
+    async def vector_index_lock(partition):
+        state["calls"].append("lock")
+        yield
+        state["calls"].append("unlock")
+
+    async def create_vector_index(partition, storage):
+        state["calls"].append(f"create {storage}")
+        created = storage not in state["indexes"]
+        state["indexes"].add(storage)
+        return created
+
+    async def set_tenant_vector_index(tenant_id, storage):
+        state["calls"].append(f"switch {storage}")
+        state["settings"]["vector_index"] = storage
+
+    async def drop_vector_indexes(partition, keep):
+        state["calls"].append(f"drop all but {keep}")
+        state["indexes"] &= {keep}
+
+    monkeypatch.setattr(config_service, "get_tenant_settings", get_tenant_settings)
+    monkeypatch.setattr(config_service, "get_tenant_languages", get_tenant_languages)
+    for name, fn in (
+        ("ensure_tenant_partition", ensure_tenant_partition),
+        ("vector_index_lock", vector_index_lock),
+        ("create_vector_index", create_vector_index),
+        ("set_tenant_vector_index", set_tenant_vector_index),
+        ("drop_vector_indexes", drop_vector_indexes),
+    ):
+        monkeypatch.setattr(vector_indexes, name, fn)
+    return state
+
+
+def test_index_names_fit_postgres_identifiers():
+    assert vector_index_name(PARTITION, "halfvec") == f"{PARTITION}_halfvec_hnsw"
+    assert max(len(vector_index_name(PARTITION, mode)) for mode in ("full", "halfvec", "binary")) <= 63
+
+
+async def test_queries_use_the_indexed_mode_until_the_switch(tenant):
+    tenant["settings"] = {"retrieval": {"vector_storage": "binary", "rescore_factor": 4}}
+
+    settings = await config_service.get_tenant_retrieval_settings(TENANT)
+
+    assert (settings["vector_storage"], settings["query_vector_storage"]) == ("binary", "full")
+    assert vector_search_params(settings, 10) == {"storage": "full", "candidates": 40}
+
+
+async def test_switch_builds_the_new_index_before_dropping_the_old_one(tenant):
+    tenant["settings"] = {"retrieval": {"vector_storage": "halfvec"}}
+
+    assert await vector_indexes.sync_vector_index(TENANT) == "halfvec"
+
+    assert tenant["calls"] == [
+        "ensure_partition", "lock", "create halfvec", "switch halfvec", "drop all but halfvec", "unlock"
+    ]
+    assert tenant["indexes"] == {"halfvec"}
+    settings = await config_service.get_tenant_retrieval_settings(TENANT)
+    assert settings["query_vector_storage"] == "halfvec"
+
+
+async def test_switching_back_to_full_restores_the_full_precision_index(tenant):
+    tenant["settings"] = {"vector_index": "binary", "retrieval": {}}
+    tenant["indexes"] = {"binary"}
+
+    assert await vector_indexes.sync_vector_index(TENANT) == "full"
+
+    assert tenant["indexes"] == {"full"}
+    assert tenant["settings"]["vector_index"] == "full"
+
+
+async def test_sync_without_a_change_only_cleans_up(tenant):
+    await vector_indexes.sync_vector_index(TENANT)
+
+    assert "switch full" not in tenant["calls"]
+    assert tenant["indexes"] == {"full"}
@@ -0,0 +1,95 @@
+import io
+
+import pytest
+from PIL import Image, UnidentifiedImageError
+
+from src.services import vlm
+
+
+def _png(width, height, mode="RGBA"):
+    output = io.BytesIO()
+    Image.new(mode, (width, height), (200, 10, 10, 128) if mode == "RGBA" else (200, 10, 10)).save(output, "PNG")
+    return output.getvalue()
+
+
+def test_prepare_image_downsizes_and_reencodes_as_jpeg():
+    prepared = vlm.prepare_image(_png(4000, 3000), max_side=1536)
+
+    with Image.open(io.BytesIO(prepared)) as image:
+        assert image.format == "JPEG"
+        assert image.mode == "RGB"
+        assert image.size == (1536, 1152)
+
+
+def test_prepare_image_keeps_small_images_at_their_size():
+    prepared = vlm.prepare_image(_png(300, 200, mode="RGB"), max_side=1536)
+
+    with Image.open(io.BytesIO(prepared)) as image:
+        assert image.size == (300, 200)
+
+
+class _FakeModel:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    async def generate_content_async(self, parts):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return type("Response", (), {"text": "A red square"})()
+
+
+@pytest.fixture
+def vlm_env(monkeypatch):
+    state = {"cached": None, "stored": [], "model": _FakeModel()}
+
+    async def get_cached(image_hash, model_name, prompt_hash):
+        return state["cached"]
+
+    async def store_cached(image_hash, model_name, prompt_hash, description):
+        state["stored"].append(description)
+
+    monkeypatch.setattr(vlm, "resolve_image_provider", lambda: "gemini")
+    monkeypatch.setattr(vlm, "_vlm_config", lambda: {"requests_per_minute": 0})
+    monkeypatch.setattr(vlm, "get_cached_image_description", get_cached)
+    monkeypatch.setattr(vlm, "store_cached_image_description", store_cached)
+    monkeypatch.setattr(vlm, "get_image_model", lambda model_name: state["model"])
+    monkeypatch.setattr(vlm, "_semaphore", None)
+    monkeypatch.setattr(vlm, "_rate_limiter", None)
+    return state
+
+
+async def test_describe_image_caches_new_captions(vlm_env):
+    description = await vlm.describe_image(_png(64, 64), "square.png", model_name="gemini-test")
+
+    assert description == "A red square"
+    assert vlm_env["stored"] == ["A red square"]
+    assert vlm_env["model"].calls == 1
+
+
+async def test_describe_image_uses_the_cached_caption(vlm_env):
+    vlm_env["cached"] = "Cached caption"
+
+    description = await vlm.describe_image(_png(64, 64), "square.png", model_name="gemini-test")
+
+    assert description == "Cached caption"
+    assert vlm_env["model"].calls == 0
+    assert vlm_env["stored"] == []
+
+
+async def test_describe_image_raises_on_unreadable_images(vlm_env):
+    with pytest.raises(UnidentifiedImageError):
+        await vlm.describe_image(b"not an image", "broken.png", model_name="gemini-test")
+
+    assert vlm_env["model"].calls == 0
+    assert vlm_env["stored"] == []
+
+
+async def test_describe_image_raises_model_errors_without_caching(vlm_env):
+    vlm_env["model"] = _FakeModel(error=ConnectionError("429 Too Many Requests"))
+
+    with pytest.raises(ConnectionError):
+        await vlm.describe_image(_png(64, 64), "square.png", model_name="gemini-test")
+
+    assert vlm_env["stored"] == []
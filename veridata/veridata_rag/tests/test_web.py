@@ -0,0 +1,40 @@
+from src.controllers.web import merge_tenant_settings
+
+
+def test_merge_keeps_settings_the_form_does_not_expose():
+    stored = {
+        "retrieval": {
+            "ef_search": 40, "max_scan_tuples": 50000, "rescore_factor": 4, "adaptive_retrieval": {"enabled": True}
+        },
+        "chunking": {"strategy": "sentence", "chunk_size": 512},
+        "other": {"kept": True},
+    }
+
+    merged = merge_tenant_settings(stored, {"ef_search": 100}, {"chunk_size": 1024})
+
+    assert merged["retrieval"] == {
+        "ef_search": 100, "max_scan_tuples": 50000, "rescore_factor": 4, "adaptive_retrieval": {"enabled": True}
+    }
+    assert merged["chunking"] == {"chunk_size": 1024}
+    assert merged["other"] == {"kept": True}
+
+
+def test_merge_drops_form_keys_left_empty():
+    stored = {"retrieval": {"fts_config": "portuguese", "rerank_backend": "lexical", "rescore_factor": 2}}
+
+    merged = merge_tenant_settings(stored, {}, {})
+
+    assert merged["retrieval"] == {"rescore_factor": 2}
+    assert merged["chunking"] == {}
+
+
+def test_merge_does_not_modify_the_stored_settings():
+    stored = {"retrieval": {"ef_search": 40}}
+
+    merge_tenant_settings(stored, {"ef_search": 80}, {})
+
+    assert stored == {"retrieval": {"ef_search": 40}}
+
+
+def test_merge_handles_tenants_without_settings():
+    assert merge_tenant_settings(None, {"ef_search": 80}, {}) == {"retrieval": {"ef_search": 80}, "chunking": {}}